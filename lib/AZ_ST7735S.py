@@ -59,8 +59,11 @@
 # Code imports for Screen
 import busio, board #Pico and Lower Level Stuff
 from adafruit_st7735r import ST7735R #Screen Driver
-import displayio, terminalio #Graphics stuff
-from adafruit_display_text import label #Text Label 
+import displayio #Graphics stuff
+import time #Refresh timing for Metrics
+from DirtyRegion import DirtyRegion #Changed area tracking
+from ScrollTransition import ScrollTransition #Hardware scrolled background transitions
+from Clock import getNow #Monotonic ms
 
 class AZ_ST7735S:
     # ****************************
@@ -73,7 +76,17 @@ class AZ_ST7735S:
     __tft_sda = board.GP19 #also called the MOSI pin
     __tft_res = board.GP16 #also called the reset pin
 
-    # TFT Dimensions in Pixels
+    # SPI bus shared with other panels (see DisplayManager), None to set one up on the sck / sda pins above
+    __tft_spi = None
+
+    # SPI bus this object set up itself (given back before setting up again) and the SPI clock in Hz, the Pico
+    # divides its 125MHz clock down so it runs at the nearest rate below (24MHz, Circuit Python's default, is 20.8MHz)
+    __tft_ownSpi = None
+    __tft_baudrate = 24000000
+
+    # TFT Dimensions in Pixels (portrait, width and height are swapped for landscape)
+    __TFT_PANEL_WIDTH=128
+    __TFT_PANEL_HEIGHT=160
     __tft_width=128
     __tft_height=160
 
@@ -83,39 +96,140 @@ class AZ_ST7735S:
     # Reference to screen once initialised
     __tft_screen = None
 
+    # Reference to the display driver once initialised (ST7735R on the Pico, the simulated one under tools/sim)
+    __tft_display = None
+
+    # SPI bus the screen is on (transitions send their own commands to it) and the transition maker once used
+    __tft_bus = None
+    __transition = None
+
     # Background Set
     __hasBackground = False
+
+    # Long lived solid colour background (made once, colour changes only touch the palette)
+    __colourBackground = None
+    __colourPalette = None
+    __backgroundColour = None
+
+    # Recently used background images as (file name, TileGrid), most recently used last
+    __imageBackgrounds = None
+    __imageCacheSize = 2
+
+    # Changed areas since the last refresh and counters for what each refresh sent
+    __dirty = None
+    __lastUpdateBytes = 0
+    __bytesPushed = 0
+    __updates = 0
+
+    # Batched updates (beginUpdate / commit), refreshes asked for inside a batch are held back until commit.  To count
+    # what a batch saved the refreshes it would have taken without batching are counted as it goes: refresh() calls
+    # with something new to send, or with auto refresh each change made more than AUTO_REFRESH_MS after the one
+    # displayio would still have been about to send.  __batchUpdates is the refresh count when the batch started.
+    AUTO_REFRESH_MS = 16 #displayio auto refreshes at up to 60 frames per second
+    __batchDepth = 0
+    __batchAutoRefresh = False
+    __batchDeferred = 0
+    __batchUpdates = 0
+    __batchChanged = False
+    __batchPendingSince = None
+    __batches = 0
+    __refreshesSaved = 0
+    __lastBatchSaved = 0
+
+    # Metrics the refresh time (us) and bytes are recorded in, None until setMetrics()
+    __metrics = None
+    __refreshMetric = None
+    __refreshBytesMetric = None
     
     # ****************************
     # *   FUNCTION DEFINITIONS   *
     # ****************************
     #
+    # function __init__
+    # Pins left as None use the wiring above, pass others to run more than one panel (see DisplayManager)
+    # @param cs [None]: chip select pin
+    # @param dc [None]: command (RS) pin
+    # @param res [None]: reset pin
+    # @param sck [None]: clock pin
+    # @param sda [None]: MOSI pin
+    # @param spi [None]: busio.SPI already set up and shared with other panels, sck and sda are then not used
+    def __init__(self, cs = None, dc = None, res = None, sck = None, sda = None, spi = None):
+        if cs != None:
+            self.__tft_cs = cs
+        if dc != None:
+            self.__tft_dc = dc
+        if res != None:
+            self.__tft_res = res
+        if sck != None:
+            self.__tft_sck = sck
+        if sda != None:
+            self.__tft_sda = sda
+
+        self.__tft_spi = spi
+
     # function initialiseScreen
     # This does all the behind the scenes screen setup with the driver and a canvas for drawing onto
     # @param orientation: 0 = Portrait, 90 = Landscape left to right, 180 = Upside Down, 270 = Landscape right to left
-    def initialiseScreen(self, orientation):
+    # @param autoRefresh [True]: let displayio refresh in the background.  If False nothing is sent until you call refresh()
+    #                            so a batch of changes goes out as one update
+    # @param profiler [None]: BootProfiler to mark the SPI bus and driver set up stages on
+    # @param releaseDisplays [True]: release any displays from previous code runs first, False when other panels
+    #                                have already been set up in this run (it would release those too)
+    # @param baudrate [None]: SPI clock in Hz (see BaudTuner), None to keep the last one used (24MHz to start with)
+    def initialiseScreen(self, orientation, autoRefresh = True, profiler = None, releaseDisplays = True, baudrate = None):
         self.__tft_orientation=orientation
 
+        if baudrate != None:
+            self.__tft_baudrate = baudrate
+
         # Release any resources that may already be in use (from previous code runs)
-        displayio.release_displays()
+        if releaseDisplays:
+            displayio.release_displays()
+
+        # Setting up again (e.g. at another baud rate), the pins are still held by the SPI bus from last time
+        if self.__tft_ownSpi != None:
+            self.__tft_ownSpi.deinit()
+            self.__tft_ownSpi = None
+
+        # Setup Screen communication with SPI (or use the bus shared with other panels)
+        SPI = self.__tft_spi
+
+        if SPI == None:
+            SPI = busio.SPI(clock=self.__tft_sck, MOSI=self.__tft_sda)
+            self.__tft_ownSpi = SPI
+
+        display_bus = displayio.FourWire(SPI, command=self.__tft_dc, chip_select=self.__tft_cs, reset=self.__tft_res, baudrate=self.__tft_baudrate)
+        self.__tft_bus = display_bus
+        self.__transition = None
 
-        # Setup Screen communication with SPI
-        SPI = busio.SPI(clock=self.__tft_sck, MOSI=self.__tft_sda)
-        display_bus = displayio.FourWire(SPI, command=self.__tft_dc, chip_select=self.__tft_cs, reset=self.__tft_res)
+        if profiler != None:
+            profiler.mark("spi bus")
 
         # Setup Screen Driver
         # if landscape swap width and height
+        self.__tft_width = self.__TFT_PANEL_WIDTH
+        self.__tft_height = self.__TFT_PANEL_HEIGHT
+
         if self.__tft_orientation == 90 or self.__tft_orientation == 270:
-            tmp = self.__tft_width
-            self.__tft_width = self.__tft_height
-            self.__tft_height = tmp
+            self.__tft_width = self.__TFT_PANEL_HEIGHT
+            self.__tft_height = self.__TFT_PANEL_WIDTH
 
         # This screen has reverse order RGB (bgr) colour values so we need to set bgr = True otherwise colours are backwards
         # (e.g. you use blue but see red if you don't set this to True)
-        display = ST7735R(display_bus, width=self.__tft_width, height=self.__tft_height, rotation=self.__tft_orientation, bgr=True)
+        display = ST7735R(display_bus, width=self.__tft_width, height=self.__tft_height, rotation=self.__tft_orientation, bgr=True, auto_refresh=autoRefresh)
+        self.__tft_display = display
+
+        if profiler != None:
+            profiler.mark("driver")
+
+        # Track changed areas so we know what each refresh costs (and can skip refreshes where nothing changed)
+        self.__dirty = DirtyRegion(self.__tft_width, self.__tft_height)
 
         # Get a screen reference that allows us to put groups of items onto it
         self.__tft_screen = displayio.Group()
+        self.__hasBackground = False
+        self.__colourBackground = None
+        self.__imageBackgrounds = []
 
         # Set the display to use our screen group
         display.root_group = self.__tft_screen
@@ -132,6 +246,172 @@ class AZ_ST7735S:
         
         return self.__tft_screen
     
+    # function getDisplay
+    # Gets the display driver object, useful for refresh() and the counters the host simulator keeps
+    # @return display driver or None if not initialised yet
+    def getDisplay(self):
+        return self.__tft_display
+
+    # function getDirtyRegion
+    # Gets the changed area tracker, pass this to screens/labels so they can mark what they change
+    # @return DirtyRegion
+    def getDirtyRegion(self):
+        return self.__dirty
+
+    # function markDirty
+    # Marks an area of the screen as changed
+    # @param x: left co-ordinate
+    # @param y: top co-ordinate
+    # @param width: width in pixels
+    # @param height: height in pixels
+    def markDirty(self, x, y, width, height):
+        self.__dirty.mark(x, y, width, height)
+
+    # function refresh
+    # Sends everything marked dirty since the last refresh to the screen as one update
+    # The dirty windows are merged and if they add up to more than the full screen threshold the whole screen is sent
+    # Inside beginUpdate() / commit() nothing is sent, commit() does one refresh for the whole batch
+    # @return True if anything was sent, False if nothing had changed (or it was held back for a batch)
+    def refresh(self):
+        if not self.__dirty.isDirty():
+            self.__lastUpdateBytes = 0
+            return False
+
+        if self.__batchDepth > 0:
+            # Without the batch this would have sent whatever changed since the last one
+            if self.__batchChanged and not self.__batchAutoRefresh:
+                self.__batchDeferred += 1
+                self.__batchChanged = False
+
+            return False
+
+        started = time.monotonic_ns()
+        self.__lastUpdateBytes = self.__dirty.cost()
+        self.__bytesPushed += self.__lastUpdateBytes
+        self.__updates += 1
+        self.__dirty.clear()
+
+        # With auto refresh on displayio has already sent (or will send) the changes itself
+        if not self.__tft_display.auto_refresh:
+            self.__tft_display.refresh()
+
+        if self.__metrics != None:
+            self.__metrics.observe(self.__refreshMetric, (time.monotonic_ns() - started) // 1000)
+            self.__metrics.increment(self.__refreshBytesMetric, self.__lastUpdateBytes)
+
+        return True
+
+    # function setMetrics
+    # Records each refresh's time in the "refresh" histogram (us) and the bytes in the "refreshBytes" counter
+    # @param metrics: Metrics, None to stop recording
+    def setMetrics(self, metrics):
+        self.__metrics = metrics
+
+        if metrics != None:
+            self.__refreshMetric = metrics.addHistogram("refresh")
+            self.__refreshBytesMetric = metrics.addCounter("refreshBytes")
+
+    # function beginUpdate
+    # Starts a batch of changes: auto refresh is suspended and refresh() calls are held back until commit() so all the
+    # changes go out as one update.  Batches can be nested, only the outermost commit() refreshes.
+    # Can also be used as "with tft:"
+    def beginUpdate(self):
+        if self.__batchDepth == 0:
+            self.__batchAutoRefresh = self.__tft_display.auto_refresh
+            self.__tft_display.auto_refresh = False
+            self.__batchDeferred = 0
+            self.__batchUpdates = self.__updates
+            self.__batchChanged = self.__dirty.isDirty()
+            self.__batchPendingSince = getNow() if self.__batchChanged else None
+            self.__dirty.setOnMark(self._onBatchMark)
+
+        self.__batchDepth += 1
+
+    # function _onBatchMark
+    # Counts the refreshes a change inside a batch would have cost without it
+    def _onBatchMark(self):
+        self.__batchChanged = True
+
+        if not self.__batchAutoRefresh:
+            return
+
+        now = getNow()
+
+        # Auto refresh would have sent what was waiting before this change came along
+        if self.__batchPendingSince == None:
+            self.__batchPendingSince = now
+        elif now - self.__batchPendingSince >= self.AUTO_REFRESH_MS:
+            self.__batchDeferred += 1
+            self.__batchPendingSince = now
+
+    # function commit
+    # Ends a batch, sends everything it changed in one refresh and puts auto refresh back how it was
+    # @return number of refreshes the batch saved: the refreshes it would have taken without batching (refresh()
+    #         calls that had something new to send, or auto refresh's background refreshes) less the ones it sent
+    def commit(self):
+        if self.__batchDepth == 0:
+            return 0
+
+        self.__batchDepth -= 1
+
+        if self.__batchDepth > 0:
+            return 0
+
+        self.__dirty.setOnMark(None)
+
+        # Whatever is still waiting would have gone out in one more refresh
+        if self.__batchChanged:
+            self.__batchDeferred += 1
+
+        self.refresh()
+        self.__tft_display.auto_refresh = self.__batchAutoRefresh
+
+        saved = max(0, self.__batchDeferred - (self.__updates - self.__batchUpdates))
+        self.__batches += 1
+        self.__refreshesSaved += saved
+        self.__lastBatchSaved = saved
+        return saved
+
+    def __enter__(self):
+        self.beginUpdate()
+        return self
+
+    def __exit__(self, exceptionType, exceptionValue, traceback):
+        self.commit()
+        return False
+
+    # function getBatchStats
+    # @return dict of batches committed, refreshes saved in total and by the last batch
+    def getBatchStats(self):
+        return {
+            "batches": self.__batches,
+            "refreshesSaved": self.__refreshesSaved,
+            "lastSaved": self.__lastBatchSaved,
+        }
+
+    # function getLastUpdateBytes
+    # @return bytes the last refresh() put on the SPI bus (worked out from the dirty windows)
+    def getLastUpdateBytes(self):
+        return self.__lastUpdateBytes
+
+    # function getPendingBytes
+    # @return bytes the next refresh() would put on the SPI bus, 0 if nothing has changed
+    def getPendingBytes(self):
+        if self.__dirty == None or not self.__dirty.isDirty():
+            return 0
+
+        return self.__dirty.cost()
+
+    # function getBytesPushed
+    # @return total bytes sent by refresh() since the screen was initialised
+    def getBytesPushed(self):
+        return self.__bytesPushed
+
+    # function getUpdateCount
+    # @return number of refresh() calls that sent something
+    def getUpdateCount(self):
+        return self.__updates
+
     def getWidth(self):
         return self.__tft_width
     
@@ -141,6 +421,18 @@ class AZ_ST7735S:
     def getOrientation(self):
         return self.__tft_orientation
 
+    # function sendCommand
+    # Sends a command straight to the panel, e.g. 0x28 DISPOFF / 0x10 SLPIN to blank it (see Backlight)
+    # @param command: command byte
+    # @param data [b""]: parameter bytes
+    def sendCommand(self, command, data = b""):
+        self.__tft_bus.send(command, data)
+
+    # function getBaudrate
+    # @return SPI clock in Hz asked for when the screen was set up
+    def getBaudrate(self):
+        return self.__tft_baudrate
+
     # Creates an adafruit_display_text -> label at the given co-ordinates
     # @param x = x co-ordinate to display label
     # @param y = y co-ordinate to display label
@@ -148,37 +440,162 @@ class AZ_ST7735S:
     # @param text = Text to display, if the text is too long, it will go off the screen
     # @return Label you can append to a display group
     def createLabel(self, x, y, colour, text):
+        # Only imported when a label is wanted, adafruit_display_text is slow to import and the screen doesn't need it to start
+        from adafruit_display_text import label
+        import terminalio
         return label.Label(terminalio.FONT, text=text, color=colour, x=x, y=y)
     
+    # function _setLayer0
+    # Puts the given background in layer 0 (replacing whatever background was there)
+    # @param background: TileGrid to use as the background
+    # @return True if layer 0 changed, False if it was already this background
+    def _setLayer0(self, background):
+        if self.__hasBackground:
+            if self.__tft_screen[0] is background:
+                return False
+            
+            self.__tft_screen[0] = background
+        else:
+            self.__tft_screen.insert(0, background)
+            self.__hasBackground = True
+        
+        return True
+    
     # Sets layer 0 to the given colour
+    # The full screen bitmap is only created the first time, after that a colour change just changes its palette entry
+    # so we don't churn 160 x 128 bitmaps through the heap every cycle
     # @param colour = Hex value for colour (same as HTML e.g. 0x0000FF = Blue)
     def setBackgroundColour(self, colour):
         
-        color_bitmap = displayio.Bitmap(self.__tft_width, self.__tft_height, 1)
-        color_palette = displayio.Palette(1)
-        color_palette[0] = colour
-        background = displayio.TileGrid(color_bitmap, pixel_shader=color_palette,x=0, y=0)
+        if self.__colourBackground == None:
+            color_bitmap = displayio.Bitmap(self.__tft_width, self.__tft_height, 1)
+            self.__colourPalette = displayio.Palette(1)
+            self.__colourBackground = displayio.TileGrid(color_bitmap, pixel_shader=self.__colourPalette, x=0, y=0)
+            self.__backgroundColour = None
         
-        # If we have a background already, remove it and replace with new colour
-        if self.__hasBackground:
-            #Remove Layer 0
-            self.__tft_screen.pop(0)
-            
-        #Put this as layer 0
-        self.__tft_screen.insert(0, background)        
-        self.__hasBackground = True
+        changed = self._setLayer0(self.__colourBackground)
+        
+        if self.__backgroundColour != colour:
+            self.__colourPalette[0] = colour
+            self.__backgroundColour = colour
+            changed = True
+        
+        if changed:
+            self.__dirty.markAll()
         
     # Sets layer 0 to an image from disk stored on the pico under /images
+    # The last few images are kept (see setImageCacheSize) so swapping back to them doesn't reopen the file
+    # @param imageFile: file name inside /images on the Pico
     def setBackgroundImage(self, imageFile):
-        # Setup the file as the bitmap data source
-        bitmap = displayio.OnDiskBitmap("/images/" + imageFile)
-
-        # Create a TileGrid to hold the bitmap
-        tile_grid = displayio.TileGrid(bitmap, pixel_shader=bitmap.pixel_shader)
+        tile_grid = None
         
-        if self.__hasBackground:
-            #Remove Layer 0
-            self.__tft_screen.pop(0)
+        for i in range(len(self.__imageBackgrounds)):
+            if self.__imageBackgrounds[i][0] == imageFile:
+                # Move to the end so it's the most recently used
+                entry = self.__imageBackgrounds.pop(i)
+                self.__imageBackgrounds.append(entry)
+                tile_grid = entry[1]
+                break
+        
+        if tile_grid == None:
+            # Setup the file as the bitmap data source
+            bitmap = displayio.OnDiskBitmap("/images/" + imageFile)
+            
+            # Create a TileGrid to hold the bitmap
+            tile_grid = displayio.TileGrid(bitmap, pixel_shader=bitmap.pixel_shader)
+            
+            self.__imageBackgrounds.append((imageFile, tile_grid))
+            
+            # Drop the least recently used image (never the one currently on screen, that's the one we just added)
+            while len(self.__imageBackgrounds) > self.__imageCacheSize:
+                self.__imageBackgrounds.pop(0)
+        
+        if self._setLayer0(tile_grid):
+            self.__dirty.markAll()
+    
+    # function setBackgroundLayer
+    # Sets layer 0 to a TileGrid you have already made (e.g. one prefetched by SlideShowLoader)
+    # @param tileGrid: TileGrid covering the screen
+    def setBackgroundLayer(self, tileGrid):
+        if self._setLayer0(tileGrid):
+            self.__dirty.markAll()
+    
+    # function transitionBackgroundLayer
+    # Sets layer 0 to a full screen TileGrid with a slide, wipe or reveal instead of a hard cut.  The panel scrolls the
+    # old picture itself (see ScrollTransition) and only strips of the new image are sent, once each, so it costs about
+    # the same as the full screen refresh a hard cut would do.
+    # Only for when nothing but the background is showing (hide other screens first), anything on top would be
+    # covered.  Can be used inside beginUpdate() / commit().
+    # displayio isn't told what was sent, so with auto refresh on it redraws the new background once the transition ends.
+    # @param tileGrid: TileGrid covering the screen (e.g. from SlideShowLoader.take())
+    # @param effect [ScrollTransition.SLIDE]: ScrollTransition.SLIDE, WIPE or REVEAL
+    # @param imagePath [None]: file an OnDiskBitmap TileGrid was opened from (e.g. SlideShowLoader.getImagePath())
+    # @param steps [16]: number of strips the image is sent in
+    # @return True if it was a transition, False if it fell back to setBackgroundLayer (image can't be streamed or
+    #         something else is showing)
+    def transitionBackgroundLayer(self, tileGrid, effect = ScrollTransition.SLIDE, imagePath = None, steps = 16):
+        covered = False
+
+        for i in range(1 if self.__hasBackground else 0, len(self.__tft_screen)):
+            if not self.__tft_screen[i].hidden:
+                covered = True
+
+        if self.__transition == None:
+            self.__transition = ScrollTransition(self.__tft_bus, self.__tft_orientation, panelWidth=min(self.__tft_width, self.__tft_height),
+                                                 panelHeight=max(self.__tft_width, self.__tft_height))
+
+        autoRefresh = self.__tft_display.auto_refresh
+        self.__tft_display.auto_refresh = False
+
+        if covered or not self.__transition.run(tileGrid, effect, steps, imagePath):
+            self.__tft_display.auto_refresh = autoRefresh
+            self.setBackgroundLayer(tileGrid)
+            return False
+
+        # The panel already shows the new background, so nothing that was waiting for a refresh needs sending
+        self._setLayer0(tileGrid)
+        self.__dirty.clear()
+        self.__lastUpdateBytes = self.__transition.getStats()["lastBytes"]
+        self.__bytesPushed += self.__lastUpdateBytes
+        self.__updates += 1
+        self.__tft_display.auto_refresh = autoRefresh
+        return True
+
+    # function drawPanelImage
+    # Sends an RGB565 PanelImage (tools/convert_images.py) straight to the panel, no decoding or colour conversion.
+    # displayio isn't told, so anything it redraws in that area later goes over the image, best for full screen
+    # pictures while nothing else is showing.
+    # @param image: PanelImage converted for this screen's orientation
+    # @param x [0]: left of the image on the screen
+    # @param y [0]: top of the image on the screen
+    # @return bytes sent, 0 if the image is indexed or was converted for another orientation
+    def drawPanelImage(self, image, x = 0, y = 0):
+        if image.getOrientation() != self.__tft_orientation:
+            return 0
+
+        sent = image.draw(self.__tft_bus, x, y, panelWidth=min(self.__tft_width, self.__tft_height), panelHeight=max(self.__tft_width, self.__tft_height))
+
+        if sent > 0:
+            self.__lastUpdateBytes = sent
+            self.__bytesPushed += sent
+            self.__updates += 1
+
+        return sent
+
+    # function getTransitionStats
+    # @return dict of ScrollTransition figures (transitions, fallbacks, bytes sent, last transition's bytes / steps / ms)
+    def getTransitionStats(self):
+        if self.__transition == None:
+            return {"transitions": 0, "fallbacks": 0, "bytesSent": 0, "lastBytes": 0, "lastSteps": 0, "lastMs": 0}
+
+        return self.__transition.getStats()
+
+    # function setImageCacheSize
+    # Sets how many background images are kept open for reuse by setBackgroundImage
+    # Each one holds an open file on the Pico so keep this small
+    # @param size: number of images to keep (minimum 1, the one on screen)
+    def setImageCacheSize(self, size):
+        self.__imageCacheSize = max(1, size)
         
-        self.__tft_screen.insert(0, tile_grid)
-        self.__hasBackground = True
+        while len(self.__imageBackgrounds) > self.__imageCacheSize:
+            self.__imageBackgrounds.pop(0)
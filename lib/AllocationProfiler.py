@@ -0,0 +1,115 @@
+# AllocationProfiler.py
+# Finds which calls make the garbage: every method of the classes given is wrapped to count how much gc.mem_alloc()
+# grows while it runs
+#
+# Bytes are inclusive (a method that calls another is charged for both) and only what's still allocated when the call
+# returns shows, so it's a guide to where the churn comes from rather than an exact count.  A call during which a
+# collection ran can't be measured (mem_alloc went down), those are counted as "collected".  The wrapping slows every
+# call down, so only turn it on to look.
+#
+#   profiler = AllocationProfiler()
+#   profiler.wrap(TemperatureScreen)
+#   ...
+#   print(profiler.formatStats())
+import gc
+
+class AllocationSite:
+    # function __init__
+    # @param name: Class.method
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.bytes = 0
+        self.max = 0
+        self.collected = 0
+
+class AllocationProfiler:
+    # ****************************
+    # *    INTERNAL VARIABLES    *
+    # ****************************
+    __sites = None
+    __wrapped = None
+
+    def __init__(self):
+        self.__sites = []
+        self.__wrapped = []
+
+    # function wrap
+    # Wraps __init__ and every method of a class (private name mangled ones and other dunders are left alone)
+    # @param cls: class to profile, instances already made are profiled too
+    def wrap(self, cls):
+        for name in dir(cls):
+            if name != "__init__" and (name.startswith("__") or "__" in name):
+                continue
+
+            function = getattr(cls, name)
+
+            if not callable(function) or isinstance(function, type):
+                continue
+
+            self._wrapMethod(cls, name, function)
+
+    # function _wrapMethod
+    def _wrapMethod(self, cls, name, function):
+        site = AllocationSite(cls.__name__ + "." + name)
+        self.__sites.append(site)
+        self.__wrapped.append((cls, name, function))
+
+        def profiled(*args, **kwargs):
+            before = gc.mem_alloc()
+            result = function(*args, **kwargs)
+            grown = gc.mem_alloc() - before
+            site.calls += 1
+
+            if grown < 0:
+                site.collected += 1
+            else:
+                site.bytes += grown
+
+                if grown > site.max:
+                    site.max = grown
+
+            return result
+
+        setattr(cls, name, profiled)
+
+    # function unwrap
+    # Puts every wrapped method back
+    def unwrap(self):
+        for cls, name, function in self.__wrapped:
+            setattr(cls, name, function)
+
+        self.__wrapped = []
+
+    # function reset
+    # Zeroes the counts
+    def reset(self):
+        for site in self.__sites:
+            site.calls = 0
+            site.bytes = 0
+            site.max = 0
+            site.collected = 0
+
+    # function getStats
+    # @return dict of Class.method -> dict of calls, bytes, max (one call) and collected, for methods that were called
+    def getStats(self):
+        stats = {}
+
+        for site in self.__sites:
+            if site.calls > 0:
+                stats[site.name] = {"calls": site.calls, "bytes": site.bytes, "max": site.max, "collected": site.collected}
+
+        return stats
+
+    # function formatStats
+    # @param top [10]: how many of the biggest allocators to list
+    # @return one line per method, most bytes first
+    def formatStats(self, top = 10):
+        sites = sorted([site for site in self.__sites if site.calls > 0], key = lambda site: site.bytes, reverse = True)
+        lines = []
+
+        for site in sites[:top]:
+            lines.append("{0}: {1} bytes in {2} calls ({3}/call, max {4}) collected during {5}".format(
+                site.name, site.bytes, site.calls, site.bytes // site.calls, site.max, site.collected))
+
+        return "\n".join(lines)
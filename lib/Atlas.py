@@ -0,0 +1,89 @@
+# Atlas.py
+# Sprite sheet atlas: the ImageLabel pictures packed into a few indexed bmps (one per tile size) so each is only loaded
+# (and allocated) once
+#
+# An atlas is made by tools/pack_atlas.py on a PC:
+#  - atlas_WxH.bmp: the sprite sheets with WxH tiles packed together, every bmp has the same palette (index 0 is
+#    transparent).  A TileGrid's tile size has to divide its bitmap exactly, so sheets with different tile sizes can't
+#    share a bmp.
+#  - atlas.txt: the bmp file names on the first line (comma separated), then one line per sprite:
+#    name,firstTile,tileWidth,tileHeight,frames,image (image is which of the bmps it's in, from 0)
+#
+# Each sprite's frames are packed so that with a TileGrid of tileWidth x tileHeight tiles over its atlas bitmap they
+# are tiles firstTile, firstTile + 1 ... firstTile + frames - 1.  That means an ImageLabel can use the shared bitmap
+# directly and changing picture is still just changing the tile number.
+#
+# Sprite names are the file names of the original sheets (e.g. temperature_1-2.bmp) so code can use either.
+import displayio
+import adafruit_imageload
+
+class Atlas:
+    # ****************************
+    # *    INTERNAL VARIABLES    *
+    # ****************************
+    __bitmaps = None
+    __palette = None
+    __sprites = None
+
+    # function __init__
+    # Loads the atlas image and manifest
+    # @param manifestPath: path to the manifest on the Pico (e.g. /images/atlas.txt), the images are the first line
+    def __init__(self, manifestPath):
+        self.__sprites = {}
+        self.__bitmaps = []
+        directory = manifestPath[:manifestPath.rfind("/") + 1]
+
+        with open(manifestPath, "r") as f:
+            lines = f.read().split("\n")
+
+        for line in lines[1:]:
+            if line == "" or line.startswith("#"):
+                continue
+
+            fields = line.split(",")
+            self.__sprites[fields[0]] = (int(fields[1]), int(fields[2]), int(fields[3]), int(fields[4]), int(fields[5]))
+
+        # The bmps all have the same palette, the first one's is kept
+        for image in lines[0].split(","):
+            bitmap, palette = adafruit_imageload.load(directory + image.strip(), bitmap=displayio.Bitmap, palette=displayio.Palette)
+            self.__bitmaps.append(bitmap)
+
+            if self.__palette == None:
+                self.__palette = palette
+
+        self.__palette.make_transparent(0)
+
+    # function exists
+    # Checks for an atlas manifest without loading it
+    # @param manifestPath: path to the manifest on the Pico
+    # @return True if the file is there
+    @staticmethod
+    def exists(manifestPath):
+        try:
+            with open(manifestPath, "r"):
+                return True
+        except OSError:
+            return False
+
+    # function getBitmap
+    # @param name: sprite name (original sheet file name)
+    # @return the shared displayio.Bitmap the sprite is in
+    def getBitmap(self, name):
+        return self.__bitmaps[self.__sprites[name][4]]
+
+    # function getPalette
+    # @return the shared displayio.Palette (index 0 transparent)
+    def getPalette(self):
+        return self.__palette
+
+    # function hasSprite
+    # @param name: sprite name (original sheet file name)
+    # @return True if the atlas has it
+    def hasSprite(self, name):
+        return name in self.__sprites
+
+    # function getSprite
+    # @param name: sprite name (original sheet file name)
+    # @return (firstTile, tileWidth, tileHeight, frames)
+    def getSprite(self, name):
+        return self.__sprites[name][:4]
@@ -0,0 +1,346 @@
+# Backlight.py
+# PWM brightness for the screen's backlight (LEDA) with fades, idle / time of day dimming and an energy estimate
+#
+# The backlight is most of the module's ~50mA, wired to 3V3 it is on full all the time.  Driven from a PWM pin instead:
+#  - brightness levels are as they look (0.5 looks half as bright), gamma corrected into the duty cycle
+#  - changes fade over fadeMs, a step every FADE_STEP ms, timed off the monotonic clock like the Scheduler
+#  - setIdle() dims (and optionally switches off) after a while without activity(), setSchedule() scales the
+#    brightness by time of day and setAmbient() by how bright the room is (e.g. from a light sensor)
+#  - at 0 (blank(), a schedule level of 0 or idle off) it fades out then puts the panel to sleep (DISPOFF, SLPIN), it
+#    wakes it again (SLPOUT, DISPON WAKE_TIME ms later) before fading back in
+#
+# Call update() from a Scheduler task, it returns how long until it next needs to run (FADE_STEP while fading).
+#
+# The energy counter integrates the estimated current of the backlight (fullCurrent x duty cycle) and the panel itself
+# (panelCurrent, or sleepCurrent while asleep), the defaults are rough figures for the AZ Delivery 1.77" module, measure
+# yours for better numbers.  It's for comparing settings, not a fuel gauge.
+#
+# WIRING:
+#
+# A GPIO pin can only supply ~12mA so it switches the backlight through a transistor, e.g. a PNP (S8550, BC327) with
+# the emitter on 3V3, the collector to TFT Pin 8 LEDA and the base to the PWM pin through a 1K resistor.  A PNP turns on
+# when the pin is low, pass inverted = True for that.
+#
+#  - PNP Emitter   --> Pico Pin 36 3V3 (Out)
+#  - PNP Collector --> TFT Pin 8 LEDA
+#  - PNP Base      --> 1K --> Pico GP22
+import time
+import pwmio
+from Clock import getNow
+
+# function getMinuteOfDay
+# @return minutes since midnight from the real time clock (only right once the clock has been set, e.g. over NTP)
+def getMinuteOfDay():
+    now = time.localtime()
+    return now.tm_hour * 60 + now.tm_min
+
+class Backlight:
+    # ****************************
+    # *    SETTINGS VARIABLES    *
+    # ****************************
+    # ms between duty cycle changes while fading (50 a second looks smooth) and the longest update() sleeps otherwise
+    FADE_STEP = 20
+    IDLE_CHECK = 500
+
+    # ms the ST7735S needs after SLPIN or SLPOUT before the next sleep command
+    WAKE_TIME = 120
+
+    # Brightness is scaled by AMBIENT_FLOOR in the dark (setAmbient(0)) up to 1 in a bright room (setAmbient(1))
+    AMBIENT_FLOOR = 0.2
+
+    __SLPIN = 0x10
+    __SLPOUT = 0x11
+    __DISPOFF = 0x28
+    __DISPON = 0x29
+
+    # Panel states
+    __PANEL_ON = 0
+    __PANEL_WAKING = 1
+    __PANEL_ASLEEP = 2
+
+    # ****************************
+    # *    INTERNAL VARIABLES    *
+    # ****************************
+    __pwm = None
+    __tft = None
+    __gamma = 2.2
+    __inverted = False
+    __duty = 0
+
+    # What's wanted
+    __level = 1.0
+    __ambient = 1.0
+    __fadeMs = 500
+    __fadeOverride = None
+    __dimAfter = None
+    __dimLevel = 0.3
+    __offAfter = None
+    __lastActivity = 0
+    __schedule = None
+    __blanked = False
+
+    # Fade in progress (levels as they look) and the panel's power state
+    __current = 0.0
+    __fadeFrom = 0.0
+    __fadeTo = 0.0
+    __fadeStart = 0
+    __fadeTime = 0
+    __panel = 0
+    __panelAt = 0
+
+    # Energy estimate (mA x ms) and counters
+    __fullCurrent = 40
+    __panelCurrent = 6
+    __sleepCurrent = 0.01
+    __voltage = 3.3
+    __lastAccount = 0
+    __startedAt = 0
+    __backlightMaMs = 0
+    __panelMaMs = 0
+    __asleepMs = 0
+    __fades = 0
+    __sleeps = 0
+
+    # function __init__
+    # Starts the PWM at level straight away (no fade)
+    # @param pin: board pin the backlight transistor is driven from
+    # @param tft [None]: AZ_ST7735S to put to sleep when blanked, None to only switch the backlight off
+    # @param level [1.0]: brightness 0 - 1
+    # @param fadeMs [500]: ms a change of brightness takes
+    # @param gamma [2.2]: how the duty cycle is curved so levels look even
+    # @param inverted [False]: True if the backlight is on when the pin is low (PNP / P-channel MOSFET)
+    # @param frequency [1000]: PWM frequency in Hz (too low flickers)
+    # @param fullCurrent [40]: mA the backlight draws at full brightness
+    # @param panelCurrent [6]: mA the panel draws awake (less the backlight)
+    # @param sleepCurrent [0.01]: mA the panel draws asleep
+    # @param voltage [3.3]: supply voltage for the mWh figure
+    def __init__(self, pin, tft = None, level = 1.0, fadeMs = 500, gamma = 2.2, inverted = False, frequency = 1000,
+                 fullCurrent = 40, panelCurrent = 6, sleepCurrent = 0.01, voltage = 3.3):
+        self.__tft = tft
+        self.__gamma = gamma
+        self.__inverted = inverted
+        self.__level = self._clamp(level)
+        self.__fadeMs = fadeMs
+        self.__current = self.__level
+        self.__fadeFrom = self.__level
+        self.__fadeTo = self.__level
+        self.__panel = self.__PANEL_ON
+        self.__fullCurrent = fullCurrent
+        self.__panelCurrent = panelCurrent
+        self.__sleepCurrent = sleepCurrent
+        self.__voltage = voltage
+
+        now = getNow()
+        self.__lastActivity = now
+        self.__lastAccount = now
+        self.__startedAt = now
+
+        self.__duty = self._duty(self.__level)
+        self.__pwm = pwmio.PWMOut(pin, frequency=frequency, duty_cycle=self._pinDuty(self.__duty))
+
+    # function _clamp
+    def _clamp(self, level):
+        return min(1.0, max(0.0, level))
+
+    # function _duty
+    # @param level: brightness 0 - 1 as it looks
+    # @return PWM duty cycle 0 - 65535 giving that brightness
+    def _duty(self, level):
+        return int(65535 * level ** self.__gamma + 0.5)
+
+    # function _pinDuty
+    # @param duty: backlight duty cycle
+    # @return duty cycle for the pin (flipped for a backlight that's on when the pin is low)
+    def _pinDuty(self, duty):
+        return 65535 - duty if self.__inverted else duty
+
+    # function setBrightness
+    # @param level: brightness 0 - 1 as it looks
+    # @param fadeMs [None]: ms to fade to it over, None for the fadeMs given to __init__
+    def setBrightness(self, level, fadeMs = None):
+        self.__level = self._clamp(level)
+        self.__fadeOverride = fadeMs
+
+    # function getBrightness
+    # @return brightness showing now (0 - 1, part way through a fade if one is going)
+    def getBrightness(self):
+        return self.__current
+
+    # function setAmbient
+    # @param fraction: how bright the room is, 0 (dark, brightness x AMBIENT_FLOOR) to 1 (bright, brightness x 1)
+    def setAmbient(self, fraction):
+        self.__ambient = self._clamp(fraction)
+
+    # function setIdle
+    # @param dimAfter: ms without activity() before dimming, None to never dim
+    # @param dimLevel [0.3]: brightness to dim to (if it's brighter)
+    # @param offAfter [None]: ms without activity() before blanking, None to never blank
+    def setIdle(self, dimAfter, dimLevel = 0.3, offAfter = None):
+        self.__dimAfter = dimAfter
+        self.__dimLevel = dimLevel
+        self.__offAfter = offAfter
+
+    # function activity
+    # Something worth looking at happened (a button press, a new reading), restarts the idle timer
+    def activity(self):
+        self.__lastActivity = getNow()
+
+    # function setSchedule
+    # @param schedule: list of (hour, minute, level) brightness scales from that time of day until the next entry (the
+    #                  last one runs on past midnight), level 0 blanks.  Empty or None for no schedule.
+    def setSchedule(self, schedule):
+        self.__schedule = sorted(schedule) if schedule else None
+
+    # function blank
+    # Fades the backlight out and puts the panel to sleep until unblank()
+    def blank(self):
+        self.__blanked = True
+
+    # function unblank
+    def unblank(self):
+        self.__blanked = False
+
+    # function isAsleep
+    # @return True if the panel is asleep (blanked, nothing showing)
+    def isAsleep(self):
+        return self.__panel != self.__PANEL_ON
+
+    # function _scheduled
+    # @return the schedule's brightness scale for now
+    def _scheduled(self):
+        minute = getMinuteOfDay()
+        level = self.__schedule[-1][2]
+
+        for hour, start, entryLevel in self.__schedule:
+            if hour * 60 + start <= minute:
+                level = entryLevel
+
+        return level
+
+    # function _target
+    # @param now: ms
+    # @return brightness wanted now
+    def _target(self, now):
+        if self.__blanked:
+            return 0.0
+
+        level = self.__level * (self.AMBIENT_FLOOR + (1 - self.AMBIENT_FLOOR) * self.__ambient)
+
+        if self.__schedule != None:
+            level *= self._scheduled()
+
+        idle = now - self.__lastActivity
+
+        if self.__offAfter != None and idle >= self.__offAfter:
+            return 0.0
+
+        if self.__dimAfter != None and idle >= self.__dimAfter:
+            level = min(level, self.__dimLevel)
+
+        return self._clamp(level)
+
+    # function update
+    # Moves fades on, dims / blanks / wakes as needed and keeps the energy count up to date
+    # @return ms until it should be called again
+    def update(self):
+        now = getNow()
+        self._account(now)
+        target = self._target(now)
+
+        # Asleep and wanted again: SLPOUT (once it has been asleep long enough), DISPON WAKE_TIME later
+        if self.__panel == self.__PANEL_ASLEEP:
+            if target == 0:
+                return self.IDLE_CHECK
+
+            if now - self.__panelAt < self.WAKE_TIME:
+                return self.WAKE_TIME - (now - self.__panelAt)
+
+            self.__tft.sendCommand(self.__SLPOUT)
+            self.__panel = self.__PANEL_WAKING
+            self.__panelAt = now
+            return self.WAKE_TIME
+
+        if self.__panel == self.__PANEL_WAKING:
+            if now - self.__panelAt < self.WAKE_TIME:
+                return self.WAKE_TIME - (now - self.__panelAt)
+
+            self.__tft.sendCommand(self.__DISPON)
+            self.__panel = self.__PANEL_ON
+
+        if target != self.__fadeTo:
+            self.__fadeFrom = self.__current
+            self.__fadeTo = target
+            self.__fadeStart = now
+            self.__fadeTime = self.__fadeMs if self.__fadeOverride == None else self.__fadeOverride
+            self.__fadeOverride = None
+            self.__fades += 1
+
+        fading = now - self.__fadeStart < self.__fadeTime
+
+        if fading:
+            self.__current = self.__fadeFrom + (self.__fadeTo - self.__fadeFrom) * (now - self.__fadeStart) / self.__fadeTime
+        else:
+            self.__current = self.__fadeTo
+
+        duty = self._duty(self.__current)
+
+        if duty != self.__duty:
+            self.__duty = duty
+            self.__pwm.duty_cycle = self._pinDuty(duty)
+
+        if fading:
+            return self.FADE_STEP
+
+        # Faded right out, the panel sleeps too
+        if self.__current == 0 and self.__tft != None:
+            self.__tft.sendCommand(self.__DISPOFF)
+            self.__tft.sendCommand(self.__SLPIN)
+            self.__panel = self.__PANEL_ASLEEP
+            self.__panelAt = now
+            self.__sleeps += 1
+
+        return self.IDLE_CHECK
+
+    # function _account
+    # Adds the energy used since the last call (at the duty cycle and panel state there's been since)
+    # @param now: ms
+    def _account(self, now):
+        elapsed = now - self.__lastAccount
+        self.__lastAccount = now
+        self.__backlightMaMs += self.__fullCurrent * self.__duty / 65535 * elapsed
+
+        if self.__panel == self.__PANEL_ASLEEP:
+            self.__panelMaMs += self.__sleepCurrent * elapsed
+            self.__asleepMs += elapsed
+        else:
+            self.__panelMaMs += self.__panelCurrent * elapsed
+
+    # function getEnergy
+    # @return estimated mWh used by the backlight and panel since __init__
+    def getEnergy(self):
+        return (self.__backlightMaMs + self.__panelMaMs) / 3600000 * self.__voltage
+
+    # function getStats
+    # @return dict of brightness, duty cycle, energy estimate and counters
+    def getStats(self):
+        elapsed = max(1, self.__lastAccount - self.__startedAt)
+
+        return {
+            "brightness": self.__current,
+            "duty": self.__duty,
+            "averageMa": (self.__backlightMaMs + self.__panelMaMs) / elapsed,
+            "backlightMah": self.__backlightMaMs / 3600000,
+            "panelMah": self.__panelMaMs / 3600000,
+            "mWh": self.getEnergy(),
+            "asleepPercent": 100 * self.__asleepMs / elapsed,
+            "fades": self.__fades,
+            "sleeps": self.__sleeps,
+        }
+
+    # function formatStats
+    # @return one line for printing to the serial console
+    def formatStats(self):
+        s = self.getStats()
+        return "backlight: {0:.0f}% duty {1} average {2:.1f}mA ({3:.2f}mAh backlight {4:.2f}mAh panel) {5:.2f}mWh asleep {6:.1f}% fades {7} sleeps {8}".format(
+            s["brightness"] * 100, s["duty"], s["averageMa"], s["backlightMah"], s["panelMah"], s["mWh"], s["asleepPercent"],
+            s["fades"], s["sleeps"])
@@ -0,0 +1,177 @@
+# BaudTuner.py
+# Finds the fastest SPI clock the screen runs at without corrupting the picture and saves it for later boots
+#
+# FourWire defaults to 24MHz.  The ST7735S datasheet only promises ~15MHz for writes but most panels go faster, how
+# much faster depends on the wiring (wire length, breadboard contacts ...).  The Pico divides its 125MHz clock down to
+# get the SPI clock so only 62.5, 31.25, 20.8, 15.6, 12.5MHz ... can actually be had, RATES are those.
+#
+# sweep() sets the screen up at each rate in turn, slowest first, shows a test pattern, times full screen repaints and
+# stops at the first rate that fails.  The panel can't be read back on this wiring (SDA is only driven by the Pico and
+# FourWire has no reads) so whether the pattern arrived intact is up to verify(tft): by default it asks over the serial
+# console.  The pattern is a white border (a dropped or extra byte shears it), eight colour bars (a wrong bit shows as
+# a wrong colour) and a one pixel checkerboard (the fastest changing data, first to smear).  Under the host simulator
+# tools/tune_spi.py checks the panel's memory against the display tree instead.
+#
+# The fastest good rate is written to CONFIG_PATH, main.py reads it back with loadBaudrate() at boot.  The Pico's
+# filesystem is read only to code unless boot.py remounts it, if the save fails set SPI_BAUDRATE in main.py instead.
+#
+# Setting the screen up again at each rate has to release every display (displayio.release_displays(), there's no
+# way to let go of just one panel's pins), so with several panels (DisplayManager) tune each one on its own before the
+# others are set up and hand its rate to DisplayManager.addPanel(baudrate=).  A sweep run after that leaves the other
+# panels released.
+import time
+import displayio
+
+# File the tuned rate is saved in (just the rate in Hz)
+CONFIG_PATH = "/spi_baudrate.txt"
+
+# function loadBaudrate
+# @param path [CONFIG_PATH]: file a sweep saved its rate in
+# @return SPI clock in Hz or None if it hasn't been tuned
+def loadBaudrate(path = CONFIG_PATH):
+    try:
+        with open(path, "r") as f:
+            return int(f.read().strip())
+    except (OSError, ValueError):
+        return None
+
+# function askOverSerial
+# The default check: asks on the serial console whether the test pattern looks right
+# @param tft: AZ_ST7735S showing the test pattern
+# @return True if it does
+def askOverSerial(tft):
+    answer = input("{0:.2f}MHz: sharp white border, 8 colour bars (white to black) and an even fine checkerboard? [y/n] ".format(
+        tft.getBaudrate() / 1000000))
+    return answer.strip().lower().startswith("y")
+
+class BaudTuner:
+    # ****************************
+    # *    SETTINGS VARIABLES    *
+    # ****************************
+    # SPI clocks the Pico can actually run at (125MHz / even divisors), slowest first
+    RATES = (12500000, 15625000, 20833333, 31250000, 62500000)
+
+    # Colour bars then black and white for the checkerboard and border
+    __COLOURS = (0xFFFFFF, 0xFFFF00, 0x00FFFF, 0x00FF00, 0xFF00FF, 0xFF0000, 0x0000FF, 0x000000, 0x000000, 0xFFFFFF)
+
+    # ****************************
+    # *    INTERNAL VARIABLES    *
+    # ****************************
+    __tft = None
+    __verify = None
+    __frames = 0
+    __results = None
+    __best = None
+
+    # function __init__
+    # @param tft: AZ_ST7735S that has been initialised
+    # @param verify [None]: function(tft) returning True if the test pattern arrived intact, None to ask over serial
+    # @param frames [10]: full screen repaints timed at each rate (rounded up to even so the pattern ends as drawn)
+    def __init__(self, tft, verify = None, frames = 10):
+        self.__tft = tft
+        self.__verify = verify if verify != None else askOverSerial
+        self.__frames = frames + frames % 2
+        self.__results = []
+
+    # function sweep
+    # Tries each rate, slowest first, until one fails then sets the screen up again at the fastest good one (or the
+    # rate it had before if none were good).  Anything that was on the screen is gone afterwards, and every other
+    # display is released (see the note at the top).
+    # @param rates [None]: SPI clocks in Hz to try, None for RATES
+    # @return fastest good rate in Hz or None
+    def sweep(self, rates = None):
+        tft = self.__tft
+        before = tft.getBaudrate()
+        self.__results = []
+        self.__best = None
+
+        for rate in sorted(rates if rates != None else self.RATES):
+            tft.initialiseScreen(tft.getOrientation(), autoRefresh=False, baudrate=rate)
+            good, msPerFrame = self._testRate()
+            self.__results.append((rate, good, msPerFrame))
+
+            if not good:
+                break
+
+            self.__best = rate
+
+        tft.initialiseScreen(tft.getOrientation(), autoRefresh=False, baudrate=self.__best if self.__best != None else before)
+        return self.__best
+
+    # function _testRate
+    # Shows the test pattern, times full screen repaints (the colours inverted every other one) and checks the result
+    # @return (True if verify passed, ms per full screen repaint)
+    def _testRate(self):
+        tft = self.__tft
+        width = tft.getWidth()
+        height = tft.getHeight()
+        bitmap = displayio.Bitmap(width, height, len(self.__COLOURS))
+        palette = displayio.Palette(len(self.__COLOURS))
+
+        for i in range(len(self.__COLOURS)):
+            palette[i] = self.__COLOURS[i]
+
+        for x in range(width):
+            bar = x * 8 // width
+
+            for y in range(height):
+                if x == 0 or y == 0 or x == width - 1 or y == height - 1:
+                    bitmap[x, y] = 9
+                elif y < height // 2:
+                    bitmap[x, y] = bar
+                else:
+                    bitmap[x, y] = 8 + (x + y) % 2
+
+        tft.setBackgroundLayer(displayio.TileGrid(bitmap, pixel_shader=palette))
+        tft.refresh()
+
+        started = time.monotonic_ns()
+
+        for frame in range(self.__frames):
+            for i in range(len(self.__COLOURS)):
+                palette[i] = self.__COLOURS[i] ^ (0xFFFFFF if frame % 2 == 0 else 0)
+
+            tft.markDirty(0, 0, width, height)
+            tft.refresh()
+
+        msPerFrame = (time.monotonic_ns() - started) / 1000000 / self.__frames
+        return self.__verify(tft), msPerFrame
+
+    # function save
+    # Writes the fastest good rate to the config file for loadBaudrate()
+    # @param path [CONFIG_PATH]: file to write
+    # @return True if saved, False if there's no good rate or the filesystem is read only
+    def save(self, path = CONFIG_PATH):
+        if self.__best == None:
+            return False
+
+        try:
+            with open(path, "w") as f:
+                f.write("{0}\n".format(self.__best))
+        except OSError:
+            return False
+
+        return True
+
+    # function getBest
+    # @return fastest good rate in Hz from the last sweep or None
+    def getBest(self):
+        return self.__best
+
+    # function getResults
+    # @return list of (rate in Hz, True if good, ms per full screen repaint) in the order tried
+    def getResults(self):
+        return self.__results
+
+    # function formatReport
+    # @return one line per rate tried: full frames a second measured and what the SPI clock alone would allow
+    def formatReport(self):
+        fullBytes = self.__tft.getDirtyRegion().fullCost()
+        lines = ["{0:>10} {1:>6} {2:>10} {3:>8} {4:>8}".format("MHz", "ok", "ms/frame", "fps", "spi fps")]
+
+        for rate, good, msPerFrame in self.__results:
+            lines.append("{0:>10.2f} {1:>6} {2:>10.2f} {3:>8.1f} {4:>8.1f}".format(rate / 1000000, "yes" if good else "NO",
+                msPerFrame, 1000 / max(0.001, msPerFrame), rate / (fullBytes * 8)))
+
+        lines.append("fastest good rate: " + ("none" if self.__best == None else "{0:.2f}MHz".format(self.__best / 1000000)))
+        return "\n".join(lines)
@@ -0,0 +1,88 @@
+# BootProfiler.py
+# Records how long each stage of boot takes and how much memory is free after it
+#
+# Make one as the very first thing main.py does and call mark() after each stage (imports, bus setup, driver, each
+# asset load ...).  markFirstFrame() goes after the first refresh that puts something on the panel (time to first
+# frame) and markInteractive() once the first real screen is up and the main loop is about to run (time to
+# interactive).  Times are from when the profiler was made, so CircuitPython's own start up isn't included.
+#
+# gc.mem_free() is read as is, without a gc.collect() first, so profiling doesn't change how long boot takes (the
+# figure includes garbage not collected yet).
+import gc, time
+
+class BootProfiler:
+    # ****************************
+    # *    INTERNAL VARIABLES    *
+    # ****************************
+    __start = 0
+    __last = 0
+    __stages = None
+    __firstFrameMs = None
+    __interactiveMs = None
+
+    def __init__(self):
+        self.__start = time.monotonic_ns()
+        self.__last = self.__start
+        self.__stages = []
+
+    # function mark
+    # Ends a stage
+    # @param name: what was done since the last mark (e.g. "imports")
+    # @return ms since the profiler was made
+    def mark(self, name):
+        now = time.monotonic_ns()
+        at = (now - self.__start) / 1000000
+        self.__stages.append((name, at, (now - self.__last) / 1000000, gc.mem_free()))
+        self.__last = now
+        return at
+
+    # function markFirstFrame
+    # Ends the stage that put the first pixels on the panel, only the first call counts
+    # @param name ["first frame"]: stage name
+    def markFirstFrame(self, name = "first frame"):
+        at = self.mark(name)
+
+        if self.__firstFrameMs == None:
+            self.__firstFrameMs = at
+
+    # function markInteractive
+    # Ends the stage that got the first real screen up, only the first call counts
+    # @param name ["interactive"]: stage name
+    def markInteractive(self, name = "interactive"):
+        at = self.mark(name)
+
+        if self.__interactiveMs == None:
+            self.__interactiveMs = at
+
+    # function isInteractive
+    # @return True once markInteractive() has been called
+    def isInteractive(self):
+        return self.__interactiveMs != None
+
+    # function getTimeToFirstFrame
+    # @return ms from the profiler being made to the first frame, None if there hasn't been one yet
+    def getTimeToFirstFrame(self):
+        return self.__firstFrameMs
+
+    # function getTimeToInteractive
+    # @return ms from the profiler being made to interactive, None if not there yet
+    def getTimeToInteractive(self):
+        return self.__interactiveMs
+
+    # function getStages
+    # @return list of (name, ms since start, ms the stage took, gc.mem_free() after it)
+    def getStages(self):
+        return self.__stages
+
+    # function formatReport
+    # @return one line per stage plus the totals for printing to the serial console
+    def formatReport(self):
+        lines = []
+
+        for name, at, took, free in self.__stages:
+            lines.append("{0:>8.1f}ms {1:>7.1f}ms free {2:>7} {3}".format(at, took, free, name))
+
+        lines.append("Time to first frame: {0} Time to interactive: {1}".format(
+            "-" if self.__firstFrameMs == None else "{0:.1f}ms".format(self.__firstFrameMs),
+            "-" if self.__interactiveMs == None else "{0:.1f}ms".format(self.__interactiveMs)))
+        return "\n".join(lines)
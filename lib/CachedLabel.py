@@ -0,0 +1,102 @@
+# CachedLabel.py
+# Text label drawn from a TextCache, for text that only changes now and then (a title, a fan's "On" / "Off")
+#
+# Positioned like adafruit_display_text's Label (x, y is the middle of the left hand side of the first line) and looks
+# the same, but it's one unscaled TileGrid over a pre-rendered bitmap instead of a TileGrid per character.  Changing
+# the text or colour swaps the TileGrid for one over the cached bitmap of the new text (drawn then if it isn't cached).
+import displayio, terminalio
+
+class CachedLabel:
+    # ****************************
+    # *    INTERNAL VARIABLES    *
+    # ****************************
+    __cache = None
+    __canvas = None
+    __entry = None
+    __text = None
+    __scale = 1
+    __colour = 0
+    __font = None
+    __dirty = None
+    __offsetX = 0
+    __offsetY = 0
+
+    # function __init__
+    # @param cache: TextCache to draw the text from (shared with other labels)
+    # @param text: text to show, may contain \n
+    # @param x [0]: x position relative to the parent group
+    # @param y [0]: y position (middle of the first line) relative to the parent group
+    # @param colour [0xFFFFFF]: text colour
+    # @param scale [1]: text size multiplier
+    # @param font [None]: defaults to terminalio.FONT
+    def __init__(self, cache, text, x = 0, y = 0, colour = 0xFFFFFF, scale = 1, font = None):
+        self.__cache = cache
+        self.__scale = scale
+        self.__colour = colour
+        self.__font = font if font != None else terminalio.FONT
+        self.__canvas = displayio.Group(x = x, y = y)
+        self._show(text)
+
+    # function getGroup
+    # @return displayio.Group to add to the screen
+    def getGroup(self):
+        return self.__canvas
+
+    # function setDirtyRegion
+    # Sets the DirtyRegion to mark when the text or colour changes
+    # @param dirtyRegion: DirtyRegion or None to stop tracking
+    # @param offsetX [0]: absolute x position of the group this label's group is added to
+    # @param offsetY [0]: absolute y position of the group this label's group is added to
+    def setDirtyRegion(self, dirtyRegion, offsetX = 0, offsetY = 0):
+        self.__dirty = dirtyRegion
+        self.__offsetX = offsetX
+        self.__offsetY = offsetY
+
+    # function getText
+    # @return the text showing
+    def getText(self):
+        return self.__text
+
+    # function setText
+    # @param text: text to show
+    def setText(self, text):
+        if text == self.__text:
+            return
+
+        self._mark()
+        self._show(text)
+        self._mark()
+
+    # function setColour
+    # @param colour: text colour
+    def setColour(self, colour):
+        if colour == self.__colour:
+            return
+
+        self.__colour = colour
+        self._show(self.__text)
+        self._mark()
+
+    # function getArea
+    # @return (x, y, width, height) the text covers relative to the parent group
+    def getArea(self):
+        return (self.__canvas.x, self.__canvas.y + self.__entry.top, self.__entry.width, self.__entry.height)
+
+    # function _show
+    # Puts the cached bitmap of text in place of the current one
+    def _show(self, text):
+        self.__text = text
+        self.__entry = self.__cache.get(text, self.__scale, self.__colour, self.__font)
+        grid = displayio.TileGrid(self.__entry.bitmap, pixel_shader = self.__entry.palette, y = self.__entry.top)
+
+        if len(self.__canvas) > 0:
+            self.__canvas[0] = grid
+        else:
+            self.__canvas.append(grid)
+
+    # function _mark
+    # Marks the area the text covers as changed
+    def _mark(self):
+        if self.__dirty != None:
+            x, y, width, height = self.getArea()
+            self.__dirty.mark(self.__offsetX + x, self.__offsetY + y, width, height)
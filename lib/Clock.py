@@ -0,0 +1,12 @@
+# Clock.py
+# Monotonic time in milliseconds for everything that schedules or times things off it (Scheduler, Timeline, refresh
+# batching, sensor reads, ...)
+#
+# Nanoseconds based so it stays accurate after the Pico has been on a while (time.monotonic() is a float and starts
+# losing milliseconds after a few hours).
+import time
+
+# function getNow
+# @return monotonic time in milliseconds
+def getNow():
+    return time.monotonic_ns() // 1000000
@@ -0,0 +1,93 @@
+# DHT22Driver.py
+# DHT22 / AM2302 temperature and humidity sensor on one data pin, for SensorReader
+#
+# adafruit_dht sleeps for a quarter of a second on every read.  Here pulseio does the waiting in the background:
+# trigger() pulls the data line low for 1ms (the start signal) and starts recording pulses, the sensor answers with
+# 40 bits within ~5ms and collect() decodes them from the recorded pulse lengths.  The DHT22 can't be read more often
+# than every 2 seconds.
+#
+# The answer is an 80us low / 80us high response then each bit is a ~50us low and a high of ~26us (0) or ~70us (1),
+# then a last ~50us low before the line goes back high.  So the last 81 pulses recorded are the 40 (low, high) pairs
+# and that last low.  The 5th byte is a checksum of the other 4.
+#
+# WIRING:
+#
+#  - DHT22 VCC  --> Pico 3V3
+#  - DHT22 DATA --> Pico GP15 (with a 10K pull up to 3V3 if the module hasn't got one)
+#  - DHT22 GND  --> Pico GND
+#
+#   driver = DHT22Driver(board.GP15)
+import pulseio
+from SensorDriver import SensorDriver
+
+class DHT22Driver(SensorDriver):
+    # ****************************
+    # *    SETTINGS VARIABLES    *
+    # ****************************
+    # High pulses longer than this (us) are 1 bits
+    __ONE_THRESHOLD = 51
+
+    # ****************************
+    # *    INTERNAL VARIABLES    *
+    # ****************************
+    __pulses = None
+    __data = None
+
+    # function __init__
+    # @param pin: board pin the data line is on
+    def __init__(self, pin):
+        self.__pulses = pulseio.PulseIn(pin, maxlen=81, idle_state=True)
+        self.__pulses.pause()
+        self.__data = bytearray(5)
+
+    def getNames(self):
+        return ("temperature", "humidity")
+
+    def getReadTime(self):
+        return 10
+
+    def getStepBudget(self):
+        return 2
+
+    def getMinInterval(self):
+        return 2000
+
+    # function trigger
+    # Sends the start signal and records the answer in the background
+    # @return True
+    def trigger(self):
+        self.__pulses.clear()
+        self.__pulses.resume(1000)
+        return True
+
+    # function collect
+    # Decodes the recorded pulses
+    # @return (degrees C, % relative humidity) or None if the answer was short or the checksum is wrong
+    def collect(self):
+        pulses = self.__pulses
+        pulses.pause()
+        count = len(pulses)
+
+        if count < 81:
+            return None
+
+        data = self.__data
+        start = count - 81
+
+        for i in range(5):
+            data[i] = 0
+
+        for bit in range(40):
+            if pulses[start + bit * 2 + 1] > self.__ONE_THRESHOLD:
+                data[bit // 8] |= 0x80 >> (bit % 8)
+
+        if (data[0] + data[1] + data[2] + data[3]) & 0xFF != data[4]:
+            return None
+
+        humidity = ((data[0] << 8) | data[1]) / 10
+        temperature = (((data[2] & 0x7F) << 8) | data[3]) / 10
+
+        if data[2] & 0x80:
+            temperature = -temperature
+
+        return (temperature, humidity)
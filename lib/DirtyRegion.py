@@ -0,0 +1,146 @@
+# DirtyRegion.py
+# Keeps track of which rectangles of the screen have changed since the last refresh
+#
+# Every window sent to the ST7735S costs a CASET (column address) + RASET (row address) + RAMWR (memory write)
+# command before the pixels themselves (2 bytes each), so a few small windows are much cheaper than a full
+# 160 x 128 x 2 = 40960 byte frame.  Once the changed area gets big enough it's cheaper (and simpler) to just
+# send the whole screen, this class works out which is which.
+#
+# Overlapping (or touching) rectangles are merged so the same pixels aren't sent twice.
+
+class DirtyRegion:
+    # ****************************
+    # *    SETTINGS VARIABLES    *
+    # ****************************
+    # Bytes sent per window before the pixel data: CASET (1 + 4) + RASET (1 + 4) + RAMWR (1)
+    WINDOW_OVERHEAD = 11
+
+    # Bytes per pixel (RGB565)
+    BYTES_PER_PIXEL = 2
+
+    # ****************************
+    # *    INTERNAL VARIABLES    *
+    # ****************************
+    __width = 0
+    __height = 0
+    __threshold = 0.6
+    __rects = None
+    __full = False
+    __onMark = None
+
+    # function __init__
+    # @param width: screen width in pixels
+    # @param height: screen height in pixels
+    # @param threshold [0.6]: fraction of a full screen refresh cost above which the whole screen is sent instead
+    def __init__(self, width, height, threshold = 0.6):
+        self.__width = width
+        self.__height = height
+        self.__threshold = threshold
+        self.__rects = []
+
+    # function resize
+    # Changes the screen size (e.g. after a rotation), anything already marked is thrown away and the full screen is dirty
+    def resize(self, width, height):
+        self.__width = width
+        self.__height = height
+        self.markAll()
+
+    # function mark
+    # Marks a rectangle as changed, clipped to the screen
+    # @param x: left co-ordinate
+    # @param y: top co-ordinate
+    # @param width: width in pixels
+    # @param height: height in pixels
+    def mark(self, x, y, width, height):
+        x1 = max(0, x)
+        y1 = max(0, y)
+        x2 = min(self.__width, x + width)
+        y2 = min(self.__height, y + height)
+
+        if x2 <= x1 or y2 <= y1:
+            return
+
+        if self.__onMark != None:
+            self.__onMark()
+
+        if self.__full:
+            return
+
+        # Keep merging with anything we overlap/touch until nothing else does
+        merged = True
+
+        while merged:
+            merged = False
+
+            for i in range(len(self.__rects)):
+                rx1, ry1, rx2, ry2 = self.__rects[i]
+
+                if x1 <= rx2 and rx1 <= x2 and y1 <= ry2 and ry1 <= y2:
+                    x1 = min(x1, rx1)
+                    y1 = min(y1, ry1)
+                    x2 = max(x2, rx2)
+                    y2 = max(y2, ry2)
+                    self.__rects.pop(i)
+                    merged = True
+                    break
+
+        self.__rects.append((x1, y1, x2, y2))
+
+        if self.cost() > self.fullCost() * self.__threshold:
+            self.markAll()
+
+    # function markAll
+    # Marks the whole screen as changed
+    def markAll(self):
+        if self.__onMark != None:
+            self.__onMark()
+
+        self.__full = True
+        self.__rects = [(0, 0, self.__width, self.__height)]
+
+    # function setOnMark
+    # @param callback: function() called every time something on the screen is marked (e.g. to count the changes made
+    #                  during a batch), None for none
+    def setOnMark(self, callback):
+        self.__onMark = callback
+
+    # function clear
+    # Forget everything marked, call once the changes have been sent to the screen
+    def clear(self):
+        self.__full = False
+        self.__rects = []
+
+    # function isDirty
+    # @return True if anything has been marked since the last clear
+    def isDirty(self):
+        return len(self.__rects) > 0
+
+    # function isFull
+    # @return True if the whole screen will be refreshed
+    def isFull(self):
+        return self.__full
+
+    # function getRects
+    # @return list of (x, y, width, height) windows to send
+    def getRects(self):
+        return [(r[0], r[1], r[2] - r[0], r[3] - r[1]) for r in self.__rects]
+
+    # function getArea
+    # @return number of dirty pixels
+    def getArea(self):
+        area = 0
+
+        for r in self.__rects:
+            area += (r[2] - r[0]) * (r[3] - r[1])
+
+        return area
+
+    # function cost
+    # @return bytes that sending the current windows would put on the SPI bus
+    def cost(self):
+        return len(self.__rects) * self.WINDOW_OVERHEAD + self.getArea() * self.BYTES_PER_PIXEL
+
+    # function fullCost
+    # @return bytes for sending the full screen as one window
+    def fullCost(self):
+        return self.WINDOW_OVERHEAD + self.__width * self.__height * self.BYTES_PER_PIXEL
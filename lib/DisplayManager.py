@@ -0,0 +1,229 @@
+# DisplayManager.py
+# Runs several AZ_ST7735S panels from one Pico, sharing the SPI bus(es) and taking turns to refresh
+#
+# Each panel has its own CS, DC (RS) and RES pins, panels on the same bus share SCK and SDA.  The Pico has two SPI
+# blocks, bus 0 is the wiring in AZ_ST7735S.py (GP18 / GP19), bus 1 uses GP10 SCK / GP11 SDA.  Both buses have
+# to run from the one CPU so a second bus saves pins rather than time.
+#
+# Panels are set up with auto refresh off and refresh() sends them in turn (round robin), starting one panel further
+# on each call.  Small changes (an animation frame, a label) that fit in the byte budget go first and at most one
+# panel whose changes don't fit (a full repaint is ~40KB, the longest the bus is tied up) goes after them.  So an
+# animation on one panel never waits behind another panel's repaint, and two panels both repainting take it in turns
+# (their changes build up until their turn) instead of both holding up every call.
+#
+# Per panel it keeps refreshes, bytes sent (counted from the panel so refreshes done directly, e.g. by commit(),
+# are included), time spent in refresh, how often it was put off to a later call and the longest it waited.
+#
+# Standard Circuit Python builds only allow one display (CIRCUITPY_DISPLAY_LIMIT), more need a build with a
+# higher limit.  addPanel() returns None for a panel the build has no room for.
+import time
+import board, busio, displayio
+from AZ_ST7735S import AZ_ST7735S
+from Clock import getNow
+
+class ManagedPanel:
+    # function __init__
+    # @param name: name used in the stats
+    # @param tft: AZ_ST7735S that has been initialised
+    # @param bus: SPI bus number it's on
+    def __init__(self, name, tft, bus):
+        self.name = name
+        self.tft = tft
+        self.bus = bus
+        self.added = getNow()
+        self.bytesAtStart = tft.getBytesPushed()
+        self.refreshes = 0
+        self.busyTotal = 0
+        self.busyMax = 0
+        self.deferred = 0
+        self.waitMax = 0
+        self.dirtySince = None
+
+    # function getStats
+    # @return dict of this panel's counters
+    def getStats(self):
+        sent = self.tft.getBytesPushed() - self.bytesAtStart
+        seconds = max(1, getNow() - self.added) / 1000
+
+        return {
+            "bus": self.bus,
+            "refreshes": self.refreshes,
+            "bytes": sent,
+            "bytesPerSecond": int(sent / seconds),
+            "busyMean": self.busyTotal / max(1, self.refreshes),
+            "busyMax": self.busyMax,
+            "deferred": self.deferred,
+            "waitMax": self.waitMax,
+        }
+
+class DisplayManager:
+    # ****************************
+    # *    SETTINGS VARIABLES    *
+    # ****************************
+    # SPI pins (clock, MOSI) for each bus
+    BUS_PINS = {
+        0: (board.GP18, board.GP19),
+        1: (board.GP10, board.GP11),
+    }
+
+    # ****************************
+    # *    INTERNAL VARIABLES    *
+    # ****************************
+    __panels = None
+    __buses = None
+    __budget = 0
+    __next = 0
+
+    # function __init__
+    # Releases any displays from previous code runs, do this before setting up any panel
+    # @param budget [8192]: bytes one refresh() call sends before putting the other panels off to the next call
+    def __init__(self, budget = 8192):
+        displayio.release_displays()
+        self.__panels = []
+        self.__buses = {}
+        self.__budget = budget
+
+    # function getBus
+    # @param bus: SPI bus number (a key of BUS_PINS)
+    # @return busio.SPI for the bus, set up the first time it's asked for
+    def getBus(self, bus):
+        if bus not in self.__buses:
+            clock, mosi = self.BUS_PINS[bus]
+            self.__buses[bus] = busio.SPI(clock=clock, MOSI=mosi)
+
+        return self.__buses[bus]
+
+    # function addPanel
+    # Sets up a panel on a shared bus with auto refresh off (refresh() sends it)
+    # @param name: name to get it by
+    # @param cs: chip select pin
+    # @param dc: command (RS) pin
+    # @param res: reset pin
+    # @param bus [0]: SPI bus number
+    # @param orientation [90]: see AZ_ST7735S.initialiseScreen
+    # @param baudrate [None]: SPI clock in Hz for this panel, None for the 24MHz default (tune it with BaudTuner before
+    #                         any panels are added, a sweep releases every display)
+    # @return AZ_ST7735S or None if no more displays can be set up
+    def addPanel(self, name, cs, dc, res, bus = 0, orientation = 90, baudrate = None):
+        tft = AZ_ST7735S(cs=cs, dc=dc, res=res, spi=self.getBus(bus))
+
+        try:
+            tft.initialiseScreen(orientation, autoRefresh=False, releaseDisplays=False, baudrate=baudrate)
+        except RuntimeError:
+            # Too many displays for this Circuit Python build
+            return None
+
+        self.__panels.append(ManagedPanel(name, tft, bus))
+        return tft
+
+    # function getPanel
+    # @param name: panel name
+    # @return AZ_ST7735S or None
+    def getPanel(self, name):
+        for panel in self.__panels:
+            if panel.name == name:
+                return panel.tft
+
+        return None
+
+    # function getPanelCount
+    def getPanelCount(self):
+        return len(self.__panels)
+
+    # function setBudget
+    # @param budget: bytes one refresh() call sends before putting the other panels off to the next call
+    def setBudget(self, budget):
+        self.__budget = budget
+
+    # function _send
+    # Refreshes one panel and counts it
+    # @param panel: ManagedPanel with changes
+    # @param now: time the refresh() call started (ms)
+    # @return bytes sent
+    def _send(self, panel, now):
+        pending = panel.tft.getPendingBytes()
+        started = time.monotonic_ns()
+
+        if not panel.tft.refresh():
+            # Held back by a batch, it goes out when the batch is committed
+            return 0
+
+        busy = (time.monotonic_ns() - started) / 1000000
+        wait = now - panel.dirtySince
+        panel.refreshes += 1
+        panel.busyTotal += busy
+        panel.dirtySince = None
+
+        if busy > panel.busyMax:
+            panel.busyMax = busy
+
+        if wait > panel.waitMax:
+            panel.waitMax = wait
+
+        return pending
+
+    # function refresh
+    # Sends the panels' changes in turn, starting one panel further on than last time.  Panels whose changes fit in
+    # what's left of the budget go first, then at most one panel that doesn't fit (the first in turn), the rest wait
+    # for a later call.
+    # @return bytes sent
+    def refresh(self):
+        count = len(self.__panels)
+
+        if count == 0:
+            return 0
+
+        now = getNow()
+        sent = 0
+        large = None
+
+        for i in range(count):
+            panel = self.__panels[(self.__next + i) % count]
+            pending = panel.tft.getPendingBytes()
+
+            if pending == 0:
+                panel.dirtySince = None
+                continue
+
+            if panel.dirtySince == None:
+                panel.dirtySince = now
+
+            if sent + pending > self.__budget:
+                if large == None:
+                    large = panel
+                else:
+                    panel.deferred += 1
+                continue
+
+            sent += self._send(panel, now)
+
+        # Next time start after the panel that had the big refresh, so panels repainting take it in turns
+        if large != None:
+            sent += self._send(large, now)
+            self.__next = (self.__panels.index(large) + 1) % count
+        else:
+            self.__next = (self.__next + 1) % count
+        return sent
+
+    # function getStats
+    # @return dict of panel name -> stats dict (see ManagedPanel.getStats)
+    def getStats(self):
+        stats = {}
+
+        for panel in self.__panels:
+            stats[panel.name] = panel.getStats()
+
+        return stats
+
+    # function formatStats
+    # @return one line per panel for printing to the serial console
+    def formatStats(self):
+        lines = []
+
+        for panel in self.__panels:
+            s = panel.getStats()
+            lines.append("{0} (spi{1}): {2} refreshes {3} bytes {4} B/s busy {5:.2f}/{6:.2f}ms deferred {7} wait max {8}ms".format(
+                panel.name, s["bus"], s["refreshes"], s["bytes"], s["bytesPerSecond"], s["busyMean"], s["busyMax"],
+                s["deferred"], s["waitMax"]))
+
+        return "\n".join(lines)
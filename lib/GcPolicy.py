@@ -0,0 +1,172 @@
+# GcPolicy.py
+# Keeps garbage collections out of the animations by collecting at quiet moments instead of whenever the heap decides
+#
+# Circuit Python collects when an allocation doesn't fit (or once gc.threshold bytes have been allocated since the last
+# collection), which is in the middle of whatever allocated: a label rebuild, a background bitmap, an os.listdir().
+# When that's half way through an animation frame the frame is late by the whole pause.
+#
+# GcPolicy sets gc.threshold so the automatic collection is a backstop and the caller calls idle() whenever it knows
+# there's time to spare (straight after a screen rotation, after an animation frame has gone out, at the start of the
+# slideshow's dwell).  idle() collects if collectAfter bytes have been allocated since the last collection or free
+# memory is below lowFree, idle(force = True) always does.  Automatic collections still happen if idle() isn't called
+# often enough, they're spotted by gc.mem_alloc() going down between calls and counted.
+#
+# Each collection's time and bytes freed are kept (the last LOG_SIZE of them for formatLog(), totals for getStats())
+# and recorded in Metrics if one is given.
+import gc, time
+from Clock import getNow
+
+class GcPolicy:
+    # ****************************
+    # *    SETTINGS VARIABLES    *
+    # ****************************
+    # Collections kept for formatLog()
+    LOG_SIZE = 16
+
+    # ****************************
+    # *    INTERNAL VARIABLES    *
+    # ****************************
+    __threshold = None
+    __collectAfter = 0
+    __lowFree = 0
+    __metrics = None
+    __verbose = False
+    __allocAfter = 0
+    __log = None
+    __logNext = 0
+    __collections = 0
+    __pauseTotal = 0
+    __pauseMax = 0
+    __freedTotal = 0
+    __skipped = 0
+    __automatic = 0
+
+    # function __init__
+    # @param threshold [None]: bytes allocated before the heap collects by itself (gc.threshold), None to leave it at
+    #                          the firmware's setting (only when an allocation doesn't fit)
+    # @param collectAfter [None]: bytes allocated since the last collection before idle() collects, defaults to half
+    #                             the threshold or a quarter of the free heap
+    # @param lowFree [16384]: idle() also collects when less than this is free
+    # @param metrics [None]: Metrics to record each collection in
+    # @param verbose [False]: print each collection
+    def __init__(self, threshold = None, collectAfter = None, lowFree = 16384, metrics = None, verbose = False):
+        self.__threshold = threshold
+        self.__lowFree = lowFree
+        self.__metrics = metrics
+        self.__verbose = verbose
+        self.__log = []
+
+        if threshold != None and hasattr(gc, "threshold"):
+            gc.threshold(threshold)
+
+        if collectAfter != None:
+            self.__collectAfter = collectAfter
+        elif threshold != None:
+            self.__collectAfter = threshold // 2
+        else:
+            self.__collectAfter = gc.mem_free() // 4
+
+        self.__allocAfter = gc.mem_alloc()
+
+    # function getAllocated
+    # @return bytes allocated since the last collection (as far as gc.mem_alloc() can tell)
+    def getAllocated(self):
+        allocated = gc.mem_alloc()
+
+        # It went down, so the heap has collected by itself since we last looked
+        if allocated < self.__allocAfter:
+            self.__automatic += 1
+            self.__allocAfter = allocated
+
+            if self.__verbose:
+                print("gc automatic: heap collected by itself")
+
+        return allocated - self.__allocAfter
+
+    # function isDue
+    # @return True if enough has been allocated (or little enough is free) to be worth collecting
+    def isDue(self):
+        return self.getAllocated() >= self.__collectAfter or gc.mem_free() < self.__lowFree
+
+    # function idle
+    # Call when there's time to spare: collects if it's due
+    # @param reason: where it was called from, for the log
+    # @param force [False]: collect even if it isn't due
+    # @return us the collection took, 0 if there wasn't one
+    def idle(self, reason, force = False):
+        if not force and not self.isDue():
+            self.__skipped += 1
+            return 0
+
+        return self.collect(reason)
+
+    # function collect
+    # Collects now
+    # @param reason: for the log
+    # @return us it took
+    def collect(self, reason):
+        before = gc.mem_free()
+        started = time.monotonic_ns()
+        gc.collect()
+        pause = (time.monotonic_ns() - started) // 1000
+        freed = max(0, gc.mem_free() - before)
+        self.__allocAfter = gc.mem_alloc()
+
+        self.__collections += 1
+        self.__pauseTotal += pause
+        self.__freedTotal += freed
+
+        if pause > self.__pauseMax:
+            self.__pauseMax = pause
+
+        entry = (getNow(), reason, pause, freed)
+
+        if len(self.__log) < self.LOG_SIZE:
+            self.__log.append(entry)
+        else:
+            self.__log[self.__logNext] = entry
+
+        self.__logNext = (self.__logNext + 1) % self.LOG_SIZE
+
+        if self.__metrics != None:
+            self.__metrics.recordCollection(pause, freed)
+
+        if self.__verbose:
+            print("gc {0}: {1:.2f}ms freed {2} bytes".format(reason, pause / 1000, freed))
+
+        return pause
+
+    # function getLog
+    # @return list of (ms, reason, pause us, bytes freed) for the last LOG_SIZE collections, oldest first
+    def getLog(self):
+        if len(self.__log) < self.LOG_SIZE:
+            return list(self.__log)
+
+        return self.__log[self.__logNext:] + self.__log[:self.__logNext]
+
+    # function formatLog
+    # @return one line per logged collection
+    def formatLog(self):
+        return "\n".join("gc {0}ms {1}: {2:.2f}ms freed {3}".format(at, reason, pause / 1000, freed)
+                         for at, reason, pause, freed in self.getLog())
+
+    # function getStats
+    # @return dict of collections made, their pauses (ms) and bytes freed, idle() calls that didn't need one and
+    #         automatic collections spotted
+    def getStats(self):
+        return {
+            "collections": self.__collections,
+            "pauseMean": self.__pauseTotal / max(1, self.__collections) / 1000,
+            "pauseMax": self.__pauseMax / 1000,
+            "freed": self.__freedTotal,
+            "skipped": self.__skipped,
+            "automatic": self.__automatic,
+            "allocated": self.getAllocated(),
+        }
+
+    # function formatStats
+    # @return one line for printing to the serial console
+    def formatStats(self):
+        s = self.getStats()
+        return "gc: collections {0} pause {1:.2f}/{2:.2f}ms freed {3} skipped {4} automatic {5} allocated since last {6}".format(
+            s["collections"], s["pauseMean"], s["pauseMax"], s["freed"], s["skipped"], s["automatic"], s["allocated"])
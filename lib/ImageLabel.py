@@ -2,6 +2,9 @@
 # Creates a displayio label with an image either to the right or left hand side
 # This uses tiles to allow you to change the image to a given tile in the original bitmap
 from adafruit_display_text import label #Text Label
+from NumericLabel import NumericLabel #Fixed width label for readings
+from CachedLabel import CachedLabel #Pre-rendered label for text that rarely changes
+from TextCache import measureText
 import displayio, terminalio
 import adafruit_imageload
 
@@ -16,6 +19,15 @@ class ImageLabel:
     __tileGrid = None
     __currentTile = 0
     __numberOfTiles = 0
+    __textSize = 1
+    __tileWidth = 0
+    __tileHeight = 0
+    __dirty = None
+    __offsetX = 0
+    __offsetY = 0
+    __firstTile = 0
+    __numeric = None
+    __cached = None
     
     # function __init__
     # Sets up the ImageLabel
@@ -29,7 +41,14 @@ class ImageLabel:
     # @param tileWidth [40]: Width of a tile in pixels, defaults to 40
     # @param tileHeight [40]: Height of a tile in pixels, defaults to 40
     # @param onLeft [True]: Put text on the left, defaults to True (on right if False)
-    def __init__(self, text, textSize, imagePath, xPos, yPos, numberOfTiles = 2, tileWidth = 40, tileHeight = 40, onLeft = True):
+    # @param atlas [None]: Atlas to take the picture from instead of loading imagePath, imagePath is then the sprite name
+    #                      and numberOfTiles/tileWidth/tileHeight come from the atlas
+    # @param digits [None]: for a number that changes a lot (e.g. a reading) the text is a NumericLabel with this many
+    #                       digit cells followed by suffix, use changeValue() to update it.  The text sets the width.
+    # @param suffix [""]: text after the number for a NumericLabel, e.g. " C"
+    # @param textCache [None]: TextCache to draw the text from (a CachedLabel) instead of a Label, for text that only
+    #                          changes between a few values
+    def __init__(self, text, textSize, imagePath, xPos, yPos, numberOfTiles = 2, tileWidth = 40, tileHeight = 40, onLeft = True, atlas = None, digits = None, suffix = "", textCache = None):
         
         # Set Up the canvas variable
         self.__canvas = displayio.Group(x = xPos, y = yPos)
@@ -37,49 +56,49 @@ class ImageLabel:
         # Set Up the label variable
         self.__text = text
         
+        # Set Up the picture and pull out the palette so we can set index 0 to transparent
+        # With an atlas the bitmap and palette are shared with every other label using it
+        if atlas != None and atlas.hasSprite(imagePath):
+            self.__firstTile, tileWidth, tileHeight, numberOfTiles = atlas.getSprite(imagePath)
+            self.__picture = atlas.getBitmap(imagePath)
+            palette = atlas.getPalette()
+        else:
+            self.__picture, palette = adafruit_imageload.load("/images/" + imagePath, bitmap=displayio.Bitmap, palette=displayio.Palette)
+            palette.make_transparent(0)
+        
         # Set up the number of tiles variable
         self.__numberOfTiles = numberOfTiles
-        
-        # Set Up the picture and pull out the palette so we can set index 0 to transparent
-        self.__picture, palette = adafruit_imageload.load("/images/" + imagePath, bitmap=displayio.Bitmap, palette=displayio.Palette)
-        palette.make_transparent(0)
+        self.__textSize = textSize
+        self.__tileWidth = tileWidth
+        self.__tileHeight = tileHeight
         
         # Create a TileGrid to hold the bitmap
-        # The onLeft offset to clear the text is a bit of a hack based on chars * 6 * scale + 4 for a bit of a buffer
-        # There doesn't seem to be a built in way to do this without more external libraries
+        # The onLeft offset clears the text's width (from the font's glyph widths) + 4 for a bit of a buffer
         if onLeft:
-            self.__tileGrid = displayio.TileGrid(self.__picture, pixel_shader=palette, x = (self._textLength() * 6 * textSize) + 4, width = 1, height = 1, tile_width = tileWidth, tile_height = tileHeight, default_tile = 0)
+            self.__tileGrid = displayio.TileGrid(self.__picture, pixel_shader=palette, x = (measureText(self.__text)[0] * textSize) + 4, width = 1, height = 1, tile_width = tileWidth, tile_height = tileHeight, default_tile = self.__firstTile)
         else:
-            self.__tileGrid = displayio.TileGrid(self.__picture, pixel_shader=palette, x = 0, width = 1, height = 1, tile_width = tileWidth, tile_height = tileHeight, default_tile = 0)
+            self.__tileGrid = displayio.TileGrid(self.__picture, pixel_shader=palette, x = 0, width = 1, height = 1, tile_width = tileWidth, tile_height = tileHeight, default_tile = self.__firstTile)
         
         # Create the label for the picture
-        if onLeft:
-            self.__label = self._createLabel(0, int(self.__picture.height / 2), 0xFFFFFF, self.__text, textSize)
+        labelX = 0
+        
+        if not onLeft:
+            labelX = tileWidth + 4
+        
+        if digits != None:
+            self.__numeric = NumericLabel(digits, suffix, labelX, int(tileHeight / 2), 0xFFFFFF, textSize, cells = len(self.__text))
+            self.__numeric.setText(self.__text[:digits])
+            self.__label = self.__numeric.getGroup()
+        elif textCache != None:
+            self.__cached = CachedLabel(textCache, self.__text, labelX, int(tileHeight / 2), 0xFFFFFF, textSize)
+            self.__label = self.__cached.getGroup()
         else:
-            self.__label = self._createLabel(int(self.__picture.width / self.__numberOfTiles) + 4, int(self.__picture.height / 2), 0xFFFFFF, self.__text, textSize)
+            self.__label = self._createLabel(labelX, int(tileHeight / 2), 0xFFFFFF, self.__text, textSize)
         
         # Add to canvas
         self.__canvas.append(self.__tileGrid)
         self.__canvas.append(self.__label)
     
-    # function _textLength
-    # Checks string for \n if so splits string and finds longest of each substring
-    # This can then be used to determine label picture offset
-    # @return string length or longest segment length if it contains \n
-    def _textLength(self):
-        length = -1
-        
-        if "\n" not in self.__text:
-            length = len(self.__text)
-        else:            
-            tmpText = self.__text.split("\n")
-            
-            for sub in tmpText:
-                if len(sub) > length:
-                    length = len(sub)
-        
-        return length
-    
     # function _createLabel
     # Internal method to create an adafruit Label
     # @param x: X co-ordinate for label relative to this ImageLabel
@@ -90,6 +109,33 @@ class ImageLabel:
     def _createLabel(self, x, y, colour, text, scale):
         return label.Label(terminalio.FONT, text=text, color=colour, x=x, y=y, scale=scale)
     
+    # function _textArea
+    # Works out the area the given text covers on screen, used for dirty tracking
+    # @param text: Text to measure
+    # @return (x, y, width, height) in screen co-ordinates
+    def _textArea(self, text):
+        glyphHeight = terminalio.FONT.get_bounding_box()[1]
+        width, height = measureText(text)
+
+        # Labels are positioned on the middle of the first line
+        x = self.__offsetX + self.__canvas.x + self.__label.x
+        y = self.__offsetY + self.__canvas.y + self.__label.y - (glyphHeight // 2) * self.__textSize
+
+        return (x, y, width * self.__textSize, height * self.__textSize)
+
+    # function setDirtyRegion
+    # Sets the DirtyRegion to mark when the picture or text changes
+    # @param dirtyRegion: DirtyRegion (e.g. from AZ_ST7735S.getDirtyRegion()) or None to stop tracking
+    # @param offsetX [0]: absolute x position of the group this label's group is added to
+    # @param offsetY [0]: absolute y position of the group this label's group is added to
+    def setDirtyRegion(self, dirtyRegion, offsetX = 0, offsetY = 0):
+        self.__dirty = dirtyRegion
+        self.__offsetX = offsetX
+        self.__offsetY = offsetY
+        
+        if self.__numeric != None:
+            self.__numeric.setDirtyRegion(dirtyRegion, offsetX, offsetY, self.__canvas)
+
     # function getGroup
     # Gets the displayio.Group that this object holds
     # Need this in order to add to the screen
@@ -101,25 +147,58 @@ class ImageLabel:
     # Changes the picture of this label to the given tile number
     # @param tileNo: Tile number to change to (there is no checking for out of bounds so be careful)
     def changePicture(self, tileNo):
-        self.__tileGrid[0] = tileNo
+        if self.__dirty != None and tileNo != self.__currentTile:
+            self.__dirty.mark(self.__offsetX + self.__canvas.x + self.__tileGrid.x, self.__offsetY + self.__canvas.y + self.__tileGrid.y, self.__tileWidth, self.__tileHeight)
+
+        self.__tileGrid[0] = self.__firstTile + tileNo
         self.__currentTile = tileNo
         
+    # function getNumberOfTiles
+    # @return number of pictures this label has
+    def getNumberOfTiles(self):
+        return self.__numberOfTiles
+    
     # function togglePicture
     # Changes the picture of this label to the next tile, loops around to 0 if out of range
     def togglePicture(self):
         
-        self.__currentTile += 1
+        nextTile = self.__currentTile + 1
         
-        if self.__currentTile >= self.__numberOfTiles:
-            self.__currentTile = 0
+        if nextTile >= self.__numberOfTiles:
+            nextTile = 0
         
-        self.changePicture(self.__currentTile)
+        self.changePicture(nextTile)
     
     # function changeText
     # Changes the text on this label
     # There is no resizing of the picture on the screen so stick to the same text length
     # @param text: Text to change label to
     def changeText(self, text):
-        self.__label.text = text
+        if text == self.__text:
+            return
+        
+        if self.__numeric != None:
+            self.__text = text
+            self.__numeric.setText(text)
+            return
+
+        # Old and new text areas both need redrawing (shorter text leaves background showing)
+        if self.__dirty != None:
+            self.__dirty.mark(*self._textArea(self.__text))
+            self.__dirty.mark(*self._textArea(text))
+
+        self.__text = text
+
+        if self.__cached != None:
+            self.__cached.setText(text)
+        else:
+            self.__label.text = text
+
+    # function changeValue
+    # Changes the number on a label made with digits, only the digits that are different get redrawn
+    # This doesn't allocate any memory so it's fine to call for every sensor reading
+    # @param value: whole number to show
+    def changeValue(self, value):
+        self.__numeric.setValue(value)
 
 #pictureLabel = ImageLabel("Test", 2, "test.bmp", 50, 50, 2, 40, 40)
\ No newline at end of file
@@ -0,0 +1,246 @@
+# Metrics.py
+# Counters, gauges and histograms kept in one preallocated array, streamed over the serial console as one short line
+#
+# Metrics are added while setting up (each add grows the array), after that recording one is a few integer operations
+# on the array with no allocation, so it can go in hot paths like the refresh:
+#  - counter: a total since the last report (bytes sent, failed reads), so it can't outgrow the 32 bit array
+#  - gauge: the latest value (heap free), lowerGauge() keeps the lowest value seen (heap low water mark)
+#  - histogram: count, sum and max plus a count per bucket of the values observed since the last report (times in us)
+#
+# Scheduler, AZ_ST7735S and SensorReader record their own metrics once given a Metrics with setMetrics().  collect()
+# is a timed gc.collect() that records the pause ("gc") and the bytes freed ("gcFreed").  "reportUs" is the time the
+# previous report took, so the cost of the stream itself shows in it.
+#
+# report() prints the line protocol (tools/plot_metrics.py reads it back on the PC):
+#
+#   #MH <name>:c <name>:g <name>:h:<bound>:<bound>...        names, kinds and bucket bounds, every HEADER_EVERY reports
+#   #M <ms> <counter or gauge value> <count>,<sum>,<max>,<bucket counts joined by :>...    in the same order
+#
+# A histogram has one more bucket than bounds, for values over the last bound.  Everything else printed over the
+# console is left alone, the parser only reads lines starting #M.
+import array, gc, time
+from Clock import getNow
+
+class Metrics:
+    # ****************************
+    # *    SETTINGS VARIABLES    *
+    # ****************************
+    # Bucket bounds (us) for timing histograms: 0.5, 1, 2, 5, 10, 20, 50, 100, 250ms
+    TIME_BUCKETS = (500, 1000, 2000, 5000, 10000, 20000, 50000, 100000, 250000)
+
+    # The header line is repeated so a console opened part way through can still be read
+    HEADER_EVERY = 10
+
+    __COUNTER = 0
+    __GAUGE = 1
+    __HISTOGRAM = 2
+    __KIND_NAMES = ("c", "g", "h")
+
+    # ****************************
+    # *    INTERNAL VARIABLES    *
+    # ****************************
+    __values = None
+    __names = None
+    __kinds = None
+    __ids = None
+    __bounds = None
+    __reports = 0
+    __reportUs = 0
+    __gcId = None
+    __gcFreedId = None
+    __heapFreeId = None
+    __heapLowId = None
+    __reportId = None
+
+    def __init__(self):
+        self.__values = array.array("l")
+        self.__names = []
+        self.__kinds = []
+        self.__ids = []
+        self.__bounds = {}
+        self.__gcId = self.addHistogram("gc")
+        self.__gcFreedId = self.addCounter("gcFreed")
+        self.__heapFreeId = self.addGauge("heapFree", gc.mem_free())
+        self.__heapLowId = self.addGauge("heapLow", gc.mem_free())
+        self.__reportId = self.addCounter("reportUs")
+
+    # function _add
+    # @return id of the new metric (where its values start in the array), the id of the existing one if the name is taken
+    def _add(self, name, kind, slots, value = 0):
+        if name in self.__names:
+            return self.__ids[self.__names.index(name)]
+
+        id = len(self.__values)
+        self.__values.extend(array.array("l", [value] * slots))
+        self.__names.append(name)
+        self.__kinds.append(kind)
+        self.__ids.append(id)
+        return id
+
+    # function addCounter
+    # @param name: name in the report (no spaces)
+    # @return id to pass to increment()
+    def addCounter(self, name):
+        return self._add(name, self.__COUNTER, 1)
+
+    # function addGauge
+    # @param name: name in the report (no spaces)
+    # @param value [0]: starting value
+    # @return id to pass to setGauge() / lowerGauge()
+    def addGauge(self, name, value = 0):
+        return self._add(name, self.__GAUGE, 1, value)
+
+    # function addHistogram
+    # @param name: name in the report (no spaces)
+    # @param bounds [TIME_BUCKETS]: ascending upper bounds of the buckets
+    # @return id to pass to observe()
+    def addHistogram(self, name, bounds = None):
+        if bounds == None:
+            bounds = self.TIME_BUCKETS
+
+        id = self._add(name, self.__HISTOGRAM, 3 + len(bounds) + 1)
+        self.__bounds[id] = bounds
+        return id
+
+    # function increment
+    # @param id: counter id
+    # @param amount [1]
+    def increment(self, id, amount = 1):
+        self.__values[id] += amount
+
+    # function setGauge
+    # @param id: gauge id
+    # @param value: new value
+    def setGauge(self, id, value):
+        self.__values[id] = value
+
+    # function lowerGauge
+    # Sets the gauge only if value is lower (a low water mark)
+    # @param id: gauge id
+    # @param value: new value
+    def lowerGauge(self, id, value):
+        if value < self.__values[id]:
+            self.__values[id] = value
+
+    # function observe
+    # Adds a value to a histogram
+    # @param id: histogram id
+    # @param value: whole number (us for times)
+    def observe(self, id, value):
+        values = self.__values
+        values[id] += 1
+        values[id + 1] += value
+
+        if value > values[id + 2]:
+            values[id + 2] = value
+
+        bucket = id + 3
+
+        for bound in self.__bounds[id]:
+            if value <= bound:
+                break
+
+            bucket += 1
+
+        values[bucket] += 1
+
+    # function get
+    # @param id: metric id
+    # @return a gauge's value, a counter's total or a histogram's count since the last report
+    def get(self, id):
+        return self.__values[id]
+
+    # function sampleHeap
+    # Updates heapFree and heapLow from gc.mem_free() (no collection, so it includes garbage not collected yet)
+    def sampleHeap(self):
+        free = gc.mem_free()
+        self.__values[self.__heapFreeId] = free
+        self.lowerGauge(self.__heapLowId, free)
+
+    # function collect
+    # gc.collect() with the pause and the bytes it freed recorded
+    # @return us the collection took
+    def collect(self):
+        before = gc.mem_free()
+        started = time.monotonic_ns()
+        gc.collect()
+        pause = (time.monotonic_ns() - started) // 1000
+        self.recordCollection(pause, gc.mem_free() - before)
+        return pause
+
+    # function recordCollection
+    # Records a collection timed somewhere else (e.g. by GcPolicy)
+    # @param pause: us it took
+    # @param freed: bytes it freed
+    def recordCollection(self, pause, freed):
+        self.observe(self.__gcId, pause)
+        self.increment(self.__gcFreedId, max(0, freed))
+        self.sampleHeap()
+
+    # function formatHeader
+    # @return the #MH line naming the metrics
+    def formatHeader(self):
+        parts = ["#MH"]
+
+        for i in range(len(self.__names)):
+            part = self.__names[i] + ":" + self.__KIND_NAMES[self.__kinds[i]]
+
+            if self.__kinds[i] == self.__HISTOGRAM:
+                part += ":" + ":".join(str(bound) for bound in self.__bounds[self.__ids[i]])
+
+            parts.append(part)
+
+        return " ".join(parts)
+
+    # function formatLine
+    # @return the #M line of values, counters and histograms are cleared for the next one
+    def formatLine(self):
+        values = self.__values
+        parts = ["#M", str(getNow())]
+
+        for i in range(len(self.__names)):
+            id = self.__ids[i]
+
+            if self.__kinds[i] == self.__GAUGE:
+                parts.append(str(values[id]))
+                continue
+
+            if self.__kinds[i] == self.__COUNTER:
+                parts.append(str(values[id]))
+                values[id] = 0
+                continue
+
+            end = id + 4 + len(self.__bounds[id])
+            parts.append("{0},{1},{2},{3}".format(values[id], values[id + 1], values[id + 2],
+                ":".join(str(values[j]) for j in range(id + 3, end))))
+
+            for j in range(id, end):
+                values[j] = 0
+
+        return " ".join(parts)
+
+    # function report
+    # Samples the heap and prints a line (and the header when it's due), for a Scheduler task
+    def report(self):
+        started = time.monotonic_ns()
+        self.sampleHeap()
+
+        if self.__reports % self.HEADER_EVERY == 0:
+            print(self.formatHeader())
+
+        print(self.formatLine())
+        elapsed = (time.monotonic_ns() - started) // 1000
+        self.__reports += 1
+        self.__reportUs += elapsed
+
+        # Goes out in the next line
+        self.increment(self.__reportId, elapsed)
+
+    # function getStats
+    # @return dict of reports printed and us spent making them
+    def getStats(self):
+        return {
+            "metrics": len(self.__names),
+            "reports": self.__reports,
+            "reportUs": self.__reportUs,
+        }
@@ -0,0 +1,199 @@
+# NumericLabel.py
+# Fixed width text label for readings that change all the time (e.g. "21 C"), drawn as one TileGrid over the
+# built in font's glyph bitmap
+#
+# adafruit_display_text's Label builds a new TileGrid for every character each time its text changes.  This label
+# makes its grid of character cells once and changing the value just changes the tile numbers of the cells that are
+# different, so setValue() doesn't allocate anything: digits are worked out with integer maths and the glyph tile
+# numbers for 0-9, space and minus are looked up once at the start.
+#
+# The value is right aligned in the digit cells with the suffix (e.g. " C") after it, positioned like a Label
+# (x, y is the middle of the left hand side of the text).
+import displayio, terminalio
+
+class NumericLabel:
+    # ****************************
+    # *    INTERNAL VARIABLES    *
+    # ****************************
+    __canvas = None
+    __grid = None
+    __palette = None
+    __digits = 0
+    __cells = 0
+    __digitTiles = None
+    __spaceTile = 0
+    __minusTile = 0
+    __value = None
+    __glyphWidth = 0
+    __glyphHeight = 0
+    __dirty = None
+    __offsetX = 0
+    __offsetY = 0
+    __parent = None
+
+    # function __init__
+    # @param digits: number of cells for the value (including a minus sign if it can go negative)
+    # @param suffix [""]: fixed text after the value, e.g. " C"
+    # @param x [0]: x position relative to the parent group
+    # @param y [0]: y position (middle of the text) relative to the parent group
+    # @param colour [0xFFFFFF]: text colour
+    # @param scale [1]: text size multiplier
+    # @param cells [None]: total cells, defaults to digits + len(suffix), more leaves blank cells on the right
+    def __init__(self, digits, suffix = "", x = 0, y = 0, colour = 0xFFFFFF, scale = 1, cells = None):
+        font = terminalio.FONT
+        self.__glyphWidth, self.__glyphHeight = font.get_bounding_box()
+        self.__digits = digits
+        self.__cells = max(digits + len(suffix), cells if cells != None else 0)
+        self.__digitTiles = bytearray(10)
+
+        for i in range(10):
+            self.__digitTiles[i] = font.get_glyph(ord("0") + i).tile_index
+
+        self.__spaceTile = font.get_glyph(ord(" ")).tile_index
+        self.__minusTile = font.get_glyph(ord("-")).tile_index
+
+        self.__palette = displayio.Palette(2)
+        self.__palette.make_transparent(0)
+        self.__palette[1] = colour
+
+        self.__grid = displayio.TileGrid(font.bitmap, pixel_shader = self.__palette, width = self.__cells, height = 1,
+                                         tile_width = self.__glyphWidth, tile_height = self.__glyphHeight,
+                                         default_tile = self.__spaceTile, y = -(self.__glyphHeight // 2))
+
+        for i in range(len(suffix)):
+            self.__grid[digits + i] = self._tile(suffix[i])
+
+        self.__canvas = displayio.Group(x = x, y = y, scale = scale)
+        self.__canvas.append(self.__grid)
+
+    # function getGroup
+    # @return displayio.Group to add to the screen
+    def getGroup(self):
+        return self.__canvas
+
+    # function setDirtyRegion
+    # Sets the DirtyRegion to mark when cells change
+    # @param dirtyRegion: DirtyRegion or None to stop tracking
+    # @param offsetX [0]: absolute x position of the group this label's group is added to (or of parent's group)
+    # @param offsetY [0]: absolute y position of the group this label's group is added to (or of parent's group)
+    # @param parent [None]: displayio.Group this label's group is added to, its position is read each time cells are
+    #                       marked so the label can be moved with it (e.g. an ImageLabel moved for a portrait layout)
+    def setDirtyRegion(self, dirtyRegion, offsetX = 0, offsetY = 0, parent = None):
+        self.__dirty = dirtyRegion
+        self.__offsetX = offsetX
+        self.__offsetY = offsetY
+        self.__parent = parent
+
+    # function setColour
+    # @param colour: text colour
+    def setColour(self, colour):
+        self.__palette[1] = colour
+
+        if self.__dirty != None:
+            self._markCells(0, self.__cells)
+
+    # function setValue
+    # Shows a whole number right aligned in the digit cells, values that don't fit are shown as all minus signs
+    # @param value: number to show, rounded to the nearest whole number
+    def setValue(self, value):
+        value = int(round(value))
+
+        if value == self.__value:
+            return
+
+        self.__value = value
+        negative = value < 0
+
+        if negative:
+            value = -value
+
+        first = -1
+        last = -1
+        cell = self.__digits - 1
+
+        # Digits from the right, then the minus sign, then blanks
+        while cell >= 0:
+            if value > 0 or cell == self.__digits - 1:
+                tile = self.__digitTiles[value % 10]
+                value //= 10
+            elif negative:
+                tile = self.__minusTile
+                negative = False
+            else:
+                tile = self.__spaceTile
+
+            if self.__grid[cell] != tile:
+                self.__grid[cell] = tile
+
+                if last < 0:
+                    last = cell
+
+                first = cell
+
+            cell -= 1
+
+        if value > 0 or negative:
+            self._overflow()
+            return
+
+        if self.__dirty != None and last >= 0:
+            self._markCells(first, last + 1)
+
+    # function setText
+    # Shows text in the digit cells (left aligned, cut to fit) for the odd value that isn't a number, e.g. "--"
+    # This path allocates (glyph lookups) so use setValue for readings
+    # @param text: text to show, the suffix stays as it is
+    def setText(self, text):
+        self.__value = None
+        first = -1
+        last = -1
+
+        for cell in range(self.__digits):
+            tile = self.__spaceTile
+
+            if cell < len(text):
+                tile = self._tile(text[cell])
+
+            if self.__grid[cell] != tile:
+                self.__grid[cell] = tile
+
+                if first < 0:
+                    first = cell
+
+                last = cell
+
+        if self.__dirty != None and last >= 0:
+            self._markCells(first, last + 1)
+
+    # function _tile
+    # @return the font's tile for character, a blank cell if the font doesn't have it
+    def _tile(self, character):
+        glyph = terminalio.FONT.get_glyph(ord(character))
+        return glyph.tile_index if glyph != None else self.__spaceTile
+
+    # function _overflow
+    # Fills the digit cells with minus signs when a value doesn't fit
+    def _overflow(self):
+        for cell in range(self.__digits):
+            self.__grid[cell] = self.__minusTile
+
+        if self.__dirty != None:
+            self._markCells(0, self.__digits)
+
+    # function _markCells
+    # Marks cells first to last - 1 as changed
+    def _markCells(self, first, last):
+        scale = self.__canvas.scale
+        x = self.__offsetX + self.__canvas.x + first * self.__glyphWidth * scale
+        y = self.__offsetY + self.__canvas.y - (self.__glyphHeight // 2) * scale
+
+        if self.__parent != None:
+            x += self.__parent.x
+            y += self.__parent.y
+
+        self.__dirty.mark(x, y, (last - first) * self.__glyphWidth * scale, self.__glyphHeight * scale)
+
+    # function getWidth
+    # @return width in pixels (scaled)
+    def getWidth(self):
+        return self.__cells * self.__glyphWidth * self.__canvas.scale
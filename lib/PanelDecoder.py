@@ -0,0 +1,146 @@
+# PanelDecoder.py
+# Streams the pixels of a compressed PanelImage out of its file a chunk at a time
+#
+# The file is read through a small fixed buffer and the caller asks for as many pixels as its own (fixed) buffer holds,
+# so the RAM used doesn't depend on the size of the image.  Runs and literals carry on across calls.
+#
+# Indexed images are run length encoded, one palette index per pixel:
+#   0x00 - 0x7F  literal: (byte + 1) indexes follow
+#   0x80 - 0xFF  run: (byte & 0x7F) + 2 copies of the index in the next byte
+#
+# RGB565 images use a QOI style encoding of the 16 bit panel values (split into their 5, 6 and 5 bit fields, whichever
+# colours they hold after the BGR swap), each op relative to the previous pixel:
+#   0x00 - 0x3F  index: the value in slot n of a 64 entry table of recently seen values
+#   0x40 - 0x7F  diff: 0b01hhmmll, each field changes by -2 to 1
+#   0x80 - 0xBF  luma: middle field changes by (byte & 0x3F) - 32, next byte holds the other two fields' change less
+#                half that, 4 bits each (-8 to 7)
+#   0xC0 - 0xFD  run: the previous value (byte & 0x3F) + 1 times
+#   0xFE         full: the value follows, high byte first
+# Every value decoded (other than runs) goes into the table at slot (high * 3 + middle * 5 + low * 7) & 63.
+import array
+
+class PanelDecoder:
+    # ****************************
+    # *    INTERNAL VARIABLES    *
+    # ****************************
+    __file = None
+    __input = None
+    __inputView = None
+    __position = 0
+    __length = 0
+    __run = 0
+    __literal = 0
+    __value = 0
+    __table = None
+
+    # function __init__
+    # @param file: file open in binary mode at the first byte of pixel data
+    # @param inputSize [64]: bytes read from the file at a time
+    def __init__(self, file, inputSize = 64):
+        self.__file = file
+        self.__input = bytearray(inputSize)
+        self.__inputView = memoryview(self.__input)
+        self.__table = array.array("H", [0] * 64)
+
+    # function _next
+    # @return the next byte of compressed data (0 past the end of the file)
+    def _next(self):
+        if self.__position >= self.__length:
+            self.__length = self.__file.readinto(self.__input)
+            self.__position = 0
+
+            if not self.__length:
+                self.__length = 0
+                return 0
+
+        value = self.__input[self.__position]
+        self.__position += 1
+        return value
+
+    # function readIndexes
+    # Decodes the next count pixels of a run length encoded indexed image
+    # @param buffer: bytearray to fill, one index per byte from the start
+    # @param count: number of pixels
+    def readIndexes(self, buffer, count):
+        output = memoryview(buffer)
+        i = 0
+
+        while i < count:
+            if self.__run > 0:
+                n = min(self.__run, count - i)
+                value = self.__value
+
+                for j in range(i, i + n):
+                    buffer[j] = value
+
+                self.__run -= n
+                i += n
+            elif self.__literal > 0:
+                if self.__position >= self.__length:
+                    self.__literal -= 1
+                    buffer[i] = self._next()
+                    i += 1
+                    continue
+
+                # Copy straight out of the input buffer
+                n = min(self.__literal, count - i, self.__length - self.__position)
+                output[i:i + n] = self.__inputView[self.__position:self.__position + n]
+                self.__position += n
+                self.__literal -= n
+                i += n
+            else:
+                control = self._next()
+
+                if control & 0x80:
+                    self.__run = (control & 0x7F) + 2
+                    self.__value = self._next()
+                else:
+                    self.__literal = control + 1
+
+    # function readRGB565
+    # Decodes the next count pixels of a QOI style RGB565 image
+    # @param buffer: bytearray to fill, two bytes (high first) per pixel from the start
+    # @param count: number of pixels
+    def readRGB565(self, buffer, count):
+        table = self.__table
+        previous = self.__value
+        end = count * 2
+        i = 0
+
+        while i < end:
+            if self.__run > 0:
+                self.__run -= 1
+                buffer[i] = previous >> 8
+                buffer[i + 1] = previous & 0xFF
+                i += 2
+                continue
+
+            op = self._next()
+
+            if op < 0x40:
+                value = table[op]
+            elif op < 0x80:
+                value = ((((previous >> 11) + ((op >> 4) & 3) - 2) & 31) << 11) | \
+                        (((((previous >> 5) & 63) + ((op >> 2) & 3) - 2) & 63) << 5) | \
+                        (((previous & 31) + (op & 3) - 2) & 31)
+            elif op < 0xC0:
+                middle = (op & 0x3F) - 32
+                half = middle >> 1
+                other = self._next()
+                value = ((((previous >> 11) + half + (other >> 4) - 8) & 31) << 11) | \
+                        (((((previous >> 5) & 63) + middle) & 63) << 5) | \
+                        (((previous & 31) + half + (other & 15) - 8) & 31)
+            elif op < 0xFE:
+                self.__run = (op & 0x3F) + 1
+                continue
+            else:
+                value = self._next() << 8
+                value |= self._next()
+
+            table[((value >> 11) * 3 + ((value >> 5) & 63) * 5 + (value & 31) * 7) & 63] = value
+            previous = value
+            buffer[i] = value >> 8
+            buffer[i + 1] = value & 0xFF
+            i += 2
+
+        self.__value = previous
@@ -0,0 +1,259 @@
+# PanelImage.py
+# Images made on a PC by tools/convert_images.py in the form the panel / displayio use them, so the Pico does no decoding
+#
+# A BMP has to have its header parsed, its padded bottom up rows walked and every pixel looked up in the palette, turned
+# into RGB565, BGR swapped and rotated before it can go to the panel.  A panel image has all that done already:
+#
+#  - RGB565 (16 bits per pixel): pixels in the panel's own order for one orientation (pre-rotated), big endian RGB565
+#    with the BGR swap done.  draw() reads rows straight into a buffer and sends them to the panel's RAM window
+#    (CASET / RASET / RAMWR), no per pixel work at all.
+#  - indexed (1, 2, 4 or 8 bits per pixel): the palette cut down to only the colours the image uses and packed rows
+#    in screen order, loaded into a displayio.Bitmap in one bitmaptools.readinto call.  displayio draws (and rotates)
+#    these as usual, so they work in TileGrids like any bitmap.
+#
+# Either can be compressed (flag 4, see PanelDecoder.py for the encodings): indexed images run length encoded, RGB565
+# QOI style.  Compressed pixels are decoded a fixed size chunk at a time, so the RAM needed on top of the bitmap (or
+# nothing, for draw()) stays the same whatever the size of the image.
+#
+# File layout (little endian):
+#   0  4 bytes  b"AZPI"
+#   4  1 byte   version (1)
+#   5  1 byte   bits per pixel (1, 2, 4, 8 or 16)
+#   6  1 byte   orientation / 90 the image was rotated for (RGB565 only)
+#   7  1 byte   flags: 1 = BGR colour order, 2 = palette index 0 is transparent, 4 = compressed
+#   8  2 bytes  width (screen pixels)
+#  10  2 bytes  height (screen pixels)
+#  12  2 bytes  palette colours (0 for RGB565)
+#  14  2 bytes  bytes per row
+#  16  colours x 3 bytes palette (0xRRGGBB, high byte first), then the rows (or compressed pixels)
+import displayio
+import bitmaptools
+from PanelDecoder import PanelDecoder
+
+class PanelImage:
+    # ****************************
+    # *    SETTINGS VARIABLES    *
+    # ****************************
+    RGB565 = 16
+    FLAG_BGR = 1
+    FLAG_TRANSPARENT = 2
+    FLAG_COMPRESSED = 4
+
+    # Pixels decoded at a time when loading a compressed indexed image into a Bitmap
+    CHUNK_PIXELS = 256
+
+    # ****************************
+    # *    INTERNAL VARIABLES    *
+    # ****************************
+    # ST7735 commands
+    __CASET = 0x2A
+    __RASET = 0x2B
+    __RAMWR = 0x2C
+
+    __HEADER_SIZE = 16
+
+    __path = None
+    __valid = False
+    __bits = 0
+    __orientation = 0
+    __flags = 0
+    __width = 0
+    __height = 0
+    __colours = 0
+    __rowBytes = 0
+    __buffer = None
+    __window = None
+
+    # function __init__
+    # Reads the header (the pixels are only read by draw() / getBitmap())
+    # @param path: path to the image on the Pico (e.g. /images/slideshow/lizard.pimg)
+    def __init__(self, path):
+        self.__path = path
+
+        try:
+            with open(path, "rb") as f:
+                header = f.read(self.__HEADER_SIZE)
+        except OSError:
+            return
+
+        if len(header) < self.__HEADER_SIZE or header[0:4] != b"AZPI" or header[4] != 1:
+            return
+
+        self.__bits = header[5]
+        self.__orientation = header[6] * 90
+        self.__flags = header[7]
+        self.__width = header[8] | (header[9] << 8)
+        self.__height = header[10] | (header[11] << 8)
+        self.__colours = header[12] | (header[13] << 8)
+        self.__rowBytes = header[14] | (header[15] << 8)
+        self.__valid = self.__bits in (1, 2, 4, 8, 16)
+
+    # function isValid
+    # @return True if the file was a panel image this code understands
+    def isValid(self):
+        return self.__valid
+
+    # function isIndexed
+    # @return True for an indexed image (getBitmap), False for RGB565 (draw)
+    def isIndexed(self):
+        return self.__bits != self.RGB565
+
+    def getWidth(self):
+        return self.__width
+
+    def getHeight(self):
+        return self.__height
+
+    def getBitsPerPixel(self):
+        return self.__bits
+
+    def isCompressed(self):
+        return (self.__flags & self.FLAG_COMPRESSED) != 0
+
+    # function getOrientation
+    # @return orientation an RGB565 image was rotated for (draw() needs the display to be the same)
+    def getOrientation(self):
+        return self.__orientation
+
+    # function getPalette
+    # @return displayio.Palette of an indexed image (index 0 transparent if it was converted with transparency)
+    def getPalette(self):
+        palette = displayio.Palette(self.__colours)
+        entry = bytearray(3)
+
+        with open(self.__path, "rb") as f:
+            f.seek(self.__HEADER_SIZE)
+
+            for i in range(self.__colours):
+                f.readinto(entry)
+                palette[i] = (entry[0] << 16) | (entry[1] << 8) | entry[2]
+
+        if self.__flags & self.FLAG_TRANSPARENT:
+            palette.make_transparent(0)
+
+        return palette
+
+    # function getBitmap
+    # Loads an indexed image into a new displayio.Bitmap
+    # @return displayio.Bitmap or None for an RGB565 image
+    def getBitmap(self):
+        if not self.isIndexed():
+            return None
+
+        bitmap = displayio.Bitmap(self.__width, self.__height, 1 << self.__bits)
+
+        with open(self.__path, "rb") as f:
+            f.seek(self.__HEADER_SIZE + self.__colours * 3)
+
+            if self.isCompressed():
+                self._decodeInto(bitmap, PanelDecoder(f))
+            else:
+                bitmaptools.readinto(bitmap, f, self.__bits, 1, True)
+
+        return bitmap
+
+    # function _decodeInto
+    # Fills a Bitmap from run length encoded indexes a chunk at a time, each chunk blitted a row segment at a time
+    # @param bitmap: displayio.Bitmap the size of the image
+    # @param decoder: PanelDecoder at the start of the pixels
+    def _decodeInto(self, bitmap, decoder):
+        chunk = bytearray(self.CHUNK_PIXELS)
+        view = memoryview(chunk)
+        width = self.__width
+        remaining = width * self.__height
+        x = 0
+        y = 0
+
+        while remaining > 0:
+            count = min(self.CHUNK_PIXELS, remaining)
+            decoder.readIndexes(chunk, count)
+            remaining -= count
+            i = 0
+
+            while i < count:
+                n = min(count - i, width - x)
+                bitmaptools.arrayblit(bitmap, view[i:i + n], x, y, x + n, y + 1)
+                i += n
+                x += n
+
+                if x == width:
+                    x = 0
+                    y += 1
+
+    # function getTileGrid
+    # @return displayio.TileGrid of an indexed image with its palette, None for an RGB565 image
+    def getTileGrid(self, x = 0, y = 0):
+        if not self.isIndexed():
+            return None
+
+        return displayio.TileGrid(self.getBitmap(), pixel_shader = self.getPalette(), x = x, y = y)
+
+    # function draw
+    # Sends an RGB565 image straight to the panel's RAM, a few rows at a time, bypassing displayio (so anything displayio
+    # draws there afterwards goes over it)
+    # @param bus: displayio.FourWire the panel is on
+    # @param x [0]: left of the image on the screen
+    # @param y [0]: top of the image on the screen
+    # @param panelWidth [128]: panel width in its own (unrotated) co-ordinates
+    # @param panelHeight [160]: panel height in its own co-ordinates
+    # @param rows [8]: panel rows sent per RAMWR (the buffer is rows x bytes per row)
+    # @return bytes sent, 0 if this isn't an RGB565 image
+    def draw(self, bus, x = 0, y = 0, panelWidth = 128, panelHeight = 160, rows = 8):
+        if not self.__valid or self.isIndexed():
+            return 0
+
+        left, top, width, height = self._panelWindow(x, y, panelWidth, panelHeight)
+        size = rows * self.__rowBytes
+
+        if self.__buffer == None or len(self.__buffer) < size:
+            self.__buffer = bytearray(size)
+            self.__window = bytearray(4)
+
+        view = memoryview(self.__buffer)
+        sent = 0
+
+        with open(self.__path, "rb") as f:
+            f.seek(self.__HEADER_SIZE + self.__colours * 3)
+            decoder = PanelDecoder(f) if self.isCompressed() else None
+
+            for first in range(0, height, rows):
+                count = min(rows, height - first)
+                length = count * self.__rowBytes
+
+                if decoder != None:
+                    decoder.readRGB565(self.__buffer, length // 2)
+                else:
+                    f.readinto(view[0:length])
+
+                sent += self._setWindow(bus, self.__CASET, left, left + width - 1)
+                sent += self._setWindow(bus, self.__RASET, top + first, top + first + count - 1)
+                bus.send(self.__RAMWR, view[0:length])
+                sent += 1 + length
+
+        return sent
+
+    # function _panelWindow
+    # Where the image's screen rectangle is in panel co-ordinates (rotation is clockwise, as displayio does it)
+    # @return (x, y, width, height) in panel co-ordinates
+    def _panelWindow(self, x, y, panelWidth, panelHeight):
+        width = self.__width
+        height = self.__height
+
+        if self.__orientation == 90:
+            return (panelWidth - y - height, x, height, width)
+
+        if self.__orientation == 180:
+            return (panelWidth - x - width, panelHeight - y - height, width, height)
+
+        if self.__orientation == 270:
+            return (y, panelHeight - x - width, height, width)
+
+        return (x, y, width, height)
+
+    def _setWindow(self, bus, command, start, end):
+        self.__window[0] = start >> 8
+        self.__window[1] = start & 0xFF
+        self.__window[2] = end >> 8
+        self.__window[3] = end & 0xFF
+        bus.send(command, self.__window)
+        return 5
@@ -0,0 +1,103 @@
+# SHT31Driver.py
+# Sensirion SHT31 temperature and humidity sensor on I2C (e.g. Adafruit 2857), for SensorReader
+#
+# Uses single shot measurements with clock stretching off: trigger() sends the measure command and returns, the
+# sensor takes up to 15.5ms (high repeatability) and collect() reads the 6 byte result.  Each reading comes with a
+# CRC-8 that is checked so a glitch on the bus is a failed read rather than a wild value.
+#
+# WIRING (I2C0, any I2C pins will do):
+#
+#  - SHT31 VIN --> Pico 3V3
+#  - SHT31 GND --> Pico GND
+#  - SHT31 SCL --> Pico GP5
+#  - SHT31 SDA --> Pico GP4
+#
+#   i2c = busio.I2C(scl=board.GP5, sda=board.GP4)
+#   driver = SHT31Driver(i2c)
+from SensorDriver import SensorDriver
+
+class SHT31Driver(SensorDriver):
+    # ****************************
+    # *    SETTINGS VARIABLES    *
+    # ****************************
+    # Single shot, high repeatability, no clock stretching
+    __MEASURE = b"\x24\x00"
+
+    # ****************************
+    # *    INTERNAL VARIABLES    *
+    # ****************************
+    __i2c = None
+    __address = 0x44
+    __buffer = None
+
+    # function __init__
+    # @param i2c: busio.I2C the sensor is on
+    # @param address [0x44]: 0x44, or 0x45 with the ADR pin high
+    def __init__(self, i2c, address = 0x44):
+        self.__i2c = i2c
+        self.__address = address
+        self.__buffer = bytearray(6)
+
+    def getNames(self):
+        return ("temperature", "humidity")
+
+    def getReadTime(self):
+        return 16
+
+    def getStepBudget(self):
+        return 2
+
+    # function trigger
+    # Sends the measure command
+    # @return True if the sensor acknowledged it
+    def trigger(self):
+        if not self.__i2c.try_lock():
+            return False
+
+        try:
+            self.__i2c.writeto(self.__address, self.__MEASURE)
+        except OSError:
+            return False
+        finally:
+            self.__i2c.unlock()
+
+        return True
+
+    # function collect
+    # Reads the result: temperature MSB, LSB, CRC then humidity MSB, LSB, CRC
+    # @return (degrees C, % relative humidity) or None if it isn't ready or a CRC is wrong
+    def collect(self):
+        buffer = self.__buffer
+
+        if not self.__i2c.try_lock():
+            return None
+
+        try:
+            self.__i2c.readfrom_into(self.__address, buffer)
+        except OSError:
+            return None
+        finally:
+            self.__i2c.unlock()
+
+        if self._crc(buffer, 0) != buffer[2] or self._crc(buffer, 3) != buffer[5]:
+            return None
+
+        temperature = -45 + 175 * ((buffer[0] << 8) | buffer[1]) / 65535
+        humidity = 100 * ((buffer[3] << 8) | buffer[4]) / 65535
+        return (temperature, humidity)
+
+    # function _crc
+    # CRC-8 (polynomial 0x31, starting at 0xFF) of the two bytes at start
+    def _crc(self, buffer, start):
+        crc = 0xFF
+
+        for i in range(start, start + 2):
+            crc ^= buffer[i]
+
+            for bit in range(8):
+                if crc & 0x80:
+                    crc = ((crc << 1) ^ 0x31) & 0xFF
+                else:
+                    crc = (crc << 1) & 0xFF
+
+        return crc
@@ -0,0 +1,176 @@
+# Scheduler.py
+# Runs periodic tasks (animation, sensor reads, screen changes) on asyncio instead of a sleep(0.1) polling loop
+#
+# Each task gets its own coroutine that sleeps exactly until its next deadline, so nothing wakes up early just to check
+# the time and nothing stops running while another screen is showing.
+# A callback that returns a number of milliseconds sets its own next deadline instead of the period (e.g.
+# SensorReader.poll, which knows when its next trigger / collect step is due).
+# Works with Circuit Python's asyncio library on the Pico (copy the asyncio and adafruit_ticks folders from the bundle
+# into /lib) and with the standard asyncio on a PC.
+#
+# Per task it keeps:
+#  - runs: how many times the callback has run
+#  - missed: deadlines skipped because the previous run (or another task) went on too long
+#  - late: how many milliseconds after its deadline the callback actually started (mean and max = jitter)
+#  - busy: how long the callback takes to run (mean and max)
+# Given a Metrics with setMetrics() every run also goes in the "loop" (busy) and "late" histograms, in us.
+import asyncio, time
+from Clock import getNow
+
+class ScheduledTask:
+    # function __init__
+    # @param name: name used in the stats
+    # @param period: milliseconds between runs
+    # @param callback: function to call, takes no arguments
+    # @param startDelay: milliseconds to wait before the first run
+    def __init__(self, name, period, callback, startDelay):
+        self.name = name
+        self.period = period
+        self.callback = callback
+        self.startDelay = startDelay
+        self.runs = 0
+        self.missed = 0
+        self.lateTotal = 0
+        self.lateMax = 0
+        self.busyTotal = 0
+        self.busyMax = 0
+
+    # function getStats
+    # @return dict of this task's counters
+    def getStats(self):
+        runs = max(1, self.runs)
+
+        return {
+            "runs": self.runs,
+            "missed": self.missed,
+            "lateMean": self.lateTotal / runs,
+            "lateMax": self.lateMax,
+            "busyMean": self.busyTotal / runs,
+            "busyMax": self.busyMax,
+        }
+
+class Scheduler:
+    # ****************************
+    # *    INTERNAL VARIABLES    *
+    # ****************************
+    __tasks = None
+    __running = False
+    __metrics = None
+    __loopMetric = None
+    __lateMetric = None
+
+    def __init__(self):
+        self.__tasks = []
+
+    # function addTask
+    # Adds a task to run every period milliseconds once run() is called
+    # @param name: name for the stats
+    # @param period: milliseconds between runs
+    # @param callback: function to call, takes no arguments, may return milliseconds until it should run next
+    # @param startDelay [None]: milliseconds before the first run, defaults to one period
+    # @return ScheduledTask
+    def addTask(self, name, period, callback, startDelay = None):
+        if startDelay == None:
+            startDelay = period
+
+        task = ScheduledTask(name, period, callback, startDelay)
+        self.__tasks.append(task)
+        return task
+
+    # function setMetrics
+    # @param metrics: Metrics to record each run's busy and late time in, None to stop recording
+    def setMetrics(self, metrics):
+        self.__metrics = metrics
+
+        if metrics != None:
+            self.__loopMetric = metrics.addHistogram("loop")
+            self.__lateMetric = metrics.addHistogram("late")
+
+    # function run
+    # Runs all the tasks until stop() is called (never returns in main.py)
+    def run(self):
+        asyncio.run(self._main())
+
+    # function stop
+    # Stops every task after its current run
+    def stop(self):
+        self.__running = False
+
+    async def _main(self):
+        self.__running = True
+        await asyncio.gather(*[self._runTask(task) for task in self.__tasks])
+
+    # function _runTask
+    # Coroutine for one task: sleep until the deadline, run, work out the next deadline
+    async def _runTask(self, task):
+        deadline = getNow() + task.startDelay
+
+        while self.__running:
+            delay = deadline - getNow()
+
+            if delay > 0:
+                await asyncio.sleep(delay / 1000)
+
+            if not self.__running:
+                break
+
+            startedNs = time.monotonic_ns()
+            started = startedNs // 1000000
+            late = started - deadline
+            nextRun = task.callback()
+            endedNs = time.monotonic_ns()
+            busy = endedNs // 1000000 - started
+
+            if self.__metrics != None:
+                self.__metrics.observe(self.__loopMetric, (endedNs - startedNs) // 1000)
+                self.__metrics.observe(self.__lateMetric, late * 1000)
+
+            task.runs += 1
+            task.lateTotal += late
+            task.busyTotal += busy
+
+            if late > task.lateMax:
+                task.lateMax = late
+
+            if busy > task.busyMax:
+                task.busyMax = busy
+
+            # The task said when it wants to run next
+            if nextRun != None:
+                deadline = getNow() + nextRun
+                await asyncio.sleep(0)
+                continue
+
+            # Skip any deadlines we have already blown through rather than running the task several times to catch up
+            deadline += task.period
+            now = getNow()
+
+            if now - deadline >= task.period:
+                skipped = (now - deadline) // task.period
+                task.missed += skipped
+                deadline += skipped * task.period
+
+            # Let the other tasks have a go even if we are behind
+            await asyncio.sleep(0)
+
+    # function getStats
+    # @return dict of task name -> stats dict (see ScheduledTask.getStats)
+    def getStats(self):
+        stats = {}
+
+        for task in self.__tasks:
+            stats[task.name] = task.getStats()
+
+        return stats
+
+    # function formatStats
+    # @return one line per task for printing to the serial console
+    def formatStats(self):
+        lines = []
+
+        for task in self.__tasks:
+            s = task.getStats()
+            lines.append("{0}: runs {1} missed {2} late {3:.1f}/{4}ms busy {5:.1f}/{6}ms".format(
+                task.name, s["runs"], s["missed"], s["lateMean"], s["lateMax"], s["busyMean"], s["busyMax"]))
+
+        return "\n".join(lines)
@@ -0,0 +1,222 @@
+# ScreenManager.py
+# Builds screens (e.g. TemperatureScreen) the first time they are shown and tears them down again when RAM runs low
+#
+# Each screen is registered with a function that builds it, nothing is created until show() needs it.  Built screens
+# stay in RAM (hidden) so switching back is quick, but whenever gc.mem_free() drops below the watermark the least
+# recently shown screens that aren't on display are torn down: their group is taken off the display and every
+# reference dropped so their bitmaps can be collected.  Showing one again builds it again.
+#
+# A screen object needs getGroup(), showAll() and hideAll().  If it also has getState() / setState(state) the state
+# is kept across a teardown and given back after it's rebuilt (e.g. the last sensor readings).
+#
+# Per screen it keeps how many times it was built / torn down and how long that took, so the watermark can be set to
+# trade RAM against switch time.
+import gc, time
+
+class ManagedScreen:
+    # function __init__
+    # @param name: name used in show() and the stats
+    # @param builder: function taking no arguments that returns the screen object
+    def __init__(self, name, builder):
+        self.name = name
+        self.builder = builder
+        self.screen = None
+        self.state = None
+        self.builds = 0
+        self.teardowns = 0
+        self.buildMsTotal = 0
+        self.buildMsMax = 0
+        self.buildMsLast = 0
+        self.teardownMsTotal = 0
+        self.teardownMsMax = 0
+        self.freedBytes = 0
+
+    # function getStats
+    # @return dict of this screen's counters
+    def getStats(self):
+        return {
+            "built": self.screen != None,
+            "builds": self.builds,
+            "teardowns": self.teardowns,
+            "buildMsMean": self.buildMsTotal / max(1, self.builds),
+            "buildMsMax": self.buildMsMax,
+            "buildMsLast": self.buildMsLast,
+            "teardownMsMean": self.teardownMsTotal / max(1, self.teardowns),
+            "teardownMsMax": self.teardownMsMax,
+            "freedBytes": self.freedBytes,
+        }
+
+class ScreenManager:
+    # ****************************
+    # *    INTERNAL VARIABLES    *
+    # ****************************
+    __parent = None
+    __screens = None
+    __recent = None
+    __current = None
+    __watermark = 0
+
+    # function __init__
+    # @param parent: displayio.Group screens are added to (e.g. AZ_ST7735S.getScreen())
+    # @param watermark [20000]: tear down unused screens while gc.mem_free() is below this many bytes, 0 to never
+    def __init__(self, parent, watermark = 20000):
+        self.__parent = parent
+        self.__screens = {}
+        self.__recent = []
+        self.__watermark = watermark
+
+    # function addScreen
+    # Registers a screen, it isn't built until it's first shown
+    # @param name: name to show it by
+    # @param builder: function taking no arguments that returns the screen object
+    def addScreen(self, name, builder):
+        self.__screens[name] = ManagedScreen(name, builder)
+
+    # function setWatermark
+    # @param watermark: bytes of free memory to keep, 0 to never tear screens down
+    def setWatermark(self, watermark):
+        self.__watermark = watermark
+        self.checkMemory()
+
+    # function show
+    # Hides the current screen and shows the named one, building it first if needed
+    # @param name: screen name, or None to just hide the current one (e.g. while the slideshow is up)
+    # @return the screen object or None
+    def show(self, name):
+        if self.__current != None and self.__current != name:
+            self.__screens[self.__current].screen.hideAll()
+
+        self.__current = name
+
+        if name == None:
+            self.checkMemory()
+            return None
+
+        entry = self.__screens[name]
+
+        if entry.screen == None:
+            # Make room first, the new screen's bitmaps are about to be allocated
+            self.checkMemory()
+            self._build(entry)
+
+        if name in self.__recent:
+            self.__recent.remove(name)
+
+        self.__recent.append(name)
+        entry.screen.showAll()
+        return entry.screen
+
+    # function get
+    # @param name: screen name
+    # @return the screen object or None if it isn't built at the moment
+    def get(self, name):
+        return self.__screens[name].screen
+
+    # function getCurrent
+    # @return name of the screen being shown or None
+    def getCurrent(self):
+        return self.__current
+
+    # function checkMemory
+    # Tears down the least recently shown screens (never the current one) until gc.mem_free() is above the watermark
+    # @return number of screens torn down
+    def checkMemory(self):
+        released = 0
+
+        if self.__watermark <= 0 or gc.mem_free() >= self.__watermark:
+            return released
+
+        gc.collect()
+
+        for name in list(self.__recent):
+            if gc.mem_free() >= self.__watermark:
+                break
+
+            if name != self.__current:
+                self.release(name)
+                released += 1
+
+        return released
+
+    # function release
+    # Tears a screen down now, it will be built again next time it's shown
+    # @param name: screen name
+    def release(self, name):
+        entry = self.__screens[name]
+
+        if entry.screen == None:
+            return
+
+        start = time.monotonic_ns()
+        before = gc.mem_free()
+
+        if hasattr(entry.screen, "getState"):
+            entry.state = entry.screen.getState()
+
+        if name == self.__current:
+            entry.screen.hideAll()
+            self.__current = None
+
+        try:
+            self.__parent.remove(entry.screen.getGroup())
+        except ValueError:
+            pass
+
+        entry.screen = None
+
+        if name in self.__recent:
+            self.__recent.remove(name)
+
+        gc.collect()
+        ms = (time.monotonic_ns() - start) / 1000000
+        entry.teardowns += 1
+        entry.teardownMsTotal += ms
+        entry.freedBytes += max(0, gc.mem_free() - before)
+
+        if ms > entry.teardownMsMax:
+            entry.teardownMsMax = ms
+
+    # function _build
+    # Builds a screen, adds it to the display (hidden) and gives it back any state saved at teardown
+    def _build(self, entry):
+        start = time.monotonic_ns()
+        screen = entry.builder()
+
+        if entry.state != None and hasattr(screen, "setState"):
+            screen.setState(entry.state)
+
+        entry.state = None
+        screen.hideAll()
+        self.__parent.append(screen.getGroup())
+        entry.screen = screen
+
+        ms = (time.monotonic_ns() - start) / 1000000
+        entry.builds += 1
+        entry.buildMsTotal += ms
+        entry.buildMsLast = ms
+
+        if ms > entry.buildMsMax:
+            entry.buildMsMax = ms
+
+    # function getStats
+    # @return dict of screen name -> stats dict (see ManagedScreen.getStats)
+    def getStats(self):
+        stats = {}
+
+        for name in self.__screens:
+            stats[name] = self.__screens[name].getStats()
+
+        return stats
+
+    # function formatStats
+    # @return one line per screen for printing to the serial console
+    def formatStats(self):
+        lines = []
+
+        for name in self.__screens:
+            s = self.__screens[name].getStats()
+            lines.append("{0}: {1} builds {2} {3:.1f}/{4:.1f}ms teardowns {5} {6:.1f}/{7:.1f}ms freed {8}".format(
+                name, "built" if s["built"] else "not built", s["builds"], s["buildMsMean"], s["buildMsMax"],
+                s["teardowns"], s["teardownMsMean"], s["teardownMsMax"], s["freedBytes"]))
+
+        return "\n".join(lines)
@@ -0,0 +1,376 @@
+# ScrollTransition.py
+# Slideshow transitions that get the ST7735 to move the pixels already on the panel
+#
+# The ST7735 can scroll its frame memory: VSCRDEF (0x33) sets up a scroll area of panel lines and VSCSAD (0x37) says
+# which memory line is shown at the top of it, so changing VSCSAD moves the whole picture without sending a pixel.
+# A slide writes the next strip of the new image into the memory lines that are about to come into view and then moves
+# the start address on, after a full turn the start address is back to 0 and the memory holds the new image exactly
+# where displayio would have put it.  Only the new image goes over the bus (once), the old one is moved by the panel.
+#
+# Effects:
+#  - SLIDE:  the old picture moves out and the new one follows it in (scroll + strip writes)
+#  - WIPE:   the new picture is written over the old one strip by strip, nothing moves
+#  - REVEAL: the new picture opens out from the middle like a curtain, nothing moves
+#
+# Scrolling is along the panel's own lines (the 160 pixel side) whatever the rotation, so it's a sideways slide in
+# landscape and an upwards one in portrait.  Strips are sent with CASET / RASET / RAMWR straight to the FourWire bus in
+# panel co-ordinates, displayio isn't involved so auto refresh must be off while it runs (AZ_ST7735S does this).
+#
+# Pixels come from the TileGrid's bitmap if it's in RAM (displayio.Bitmap, e.g. from adafruit_imageload) or are read a
+# row at a time from the BMP file for an OnDiskBitmap.  Only indexed images (1, 4 or 8 bit with a Palette) are
+# supported, run() returns False for anything else so the caller can fall back to a plain layer swap.
+import array, time
+import displayio
+
+class ScrollTransition:
+    # ****************************
+    # *    SETTINGS VARIABLES    *
+    # ****************************
+    SLIDE = 0
+    WIPE = 1
+    REVEAL = 2
+
+    # ****************************
+    # *    INTERNAL VARIABLES    *
+    # ****************************
+    # ST7735 commands
+    __CASET = 0x2A
+    __RASET = 0x2B
+    __RAMWR = 0x2C
+    __VSCRDEF = 0x33
+    __VSCSAD = 0x37
+
+    __bus = None
+    __orientation = 0
+    __panelWidth = 128
+    __panelHeight = 160
+    __lines = 160
+    __bgr = True
+    __colstart = 0
+    __rowstart = 0
+
+    # Strip of RGB565 pixels ready to send, a row of palette indexes and the window / scroll parameters
+    __buffer = None
+    __row = None
+    __raw = None
+    __window = None
+    __scroll = None
+
+    # Source image, either a Bitmap or an open BMP file, and its palette as panel RGB565 values
+    __colours = None
+    __bitmap = None
+    __file = None
+    __fileOffset = 0
+    __fileStride = 0
+    __fileBpp = 8
+    __fileHeight = 0
+    __fileTopDown = False
+
+    __transitions = 0
+    __fallbacks = 0
+    __bytesSent = 0
+    __lastBytes = 0
+    __lastSteps = 0
+    __lastMs = 0
+
+    # function __init__
+    # @param bus: displayio.FourWire the panel is on
+    # @param orientation: rotation the display was set up with (0, 90, 180 or 270)
+    # @param panelWidth [128]: panel width in its own (unrotated) co-ordinates
+    # @param panelHeight [160]: panel height (number of lines) in its own co-ordinates
+    # @param lines [160]: lines of frame memory the scroll area covers, 160 for this panel, 162 for ST7735 modules
+    #                     wired for the 132 x 162 memory layout
+    # @param bgr [True]: panel takes BGR colour order (same as the ST7735R bgr argument)
+    # @param colstart [0]: column offset of the visible area in frame memory
+    # @param rowstart [0]: row offset of the visible area in frame memory
+    def __init__(self, bus, orientation, panelWidth = 128, panelHeight = 160, lines = 160, bgr = True, colstart = 0, rowstart = 0):
+        self.__bus = bus
+        self.__orientation = orientation
+        self.__panelWidth = panelWidth
+        self.__panelHeight = panelHeight
+        self.__lines = lines
+        self.__bgr = bgr
+        self.__colstart = colstart
+        self.__rowstart = rowstart
+        self.__row = bytearray(panelHeight)
+        self.__raw = bytearray(panelHeight)
+        self.__window = bytearray(4)
+        self.__scroll = bytearray(6)
+
+    # function run
+    # Puts the image in a TileGrid on the panel with a transition, the panel then shows exactly what displayio would
+    # draw for a full screen TileGrid at 0, 0
+    # @param tileGrid: full screen TileGrid of the new image
+    # @param effect [SLIDE]: ScrollTransition.SLIDE, WIPE or REVEAL
+    # @param steps [16]: number of strips the new image is sent in
+    # @param imagePath [None]: file the TileGrid's OnDiskBitmap was opened from (not needed for RAM bitmaps)
+    # @param delay [0]: seconds to wait between steps
+    # @return True if the transition ran, False if the image can't be sent this way (nothing was sent)
+    def run(self, tileGrid, effect = SLIDE, steps = 16, imagePath = None, delay = 0):
+        if not self._openSource(tileGrid, imagePath):
+            self.__fallbacks += 1
+            return False
+
+        start = time.monotonic_ns()
+        self.__lastBytes = 0
+        self.__lastSteps = 0
+        lines = min(self.__lines, self.__panelHeight)
+        forward = self.__orientation == 0 or self.__orientation == 90
+
+        try:
+            if effect == self.SLIDE:
+                self._slide(steps, forward, delay)
+            elif effect == self.REVEAL:
+                half = lines // 2
+                band = (half + steps - 1) // steps
+
+                for done in range(0, half, band):
+                    end = min(half, done + band)
+                    self._writeBand(half - end, half - done)
+                    self._writeBand(half + done, lines if end == half else half + end)
+                    self._step(delay)
+            else:
+                band = (lines + steps - 1) // steps
+
+                for done in range(0, lines, band):
+                    end = min(lines, done + band)
+
+                    if forward:
+                        self._writeBand(done, end)
+                    else:
+                        self._writeBand(lines - end, lines - done)
+
+                    self._step(delay)
+        finally:
+            self._closeSource()
+
+        self.__transitions += 1
+        self.__bytesSent += self.__lastBytes
+        self.__lastMs = (time.monotonic_ns() - start) // 1000000
+        return True
+
+    # function _slide
+    # Writes each strip of the new image into the memory lines about to scroll into view and moves the start address
+    # on.  Memory line n always ends up holding line n of the new image so the last step puts the start address back to 0.
+    # Forward the picture moves towards line 0 (left in landscape, up in portrait), backwards it moves the other way.
+    def _slide(self, steps, forward, delay):
+        lines = self.__lines
+        band = (lines + steps - 1) // steps
+
+        self.__scroll[0] = 0
+        self.__scroll[1] = 0
+        self.__scroll[2] = lines >> 8
+        self.__scroll[3] = lines & 0xFF
+        self.__scroll[4] = 0
+        self.__scroll[5] = 0
+        self._send(self.__VSCRDEF, self.__scroll)
+
+        for done in range(0, lines, band):
+            end = min(lines, done + band)
+
+            if forward:
+                self._writeBand(done, end)
+                self._scrollTo(end % lines)
+            else:
+                self._writeBand(lines - end, lines - done)
+                self._scrollTo((lines - end) % lines)
+
+            self._step(delay)
+
+    # function _scrollTo
+    # Sends VSCSAD, the memory line shown at the top of the scroll area
+    def _scrollTo(self, line):
+        self.__scroll[0] = line >> 8
+        self.__scroll[1] = line & 0xFF
+        self._send(self.__VSCSAD, memoryview(self.__scroll)[0:2])
+
+    def _step(self, delay):
+        self.__lastSteps += 1
+
+        if delay > 0:
+            time.sleep(delay)
+
+    # function _bandRect
+    # Where panel lines first to last - 1 are in screen (rotated) co-ordinates and where a screen pixel goes in the strip
+    # @return (x, y, width, height, origin, stepX, stepY) the strip index of screen pixel x, y is origin + x * stepX + y * stepY
+    def _bandRect(self, first, last):
+        width = self.__panelWidth
+        height = self.__panelHeight
+
+        if self.__orientation == 90:
+            return (first, 0, last - first, width, width - 1 - first * width, width, -1)
+
+        if self.__orientation == 180:
+            return (0, height - last, width, last - first, (height - 1 - first) * width + width - 1, -1, -width)
+
+        if self.__orientation == 270:
+            return (height - last, 0, last - first, width, (height - 1 - first) * width, -width, 1)
+
+        return (0, first, width, last - first, -first * width, 1, width)
+
+    # function _writeBand
+    # Sends panel lines first to last - 1 of the new image (full panel width)
+    def _writeBand(self, first, last):
+        last = min(last, self.__panelHeight)
+
+        if last <= first:
+            return
+
+        x, y, width, height, origin, stepX, stepY = self._bandRect(first, last)
+        size = (last - first) * self.__panelWidth * 2
+
+        if self.__buffer == None or len(self.__buffer) < size:
+            self.__buffer = bytearray(size)
+
+        buffer = self.__buffer
+        colours = self.__colours
+        row = self.__row
+        start = origin + x * stepX
+        stepX *= 2
+
+        for screenY in range(y, y + height):
+            self._readRow(screenY, x, width)
+            index = (start + screenY * stepY) * 2
+
+            for i in range(width):
+                colour = colours[row[i]]
+                buffer[index] = colour >> 8
+                buffer[index + 1] = colour & 0xFF
+                index += stepX
+
+        self._setWindow(self.__CASET, self.__colstart, self.__colstart + self.__panelWidth - 1)
+        self._setWindow(self.__RASET, self.__rowstart + first, self.__rowstart + last - 1)
+        self._send(self.__RAMWR, memoryview(buffer)[0:size])
+
+    def _setWindow(self, command, start, end):
+        self.__window[0] = start >> 8
+        self.__window[1] = start & 0xFF
+        self.__window[2] = end >> 8
+        self.__window[3] = end & 0xFF
+        self._send(command, self.__window)
+
+    def _send(self, command, data):
+        self.__bus.send(command, data)
+        self.__lastBytes += 1 + len(data)
+
+    # function _openSource
+    # Gets the palette (as panel colours) and where to read pixels from
+    # @return False if the image isn't an indexed image we can read
+    def _openSource(self, tileGrid, imagePath):
+        bitmap = tileGrid.bitmap
+
+        if isinstance(bitmap, displayio.OnDiskBitmap):
+            return imagePath != None and self._openFile(imagePath)
+
+        if not isinstance(tileGrid.pixel_shader, displayio.Palette):
+            return False
+
+        palette = tileGrid.pixel_shader
+        self.__colours = array.array("H", [self._panelColour(palette[i]) for i in range(len(palette))])
+        self.__bitmap = bitmap
+        return True
+
+    # function _openFile
+    # Reads the header and palette of an uncompressed 1, 4 or 8 bit BMP and leaves it open for _readRow
+    def _openFile(self, path):
+        bmp = open(path, "rb")
+        header = bytearray(54)
+        bmp.readinto(header)
+
+        bpp = header[28] | (header[29] << 8)
+        compression = header[30] | (header[31] << 8)
+
+        if header[0:2] != b"BM" or bpp > 8 or compression != 0:
+            bmp.close()
+            return False
+
+        height = int.from_bytes(header[22:26], "little")
+
+        if height >= 0x80000000:
+            height -= 0x100000000
+
+        width = int.from_bytes(header[18:22], "little")
+        count = int.from_bytes(header[46:50], "little")
+
+        if count == 0:
+            count = 1 << bpp
+
+        entry = bytearray(4)
+        colours = array.array("H", [0] * count)
+        bmp.seek(14 + int.from_bytes(header[14:18], "little"))
+
+        for i in range(count):
+            bmp.readinto(entry)
+            colours[i] = self._panelColour((entry[2] << 16) | (entry[1] << 8) | entry[0])
+
+        self.__colours = colours
+        self.__file = bmp
+        self.__fileOffset = int.from_bytes(header[10:14], "little")
+        self.__fileStride = ((width * bpp + 31) // 32) * 4
+        self.__fileBpp = bpp
+        self.__fileTopDown = height < 0
+        self.__fileHeight = abs(height)
+        return True
+
+    def _closeSource(self):
+        if self.__file != None:
+            self.__file.close()
+
+        self.__file = None
+        self.__bitmap = None
+        self.__colours = None
+
+    # function _readRow
+    # Reads count palette indexes of screen row y starting at x into __row
+    def _readRow(self, y, x, count):
+        row = self.__row
+
+        if self.__bitmap != None:
+            bitmap = self.__bitmap
+
+            for i in range(count):
+                row[i] = bitmap[x + i, y]
+
+            return
+
+        bpp = self.__fileBpp
+        line = y if self.__fileTopDown else self.__fileHeight - 1 - y
+        first = (x * bpp) // 8
+        last = ((x + count) * bpp + 7) // 8
+        self.__file.seek(self.__fileOffset + line * self.__fileStride + first)
+
+        if bpp == 8:
+            self.__file.readinto(memoryview(row)[0:count])
+            return
+
+        # 1 and 4 bit rows are packed most significant bits first
+        raw = self.__raw
+        self.__file.readinto(memoryview(raw)[0:last - first])
+        mask = (1 << bpp) - 1
+
+        for i in range(count):
+            bit = (x + i) * bpp - first * 8
+            row[i] = (raw[bit // 8] >> (8 - bpp - bit % 8)) & mask
+
+    # function _panelColour
+    # @param colour: 0xRRGGBB
+    # @return RGB565 in the order the panel takes it
+    def _panelColour(self, colour):
+        colour = ((colour >> 8) & 0xF800) | ((colour >> 5) & 0x07E0) | ((colour >> 3) & 0x001F)
+
+        if self.__bgr:
+            colour = ((colour & 0x1F) << 11) | (colour & 0x07E0) | (colour >> 11)
+
+        return colour
+
+    # function getStats
+    # @return dict of transitions run, times the image couldn't be sent this way, bytes sent and the last one's figures
+    def getStats(self):
+        return {
+            "transitions": self.__transitions,
+            "fallbacks": self.__fallbacks,
+            "bytesSent": self.__bytesSent,
+            "lastBytes": self.__lastBytes,
+            "lastSteps": self.__lastSteps,
+            "lastMs": self.__lastMs,
+        }
@@ -0,0 +1,144 @@
+# SensorChannel.py
+# History, smoothing and change gating for one sensor reading (e.g. temperature)
+#
+# Every raw sample goes into a fixed size ring buffer (an array, allocated once) and is smoothed by one of:
+#  - AVERAGE: mean of the last size samples
+#  - MEDIAN:  middle of the last size samples, good at throwing away the odd wild reading
+#  - EMA:     exponential moving average, new = old + alpha * (sample - old), only needs the last value
+#  - RAW:     no smoothing
+#
+# The smoothed value is only passed on (add() returns True and getValue() changes) when it has moved more than the
+# deadband away from the last value passed on, so a reading wobbling +/-1 doesn't keep redrawing the screen.
+import array
+
+class SensorChannel:
+    # ****************************
+    # *    SETTINGS VARIABLES    *
+    # ****************************
+    RAW = 0
+    AVERAGE = 1
+    MEDIAN = 2
+    EMA = 3
+
+    # ****************************
+    # *    INTERNAL VARIABLES    *
+    # ****************************
+    __history = None
+    __sorted = None
+    __size = 0
+    __count = 0
+    __next = 0
+    __filter = 1
+    __alpha = 0.3
+    __deadband = 0.5
+    __filtered = None
+    __value = None
+    __samples = 0
+    __published = 0
+
+    # function __init__
+    # @param size [8]: number of samples kept (and averaged / medianed)
+    # @param filter [AVERAGE]: SensorChannel.RAW, AVERAGE, MEDIAN or EMA
+    # @param deadband [0.5]: how far the smoothed value has to move from the last value passed on before it's passed on
+    # @param alpha [0.3]: EMA weight of each new sample (0 to 1, bigger follows changes faster)
+    def __init__(self, size = 8, filter = AVERAGE, deadband = 0.5, alpha = 0.3):
+        self.__size = size
+        self.__history = array.array("f", [0] * size)
+        self.__sorted = array.array("f", [0] * size)
+        self.__filter = filter
+        self.__deadband = deadband
+        self.__alpha = alpha
+
+    # function add
+    # Adds a raw sample
+    # @param sample: the reading
+    # @return True if the value to show changed (call getValue() for it), False if it's within the deadband
+    def add(self, sample):
+        self.__history[self.__next] = sample
+        self.__next = (self.__next + 1) % self.__size
+
+        if self.__count < self.__size:
+            self.__count += 1
+
+        self.__samples += 1
+        self.__filtered = self._filter(sample)
+
+        if self.__value != None and abs(self.__filtered - self.__value) <= self.__deadband:
+            return False
+
+        self.__value = round(self.__filtered)
+        self.__published += 1
+        return True
+
+    # function _filter
+    # @param sample: the newest sample (already in the history)
+    # @return smoothed value
+    def _filter(self, sample):
+        if self.__filter == self.AVERAGE:
+            total = 0
+
+            for i in range(self.__count):
+                total += self.__history[i]
+
+            return total / self.__count
+
+        if self.__filter == self.MEDIAN:
+            return self._median()
+
+        if self.__filter == self.EMA:
+            if self.__filtered == None:
+                return sample
+
+            return self.__filtered + self.__alpha * (sample - self.__filtered)
+
+        return sample
+
+    # function _median
+    # Insertion sort of the history into a second preallocated array (only size samples so it's quick)
+    # @return median of the samples so far
+    def _median(self):
+        values = self.__sorted
+        count = self.__count
+
+        for i in range(count):
+            sample = self.__history[i]
+            j = i - 1
+
+            while j >= 0 and values[j] > sample:
+                values[j + 1] = values[j]
+                j -= 1
+
+            values[j + 1] = sample
+
+        middle = count // 2
+
+        if count % 2 == 1:
+            return values[middle]
+
+        return (values[middle - 1] + values[middle]) / 2
+
+    # function getValue
+    # @return the value to show (whole number) or None before the first sample
+    def getValue(self):
+        return self.__value
+
+    # function getFiltered
+    # @return the latest smoothed value (not rounded or gated) or None before the first sample
+    def getFiltered(self):
+        return self.__filtered
+
+    # function getHistory
+    # Copies the samples out oldest first (allocates, for graphs / debugging)
+    # @return list of samples
+    def getHistory(self):
+        start = (self.__next - self.__count) % self.__size
+        return [self.__history[(start + i) % self.__size] for i in range(self.__count)]
+
+    # function getStats
+    # @return dict of samples taken, values passed on and samples held back by the deadband
+    def getStats(self):
+        return {
+            "samples": self.__samples,
+            "published": self.__published,
+            "suppressed": self.__samples - self.__published,
+        }
@@ -0,0 +1,49 @@
+# SensorDriver.py
+# Base class for the sensor drivers SensorReader runs
+#
+# A read is split into two short steps so nothing waits for the sensor:
+#  - trigger(): start a measurement (e.g. send the measure command over I2C)
+#  - collect(): called getReadTime() ms later, fetch and check the result
+# Each step has to be quick (no sleeping), getStepBudget() is how long one can take at most.  SensorReader only runs a
+# step when that much of its time budget is left, so a read can't push the loop past a frame.
+#
+# Drivers:
+#  - SHT31Driver: I2C temperature and humidity
+#  - DHT22Driver: one wire temperature and humidity (pulseio)
+#  - SimulatedSensorDriver: made up or recorded readings with a read time and failure rate, for the host simulator and
+#    for running without sensors wired up
+#
+# For a new sensor override the get* functions that differ and trigger() / collect().
+
+class SensorDriver:
+    # function getNames
+    # @return names of the values collect() returns, in order
+    def getNames(self):
+        return ("value",)
+
+    # function getReadTime
+    # @return ms from trigger() to the measurement being ready for collect()
+    def getReadTime(self):
+        return 0
+
+    # function getStepBudget
+    # @return most ms one trigger() or collect() call takes
+    def getStepBudget(self):
+        return 2
+
+    # function getMinInterval
+    # @return fewest ms the sensor allows between measurements
+    def getMinInterval(self):
+        return 0
+
+    # function trigger
+    # Starts a measurement, must not wait for it
+    # @return True if started, False if the sensor didn't respond
+    def trigger(self):
+        return True
+
+    # function collect
+    # Fetches the measurement started by trigger()
+    # @return tuple of values (see getNames) or None if the read failed (no answer, bad checksum ...)
+    def collect(self):
+        return None
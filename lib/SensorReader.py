@@ -0,0 +1,306 @@
+# SensorReader.py
+# Reads sensors (SensorDriver) without holding up the loop: each read is a trigger step and, the driver's read time
+# later, a collect step, with nothing waiting in between
+#
+# Call poll() from a Scheduler task, it returns how long until the next step is due so the task only wakes up when
+# there's something to do (twice a read).  It runs the steps that are due, each only if the driver's step budget still
+# fits in the poll's time budget (one that doesn't is put off to straight after the other tasks have had a go, counted
+# as deferred), so a slow sensor can't push an animation frame late.  The first step of a poll always runs.
+#
+# The last good reading of each sensor is kept with the time it was taken, a failed read leaves it as it was.  After a
+# failure the next try waits period x 2, x 4 ... up to maxBackoff, the first good read puts it back to period.
+#
+# Per sensor it keeps reads, failures, how long from trigger to collect (latency), time spent in the steps (busy),
+# steps that took longer than the driver said they would (overruns) and deferred steps.  Given a Metrics with
+# setMetrics() every step's time also goes in the "sensor" histogram (us) and failed reads in "sensorFailures".
+import time
+from Clock import getNow
+
+class ReadingSensor:
+    # function __init__
+    # @param name: name used to get readings and in the stats
+    # @param driver: SensorDriver
+    # @param period: ms between reads
+    # @param onReading: function(name, values) called with each good reading, or None
+    def __init__(self, name, driver, period, onReading):
+        self.name = name
+        self.driver = driver
+        self.period = max(period, driver.getMinInterval())
+        self.onReading = onReading
+        self.values = None
+        self.takenAt = None
+        self.triggeredAt = None
+        self.nextTrigger = 0
+        self.failedInARow = 0
+        self.reads = 0
+        self.failures = 0
+        self.latencyTotal = 0
+        self.latencyMax = 0
+        self.steps = 0
+        self.busyTotal = 0
+        self.busyMax = 0
+        self.overruns = 0
+        self.deferred = 0
+
+    # function getStats
+    # @return dict of this sensor's counters
+    def getStats(self):
+        good = self.reads - self.failures
+
+        return {
+            "reads": self.reads,
+            "failures": self.failures,
+            "failureRate": self.failures / max(1, self.reads),
+            "latencyMean": self.latencyTotal / max(1, good),
+            "latencyMax": self.latencyMax,
+            "busyMean": self.busyTotal / max(1, self.steps),
+            "busyMax": self.busyMax,
+            "overruns": self.overruns,
+            "deferred": self.deferred,
+            "age": None if self.takenAt == None else getNow() - self.takenAt,
+        }
+
+class SensorReader:
+    # ****************************
+    # *    INTERNAL VARIABLES    *
+    # ****************************
+    __sensors = None
+    __budget = 0
+    __maxBackoff = 0
+    __metrics = None
+    __stepMetric = None
+    __failureMetric = None
+
+    # function __init__
+    # @param budget [10]: ms one poll() can spend in sensor steps
+    # @param maxBackoff [60000]: longest ms to wait before trying a failing sensor again
+    def __init__(self, budget = 10, maxBackoff = 60000):
+        self.__sensors = []
+        self.__budget = budget
+        self.__maxBackoff = maxBackoff
+
+    # function addSensor
+    # Adds a sensor, its first read starts on the next poll()
+    # @param name: name to get its readings by
+    # @param driver: SensorDriver
+    # @param period: ms between reads (at least the driver's minimum interval)
+    # @param onReading [None]: function(name, values) called from poll() with each good reading
+    # @return ReadingSensor
+    def addSensor(self, name, driver, period, onReading = None):
+        sensor = ReadingSensor(name, driver, period, onReading)
+        self.__sensors.append(sensor)
+        return sensor
+
+    # function setMetrics
+    # @param metrics: Metrics to record step times and failures in, None to stop recording
+    def setMetrics(self, metrics):
+        self.__metrics = metrics
+
+        if metrics != None:
+            self.__stepMetric = metrics.addHistogram("sensor")
+            self.__failureMetric = metrics.addCounter("sensorFailures")
+
+    # function setOnReading
+    # Raises ValueError if there's no sensor called name (a typo would otherwise leave the callback never called)
+    # @param name: sensor name
+    # @param onReading: function(name, values) called from poll() with each good reading, or None
+    def setOnReading(self, name, onReading):
+        sensor = self._get(name)
+
+        if sensor == None:
+            raise ValueError("no sensor called " + name)
+
+        sensor.onReading = onReading
+
+    # function poll
+    # Runs the trigger / collect steps that are due and fit in the time budget
+    # @param budget [None]: ms this poll can spend, None for the one given to __init__
+    # @return ms until the next step is due (0 if one was put off), None if there are no sensors
+    def poll(self, budget = None):
+        if budget == None:
+            budget = self.__budget
+
+        started = time.monotonic_ns()
+        ran = False
+        deferred = False
+
+        for sensor in self.__sensors:
+            now = getNow()
+            collecting = sensor.triggeredAt != None
+
+            if collecting and now - sensor.triggeredAt < sensor.driver.getReadTime():
+                continue
+
+            if not collecting and now < sensor.nextTrigger:
+                continue
+
+            stepBudget = sensor.driver.getStepBudget()
+
+            if ran and (time.monotonic_ns() - started) / 1000000 + stepBudget > budget:
+                sensor.deferred += 1
+                deferred = True
+                continue
+
+            ran = True
+            stepStarted = time.monotonic_ns()
+
+            if collecting:
+                values = sensor.driver.collect()
+            else:
+                values = None
+
+                if sensor.driver.trigger():
+                    sensor.triggeredAt = now
+
+            stepNs = time.monotonic_ns() - stepStarted
+            busy = stepNs / 1000000
+            sensor.steps += 1
+
+            if self.__metrics != None:
+                self.__metrics.observe(self.__stepMetric, stepNs // 1000)
+            sensor.busyTotal += busy
+
+            if busy > sensor.busyMax:
+                sensor.busyMax = busy
+
+            if busy > stepBudget:
+                sensor.overruns += 1
+
+            if collecting:
+                self._finishRead(sensor, values, now)
+            elif sensor.triggeredAt == None:
+                # The trigger failed, that's a failed read
+                self._finishRead(sensor, None, now)
+
+        if deferred:
+            return 0
+
+        return self.getNextDue()
+
+    # function getNextDue
+    # @return ms until the next trigger / collect step is due, None if there are no sensors
+    def getNextDue(self):
+        now = getNow()
+        due = None
+
+        for sensor in self.__sensors:
+            if sensor.triggeredAt != None:
+                at = sensor.triggeredAt + sensor.driver.getReadTime()
+            else:
+                at = sensor.nextTrigger
+
+            if due == None or at < due:
+                due = at
+
+        return None if due == None else max(0, due - now)
+
+    # function _finishRead
+    # Counts a read and works out when the next one starts
+    # @param sensor: ReadingSensor
+    # @param values: tuple from the driver or None if the read failed
+    # @param now: ms
+    # @return True if it was a good reading
+    def _finishRead(self, sensor, values, now):
+        startedAt = sensor.triggeredAt if sensor.triggeredAt != None else now
+        sensor.triggeredAt = None
+        sensor.reads += 1
+
+        if values == None:
+            sensor.failures += 1
+            sensor.failedInARow += 1
+            sensor.nextTrigger = now + min(self.__maxBackoff, sensor.period * (1 << min(sensor.failedInARow, 16)))
+
+            if self.__metrics != None:
+                self.__metrics.increment(self.__failureMetric)
+
+            return False
+
+        latency = now - startedAt
+        sensor.latencyTotal += latency
+
+        if latency > sensor.latencyMax:
+            sensor.latencyMax = latency
+
+        sensor.failedInARow = 0
+        sensor.values = values
+        sensor.takenAt = now
+
+        # Keep to the period from when the read started, unless that's already gone
+        sensor.nextTrigger = max(startedAt + sensor.period, now)
+
+        if sensor.onReading != None:
+            sensor.onReading(sensor.name, values)
+
+        return True
+
+    # function readNow
+    # Reads a sensor straight away, waiting for it (for boot, before there's a loop to poll from)
+    # @param name: sensor name
+    # @return tuple of values or None if the read failed
+    def readNow(self, name):
+        sensor = self._get(name)
+
+        if sensor == None:
+            return None
+
+        now = getNow()
+        sensor.triggeredAt = now if sensor.driver.trigger() else None
+        values = None
+
+        if sensor.triggeredAt != None:
+            time.sleep(sensor.driver.getReadTime() / 1000)
+            values = sensor.driver.collect()
+
+        self._finishRead(sensor, values, getNow())
+        return values
+
+    # function _get
+    # @param name: sensor name
+    # @return ReadingSensor or None
+    def _get(self, name):
+        for sensor in self.__sensors:
+            if sensor.name == name:
+                return sensor
+
+        return None
+
+    # function getValues
+    # @param name: sensor name
+    # @return the last good reading (tuple, see the driver's getNames) or None if there hasn't been one
+    def getValues(self, name):
+        sensor = self._get(name)
+        return None if sensor == None else sensor.values
+
+    # function getAge
+    # @param name: sensor name
+    # @return ms since the last good reading or None if there hasn't been one
+    def getAge(self, name):
+        sensor = self._get(name)
+
+        if sensor == None or sensor.takenAt == None:
+            return None
+
+        return getNow() - sensor.takenAt
+
+    # function getStats
+    # @return dict of sensor name -> stats dict (see ReadingSensor.getStats)
+    def getStats(self):
+        stats = {}
+
+        for sensor in self.__sensors:
+            stats[sensor.name] = sensor.getStats()
+
+        return stats
+
+    # function formatStats
+    # @return one line per sensor for printing to the serial console
+    def formatStats(self):
+        lines = []
+
+        for sensor in self.__sensors:
+            s = sensor.getStats()
+            lines.append("{0}: reads {1} failed {2} ({3:.1f}%) latency {4:.1f}/{5}ms busy {6:.2f}/{7:.2f}ms overruns {8} deferred {9}".format(
+                sensor.name, s["reads"], s["failures"], s["failureRate"] * 100, s["latencyMean"], s["latencyMax"], s["busyMean"],
+                s["busyMax"], s["overruns"], s["deferred"]))
+
+        return "\n".join(lines)
@@ -0,0 +1,71 @@
+# SimulatedSensorDriver.py
+# A sensor that isn't there, for SensorReader: made up or recorded readings that take a while to arrive and sometimes
+# fail, like a real one
+#
+# Readings come from a function (e.g. random numbers, what main.py uses until real sensors are wired up) or a list of
+# tuples played in order (e.g. a trace recorded from a real sensor, it starts again at the end).  collect() before
+# getReadTime() ms have passed since trigger() fails the way reading a real sensor too early would.
+import random
+from SensorDriver import SensorDriver
+from Clock import getNow
+
+class SimulatedSensorDriver(SensorDriver):
+    # ****************************
+    # *    INTERNAL VARIABLES    *
+    # ****************************
+    __source = None
+    __names = None
+    __readTime = 0
+    __stepBudget = 1
+    __failRate = 0
+    __next = 0
+    __triggeredAt = None
+    __failing = False
+
+    # function __init__
+    # @param source: function returning a tuple of values, or a list of tuples to play in order
+    # @param names [("temperature", "humidity")]: names of the values
+    # @param readTime [50]: ms from trigger() to the reading being ready
+    # @param failRate [0]: fraction of reads that fail (0 - 1)
+    # @param stepBudget [1]: ms one step is said to take at most
+    def __init__(self, source, names = ("temperature", "humidity"), readTime = 50, failRate = 0, stepBudget = 1):
+        self.__source = source
+        self.__names = names
+        self.__readTime = readTime
+        self.__failRate = failRate
+        self.__stepBudget = stepBudget
+
+    def getNames(self):
+        return self.__names
+
+    def getReadTime(self):
+        return self.__readTime
+
+    def getStepBudget(self):
+        return self.__stepBudget
+
+    # function trigger
+    # Starts the make believe measurement, whether it will fail is decided now
+    # @return True
+    def trigger(self):
+        self.__triggeredAt = getNow()
+        self.__failing = random.random() < self.__failRate
+        return True
+
+    # function collect
+    # @return the next reading or None if it failed, wasn't triggered or isn't ready yet
+    def collect(self):
+        if self.__triggeredAt == None or getNow() - self.__triggeredAt < self.__readTime:
+            return None
+
+        self.__triggeredAt = None
+
+        if self.__failing:
+            return None
+
+        if callable(self.__source):
+            return self.__source()
+
+        reading = self.__source[self.__next]
+        self.__next = (self.__next + 1) % len(self.__source)
+        return reading
@@ -0,0 +1,303 @@
+# SlideShowIndex.py
+# Index of the BMP / panel image files in a slideshow directory so we don't have to os.listdir for every image shown
+#
+# For each file the name, size, width, height and bit depth are kept.  The index is built once (checking each BMP
+# header so broken or wrongly sized files are skipped before OnDiskBitmap ever sees them) and saved as a manifest
+# next to the directory (e.g. /images/slideshow.idx).  On the next boot the manifest is used instead of rescanning as
+# long as the directory's modified time hasn't changed.
+#
+# Indexed panel images (.pimg from tools/convert_images.py, usually compressed) can sit alongside or replace the BMPs,
+# where both name.pimg and name.bmp are there only the .pimg is used.  RGB565 panel images can't go in a TileGrid so
+# they are skipped.
+#
+# Note: the Pico's filesystem is read only to code unless boot.py remounts it, in that case the manifest just isn't
+# saved and the index is rebuilt each boot.
+#
+# The directory's modified time is checked at most every CHECK_MS (a stat on every image shown adds up on a slow SD
+# card), a missing directory is treated as empty until it turns up.
+#
+# Images are handed out like a shuffled deck of cards, nothing repeats until every image has been shown.
+import os, random, struct
+from Clock import getNow
+
+class SlideShowIndex:
+    # ****************************
+    # *    SETTINGS VARIABLES    *
+    # ****************************
+    # Bit depths OnDiskBitmap can show
+    SUPPORTED_BITS = (1, 2, 4, 8, 16, 24, 32)
+
+    # Bit depths of panel images that can be loaded into a displayio.Bitmap
+    PANEL_IMAGE_BITS = (1, 2, 4, 8)
+
+    # Least ms between checks of the directory's modified time
+    CHECK_MS = 5000
+
+    # ****************************
+    # *    INTERNAL VARIABLES    *
+    # ****************************
+    __path = None
+    __manifestPath = None
+    __width = None
+    __height = None
+    __mtime = None
+    __checkedAt = None
+    __entries = None
+    __rejected = None
+    __deck = None
+    __last = None
+
+    # function __init__
+    # @param path: directory holding the BMPs (e.g. /images/slideshow)
+    # @param width [None]: required image width in pixels, None to allow any
+    # @param height [None]: required image height in pixels, None to allow any
+    # @param manifestPath [None]: where to save the index, defaults to path + ".idx" (outside the directory so saving
+    #                             it doesn't change the directory's modified time)
+    def __init__(self, path, width = None, height = None, manifestPath = None):
+        self.__path = path.rstrip("/")
+        self.__width = width
+        self.__height = height
+        self.__entries = []
+        self.__rejected = []
+        self.__deck = []
+
+        if manifestPath == None:
+            self.__manifestPath = self.__path + ".idx"
+        else:
+            self.__manifestPath = manifestPath
+
+    # function refresh
+    # Rebuilds the index if the directory has changed since it was last built
+    # @param force [False]: check the directory even if it was checked less than CHECK_MS ago
+    # @return True if the index was rebuilt (or loaded), False if nothing changed
+    def refresh(self, force = False):
+        now = getNow()
+
+        if not force and self.__checkedAt != None and now - self.__checkedAt < self.CHECK_MS:
+            return False
+
+        self.__checkedAt = now
+
+        try:
+            mtime = os.stat(self.__path)[8]
+        except OSError:
+            mtime = None
+
+        if mtime == self.__mtime:
+            return False
+
+        self.__mtime = mtime
+
+        if mtime == None:
+            # No directory, no images
+            self.__entries = []
+            self.__rejected = []
+        elif not self._loadManifest(mtime):
+            self._scan()
+            self._saveManifest(mtime)
+
+        # Start a new deck so removed files aren't handed out
+        self.__deck = []
+        return True
+
+    # function _scan
+    # Reads the header of every .bmp and .pimg in the directory
+    def _scan(self):
+        self.__entries = []
+        self.__rejected = []
+        names = sorted(os.listdir(self.__path))
+        panelImages = []
+
+        for name in names:
+            if name.lower().endswith(".pimg") and not name.startswith("."):
+                entry = self._readPanelHeader(name)
+
+                if entry == None:
+                    self.__rejected.append(name)
+                else:
+                    panelImages.append(name[:-5].lower())
+                    self.__entries.append(entry)
+
+        for name in names:
+            if not name.lower().endswith(".bmp") or name.startswith("."):
+                continue
+
+            # Converted copy takes its place
+            if name[:-4].lower() in panelImages:
+                continue
+
+            entry = self._readHeader(name)
+
+            if entry == None:
+                self.__rejected.append(name)
+            else:
+                self.__entries.append(entry)
+
+        self.__entries.sort()
+
+    # function _readHeader
+    # Checks a BMP's header is something OnDiskBitmap can show at the size we want
+    # @param name: file name inside the directory
+    # @return (name, size, width, height, bitsPerPixel) or None if the file should be skipped
+    def _readHeader(self, name):
+        try:
+            size = os.stat(self.__path + "/" + name)[6]
+
+            with open(self.__path + "/" + name, "rb") as f:
+                header = f.read(34)
+        except OSError:
+            return None
+
+        if len(header) < 34 or header[0:2] != b"BM":
+            return None
+
+        dataOffset = struct.unpack_from("<I", header, 10)[0]
+        width, height, planes, bits, compression = struct.unpack_from("<iiHHI", header, 18)
+        height = abs(height) #negative height = top down rows
+
+        if bits not in self.SUPPORTED_BITS or compression not in (0, 3) or width <= 0 or height == 0:
+            return None
+
+        if (self.__width != None and width != self.__width) or (self.__height != None and height != self.__height):
+            return None
+
+        # Rows are padded to 4 bytes, a truncated file would fail half way through drawing
+        if size < dataOffset + ((width * bits + 31) // 32) * 4 * height:
+            return None
+
+        return (name, size, width, height, bits)
+
+    # function _readPanelHeader
+    # Checks a panel image's header is an indexed image at the size we want
+    # @param name: file name inside the directory
+    # @return (name, size, width, height, bitsPerPixel) or None if the file should be skipped
+    def _readPanelHeader(self, name):
+        try:
+            size = os.stat(self.__path + "/" + name)[6]
+
+            with open(self.__path + "/" + name, "rb") as f:
+                header = f.read(16)
+        except OSError:
+            return None
+
+        if len(header) < 16 or header[0:4] != b"AZPI" or header[4] != 1:
+            return None
+
+        bits, orientation, flags, width, height, colours, rowBytes = struct.unpack_from("<BBBHHHH", header, 5)
+
+        if bits not in self.PANEL_IMAGE_BITS or width == 0 or height == 0:
+            return None
+
+        if (self.__width != None and width != self.__width) or (self.__height != None and height != self.__height):
+            return None
+
+        # Compressed pixels can be any length, uncompressed rows have to all be there
+        dataOffset = 16 + colours * 3
+
+        if size <= dataOffset or (not flags & 4 and size < dataOffset + rowBytes * height):
+            return None
+
+        return (name, size, width, height, bits)
+
+    # function _loadManifest
+    # Loads the saved index if it was made for this directory modified time and image size
+    # @param mtime: directory modified time
+    # @return True if loaded
+    def _loadManifest(self, mtime):
+        try:
+            with open(self.__manifestPath, "r") as f:
+                lines = f.read().split("\n")
+        except OSError:
+            return False
+
+        if len(lines) == 0 or lines[0] != self._manifestKey(mtime):
+            return False
+
+        self.__entries = []
+        self.__rejected = []
+
+        for line in lines[1:]:
+            if line == "":
+                continue
+
+            fields = line.split(",")
+
+            if fields[0] == "!":
+                self.__rejected.append(fields[1])
+            else:
+                self.__entries.append((fields[0], int(fields[1]), int(fields[2]), int(fields[3]), int(fields[4])))
+
+        return True
+
+    # function _saveManifest
+    # Saves the index, silently does nothing if the filesystem is read only
+    # @param mtime: directory modified time
+    def _saveManifest(self, mtime):
+        try:
+            with open(self.__manifestPath, "w") as f:
+                f.write(self._manifestKey(mtime) + "\n")
+
+                for entry in self.__entries:
+                    f.write("{0},{1},{2},{3},{4}\n".format(*entry))
+
+                for name in self.__rejected:
+                    f.write("!," + name + "\n")
+        except OSError:
+            pass
+
+    # function _manifestKey
+    # First line of the manifest, it is only valid for the same directory time and size limits
+    def _manifestKey(self, mtime):
+        return "{0},{1},{2}".format(mtime, self.__width, self.__height)
+
+    # function next
+    # Gets the next image from the shuffled deck, reshuffling once every image has been shown
+    # @return file name inside the directory or None if there are no usable images
+    def next(self):
+        self.refresh()
+
+        if len(self.__deck) == 0:
+            self._shuffle()
+
+            if len(self.__deck) == 0:
+                return None
+
+        self.__last = self.__entries[self.__deck.pop()][0]
+        return self.__last
+
+    # function _shuffle
+    # Deals a new deck (Fisher-Yates, Circuit Python's random doesn't have shuffle)
+    def _shuffle(self):
+        deck = list(range(len(self.__entries)))
+
+        for i in range(len(deck) - 1, 0, -1):
+            j = random.randint(0, i)
+            deck[i], deck[j] = deck[j], deck[i]
+
+        # Don't show the same image twice in a row across the end of one deck and start of the next
+        if len(deck) > 1 and self.__entries[deck[-1]][0] == self.__last:
+            deck[-1], deck[0] = deck[0], deck[-1]
+
+        self.__deck = deck
+
+    # function getEntries
+    # @return list of (name, size, width, height, bitsPerPixel) for the usable images
+    def getEntries(self):
+        self.refresh()
+        return self.__entries
+
+    # function lookup
+    # @param name: file name inside the directory
+    # @return (name, size, width, height, bitsPerPixel) or None if it isn't a usable image
+    def lookup(self, name):
+        for entry in self.__entries:
+            if entry[0] == name:
+                return entry
+
+        return None
+
+    # function getRejected
+    # @return list of file names skipped because their header was bad or the wrong size
+    def getRejected(self):
+        self.refresh()
+        return self.__rejected
@@ -0,0 +1,156 @@
+# SlideShowLoader.py
+# Gets the next slideshow image ready before it's needed so switching to it is just swapping layer 0
+#
+# Call prefetch() while another screen is showing (e.g. just after the temperature screen comes up), that opens
+# (and checks) the next image from the SlideShowScreen and builds its TileGrid.  When it's time to switch take()
+# hands over the ready TileGrid and AZ_ST7735S.setBackgroundLayer() puts it on screen.
+#
+# Optionally small indexed images can be decoded into RAM (adafruit_imageload) and kept in a cache so the Pico doesn't
+# have to read them from flash again when the screen refreshes.  The cache is least recently used first out and is
+# limited to a byte budget, 0 (the default) turns it off.
+#
+# Panel images (.pimg) are always loaded into RAM (there is no OnDiskBitmap for them), and cached like a BMP would be.
+import displayio
+import adafruit_imageload
+from PanelImage import PanelImage
+
+class SlideShowLoader:
+    # ****************************
+    # *    INTERNAL VARIABLES    *
+    # ****************************
+    __slideshow = None
+    __parentPath = None
+    __next = None
+    __cache = None
+    __cacheBudget = 0
+    __cacheBytes = 0
+    __maxDecodeBytes = 0
+    __hits = 0
+    __misses = 0
+    __prefetched = 0
+    __coldTakes = 0
+
+    # function __init__
+    # @param slideshow: SlideShowScreen to get images from
+    # @param parentPath ["/images"]: directory image paths from the slideshow are relative to
+    # @param cacheBudget [0]: bytes of RAM decoded images can use, 0 to always use OnDiskBitmap
+    # @param maxDecodeBytes [None]: biggest single image to decode into RAM, defaults to half the budget
+    def __init__(self, slideshow, parentPath = "/images", cacheBudget = 0, maxDecodeBytes = None):
+        self.__slideshow = slideshow
+        self.__parentPath = parentPath
+        self.__cache = []
+        self.__cacheBudget = cacheBudget
+
+        if maxDecodeBytes == None:
+            self.__maxDecodeBytes = cacheBudget // 2
+        else:
+            self.__maxDecodeBytes = maxDecodeBytes
+
+    # function prefetch
+    # Opens the next image and builds its TileGrid if that hasn't been done already
+    # @return True if an image is ready
+    def prefetch(self):
+        if self.__next != None:
+            return True
+
+        image = self.__slideshow.getBackground()
+
+        if image == None:
+            return False
+
+        self.__next = (image, self._load(image))
+        self.__prefetched += 1
+        return True
+
+    # function isReady
+    # @return True if the next image has already been prefetched
+    def isReady(self):
+        return self.__next != None
+
+    # function take
+    # Hands over the prefetched image (loading it now if prefetch() wasn't called in time)
+    # @return (image path, TileGrid) or None if there are no images
+    def take(self):
+        if self.__next == None:
+            self.__coldTakes += 1
+
+            if not self.prefetch():
+                return None
+
+        ready = self.__next
+        self.__next = None
+        return ready
+
+    # function getImagePath
+    # @param image: image path from take()
+    # @return full path of the file (e.g. for AZ_ST7735S.transitionBackgroundLayer)
+    def getImagePath(self, image):
+        return self.__parentPath + "/" + image
+
+    # function _load
+    # Builds a TileGrid for the image, from the RAM cache if we can
+    # @param image: path relative to parentPath
+    # @return TileGrid
+    def _load(self, image):
+        for i in range(len(self.__cache)):
+            if self.__cache[i][0] == image:
+                entry = self.__cache.pop(i)
+                self.__cache.append(entry)
+                self.__hits += 1
+                return displayio.TileGrid(entry[1], pixel_shader=entry[2])
+
+        self.__misses += 1
+        size = self._decodedSize(image)
+        cache = size != None and size <= self.__maxDecodeBytes and size <= self.__cacheBudget
+        isPanelImage = image.lower().endswith(".pimg")
+
+        if isPanelImage:
+            panelImage = PanelImage(self.__parentPath + "/" + image)
+            bitmap, palette = panelImage.getBitmap(), panelImage.getPalette()
+        elif cache:
+            bitmap, palette = adafruit_imageload.load(self.__parentPath + "/" + image, bitmap=displayio.Bitmap, palette=displayio.Palette)
+
+        if cache:
+            self.__cache.append((image, bitmap, palette, size))
+            self.__cacheBytes += size
+
+            # Evict least recently used (front of the list) until we are back in budget
+            while self.__cacheBytes > self.__cacheBudget and len(self.__cache) > 1:
+                self.__cacheBytes -= self.__cache.pop(0)[3]
+
+        if cache or isPanelImage:
+            return displayio.TileGrid(bitmap, pixel_shader=palette)
+
+        bitmap = displayio.OnDiskBitmap(self.__parentPath + "/" + image)
+        return displayio.TileGrid(bitmap, pixel_shader=bitmap.pixel_shader)
+
+    # function _decodedSize
+    # Works out how much RAM the image needs decoded, from the slideshow index
+    # @param image: path relative to parentPath
+    # @return bytes or None if the image can't be decoded into RAM (not indexed / unknown)
+    def _decodedSize(self, image):
+        entry = self.__slideshow.getIndex().lookup(image.split("/")[-1])
+
+        if entry == None or entry[4] > 8:
+            return None
+
+        # displayio.Bitmap packs pixels into 32 bit words per row, palette is 4 bytes an entry
+        bits = entry[4]
+        return ((entry[2] * bits + 31) // 32) * 4 * entry[3] + (1 << bits) * 4
+
+    # function getCacheBytes
+    # @return bytes used by decoded images in the cache
+    def getCacheBytes(self):
+        return self.__cacheBytes
+
+    # function getStats
+    # @return dict of prefetch / cache counters
+    def getStats(self):
+        return {
+            "prefetched": self.__prefetched,
+            "coldTakes": self.__coldTakes,
+            "cacheHits": self.__hits,
+            "cacheMisses": self.__misses,
+            "cacheBytes": self.__cacheBytes,
+            "cachedImages": len(self.__cache),
+        }
@@ -1,18 +1,38 @@
 # SlideShowScreen.py
 # Sets up a landscape screen 160 x 128 with a full screen image
 # based on indexed bmps stored in /images/slideshow (by default)
-import random, os
+from SlideShowIndex import SlideShowIndex
 
 class SlideShowScreen:
     __slideshowDir = None
     __path = None
+    __index = None
     
-    def __init__(self, parentPath = "/images", slideshowDir = "slideshow"):
+    # function __init__
+    # @param parentPath ["/images"]: directory the slideshow directory is in
+    # @param slideshowDir ["slideshow"]: directory holding the bmps
+    # @param width [None]: only show images this wide (e.g. tft.getWidth()), None for any
+    # @param height [None]: only show images this high (e.g. tft.getHeight()), None for any
+    def __init__(self, parentPath = "/images", slideshowDir = "slideshow", width = None, height = None):
         self.__path = parentPath
         self.__slideshowDir = slideshowDir
+        self.__index = SlideShowIndex(self.__path + "/" + self.__slideshowDir, width, height)
         
+    # function _getRandomImage
+    # Images come from a shuffled deck so none repeat until they've all been shown
+    # @return image path relative to parentPath or None if there are no usable images
     def _getRandomImage(self):
-        return self.__slideshowDir + "/" + random.choice(os.listdir(self.__path + "/" + self.__slideshowDir + "/"))
+        image = self.__index.next()
+        
+        if image == None:
+            return None
+        
+        return self.__slideshowDir + "/" + image
     
     def getBackground(self):
         return self._getRandomImage()
+    
+    # function getIndex
+    # @return SlideShowIndex for the slideshow directory (e.g. to check getRejected())
+    def getIndex(self):
+        return self.__index
@@ -0,0 +1,255 @@
+# Sparkline.py
+# Small history graph (e.g. the last hour of temperature) drawn into a displayio.Bitmap one column at a time
+#
+# The bitmap is one column per sample and is never redrawn or copied.  Each new sample clears the next column and draws a
+# line from the previous sample's height to the new one, so a sample costs at most height pixel writes.
+#
+# Two ways to show it:
+#  - sweep (default): the bitmap is shown as it is and a cursor sweeps left to right with a blank column in front of it
+#    (like a heart monitor), only those two columns are sent to the screen each sample.
+#  - scroll: the newest sample is always on the right.  The TileGrid is made of 1 pixel wide tiles, one per bitmap
+#    column, and scrolling just moves the ring buffer origin by changing which column each tile shows (width tile
+#    numbers, no pixels move).  Every column moves on the screen though, so the whole graph area is sent each sample
+#    (about 25 x sweep's SPI bytes for a 60 pixel wide graph, see tools/bench_sparkline.py).
+#
+# Memory is fixed: the bitmap, the TileGrid and bytearrays of each column's row and the line drawn in it (so a column
+# can be cleared without touching the rest of it and the graph can be redrawn after a rebuild).
+import displayio
+
+class Sparkline:
+    # ****************************
+    # *    INTERNAL VARIABLES    *
+    # ****************************
+    __canvas = None
+    __bitmap = None
+    __palette = None
+    __tileGrid = None
+    __width = 0
+    __height = 0
+    __minimum = 0
+    __maximum = 1
+    __scroll = False
+    __heights = None
+    __tops = None
+    __bottoms = None
+    __head = 0
+    __count = 0
+    __dirty = None
+    __offsetX = 0
+    __offsetY = 0
+    __pixelWrites = 0
+    __tileWrites = 0
+
+    # Value stored in __heights for a column with no sample
+    __EMPTY = 255
+
+    # function __init__
+    # @param x: x position relative to the parent group
+    # @param y: y position relative to the parent group
+    # @param width: number of samples shown (pixels)
+    # @param height: height in pixels (up to 254)
+    # @param minimum: value drawn on the bottom row
+    # @param maximum: value drawn on the top row
+    # @param colour [0xFFFFFF]: line colour, the rest is transparent
+    # @param scroll [False]: keep the newest sample on the right (True) or sweep a cursor across (False)
+    def __init__(self, x, y, width, height, minimum, maximum, colour = 0xFFFFFF, scroll = False):
+        self.__width = width
+        self.__height = height
+        self.__minimum = minimum
+        self.__maximum = maximum
+        self.__scroll = scroll
+        self.__heights = bytearray(width)
+        self.__tops = bytearray(width)
+        self.__bottoms = bytearray(width)
+
+        for i in range(width):
+            self.__heights[i] = self.__EMPTY
+
+        self.__bitmap = displayio.Bitmap(width, height, 2)
+        self.__palette = displayio.Palette(2)
+        self.__palette.make_transparent(0)
+        self.__palette[1] = colour
+
+        if scroll:
+            self.__tileGrid = displayio.TileGrid(self.__bitmap, pixel_shader = self.__palette, width = width, height = 1, tile_width = 1, tile_height = height)
+
+            for i in range(width):
+                self.__tileGrid[i] = i
+        else:
+            self.__tileGrid = displayio.TileGrid(self.__bitmap, pixel_shader = self.__palette)
+
+        self.__canvas = displayio.Group(x = x, y = y)
+        self.__canvas.append(self.__tileGrid)
+
+    # function getGroup
+    # @return displayio.Group to add to the screen
+    def getGroup(self):
+        return self.__canvas
+
+    # function setPosition
+    # Moves the graph (e.g. for a portrait layout)
+    def setPosition(self, x, y):
+        self._markAll()
+        self.__canvas.x = x
+        self.__canvas.y = y
+        self._markAll()
+
+    # function setDirtyRegion
+    # Sets the DirtyRegion to mark when the graph changes
+    # @param dirtyRegion: DirtyRegion or None to stop tracking
+    # @param offsetX [0]: absolute x position of the group this graph's group is added to
+    # @param offsetY [0]: absolute y position of the group this graph's group is added to
+    def setDirtyRegion(self, dirtyRegion, offsetX = 0, offsetY = 0):
+        self.__dirty = dirtyRegion
+        self.__offsetX = offsetX
+        self.__offsetY = offsetY
+
+    # function setColour
+    # @param colour: line colour
+    def setColour(self, colour):
+        self.__palette[1] = colour
+        self._markAll()
+
+    # function addSample
+    # Draws the next sample
+    # @param value: the reading, clipped to minimum - maximum
+    def addSample(self, value):
+        column = self._addRow(self._row(value))
+
+        if self.__scroll:
+            self._scrollTiles()
+            self._markAll()
+        else:
+            # Blank column in front of the cursor so the join between new and old samples shows
+            gap = self.__head
+            self._clearColumn(gap)
+            self._markColumns(column, gap)
+
+    # function _addRow
+    # Draws a row into the column at the ring buffer head and moves the head on
+    # @param row: bitmap row of the sample
+    # @return the column drawn
+    def _addRow(self, row):
+        column = self.__head
+        previous = self.__heights[(column - 1) % self.__width] if self.__count > 0 else self.__EMPTY
+
+        self._drawColumn(column, previous, row)
+        self.__heights[column] = row
+        self.__head = (column + 1) % self.__width
+
+        if self.__count < self.__width:
+            self.__count += 1
+
+        return column
+
+    # function _scrollTiles
+    # Moves the ring buffer origin: tile i shows bitmap column (head + i), so the newest column ends up on the right
+    def _scrollTiles(self):
+        for i in range(self.__width):
+            self.__tileGrid[i] = (self.__head + i) % self.__width
+
+        self.__tileWrites += self.__width
+
+    # function _row
+    # @return bitmap row for the value (0 is the top)
+    def _row(self, value):
+        if value >= self.__maximum:
+            return 0
+
+        if value <= self.__minimum:
+            return self.__height - 1
+
+        return int((self.__maximum - value) * (self.__height - 1) / (self.__maximum - self.__minimum) + 0.5)
+
+    # function _drawColumn
+    # Clears a column and draws a line from the previous sample's row to this one
+    def _drawColumn(self, column, previous, row):
+        self._clearColumn(column)
+
+        top = row
+        bottom = row
+
+        if previous != self.__EMPTY:
+            top = min(previous, row)
+            bottom = max(previous, row)
+
+        for y in range(top, bottom + 1):
+            self.__bitmap[column, y] = 1
+
+        self.__tops[column] = top
+        self.__bottoms[column] = bottom
+        self.__pixelWrites += bottom - top + 1
+
+    # function _clearColumn
+    # Clears the line drawn in a column (not the whole column)
+    def _clearColumn(self, column):
+        if self.__heights[column] == self.__EMPTY:
+            return
+
+        top = self.__tops[column]
+        bottom = self.__bottoms[column]
+
+        for y in range(top, bottom + 1):
+            self.__bitmap[column, y] = 0
+
+        self.__heights[column] = self.__EMPTY
+        self.__pixelWrites += bottom - top + 1
+
+    # function _markAll
+    # Marks the whole graph as changed
+    def _markAll(self):
+        if self.__dirty != None:
+            self.__dirty.mark(self.__offsetX + self.__canvas.x, self.__offsetY + self.__canvas.y, self.__width, self.__height)
+
+    # function _markColumns
+    # Marks bitmap columns first and second (next to each other, or wrapped round) as changed
+    def _markColumns(self, first, second):
+        if self.__dirty == None:
+            return
+
+        x = self.__offsetX + self.__canvas.x
+        y = self.__offsetY + self.__canvas.y
+
+        if second == first + 1:
+            self.__dirty.mark(x + first, y, 2, self.__height)
+        else:
+            self.__dirty.mark(x + first, y, 1, self.__height)
+            self.__dirty.mark(x + second, y, 1, self.__height)
+
+    # function getSamples
+    # @return copy of the rows drawn, oldest first (to give to setSamples after a rebuild).  Sweep mode's blank column
+    #         in front of the cursor isn't a sample so it's left out.
+    def getSamples(self):
+        start = (self.__head - self.__count) % self.__width
+        rows = bytearray()
+
+        for i in range(self.__count):
+            row = self.__heights[(start + i) % self.__width]
+
+            if row != self.__EMPTY:
+                rows.append(row)
+
+        return bytes(rows)
+
+    # function setSamples
+    # Redraws from rows saved with getSamples (the graph must be the same size), rows that aren't on the graph are
+    # left out
+    def setSamples(self, samples):
+        for row in samples:
+            if row < self.__height:
+                self._addRow(row)
+
+        if self.__scroll:
+            self._scrollTiles()
+        else:
+            self._clearColumn(self.__head)
+
+        self._markAll()
+
+    # function getStats
+    # @return dict of bitmap pixel writes and TileGrid tile writes so far
+    def getStats(self):
+        return {
+            "pixelWrites": self.__pixelWrites,
+            "tileWrites": self.__tileWrites,
+        }
@@ -0,0 +1,71 @@
+# SplashScreen.py
+# A thin progress bar across the middle of the screen to show while main.py is still booting
+#
+# It's only a two colour bitmap on top of the background, so it can go up as soon as the display is initialised
+# (before the fonts, images and screens are loaded) and each step of progress only redraws the bit of bar that grew.
+# Nothing is refreshed here, call tft.refresh() after setProgress() / hide().
+import displayio
+
+class SplashScreen:
+    # ****************************
+    # *    INTERNAL VARIABLES    *
+    # ****************************
+    __tft = None
+    __group = None
+    __bitmap = None
+    __x = 0
+    __y = 0
+    __width = 0
+    __height = 0
+    __filled = 0
+
+    # function __init__
+    # Adds the (empty) bar to the screen and marks it dirty
+    # @param tft: AZ_ST7735S that has been initialised
+    # @param colour [0x00FF00]: colour of the filled part of the bar
+    # @param trackColour [0x202020]: colour of the part still to fill
+    # @param height [4]: bar height in pixels
+    # @param margin [20]: gap at each end of the bar in pixels
+    def __init__(self, tft, colour = 0x00FF00, trackColour = 0x202020, height = 4, margin = 20):
+        self.__tft = tft
+        self.__width = tft.getWidth() - margin * 2
+        self.__height = height
+        self.__x = margin
+        self.__y = (tft.getHeight() - height) // 2
+
+        self.__bitmap = displayio.Bitmap(self.__width, height, 2)
+        palette = displayio.Palette(2)
+        palette[0] = trackColour
+        palette[1] = colour
+
+        self.__group = displayio.Group()
+        self.__group.append(displayio.TileGrid(self.__bitmap, pixel_shader=palette, x=self.__x, y=self.__y))
+        tft.getScreen().append(self.__group)
+        tft.markDirty(self.__x, self.__y, self.__width, height)
+
+    # function setProgress
+    # Fills the bar up to a fraction of its width, it never goes back
+    # @param fraction: 0.0 - 1.0
+    def setProgress(self, fraction):
+        filled = min(self.__width, int(self.__width * fraction))
+
+        if filled <= self.__filled:
+            return
+
+        for x in range(self.__filled, filled):
+            for y in range(self.__height):
+                self.__bitmap[x, y] = 1
+
+        self.__tft.markDirty(self.__x + self.__filled, self.__y, filled - self.__filled, self.__height)
+        self.__filled = filled
+
+    # function hide
+    # Takes the bar off the screen for good (the background shows through where it was)
+    def hide(self):
+        if self.__group == None:
+            return
+
+        self.__tft.getScreen().remove(self.__group)
+        self.__tft.markDirty(self.__x, self.__y, self.__width, self.__height)
+        self.__group = None
+        self.__bitmap = None
@@ -7,8 +7,11 @@
 #  | DECORATION        |
 #  ---------------------
 from ImageLabel import ImageLabel #Label with a picture
-from adafruit_display_text import label #Text Label
-import terminalio, displayio
+from Sparkline import Sparkline #History graph
+from Timeline import Timeline #Picture animations
+from TextCache import TextCache #Pre-rendered text
+from CachedLabel import CachedLabel #Label drawn from a TextCache
+import displayio
 
 class TemperatureScreen:
     # ****************************
@@ -19,6 +22,14 @@ class TemperatureScreen:
     __WET  = 40 #too humid/wet = this or above
     __DRY  = 15 #too dry = this or below
     
+    # Once past a threshold a reading has to come back this far inside it before the icon changes back,
+    # so a reading sitting right on a threshold doesn't flick the icon back and forth
+    __temperatureHysteresis = 1
+    __humidityHysteresis = 2
+    
+    # Frames per second the fan turns at while it's on
+    __FAN_FPS = 4
+    
     #
     # ****************************
     # *    INTERNAL VARIABLES    *
@@ -29,6 +40,9 @@ class TemperatureScreen:
     __decorationLabel = None
     __fanLabel = None
     __animationLabel = None
+    __temperatureGraph = None
+    __humidityGraph = None
+    __portrait = False
     __temperature = ""
     __humidity = ""
     __background = None
@@ -45,33 +59,96 @@ class TemperatureScreen:
         0x880088 #purple
     ]
     __colourIndex = 0
+    __temperatureLevel = None
+    __humidityLevel = None
+    __dirty = None
+    __atlas = None
+    __display = None
+    __timeline = None
+    __textCache = None
     
-    def __init__(self, title, temperatureTileBMP, humidityTileBMP, fanTileBMP, decorationBMP):
-        self.__title = label.Label(terminalio.FONT, text=title, color=0xFFFFFF, x=5, y=12, scale=2)
-        self.__temperatureLabel = ImageLabel("99 C", 1, temperatureTileBMP, 105, 5, tileWidth = 20, tileHeight = 20, numberOfTiles = 3)
-        self.__humidityLabel = ImageLabel("99 %", 1, humidityTileBMP, 105, 30, tileWidth = 20, tileHeight = 20, numberOfTiles = 3)
-        self.__fanLabel = ImageLabel("Off ", 1, fanTileBMP, 105, 55, tileWidth = 20, tileHeight = 20)
-        self.__decorationLabel = ImageLabel("", 1, decorationBMP, 0, 90, tileWidth = 49, tileHeight = 40)
+    # function __init__
+    # @param atlas [None]: Atlas holding the tile bmps (by file name), if None each bmp is loaded separately
+    # @param textCache [None]: TextCache the title and fan text are drawn from, share one so a rebuilt screen finds
+    #                          them already drawn.  If None the screen makes its own.
+    def __init__(self, title, temperatureTileBMP, humidityTileBMP, fanTileBMP, decorationBMP, atlas = None, textCache = None):
+        self.__atlas = atlas
+        self.__textCache = textCache if textCache != None else TextCache()
+        self.__textCache.prerender(["On", "Off"])
+        self.__title = CachedLabel(self.__textCache, title, 5, 12, 0xFFFFFF, 2)
+        # Three digit cells so below zero temperatures and 100% humidity fit, humidity's "%" goes straight after the number
+        # so the label still fits next to the temperature in portrait
+        self.__temperatureLabel = ImageLabel("-15 C", 1, temperatureTileBMP, 105, 5, tileWidth = 20, tileHeight = 20, numberOfTiles = 3, atlas = atlas, digits = 3, suffix = " C")
+        self.__humidityLabel = ImageLabel("100%", 1, humidityTileBMP, 105, 30, tileWidth = 20, tileHeight = 20, numberOfTiles = 3, atlas = atlas, digits = 3, suffix = "%")
+        self.__fanLabel = ImageLabel("Off ", 1, fanTileBMP, 105, 55, tileWidth = 20, tileHeight = 20, atlas = atlas, textCache = self.__textCache)
+        self.__decorationLabel = ImageLabel("", 1, decorationBMP, 0, 90, tileWidth = 49, tileHeight = 40, atlas = atlas)
         
         self.__background = self.__backgroundColours[0]
         
         self.__Group = displayio.Group()
-        self.__Group.append(self.__title)
+        self.__Group.append(self.__title.getGroup())
         self.__Group.append(self.__temperatureLabel.getGroup())
         self.__Group.append(self.__humidityLabel.getGroup())
         self.__Group.append(self.__fanLabel.getGroup())
         self.__Group.append(self.__decorationLabel.getGroup())
+        
+        # Animations pause by themselves while this screen is hidden
+        self.__timeline = Timeline()
+        self.__timeline.add("fan", self.__fanLabel, self.__FAN_FPS, group = self.__Group, playing = False)
     
-    def addAnimationLabel(self, animationBMP, tileWidth = 100, tileHeight = 44, numberOfTiles = 17, portrait = True):
+    # function addAnimationLabel
+    # @param fps [4]: frames per second to play the tiles at, 0 to leave it on the first tile
+    # @param mode [Timeline.LOOP]: Timeline.LOOP, PING_PONG or ONCE
+    def addAnimationLabel(self, animationBMP, tileWidth = 100, tileHeight = 44, numberOfTiles = 17, portrait = True, fps = 4, mode = Timeline.LOOP):
         
         if portrait:
-            self.__animationLabel = ImageLabel("", 1, animationBMP, 10, 110, numberOfTiles, tileWidth, tileHeight)
+            self.__animationLabel = ImageLabel("", 1, animationBMP, 10, 110, numberOfTiles, tileWidth, tileHeight, atlas = self.__atlas)
         else:
-            self.__animationLabel = ImageLabel("", 1, animationBMP, 50, 90, numberOfTiles, tileWidth, tileHeight)
+            self.__animationLabel = ImageLabel("", 1, animationBMP, 50, 90, numberOfTiles, tileWidth, tileHeight, atlas = self.__atlas)
+        
+        if fps > 0:
+            self.__timeline.add("animation", self.__animationLabel, fps, mode = mode, group = self.__Group)
         
         self.__Group.append(self.__animationLabel.getGroup())
+        self._trackLabels(self.__dirty != None and not self.__Group.hidden)
         
+    # function addGraphs
+    # Adds small temperature and humidity history graphs (under the title in landscape, next to the fan in portrait)
+    # Call addGraphSamples() to add to them
+    # @param scroll [False]: newest sample on the right (True) or a sweeping cursor (False), see Sparkline
+    def addGraphs(self, scroll = False):
+        self.__temperatureGraph = Sparkline(5, 58, 60, 12, 10, 35, 0xFF8800, scroll)
+        self.__humidityGraph = Sparkline(5, 74, 60, 12, 0, 100, 0x00AAFF, scroll)
+        self.__Group.append(self.__temperatureGraph.getGroup())
+        self.__Group.append(self.__humidityGraph.getGroup())
+        
+        if self.__portrait:
+            self._placeGraphs()
+        
+        self._trackLabels(self.__dirty != None and not self.__Group.hidden)
+    
+    # function addGraphSamples
+    # Adds the next point to the history graphs (does nothing if addGraphs() wasn't called)
+    # @param temperature: temperature reading
+    # @param humidity: humidity reading
+    def addGraphSamples(self, temperature, humidity):
+        if self.__temperatureGraph != None:
+            self.__temperatureGraph.addSample(temperature)
+            self.__humidityGraph.addSample(humidity)
+    
+    # function _placeGraphs
+    # Moves the graphs next to the fan for the portrait layout
+    def _placeGraphs(self):
+        self.__temperatureGraph.setPosition(62, 84)
+        self.__humidityGraph.setPosition(62, 98)
+    
     def setPortrait(self):
+        self.__portrait = True
+        
+        if self.__temperatureGraph != None:
+            self._placeGraphs()
+        
+
         self.__temperatureLabel.getGroup().x = 5
         self.__temperatureLabel.getGroup().y = 60
         self.__humidityLabel.getGroup().x = 80
@@ -80,15 +157,94 @@ class TemperatureScreen:
         self.__fanLabel.getGroup().y = 85
         self.__decorationLabel.getGroup().x = 74
         self.__decorationLabel.getGroup().y = 12
+        self._markAll()
             
     def getGroup(self):
         return self.__Group
     
+    # function setDisplay
+    # Sets the AZ_ST7735S this screen is drawn on, changes are marked on its DirtyRegion and beginUpdate() / commit()
+    # batch them into one refresh
+    # @param display: AZ_ST7735S
+    def setDisplay(self, display):
+        self.__display = display
+        self.setDirtyRegion(display.getDirtyRegion())
+    
+    # function beginUpdate
+    # Starts a batch of changes (e.g. a sensor tick setting temperature, humidity and the fan) that goes out as one
+    # refresh on commit().  Can also be used as "with temperatureScreen:"
+    def beginUpdate(self):
+        if self.__display != None:
+            self.__display.beginUpdate()
+    
+    # function commit
+    # Ends the batch and refreshes the display once
+    # @return number of refreshes saved (see AZ_ST7735S.commit)
+    def commit(self):
+        if self.__display != None:
+            return self.__display.commit()
+        
+        return 0
+    
+    def __enter__(self):
+        self.beginUpdate()
+        return self
+    
+    def __exit__(self, exceptionType, exceptionValue, traceback):
+        self.commit()
+        return False
+    
+    # function setDirtyRegion
+    # Sets the DirtyRegion (e.g. from AZ_ST7735S.getDirtyRegion()) that changes to this screen get marked on
+    # @param dirtyRegion: DirtyRegion or None to stop tracking
+    def setDirtyRegion(self, dirtyRegion):
+        self.__dirty = dirtyRegion
+        self._trackLabels(not self.__Group.hidden)
+    
+    # function _trackLabels
+    # Turns dirty tracking on the labels on or off, changes while the screen is hidden don't need sending
+    # (showAll marks the whole screen anyway)
+    # @param on: True to track changes
+    def _trackLabels(self, on):
+        for imageLabel in self._imageLabels() + self._graphs():
+            if on:
+                imageLabel.setDirtyRegion(self.__dirty, self.__Group.x, self.__Group.y)
+            else:
+                imageLabel.setDirtyRegion(None)
+    
+    # function _imageLabels
+    # @return list of the ImageLabels on this screen
+    def _imageLabels(self):
+        labels = [self.__temperatureLabel, self.__humidityLabel, self.__fanLabel, self.__decorationLabel]
+        
+        if self.__animationLabel != None:
+            labels.append(self.__animationLabel)
+            
+        return labels
+    
+    # function _graphs
+    # @return list of the Sparklines on this screen
+    def _graphs(self):
+        if self.__temperatureGraph == None:
+            return []
+        
+        return [self.__temperatureGraph, self.__humidityGraph]
+    
+    # function _markAll
+    # Marks everything on this screen as changed (used when it is shown, hidden or moved)
+    def _markAll(self):
+        if self.__dirty != None:
+            self.__dirty.markAll()
+    
     def hideAll(self):
         self.__Group.hidden = True
+        self._markAll()
+        self._trackLabels(False)
         
     def showAll(self):
         self.__Group.hidden = False
+        self._markAll()
+        self._trackLabels(self.__dirty != None)
 
     def setBackgroundImage(self, imagePath):
         self.__backgroundImage = True
@@ -120,31 +276,76 @@ class TemperatureScreen:
         return self.__background
     
     def changeTitleText(self, text):
-        self.__title.text = text
+        self._markTitle()
+        self.__title.setText(text)
+        self._markTitle()
         
     def changeTitleColour(self, colour):
-        self.__title.color = colour
+        self.__title.setColour(colour)
+        self._markTitle()
+    
+    # function _markTitle
+    # Marks the area the title currently covers as changed
+    def _markTitle(self):
+        if self.__dirty != None and not self.__Group.hidden:
+            x, y, width, height = self.__title.getArea()
+            self.__dirty.mark(self.__Group.x + x, self.__Group.y + y, width, height)
         
     def setTemperature(self, temperature):
         if self.__temperature != temperature:
             self.__temperature = temperature
-            self.__temperatureLabel.changeText(str(temperature) + " C")
+            self.__temperatureLabel.changeValue(temperature)
+            level = self._level(temperature, self.__temperatureLevel, self.__COLD, self.__HOT, self.__temperatureHysteresis)
+            
+            if level != self.__temperatureLevel:
+                self.__temperatureLevel = level
+                
+                if level < 0:
+                    self.setTemperatureCold()
+                elif level > 0:
+                    self.setTemperatureHot()
+                else:
+                    self.setTemperatureOK()
+    
+    # function _level
+    # Works out whether a reading is low, OK or high with hysteresis around the thresholds
+    # @param value: the reading
+    # @param level: the current level (-1 low, 0 OK, 1 high or None if there isn't one yet)
+    # @param low: at or below this is low
+    # @param high: at or above this is high
+    # @param hysteresis: how far back inside a threshold the reading has to come to leave low/high
+    # @return -1 low, 0 OK or 1 high
+    def _level(self, value, level, low, high, hysteresis):
+        if value <= low:
+            return -1
         
-            if temperature <= self.__COLD:
-                self.setTemperatureCold()
-            elif temperature >= self.__HOT:
-                self.setTemperatureHot()
-            else:
-                self.setTemperatureOK()
+        if value >= high:
+            return 1
+        
+        if level == -1 and value <= low + hysteresis:
+            return -1
+        
+        if level == 1 and value >= high - hysteresis:
+            return 1
+        
+        return 0
+    
+    # function setHysteresis
+    # @param temperature: degrees a temperature has to come back inside __COLD/__HOT before the icon changes back
+    # @param humidity: percent a humidity has to come back inside __DRY/__WET before the icon changes back
+    def setHysteresis(self, temperature, humidity):
+        self.__temperatureHysteresis = temperature
+        self.__humidityHysteresis = humidity
     
     def setFanOn(self):
         self.__fanOn = True
         self.__fanLabel.changeText("On")
-        self.animate()
+        self.__timeline.play("fan")
         
     def setFanOff(self):
         self.__fanOn = False
         self.__fanLabel.changeText("Off")
+        self.__timeline.stop("fan")
         
     def toggleFan(self):
         if self.__fanOn == True:
@@ -152,17 +353,50 @@ class TemperatureScreen:
         else:
             self.setFanOn()
             
+    # function getState
+    # Everything a rebuilt screen needs to look the same (used by ScreenManager when it tears this screen down)
+    # @return tuple to pass to setState
+    def getState(self):
+        graphs = None
+        
+        if self.__temperatureGraph != None:
+            graphs = (self.__temperatureGraph.getSamples(), self.__humidityGraph.getSamples())
+        
+        return (self.__temperature, self.__humidity, self.__fanOn, self.__colourIndex, self.__background, self.__backgroundImage, graphs)
+    
+    # function setState
+    # @param state: tuple from getState
+    def setState(self, state):
+        temperature, humidity, fanOn, self.__colourIndex, self.__background, self.__backgroundImage, graphs = state
+        
+        if graphs != None and self.__temperatureGraph != None:
+            self.__temperatureGraph.setSamples(graphs[0])
+            self.__humidityGraph.setSamples(graphs[1])
+        
+        if temperature != "":
+            self.setTemperature(temperature)
+            
+        if humidity != "":
+            self.setHumidity(humidity)
+            
+        if fanOn:
+            self.setFanOn()
+            
     def setHumidity(self, humidity):
         if self.__humidity != humidity:
             self.__humidity = humidity
-            self.__humidityLabel.changeText(str(humidity) + " %")
-        
-            if humidity >= self.__WET:
-                self.setHumidityHigh()
-            elif humidity <= self.__DRY:
-                self.setHumidityLow()
-            else:
-                self.setHumidityOK()
+            self.__humidityLabel.changeValue(humidity)
+            level = self._level(humidity, self.__humidityLevel, self.__DRY, self.__WET, self.__humidityHysteresis)
+            
+            if level != self.__humidityLevel:
+                self.__humidityLevel = level
+                
+                if level > 0:
+                    self.setHumidityHigh()
+                elif level < 0:
+                    self.setHumidityLow()
+                else:
+                    self.setHumidityOK()
         
     def setTemperatureHot(self):
         self.__temperatureLabel.changePicture(1)
@@ -182,12 +416,16 @@ class TemperatureScreen:
     def setHumidityOK(self):
         self.__humidityLabel.changePicture(2)
     
+    # function animate
+    # Moves each animation (the fan while it's on and the animation label) on to the frame it should be showing now,
+    # does nothing while the screen is hidden
+    # @return number of pictures changed
     def animate(self):
-        #Change fan picture if we're turned to on
-        if self.__fanOn:
-            self.__fanLabel.togglePicture()
-            
-        if self.__animationLabel != None:
-            self.__animationLabel.togglePicture()
+        return self.__timeline.update()
+    
+    # function getTimeline
+    # @return Timeline playing this screen's animations (e.g. for formatStats())
+    def getTimeline(self):
+        return self.__timeline
             
 #test = TemperatureScreen("Example &\nTitle", "temperature_1-2.bmp", "humidity_1-2.bmp", "fan_1-2.bmp", "decoration.bmp")
\ No newline at end of file
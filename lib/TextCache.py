@@ -0,0 +1,216 @@
+# TextCache.py
+# Pre-rendered bitmaps for text that doesn't change often (titles, "On" / "Off", fixed captions), shared by every label
+# showing the same text
+#
+# adafruit_display_text's Label draws each character as its own TileGrid into the font bitmap, and a scaled label makes
+# displayio scale every glyph on every refresh that covers it.  TextCache draws the whole string once, already scaled,
+# into one 1 bit bitmap with its own palette (index 0 transparent) so it goes out as a single unscaled TileGrid.
+#
+# Entries are keyed by (text, scale, colour, font) and kept under a byte budget: when a new one doesn't fit the least
+# recently used ones are forgotten.  A TileGrid still showing a forgotten entry keeps it alive, it just isn't shared
+# any more.  Text that changes all the time (readings) should use NumericLabel instead, every new string is a new
+# bitmap here.
+#
+# Text is laid out like a Label: lines are 1.25 x the font height apart, y is the middle of the first line and
+# characters the font doesn't have (get_glyph returns None) are left out.  Fonts are used like terminalio.FONT (each
+# glyph a tile of the font's bitmap).
+import displayio, terminalio
+
+# Line spacing of adafruit_display_text's Label
+LINE_SPACING = 1.25
+
+# function measureText
+# Exact size of text from the font's glyph advances
+# @param text: may contain \n
+# @param font [None]: defaults to terminalio.FONT
+# @return (width, height) in pixels at scale 1
+def measureText(text, font = None):
+    if font == None:
+        font = terminalio.FONT
+
+    glyphHeight = font.get_bounding_box()[1]
+    lines = text.split("\n")
+    width = 0
+
+    for line in lines:
+        lineWidth = 0
+
+        for character in line:
+            glyph = font.get_glyph(ord(character))
+
+            if glyph != None:
+                lineWidth += glyph.shift_x
+
+        if lineWidth > width:
+            width = lineWidth
+
+    return (width, int(glyphHeight * LINE_SPACING) * (len(lines) - 1) + glyphHeight)
+
+class TextEntry:
+    # function __init__
+    # @param bitmap: displayio.Bitmap with the text drawn in 1s
+    # @param palette: displayio.Palette, 0 transparent and 1 the colour
+    # @param width: pixels (scaled)
+    # @param height: pixels (scaled)
+    # @param top: y of the bitmap relative to the label's y (the middle of the first line)
+    def __init__(self, bitmap, palette, width, height, top):
+        self.bitmap = bitmap
+        self.palette = palette
+        self.width = width
+        self.height = height
+        self.top = top
+        self.bytes = ((width + 31) // 32) * 4 * height
+        self.used = 0
+
+class TextCache:
+    # ****************************
+    # *    INTERNAL VARIABLES    *
+    # ****************************
+    __budget = 0
+    __entries = None
+    __bytes = 0
+    __clock = 0
+    __hits = 0
+    __misses = 0
+    __evictions = 0
+
+    # function __init__
+    # @param budget [4096]: bytes of bitmap kept, least recently used entries are forgotten past this
+    def __init__(self, budget = 4096):
+        self.__budget = budget
+        self.__entries = {}
+
+    # function get
+    # @param text: text to draw, may contain \n
+    # @param scale [1]: text size multiplier
+    # @param colour [0xFFFFFF]: text colour
+    # @param font [None]: defaults to terminalio.FONT
+    # @return TextEntry, drawn now if it isn't cached
+    def get(self, text, scale = 1, colour = 0xFFFFFF, font = None):
+        if font == None:
+            font = terminalio.FONT
+
+        key = (text, scale, colour, font)
+        entry = self.__entries.get(key)
+        self.__clock += 1
+
+        if entry != None:
+            self.__hits += 1
+            entry.used = self.__clock
+            return entry
+
+        self.__misses += 1
+        entry = self._render(text, scale, colour, font)
+        entry.used = self.__clock
+
+        # Too big to keep at all, it's still drawn for the caller
+        if entry.bytes > self.__budget:
+            return entry
+
+        while self.__bytes + entry.bytes > self.__budget:
+            self._evict()
+
+        self.__entries[key] = entry
+        self.__bytes += entry.bytes
+
+        return entry
+
+    # function prerender
+    # Draws texts that will be needed later (e.g. each state a label can show) so showing them doesn't draw anything
+    # @param texts: list of strings
+    def prerender(self, texts, scale = 1, colour = 0xFFFFFF, font = None):
+        for text in texts:
+            self.get(text, scale, colour, font)
+
+    # function makeTileGrid
+    # @param x: x of the left of the text relative to the parent group
+    # @param y: y of the middle of the first line relative to the parent group (like a Label)
+    # @return displayio.TileGrid showing the text
+    def makeTileGrid(self, text, scale = 1, colour = 0xFFFFFF, font = None, x = 0, y = 0):
+        entry = self.get(text, scale, colour, font)
+        return displayio.TileGrid(entry.bitmap, pixel_shader = entry.palette, x = x, y = y + entry.top)
+
+    # function _render
+    # Draws the text a glyph pixel at a time, each pixel as a scale x scale block
+    # @return TextEntry
+    def _render(self, text, scale, colour, font):
+        glyphWidth, glyphHeight = font.get_bounding_box()
+        lineHeight = int(glyphHeight * LINE_SPACING)
+        width, height = measureText(text, font)
+        bitmap = displayio.Bitmap(max(1, width * scale), height * scale, 2)
+        palette = displayio.Palette(2)
+        palette.make_transparent(0)
+        palette[1] = colour
+        top = 0
+
+        for line in text.split("\n"):
+            left = 0
+
+            for character in line:
+                glyph = font.get_glyph(ord(character))
+
+                if glyph == None:
+                    continue
+
+                source = glyph.bitmap
+                tilesPerRow = max(1, source.width // glyph.width)
+                sourceX = (glyph.tile_index % tilesPerRow) * glyph.width
+                sourceY = (glyph.tile_index // tilesPerRow) * glyph.height
+
+                for row in range(glyph.height):
+                    for column in range(glyph.width):
+                        if source[sourceX + column, sourceY + row] == 0:
+                            continue
+
+                        x = (left + column) * scale
+                        y = (top + row) * scale
+
+                        for dy in range(scale):
+                            for dx in range(scale):
+                                bitmap[x + dx, y + dy] = 1
+
+                left += glyph.shift_x
+
+            top += lineHeight
+
+        return TextEntry(bitmap, palette, width * scale, height * scale, -(glyphHeight // 2) * scale)
+
+    # function _evict
+    # Forgets the least recently used entry
+    def _evict(self):
+        oldestKey = None
+        oldest = None
+
+        for key, entry in self.__entries.items():
+            if oldest == None or entry.used < oldest.used:
+                oldestKey = key
+                oldest = entry
+
+        del self.__entries[oldestKey]
+        self.__bytes -= oldest.bytes
+        self.__evictions += 1
+
+    # function clear
+    # Forgets every entry
+    def clear(self):
+        self.__entries = {}
+        self.__bytes = 0
+
+    # function getStats
+    # @return dict of entries, bytes kept, budget, hits, misses and evictions
+    def getStats(self):
+        return {
+            "entries": len(self.__entries),
+            "bytes": self.__bytes,
+            "budget": self.__budget,
+            "hits": self.__hits,
+            "misses": self.__misses,
+            "evictions": self.__evictions,
+        }
+
+    # function formatStats
+    # @return one line for printing to the serial console
+    def formatStats(self):
+        s = self.getStats()
+        return "text cache: {0} entries {1}/{2} bytes hits {3} misses {4} evictions {5}".format(
+            s["entries"], s["bytes"], s["budget"], s["hits"], s["misses"], s["evictions"])
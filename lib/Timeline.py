@@ -0,0 +1,249 @@
+# Timeline.py
+# Plays tile animations (e.g. ImageLabel pictures) each at its own frame rate, off the monotonic clock
+#
+# Call update() as often as you like (e.g. from a Scheduler task), each animation works out which frame it should be on
+# from how long it has been playing, so a late update skips straight to the right frame (counted as dropped) instead
+# of the animation drifting behind.  Nothing is changed (or marked dirty) unless an animation's frame actually moves on.
+#
+# An animation pauses by itself while its label's group, or the group it was added with (e.g. the whole screen), is
+# hidden and carries on from the same frame when it's shown again.  A frame rate of 0 holds an animation on the frame
+# it's on the same way, until setFps() gives it a rate again.
+#
+# Loop modes:
+#  LOOP:      0, 1, 2, 0, 1, 2 ...
+#  PING_PONG: 0, 1, 2, 1, 0, 1 ...
+#  ONCE:      0, 1, 2 and stops on the last frame
+#
+# Per animation it keeps how many frames were shown, how many were dropped (skipped because update() came too late)
+# and how long changing the picture took.
+import time
+from Clock import getNow
+
+class Animation:
+    # function __init__
+    # @param name: name used in the stats
+    # @param target: object with changePicture(tileNo) and getGroup() (e.g. ImageLabel)
+    # @param frames: list of tile numbers to play in order
+    # @param fps: frames per second
+    # @param mode: Timeline.LOOP, PING_PONG or ONCE
+    # @param group: displayio.Group that pauses the animation while hidden, or None
+    def __init__(self, name, target, frames, fps, mode, group):
+        self.name = name
+        self.target = target
+        self.frames = frames
+        self.fps = fps
+        self.mode = mode
+        self.group = group
+        self.playing = False
+        self.paused = False
+        self.pausedAt = 0
+        self.start = 0
+        self.step = 0
+        self.frame = None
+        self.shown = 0
+        self.dropped = 0
+        self.busyTotal = 0
+        self.busyMax = 0
+
+    # function isHidden
+    # @return True if the target or the group it was added with is hidden
+    def isHidden(self):
+        if self.group != None and self.group.hidden:
+            return True
+
+        return self.target.getGroup().hidden
+
+    # function frameAt
+    # @param step: number of frame periods since the animation started
+    # @return (index into frames, True if a ONCE animation has got to its end)
+    def frameAt(self, step):
+        count = len(self.frames)
+
+        if self.mode == Timeline.ONCE:
+            if step >= count - 1:
+                return count - 1, True
+
+            return step, False
+
+        if self.mode == Timeline.PING_PONG and count > 1:
+            cycle = count * 2 - 2
+            step = step % cycle
+            return (step if step < count else cycle - step), False
+
+        return step % count, False
+
+    # function getStats
+    # @return dict of this animation's counters
+    def getStats(self):
+        return {
+            "playing": self.playing,
+            "paused": self.paused,
+            "fps": self.fps,
+            "shown": self.shown,
+            "dropped": self.dropped,
+            "busyMean": self.busyTotal / max(1, self.shown),
+            "busyMax": self.busyMax,
+        }
+
+class Timeline:
+    # ****************************
+    # *    SETTINGS VARIABLES    *
+    # ****************************
+    LOOP = 0
+    PING_PONG = 1
+    ONCE = 2
+
+    # ****************************
+    # *    INTERNAL VARIABLES    *
+    # ****************************
+    __animations = None
+
+    def __init__(self):
+        self.__animations = {}
+
+    # function add
+    # Adds an animation (replacing any with the same name)
+    # @param name: name to play / stop it by
+    # @param target: object with changePicture(tileNo) and getGroup() (e.g. ImageLabel)
+    # @param fps: frames per second, 0 to hold it on its first frame
+    # @param frames [None]: list of tile numbers to play, None for 0 to target.getNumberOfTiles() - 1
+    # @param mode [LOOP]: LOOP, PING_PONG or ONCE
+    # @param group [None]: displayio.Group (e.g. the screen's) that pauses the animation while it's hidden
+    # @param playing [True]: start playing straight away
+    # @return Animation
+    def add(self, name, target, fps, frames = None, mode = LOOP, group = None, playing = True):
+        if frames == None:
+            frames = list(range(target.getNumberOfTiles()))
+
+        animation = Animation(name, target, frames, fps, mode, group)
+        self.__animations[name] = animation
+
+        if playing:
+            self.play(name)
+
+        return animation
+
+    # function remove
+    # @param name: animation name
+    def remove(self, name):
+        if name in self.__animations:
+            del self.__animations[name]
+
+    # function get
+    # @param name: animation name
+    # @return Animation or None
+    def get(self, name):
+        return self.__animations.get(name)
+
+    # function play
+    # Starts an animation from the frame it's on (from the start if a ONCE animation had finished)
+    # @param name: animation name
+    def play(self, name):
+        animation = self.__animations[name]
+
+        if animation.playing:
+            return
+
+        if animation.mode == self.ONCE and animation.frameAt(animation.step)[1]:
+            animation.step = 0
+
+        animation.playing = True
+        animation.paused = False
+
+        if animation.fps > 0:
+            animation.start = getNow() - animation.step * 1000 // animation.fps
+
+    # function stop
+    # Stops an animation on the frame it's showing
+    # @param name: animation name
+    def stop(self, name):
+        self.__animations[name].playing = False
+
+    # function setFps
+    # Changes an animation's frame rate without it jumping to another frame
+    # @param name: animation name
+    # @param fps: frames per second, 0 (or less) holds it on the frame it's on
+    def setFps(self, name, fps):
+        animation = self.__animations[name]
+        animation.fps = fps
+
+        if fps > 0:
+            animation.start = getNow() - animation.step * 1000 // fps
+
+    # function update
+    # Moves every playing, visible animation on to the frame it should be showing now
+    # @return number of pictures changed
+    def update(self):
+        now = getNow()
+        changed = 0
+
+        for animation in self.__animations.values():
+            if not animation.playing:
+                continue
+
+            if animation.isHidden():
+                if not animation.paused:
+                    animation.paused = True
+                    animation.pausedAt = now
+
+                continue
+
+            # Carry on where it was, the time spent hidden doesn't count
+            if animation.paused:
+                animation.paused = False
+                animation.start += now - animation.pausedAt
+
+            # Held on the frame it's on
+            if animation.fps <= 0:
+                step = animation.step
+            else:
+                step = int((now - animation.start) * animation.fps // 1000)
+
+            if step <= animation.step and animation.frame != None:
+                continue
+
+            if animation.frame != None and step > animation.step + 1:
+                animation.dropped += step - animation.step - 1
+
+            animation.step = step
+            index, finished = animation.frameAt(step)
+
+            if finished:
+                animation.playing = False
+
+            if animation.frames[index] != animation.frame:
+                started = time.monotonic_ns()
+                animation.target.changePicture(animation.frames[index])
+                busy = (time.monotonic_ns() - started) / 1000000
+                animation.frame = animation.frames[index]
+                animation.shown += 1
+                animation.busyTotal += busy
+                changed += 1
+
+                if busy > animation.busyMax:
+                    animation.busyMax = busy
+
+        return changed
+
+    # function getStats
+    # @return dict of animation name -> stats dict (see Animation.getStats)
+    def getStats(self):
+        stats = {}
+
+        for name in self.__animations:
+            stats[name] = self.__animations[name].getStats()
+
+        return stats
+
+    # function formatStats
+    # @return one line per animation for printing to the serial console
+    def formatStats(self):
+        lines = []
+
+        for name in self.__animations:
+            s = self.__animations[name].getStats()
+            lines.append("{0}: {1} {2}fps shown {3} dropped {4} busy {5:.2f}/{6:.2f}ms".format(
+                name, "paused" if s["paused"] else ("playing" if s["playing"] else "stopped"), s["fps"], s["shown"],
+                s["dropped"], s["busyMean"], s["busyMax"]))
+
+        return "\n".join(lines)
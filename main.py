@@ -1,21 +1,124 @@
 # main.py
 # Imports
+# Boot is timed stage by stage (printed once the temperature screen is up), so the profiler comes first
+from BootProfiler import BootProfiler
+boot = BootProfiler()
+
+# Only what's needed to get the splash screen onto the panel is imported here, the rest waits until after the first frame
 from AZ_ST7735S import AZ_ST7735S
-from ImageLabel import ImageLabel
-from TemperatureScreen import TemperatureScreen
-from SlideShowScreen import SlideShowScreen
-from adafruit_display_text import label #Text Label
-import displayio, terminalio
-import os, microcontroller, gc, random
-import time
+from SplashScreen import SplashScreen
+from ScrollTransition import ScrollTransition
+from BaudTuner import BaudTuner, loadBaudrate
+from Backlight import Backlight
+import board, gc
+boot.mark("imports")
 
 # ****************************
 # *    SETTING VARIABLES     *
 # ****************************
 TEN_SECONDS   = 10000 #10 seconds in millis for use with time compare
-ANIMATE_DELAY = 250   #time between animate calls for screen items in millis 250 = 4 frames/updates per second
+ANIMATE_DELAY = 250   #time between animation timeline checks in millis, each animation changes picture at its own frame rate (faster ones skip frames)
+ANIMATION_FPS = 4     #frames per second of the anim.bmp animation
 SENSOR_DELAY  = 2000  #2 seconds in millis for time between sensor updates
+SENSOR_BUDGET = 5     #millis the sensor task can spend each time it runs (a read is started then collected later, nothing waits for the sensor)
 PORTRAIT      = False  #Set to False for landscape
+SLIDE_CACHE   = 0     #bytes of RAM to keep decoded slideshow images in, 0 = always read from flash (a 160x128 16 colour bmp is ~10KB)
+SENSOR_HISTORY = 8     #samples each sensor reading is smoothed over
+SENSOR_DEADBAND = 0.6  #the smoothed reading has to move more than this before the screen is updated
+GRAPH_EVERY   = 15    #sensor reads per history graph point, 15 x 2 seconds = 30 seconds a point, 30 minutes across the graph
+MEMORY_WATERMARK = 20000 #bytes, screens that aren't showing are torn down (and rebuilt when next shown) below this much free memory
+SLIDE_TRANSITION = ScrollTransition.SLIDE #how slideshow images come in: ScrollTransition.SLIDE, WIPE, REVEAL or None for a hard cut
+SPI_BAUDRATE  = None  #screen SPI clock in Hz, None = the rate saved by TUNE_SPI (24MHz if it has never been run)
+TUNE_SPI      = False #True to try faster and faster SPI clocks at boot (answer y/n over the serial console for each test pattern), the fastest good one is saved for later boots
+BACKLIGHT_PIN = None  #pin driving the backlight through a transistor (see lib/Backlight.py) e.g. board.GP22, None while LEDA is wired to 3V3
+BACKLIGHT_LEVEL = 0.8 #brightness 0 - 1 (as it looks, 0.5 looks half as bright)
+BACKLIGHT_DIM_AFTER = 300000 #millis without a reading changing before the backlight dims, None to never dim
+BACKLIGHT_DIM_LEVEL = 0.3 #brightness when dimmed
+BACKLIGHT_SCHEDULE = [] #(hour, minute, scale) brightness by time of day, 0 blanks the screen and stops the slideshow e.g. [(7, 0, 1), (21, 0, 0.4), (23, 0, 0)] (needs the clock set)
+METRICS_PERIOD = 5000 #millis between metrics lines on the serial console (loop / refresh / sensor / gc times, heap), tools/plot_metrics.py plots them, None for none
+GC_THRESHOLD  = 32768 #bytes allocated before Circuit Python collects by itself (gc.threshold), collections are made at quiet moments before then, None for the firmware default (collect when the heap is full)
+GC_LOG        = False #True to print each garbage collection's time and bytes freed
+TEXT_CACHE_BYTES = 4096 #bytes of pre-rendered text (title, fan state) kept, least recently used text is dropped past this
+PROFILE_ALLOCATIONS = False #True to count the bytes TemperatureScreen / ImageLabel / AZ_ST7735S calls allocate, printed every rotation (slows everything down)
+
+# ****************************
+# *      SCREEN SETUP        *
+# ****************************
+# Setup the screen rotated to be landscape
+print("Initialising Screen")
+tft = AZ_ST7735S()
+
+if SPI_BAUDRATE == None:
+    SPI_BAUDRATE = loadBaudrate()
+
+# Auto refresh is off so each pass of the loop goes out as one update when we call tft.refresh()
+if PORTRAIT:
+    tft.initialiseScreen(0, autoRefresh = False, profiler = boot, baudrate = SPI_BAUDRATE) #0 for portrait, in theory 180 for upside down, 270 for landscape in other direction
+else:
+    tft.initialiseScreen(90, autoRefresh = False, profiler = boot, baudrate = SPI_BAUDRATE) #0 for portrait, in theory 180 for upside down, 270 for landscape in other direction
+
+if TUNE_SPI:
+    tuner = BaudTuner(tft)
+    tuner.sweep()
+    print(tuner.formatReport())
+
+    if tuner.getBest() != None and not tuner.save():
+        print("Couldn't save the SPI clock, set SPI_BAUDRATE in main.py instead")
+
+    tuner = None
+
+# The backlight comes on before the splash screen goes up
+backlight = None
+
+if BACKLIGHT_PIN != None:
+    backlight = Backlight(BACKLIGHT_PIN, tft, level = BACKLIGHT_LEVEL)
+    backlight.setIdle(BACKLIGHT_DIM_AFTER, BACKLIGHT_DIM_LEVEL)
+    backlight.setSchedule(BACKLIGHT_SCHEDULE)
+
+# Something on the panel straight away, the progress bar fills as the rest of boot happens
+splash = SplashScreen(tft)
+tft.refresh()
+boot.markFirstFrame()
+
+# Marks the end of a boot stage and moves the splash screen's progress bar on
+def bootStage(name, progress):
+    boot.mark(name)
+    splash.setProgress(progress)
+    tft.refresh()
+
+# Deferred imports
+from TemperatureScreen import TemperatureScreen
+from SlideShowScreen import SlideShowScreen
+from SlideShowLoader import SlideShowLoader
+from Scheduler import Scheduler
+from ScreenManager import ScreenManager
+from SensorChannel import SensorChannel
+from SensorReader import SensorReader
+from SimulatedSensorDriver import SimulatedSensorDriver
+from Atlas import Atlas
+from Metrics import Metrics
+from GcPolicy import GcPolicy
+from AllocationProfiler import AllocationProfiler
+from ImageLabel import ImageLabel
+from TextCache import TextCache
+import os, microcontroller, random
+bootStage("deferred imports", 0.4)
+
+# Loop, refresh, sensor and gc times are recorded from here on (streamed if METRICS_PERIOD is set)
+metrics = Metrics()
+tft.setMetrics(metrics)
+
+# Garbage is collected when there's time to spare rather than in the middle of an animation frame
+gcPolicy = GcPolicy(GC_THRESHOLD, metrics = metrics, verbose = GC_LOG)
+allocations = None
+
+if PROFILE_ALLOCATIONS:
+    allocations = AllocationProfiler()
+
+    for profiled in (TemperatureScreen, ImageLabel, AZ_ST7735S):
+        allocations.wrap(profiled)
+
+print(f"Screen Resolution: {tft.getWidth()} x {tft.getHeight()} @ {tft.getOrientation()} degrees")
 
 # ****************************
 # *       STARTUP CODE       *
@@ -29,50 +132,49 @@ print(f"Cpu Frequency: {microcontroller.cpu.frequency/1000000} MHz")
 # *       HELPER CODE        *
 # ****************************
 # Code to check %age of free memory on the pico can be removed
+# It doesn't collect first (that's a pause of its own), so call it after metrics.collect() for a true figure
 def free(full=False):
-  gc.collect()
   F = gc.mem_free()
   A = gc.mem_alloc()
   T = F+A
   P = '{0:.2f}%'.format(F/T*100)
   if not full: return P
   else : return ('Total:{0} Free:{1} ({2})'.format(T,F,P))
-  
-def convertToMillis(nanoSeconds):
-    return nanoSeconds // 1000000 #divide discarding remainder
-
-# Get system uptime now in millis (we use nanoseconds because the normal time
-# in millis is only accurate ish for the first couple of hours the system is
-# turned on)
-# @see https://learn.adafruit.com/clue-sensor-plotter-circuitpython/time-in-circuitpython#time-dot-monotonic-3060336.
-def getNow():
-    return convertToMillis(time.monotonic_ns())
 
 # ****************************
 # *   SENSOR READING CODE    *
 # ****************************
 
-# I don't have the sensors to hand so this is dummy random number code
-# Replace this
-def readTemperatureSensor():
-    return random.randint(15, 32)
+# I don't have the sensors to hand so this is dummy random number code that takes as long as a real sensor to answer
+# Replace this with a real driver e.g. SHT31Driver(busio.I2C(scl = board.GP5, sda = board.GP4)) or DHT22Driver(board.GP15)
+def readDummySensors():
+    return (random.randint(15, 32), random.randint(10, 50))
 
-def readHumiditySensor():
-    return random.randint(10, 50)
+climateSensor = SimulatedSensorDriver(readDummySensors, readTime = 50)
 
-# ****************************
-# *      SCREEN SETUP        *
-# ****************************
-# Setup the screen rotated to be landscape
-print("Initialising Screen")
-tft = AZ_ST7735S()
+# Each reading is smoothed (median throws away odd spikes) and only goes to the screen when it really changes
+temperatureChannel = SensorChannel(SENSOR_HISTORY, SensorChannel.MEDIAN, SENSOR_DEADBAND)
+humidityChannel = SensorChannel(SENSOR_HISTORY, SensorChannel.MEDIAN, SENSOR_DEADBAND)
 
-if PORTRAIT:
-    tft.initialiseScreen(0) #0 for portrait, in theory 180 for upside down, 270 for landscape in other direction
-else:
-    tft.initialiseScreen(90) #0 for portrait, in theory 180 for upside down, 270 for landscape in other direction
-    
-print(f"Screen Resolution: {tft.getWidth()} x {tft.getHeight()} @ {tft.getOrientation()} degrees")
+# Sensors are read in the background from the main tasks, the first reading is waited for so there's something to show
+sensors = SensorReader(budget = SENSOR_BUDGET)
+sensors.addSensor("climate", climateSensor, SENSOR_DELAY)
+sensors.setMetrics(metrics)
+reading = sensors.readNow("climate")
+
+if reading != None:
+    temperatureChannel.add(reading[0])
+    humidityChannel.add(reading[1])
+
+bootStage("sensors", 0.5)
+
+# Puts the latest readings on the temperature screen (there are none if every read has failed so far)
+def showReadings(temperatureScreen):
+    if temperatureChannel.getValue() != None:
+        temperatureScreen.setTemperature(temperatureChannel.getValue())
+
+    if humidityChannel.getValue() != None:
+        temperatureScreen.setHumidity(humidityChannel.getValue())
 
 
 # ****************************
@@ -80,66 +182,188 @@ print(f"Screen Resolution: {tft.getWidth()} x {tft.getHeight()} @ {tft.getOrient
 # ****************************
 
 #Setup Temperature Screen
-temperatureScreen = TemperatureScreen("Demo &\nText", "temperature_1-2.bmp", "humidity_1-2.bmp", "fan_1-2.bmp", "decoration.bmp")
+#If there's a packed atlas (tools/pack_atlas.py) the label pictures share a bitmap per tile size, otherwise each bmp is loaded
+atlas = None
 
-if PORTRAIT:
-    temperatureScreen.addAnimationLabel("anim.bmp")
-    temperatureScreen.setPortrait()
-else:
-    temperatureScreen.addAnimationLabel("anim.bmp", portrait = False)
+if Atlas.exists("/images/atlas.txt"):
+    atlas = Atlas("/images/atlas.txt")
+    bootStage("atlas", 0.6)
+
+#Screens are only built when they are first shown, the manager tears them down again if memory gets low
+screens = ScreenManager(tft.getScreen(), watermark = MEMORY_WATERMARK)
+
+# Shared so a rebuilt screen's title and fan text are already drawn
+textCache = TextCache(TEXT_CACHE_BYTES)
+
+# The first build is part of boot so each of its asset loads is timed
+def buildTemperatureScreen():
+    temperatureScreen = TemperatureScreen("Demo &\nText", "temperature_1-2.bmp", "humidity_1-2.bmp", "fan_1-2.bmp", "decoration.bmp", atlas = atlas, textCache = textCache)
+    
+    if not boot.isInteractive():
+        boot.mark("temperature screen images")
+    
+    if PORTRAIT:
+        temperatureScreen.addAnimationLabel("anim.bmp", fps = ANIMATION_FPS)
+        temperatureScreen.setPortrait()
+    else:
+        temperatureScreen.addAnimationLabel("anim.bmp", portrait = False, fps = ANIMATION_FPS)
+        
+    if not boot.isInteractive():
+        boot.mark("animation image")
+        
+    temperatureScreen.addGraphs()
+    temperatureScreen.setDisplay(tft)
     
-temperatureScreen.hideAll()
-tft.getScreen().append(temperatureScreen.getGroup())
+    #Set initial values for Temperature Screen
+    showReadings(temperatureScreen)
+    return temperatureScreen
 
-#Set initial values for Temperature Screen
-temperatureScreen.setTemperature(readTemperatureSensor())
-temperatureScreen.setHumidity(readHumiditySensor())
+screens.addScreen("temperature", buildTemperatureScreen)
 
 #Setup SlideShow Screen
 slideshowScreen = None
 
+# Only full screen images are used, anything else is skipped when the slideshow directory is indexed
 if PORTRAIT:
-    slideshowScreen = SlideShowScreen(slideshowDir = "slideshow_portrait")
+    slideshowScreen = SlideShowScreen(slideshowDir = "slideshow_portrait", width = tft.getWidth(), height = tft.getHeight())
 else:
-    slideshowScreen = SlideShowScreen()
+    slideshowScreen = SlideShowScreen(width = tft.getWidth(), height = tft.getHeight())
+
+for rejected in slideshowScreen.getIndex().getRejected():
+    print("Skipping slideshow image: " + rejected)
+
+bootStage("slideshow index", 0.8)
+
+# Opens the next slideshow image while the temperature screen is up so the switch is just a layer swap
+slideshowLoader = SlideShowLoader(slideshowScreen, cacheBudget = SLIDE_CACHE)
 
 # ****************************
-# *     MAIN SCREEN LOOP     *
+# *        MAIN TASKS        *
 # ****************************
-while True:
-    print("Free Memory: " + free(False))
+# Instead of a loop that polls the time every 1/10 second each job runs on its own schedule and the Pico sleeps
+# until the next one is due.  Sensors keep being read while the slideshow is showing.
+showingSlideshow = True #Starts with nothing shown, the first rotate shows the temperature screen
+
+# Animate the temperature screen, its animations pause themselves while it's hidden so this costs next to nothing then
+def animate():
+    temperatureScreen = screens.get("temperature")
     
-    # Each "screen" will stay on for 10 seconds but we need to move away from time.sleep
-    # in order to animate/do other things while waiting
-    startTime = getNow()
-    lastAnimate = startTime
-    lastSensorUpdate = startTime
+    if backlight != None and backlight.isAsleep():
+        return
     
-    tft.setBackgroundColour(temperatureScreen.getBackgroundColour())
-    temperatureScreen.showAll()
+    if temperatureScreen != None and temperatureScreen.animate() > 0:
+        tft.refresh()
+        
+        #The next frame is a whole tick away, a good time to collect if it's due
+        gcPolicy.idle("animate")
+
+# A sensor reading has come in: update the temperature screen if it's built and a reading changed,
+# hidden changes are shown next time it comes up
+sensorReads = 0
+
+def onReading(name, values):
+    global sensorReads
     
-    #Keep showing for 10 seconds
+    temperatureChanged = temperatureChannel.add(values[0])
+    humidityChanged = humidityChannel.add(values[1])
+    temperatureScreen = screens.get("temperature")
+    sensorReads += 1
+    graphPoint = sensorReads % GRAPH_EVERY == 0
     
-    while getNow() - startTime < TEN_SECONDS:
-        
-        #Check if we need to animate
-        if getNow() - lastAnimate >= ANIMATE_DELAY:
-            temperatureScreen.animate()
-            lastAnimate = getNow()
-        
-        #Check/Update sensors
-        if getNow() - lastSensorUpdate >= SENSOR_DELAY:
-            temperatureScreen.setTemperature(readTemperatureSensor())
-            temperatureScreen.setHumidity(readHumiditySensor())
-            lastSensorUpdate = getNow()
+    #Readings and graph points go out in one refresh when the batch ends
+    if backlight != None and (temperatureChanged or humidityChanged):
+        backlight.activity()
+    
+    if temperatureScreen != None and (temperatureChanged or humidityChanged or graphPoint):
+        with temperatureScreen:
+            showReadings(temperatureScreen)
             
-        time.sleep(0.1) #sleep for 1/10 second so we don't peg the CPU while waiting on this screen
+            if graphPoint:
+                temperatureScreen.addGraphSamples(temperatureChannel.getFiltered(), humidityChannel.getFiltered())
+
+sensors.setOnReading("climate", onReading)
+
+# Swap between the temperature screen and the slideshow
+def rotateScreen():
+    global showingSlideshow, splash
     
-    #Finished so hide this screen
-    temperatureScreen.hideAll()
-    temperatureScreen.cycleBackgroundColour()
-    temperatureScreen.toggleFan() #just for fan example, swap this based on sensor information
+    #Nothing to see while the backlight has the panel asleep, it carries on where it was when it wakes
+    if backlight != None and backlight.isAsleep():
+        return
     
-    #Next Screen
-    tft.setBackgroundImage(slideshowScreen.getBackground())
-    time.sleep(10) #not doing anything useful here so just sleep
\ No newline at end of file
+    if showingSlideshow:
+        print("Free Memory: " + free(False))
+        print(f"SPI Bytes: {tft.getBytesPushed()} in {tft.getUpdateCount()} updates")
+        print(scheduler.formatStats())
+        print(sensors.formatStats())
+        print(screens.formatStats())
+        print(gcPolicy.formatStats())
+        print(textCache.formatStats())
+        
+        if allocations != None:
+            print(allocations.formatStats())
+        
+        if backlight != None:
+            print(backlight.formatStats())
+        
+        if screens.get("temperature") != None:
+            print(screens.get("temperature").getTimeline().formatStats())
+        
+        print("Refreshes saved by batching: " + str(tft.getBatchStats()["refreshesSaved"]))
+        
+        with tft:
+            #The first time round the splash screen goes in the same refresh the temperature screen comes up in
+            if splash != None:
+                splash.hide()
+                splash = None
+                
+            temperatureScreen = screens.show("temperature")
+            showReadings(temperatureScreen) #in case it was rebuilt with older readings
+            tft.setBackgroundColour(temperatureScreen.getBackgroundColour())
+            
+        showingSlideshow = False
+        
+        if not boot.isInteractive():
+            boot.markInteractive()
+            print(boot.formatReport())
+        
+        #Get the next slideshow image ready now the temperature screen is showing
+        slideshowLoader.prefetch()
+        gcPolicy.idle("rotate")
+    else:
+        #Finished so hide this screen and put the next slideshow image up in one refresh
+        with tft:
+            temperatureScreen = screens.get("temperature")
+            temperatureScreen.cycleBackgroundColour()
+            temperatureScreen.toggleFan() #just for fan example, swap this based on sensor information
+            screens.show(None)
+            
+            #Next Screen
+            slide = slideshowLoader.take()
+            
+            #The panel scrolls the old picture out itself, only the new image is sent
+            if slide != None and SLIDE_TRANSITION != None:
+                tft.transitionBackgroundLayer(slide[1], SLIDE_TRANSITION, imagePath = slideshowLoader.getImagePath(slide[0]))
+            elif slide != None:
+                tft.setBackgroundLayer(slide[1])
+            
+        showingSlideshow = True
+        
+        #Nothing animates while the slideshow is up, always collect
+        gcPolicy.idle("slideshow", force = True)
+
+# ****************************
+# *     MAIN SCREEN LOOP     *
+# ****************************
+scheduler = Scheduler()
+scheduler.setMetrics(metrics)
+scheduler.addTask("rotate", TEN_SECONDS, rotateScreen, startDelay = 0)
+scheduler.addTask("animate", ANIMATE_DELAY, animate)
+scheduler.addTask("sensors", SENSOR_DELAY, sensors.poll) #runs again when the next sensor step is due
+
+if METRICS_PERIOD != None:
+    scheduler.addTask("metrics", METRICS_PERIOD, metrics.report)
+
+if backlight != None:
+    scheduler.addTask("backlight", Backlight.IDLE_CHECK, backlight.update) #every FADE_STEP while fading
+scheduler.run()
\ No newline at end of file
@@ -0,0 +1,120 @@
+# bench_atlas.py
+# Startup time and memory of TemperatureScreen with separate sprite sheets vs one packed atlas
+#
+# Packs the sheets main.py uses with pack_atlas.py into a temporary simulator root, then builds the temperature
+# screen (with the animation label) both ways and reports:
+#  - build time (mean of --runs), every image read costs --open-ms extra like opening a file on the Pico's flash
+#  - heap used: Python allocations while building (tracemalloc, what gc.mem_free would see drop)
+#  - displayio bytes: what the bitmaps and palettes take on the Pico (packed bits per pixel, 4 bytes per colour)
+#  - whether both render exactly the same pixels
+#
+# USAGE:
+#
+#   python3 tools/bench_atlas.py --runs 5 --open-ms 20
+#   python3 tools/bench_atlas.py --with-anim
+import argparse, gc, os, sys, tempfile, time, tracemalloc
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(TOOLS_DIR)
+sys.path.insert(0, os.path.join(REPO_DIR, "lib"))
+sys.path.insert(0, os.path.join(TOOLS_DIR, "sim"))
+
+import simulator, displayio, board, busio
+import pack_atlas
+from adafruit_st7735r import ST7735R
+from Atlas import Atlas
+from TemperatureScreen import TemperatureScreen
+
+# The sheets main.py loads and their tile sizes, anim.bmp stays a separate bmp unless --with-anim is given
+SHEETS = ["temperature_1-2.bmp:20x20", "humidity_1-2.bmp:20x20", "fan_1-2.bmp:20x20", "decoration.bmp:49x40"]
+ANIMATION = "anim.bmp:100x44"
+
+# function build
+# @param useAtlas: load from /images/atlas.txt instead of the separate sheets
+# @return TemperatureScreen
+def build(useAtlas):
+    atlas = Atlas("/images/atlas.txt") if useAtlas else None
+    screen = TemperatureScreen("Demo &\nText", "temperature_1-2.bmp", "humidity_1-2.bmp", "fan_1-2.bmp", "decoration.bmp", atlas = atlas)
+    screen.addAnimationLabel("anim.bmp", portrait = False)
+    return screen
+
+# function displayioBytes
+# Adds up the Pico RAM used by every distinct bitmap and palette in a group tree
+def displayioBytes(group, seen = None):
+    if seen is None:
+        seen = set()
+
+    total = 0
+
+    for layer in group:
+        if isinstance(layer, displayio.Group):
+            total += displayioBytes(layer, seen)
+            continue
+
+        for item in (layer.bitmap, layer.pixel_shader):
+            if id(item) in seen:
+                continue
+
+            seen.add(id(item))
+            total += item.deviceBytes() if isinstance(item, displayio.Bitmap) else len(item) * 4
+
+    return total
+
+# function render
+# @return framebuffer of the screen drawn on a simulated 160 x 128 display
+def render(screen):
+    bus = displayio.FourWire(busio.SPI(board.GP18, MOSI = board.GP19), command = board.GP20, chip_select = board.GP17)
+    display = ST7735R(bus, width = 160, height = 128, rotation = 90, bgr = True, auto_refresh = False)
+    display.root_group = screen.getGroup()
+    return display.render()
+
+def measure(useAtlas, runs):
+    times = []
+
+    for i in range(runs):
+        gc.collect()
+        start = time.perf_counter()
+        build(useAtlas)
+        times.append((time.perf_counter() - start) * 1000)
+
+    gc.collect()
+    tracemalloc.start()
+    screen = build(useAtlas)
+    heap = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    return sum(times) / len(times), heap, displayioBytes(screen.getGroup()), screen
+
+def main():
+    parser = argparse.ArgumentParser(description = "Separate sprite sheets vs packed atlas")
+    parser.add_argument("--runs", type = int, default = 5)
+    parser.add_argument("--open-ms", type = float, default = 20, help = "simulated flash delay per image read")
+    parser.add_argument("--with-anim", action = "store_true", help = "pack the animation strip into the atlas too")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        simulator.createDeviceRoot(root, os.path.join(REPO_DIR, "images"))
+        simulator.setRoot(root)
+
+        imagesDir = os.path.join(root, "images")
+        sprites = [pack_atlas.parseInput(spec, imagesDir) for spec in SHEETS + ([ANIMATION] if args.with_anim else [])]
+        images, colours = pack_atlas.writeAtlas(sprites, imagesDir, "atlas")
+
+        simulator.installFilesystem()
+        simulator.setReadDelay(args.open_ms)
+
+        try:
+            separate = measure(False, args.runs)
+            packed = measure(True, args.runs)
+        finally:
+            simulator.uninstallFilesystem()
+
+    print("atlas: {0}, {1} colours".format(", ".join("{0} {1} x {2}".format(*image) for image in images), colours))
+    print("{0:<10} {1:>10} {2:>12} {3:>16}".format("sheets", "build ms", "heap bytes", "displayio bytes"))
+    print("{0:<10} {1:>10.2f} {2:>12} {3:>16}".format("separate", separate[0], separate[1], separate[2]))
+    print("{0:<10} {1:>10.2f} {2:>12} {3:>16}".format("atlas", packed[0], packed[1], packed[2]))
+    print("same pixels: " + ("yes" if render(separate[3]) == render(packed[3]) else "NO"))
+    print("(simulated flash delay {0} ms per image read)".format(args.open_ms))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+# bench_background.py
+# Memory / allocation benchmark for AZ_ST7735S.setBackgroundColour and setBackgroundImage
+#
+# Runs a number of background cycles (colour changes with an occasional switch to an image and back, like main.py)
+# under the simulator with tracemalloc on.  Every 100 cycles it runs gc.collect() and samples gc.mem_alloc(), which
+# should stay flat, and it records how many bytes each cycle allocated (the churn that makes the Pico's GC kick in).
+#
+# --legacy runs the same cycles using the old approach (new Bitmap + Palette + TileGrid every call) for comparison.
+#
+# USAGE:
+#
+#   python3 tools/bench_background.py --cycles 1000
+#   python3 tools/bench_background.py --cycles 1000 --legacy
+import argparse, gc, os, sys, tempfile, tracemalloc
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(TOOLS_DIR)
+sys.path.insert(0, os.path.join(REPO_DIR, "lib"))
+sys.path.insert(0, os.path.join(TOOLS_DIR, "sim"))
+
+import simulator, displayio
+from AZ_ST7735S import AZ_ST7735S
+
+COLOURS = [0x000000, 0x880000, 0x008800, 0x000088, 0x888800, 0x008888, 0x880088]
+
+# function legacyBackgroundColour
+# The original setBackgroundColour: a new full screen bitmap, palette and tile grid every call
+def legacyBackgroundColour(tft, colour):
+    color_bitmap = displayio.Bitmap(tft.getWidth(), tft.getHeight(), 1)
+    color_palette = displayio.Palette(1)
+    color_palette[0] = colour
+    background = displayio.TileGrid(color_bitmap, pixel_shader=color_palette, x=0, y=0)
+    tft.getScreen().pop(0)
+    tft.getScreen().insert(0, background)
+
+# function legacyBackgroundImage
+# The original setBackgroundImage: reopens the file every call
+def legacyBackgroundImage(tft, imageFile):
+    bitmap = displayio.OnDiskBitmap("/images/" + imageFile)
+    tile_grid = displayio.TileGrid(bitmap, pixel_shader=bitmap.pixel_shader)
+    tft.getScreen().pop(0)
+    tft.getScreen().insert(0, tile_grid)
+
+def main():
+    parser = argparse.ArgumentParser(description = "Allocation benchmark for background changes")
+    parser.add_argument("--cycles", type = int, default = 1000)
+    parser.add_argument("--image-every", type = int, default = 2, help = "switch to an image background every N cycles (like the slideshow)")
+    parser.add_argument("--legacy", action = "store_true", help = "use the old allocate-every-time code")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        simulator.createDeviceRoot(root, os.path.join(REPO_DIR, "images"))
+        simulator.setRoot(root)
+        simulator.installGc(trace = True)
+
+        tft = AZ_ST7735S()
+        tft.initialiseScreen(90, autoRefresh = False)
+        slides = sorted(f for f in os.listdir(os.path.join(root, "images", "slideshow")) if f.endswith(".bmp"))[:2]
+
+        setColour = (lambda c: legacyBackgroundColour(tft, c)) if args.legacy else tft.setBackgroundColour
+        setImage = (lambda f: legacyBackgroundImage(tft, f)) if args.legacy else tft.setBackgroundImage
+
+        # Preallocated so the benchmark's own bookkeeping doesn't show up as growth
+        samples = []
+        cycleBytes = [0] * args.cycles
+
+        for cycle in range(args.cycles):
+            if cycle % 100 == 0:
+                gc.collect()
+                samples.append((cycle, gc.mem_alloc()))
+
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+
+            setColour(COLOURS[cycle % len(COLOURS)])
+
+            if args.image_every and cycle % args.image_every == args.image_every - 1:
+                setImage("slideshow/" + slides[(cycle // args.image_every) % len(slides)])
+
+            cycleBytes[cycle] = tracemalloc.get_traced_memory()[1] - before
+
+        gc.collect()
+        samples.append((args.cycles, gc.mem_alloc()))
+        tracemalloc.stop()
+
+    print("mode: " + ("legacy (allocate every call)" if args.legacy else "cached background"))
+    print("{0:>8} {1:>12}".format("cycle", "mem_alloc"))
+
+    for cycle, alloc in samples:
+        print("{0:>8} {1:>12}".format(cycle, alloc))
+
+    # Ignore the first sample: the cached layers and first images are allocated during the first few cycles
+    growth = samples[-1][1] - samples[1][1] if len(samples) > 2 else 0
+    print("growth after warm up: {0} bytes".format(growth))
+    print("allocated per cycle: mean {0:.0f} bytes, max {1} bytes".format(sum(cycleBytes[10:]) / max(1, len(cycleBytes) - 10), max(cycleBytes[10:] or [0])))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+# bench_backlight.py
+# A virtual day of lib/Backlight.py settings against the simulated panel and pwmio, with the energy each one uses
+#
+# Every setting runs for --hours of virtual time on a Scheduler, with the backlight task and an "activity" task that
+# calls activity() every --activity minutes between --wake and --bed o'clock (someone walking past, a reading changing)
+# and never overnight.  The day starts at midnight (Backlight.getMinuteOfDay is replaced with the virtual clock).
+#
+#  3v3: full brightness all the time, what LEDA wired to 3V3 uses
+#  pwm: BACKLIGHT_LEVEL brightness on the PWM pin, nothing else
+#  idle dim: dims to --dim after --idle minutes without activity
+#  idle off: as idle dim and blanks (panel asleep) after 3 x --idle minutes
+#  schedule: idle dim with a time of day schedule, 40% from 21:00 and blank from 23:00 to 07:00
+#
+#  avg mA / mWh: estimated (see Backlight.py, the currents are settings), per day scales mWh to 24 hours
+#  asleep: time the panel spent in SLPIN, sim asleep: the same seen from the simulated panel's sleeping flag
+#  fades / sleeps: brightness changes and times the panel was put to sleep
+#  pwm writes: duty cycle changes sent to the pin
+#
+# USAGE:
+#
+#   python3 tools/bench_backlight.py --hours 24 --activity 20
+import argparse, os, sys
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(TOOLS_DIR)
+sys.path.insert(0, os.path.join(REPO_DIR, "lib"))
+sys.path.insert(0, os.path.join(TOOLS_DIR, "sim"))
+
+import simulator
+import Backlight
+from AZ_ST7735S import AZ_ST7735S
+from Scheduler import Scheduler
+
+# function run
+# @param setup: function(backlight) applying the setting
+# @param level: brightness
+# @return (Backlight stats, pwm writes, ms the simulated panel was asleep)
+def run(setup, level, hours, activityMinutes, wake, bed):
+    clock = simulator.VirtualClock()
+    clock.install()
+    clock.installAsyncio()
+    Backlight.getMinuteOfDay = lambda: int(clock.monotonic() // 60) % 1440
+
+    try:
+        tft = AZ_ST7735S()
+        tft.initialiseScreen(90, autoRefresh = False)
+        display = tft.getDisplay()
+        backlight = Backlight.Backlight("GP22", tft, level = level)
+        setup(backlight)
+
+        scheduler = Scheduler()
+        asleep = [0, clock.monotonic()]
+
+        def activity():
+            hour = Backlight.getMinuteOfDay() / 60
+
+            if wake <= hour < bed:
+                backlight.activity()
+
+        # Each minute, add up how long the simulated panel says it was asleep
+        def watch():
+            now = clock.monotonic()
+
+            if display.sleeping:
+                asleep[0] += now - asleep[1]
+
+            asleep[1] = now
+
+            if now >= hours * 3600:
+                scheduler.stop()
+
+        scheduler.addTask("backlight", Backlight.Backlight.IDLE_CHECK, backlight.update)
+        scheduler.addTask("activity", activityMinutes * 60000, activity, startDelay = 0)
+        scheduler.addTask("watch", 60000, watch)
+        scheduler.run()
+
+        stats = backlight.getStats()
+        writes = backlight._Backlight__pwm.writes
+    finally:
+        clock.uninstall()
+
+    return stats, writes, asleep[0] * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description = "Backlight settings over a virtual day")
+    parser.add_argument("--hours", type = float, default = 24)
+    parser.add_argument("--activity", type = float, default = 20, help = "minutes between activity() calls in the day")
+    parser.add_argument("--wake", type = float, default = 7, help = "hour activity starts")
+    parser.add_argument("--bed", type = float, default = 23, help = "hour activity stops")
+    parser.add_argument("--level", type = float, default = 0.8, help = "brightness")
+    parser.add_argument("--dim", type = float, default = 0.3, help = "brightness when idle")
+    parser.add_argument("--idle", type = float, default = 5, help = "minutes without activity before dimming")
+    args = parser.parse_args()
+    idle = int(args.idle * 60000)
+
+    settings = (
+        ("3v3", 1.0, lambda backlight: None),
+        ("pwm", args.level, lambda backlight: None),
+        ("idle dim", args.level, lambda backlight: backlight.setIdle(idle, args.dim)),
+        ("idle off", args.level, lambda backlight: backlight.setIdle(idle, args.dim, idle * 3)),
+        ("schedule", args.level, lambda backlight: (backlight.setIdle(idle, args.dim),
+            backlight.setSchedule([(7, 0, 1), (21, 0, 0.4), (23, 0, 0)]))),
+    )
+
+    print("{0:<10} {1:>7} {2:>7} {3:>8} {4:>7} {5:>10} {6:>6} {7:>7} {8:>11}".format(
+        "setting", "avg mA", "mWh", "mWh/day", "asleep", "sim asleep", "fades", "sleeps", "pwm writes"))
+
+    for name, level, setup in settings:
+        stats, writes, simAsleep = run(setup, level, args.hours, args.activity, args.wake, args.bed)
+        print("{0:<10} {1:>7.2f} {2:>7.1f} {3:>8.1f} {4:>6.1f}% {5:>9.1f}% {6:>6} {7:>7} {8:>11}".format(name,
+            stats["averageMa"], stats["mWh"], stats["mWh"] * 24 / args.hours, stats["asleepPercent"],
+            100 * simAsleep / (args.hours * 3600000), stats["fades"], stats["sleeps"], writes))
+
+if __name__ == "__main__":
+    main()
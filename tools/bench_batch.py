@@ -0,0 +1,117 @@
+# bench_batch.py
+# Refreshes and SPI bytes for a sensor tick with and without beginUpdate() / commit() batching
+#
+# A tick does setTemperature, setHumidity, toggleFan and animate one after another with a short gap between each
+# (e.g. waiting on a slow sensor).  It's run four ways on the simulator:
+#
+#  manual:          auto refresh off and tft.refresh() after every change
+#  manual batched:  the same calls inside "with temperatureScreen:", the refresh() calls are held back until commit
+#  auto:            auto refresh on, displayio refreshes in the background during every gap
+#  auto batched:    the same inside "with temperatureScreen:", auto refresh is suspended until commit
+#
+# Refreshes are counted on the simulated display (only ones that actually sent pixels), "saved" is what
+# AZ_ST7735S.commit() reported: the refreshes the driver counts the ticks would have taken unbatched (a refresh() call
+# with something new to send, or with auto refresh a change made after the last one would have gone out) less the
+# ones the batches sent.  It can be a little above refreshes unbatched - batched as a refresh that changes no pixels
+# isn't counted on the display.
+#
+# USAGE:
+#
+#   python3 tools/bench_batch.py --ticks 50
+import argparse, os, random, sys, tempfile, time
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(TOOLS_DIR)
+sys.path.insert(0, os.path.join(REPO_DIR, "lib"))
+sys.path.insert(0, os.path.join(TOOLS_DIR, "sim"))
+
+import simulator
+from AZ_ST7735S import AZ_ST7735S
+from TemperatureScreen import TemperatureScreen
+
+# Gap between each change in a tick (seconds)
+GAP = 0.05
+
+# function runMode
+# @param autoRefresh: display auto refresh on
+# @param batched: wrap each tick in a batch
+# @param ticks: number of sensor ticks
+# @return (refreshes that sent something, bytes sent, refreshes saved reported by commit)
+def runMode(autoRefresh, batched, ticks):
+    random.seed(0)
+    tft = AZ_ST7735S()
+    tft.initialiseScreen(90, autoRefresh = autoRefresh)
+    screen = TemperatureScreen("Demo &\nText", "temperature_1-2.bmp", "humidity_1-2.bmp", "fan_1-2.bmp", "decoration.bmp")
+    screen.addAnimationLabel("anim.bmp", portrait = False)
+    screen.setDisplay(tft)
+    tft.getScreen().append(screen.getGroup())
+    tft.refresh()
+    time.sleep(GAP)
+
+    display = tft.getDisplay()
+    sent = [0]
+    refreshes = display.refresh
+
+    # Count only the refreshes that put pixels on the bus
+    def countingRefresh(**kwargs):
+        result = refreshes(**kwargs)
+
+        if display.lastRefreshBytes > 0:
+            sent[0] += 1
+
+        return result
+
+    display.refresh = countingRefresh
+    bytesBefore = display.bytesPushed
+    changes = [
+        lambda: screen.setTemperature(random.randint(15, 32)),
+        lambda: screen.setHumidity(random.randint(10, 50)),
+        screen.toggleFan,
+        screen.animate,
+    ]
+
+    for tick in range(ticks):
+        if batched:
+            screen.beginUpdate()
+
+        for change in changes:
+            change()
+
+            if not autoRefresh:
+                tft.refresh()
+
+            time.sleep(GAP)
+
+        if batched:
+            screen.commit()
+
+        time.sleep(GAP)
+
+    return sent[0], display.bytesPushed - bytesBefore, tft.getBatchStats()["refreshesSaved"]
+
+def main():
+    parser = argparse.ArgumentParser(description = "Batched update benchmark")
+    parser.add_argument("--ticks", type = int, default = 50)
+    args = parser.parse_args()
+
+    clock = simulator.VirtualClock()
+
+    with tempfile.TemporaryDirectory() as root:
+        simulator.createDeviceRoot(root, os.path.join(REPO_DIR, "images"))
+        simulator.setRoot(root)
+        simulator.installFilesystem()
+        clock.install()
+
+        try:
+            print("{0:<16} {1:>10} {2:>12} {3:>12} {4:>8}".format("mode", "refreshes", "per tick", "bytes", "saved"))
+
+            for name, autoRefresh, batched in (("manual", False, False), ("manual batched", False, True),
+                                               ("auto", True, False), ("auto batched", True, True)):
+                sent, sentBytes, saved = runMode(autoRefresh, batched, args.ticks)
+                print("{0:<16} {1:>10} {2:>12.2f} {3:>12} {4:>8}".format(name, sent, sent / args.ticks, sentBytes, saved))
+        finally:
+            clock.uninstall()
+            simulator.uninstallFilesystem()
+
+if __name__ == "__main__":
+    main()
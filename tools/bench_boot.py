@@ -0,0 +1,135 @@
+# bench_boot.py
+# Times main.py's boot under the simulator using its BootProfiler: each stage, time to first frame and time to
+# interactive (temperature screen up)
+#
+# Time is the host's real time (the virtual clock only moves on for sleeps, and boot has none), so the ms figures show
+# where boot time goes relative to each other rather than what the Pico takes.  Every run starts with the lib modules
+# (and adafruit_display_text) unimported so import time is counted each time.  Figures are the median of --runs.
+#
+# One more run with tracemalloc on gives the heap column: Python heap in use after each stage (from the profiler's
+# gc.mem_free() readings, no gc.collect()), it's slower so it isn't timed.  Host objects are much bigger than
+# CircuitPython's so only the growth from stage to stage means anything.
+#
+# On the Pico main.py prints the same report over serial once the temperature screen is up.
+#
+# USAGE:
+#
+#   python3 tools/bench_boot.py --runs 5
+import argparse, contextlib, io, os, runpy, sys, tempfile, time, tracemalloc
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(TOOLS_DIR)
+LIB_DIR = os.path.join(REPO_DIR, "lib")
+sys.path.insert(0, LIB_DIR)
+sys.path.insert(0, os.path.join(TOOLS_DIR, "sim"))
+
+import simulator
+
+# Modules main.py imports that a fresh boot would have to import again
+FRESH_MODULES = ("adafruit_display_text", "adafruit_imageload", "adafruit_st7735r", "bitmaptools")
+
+class HostClock(simulator.VirtualClock):
+    # Virtual time plus the real time spent running, so work between sleeps shows up in time.monotonic_ns()
+    def __init__(self, onSleep = None):
+        simulator.VirtualClock.__init__(self, onSleep)
+        self.startNs = time.perf_counter_ns()
+
+    def monotonic_ns(self):
+        return self.nowNs + time.perf_counter_ns() - self.startNs
+
+    def monotonic(self):
+        return self.monotonic_ns() / 1000000000
+
+# function forgetModules
+# Drops the lib modules (and the libraries main.py loads) so the next run imports them again
+def forgetModules():
+    for name, module in list(sys.modules.items()):
+        path = getattr(module, "__file__", None) or ""
+
+        if path.startswith(LIB_DIR) or name.split(".")[0] in FRESH_MODULES:
+            del sys.modules[name]
+
+# function runBoot
+# Runs main.py until the BootProfiler says it's interactive
+# @param root: simulator root directory
+# @param trace: use tracemalloc so gc.mem_free() means something
+# @return (main.py's BootProfiler, bytes sent to the panel by then)
+def runBoot(root, trace):
+    forgetModules()
+    simulator.setRoot(root)
+    simulator.installFilesystem()
+    simulator.installGc(trace)
+    captured = {}
+
+    # main.py's globals are only reachable while it is running (runpy puts it in sys.modules as __main__)
+    def onSleep(clock, seconds):
+        main = sys.modules["__main__"]
+        boot = getattr(main, "boot", None)
+
+        if boot != None and boot.isInteractive():
+            captured["boot"] = boot
+            captured["bytes"] = main.tft.getDisplay().bytesPushed
+            raise simulator.StopSimulation()
+
+        # Nothing should sleep for long before the temperature screen is up
+        if clock.nowNs > 30 * 1000000000:
+            raise simulator.StopSimulation()
+
+    clock = HostClock(onSleep)
+    clock.install()
+    clock.installAsyncio()
+
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            runpy.run_path(os.path.join(REPO_DIR, "main.py"), run_name = "__main__")
+    except simulator.StopSimulation:
+        pass
+    finally:
+        clock.uninstall()
+        simulator.uninstallFilesystem()
+
+        if trace:
+            tracemalloc.stop()
+
+    if "boot" not in captured:
+        raise RuntimeError("main.py never became interactive")
+
+    return captured["boot"], captured["bytes"]
+
+# function median
+def median(values):
+    ordered = sorted(values)
+    return ordered[len(ordered) // 2]
+
+def main():
+    parser = argparse.ArgumentParser(description = "main.py boot stages, time to first frame and time to interactive")
+    parser.add_argument("--runs", type = int, default = 5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        simulator.createDeviceRoot(root, os.path.join(REPO_DIR, "images"))
+        runs = [runBoot(root, False) for i in range(args.runs)]
+
+        # Big enough that the simulated gc.mem_free() never bottoms out at 0
+        heapSize = simulator.HEAP_SIZE
+        simulator.HEAP_SIZE = 1 << 40
+        traced = runBoot(root, True)[0]
+        simulator.HEAP_SIZE = heapSize
+
+    names = [stage[0] for stage in runs[0][0].getStages()]
+    heap = dict((stage[0], (1 << 40) - stage[3]) for stage in traced.getStages())
+
+    print("{0:<28} {1:>10} {2:>10} {3:>10}".format("stage", "at ms", "took ms", "heap"))
+
+    for i in range(len(names)):
+        at = median([boot.getStages()[i][1] for boot, sent in runs])
+        took = median([boot.getStages()[i][2] for boot, sent in runs])
+        print("{0:<28} {1:>10.2f} {2:>10.2f} {3:>10}".format(names[i], at, took, heap.get(names[i], "")))
+
+    print()
+    print("time to first frame  {0:>8.2f} ms".format(median([boot.getTimeToFirstFrame() for boot, sent in runs])))
+    print("time to interactive  {0:>8.2f} ms".format(median([boot.getTimeToInteractive() for boot, sent in runs])))
+    print("bytes sent by then   {0:>8}".format(runs[0][1]))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+# bench_compression.py
+# Compressed PanelImage files (tools/convert_images.py --compress) against the raw BMPs and uncompressed .pimg files
+#
+# Each image is converted four ways (indexed and rgb565, each raw and compressed) and for each the benchmark reports:
+#
+#  bytes / ratio:  file size and how many times smaller than the BMP it came from
+#  px/ms:          host decode throughput, best of --runs.  Indexed files are loaded into a displayio.Bitmap
+#                  (PanelImage.getBitmap(), the BMP row is adafruit_imageload), rgb565 files are sent to a bus that only
+#                  counts bytes (PanelImage.draw()).  The simulator's Bitmap / bitmaptools are Python, so only compare
+#                  rows with each other, not with the Pico.
+#  work bytes:     peak Python heap (tracemalloc) above what is still held once the decode is done (i.e. not counting
+#                  the Bitmap it made) - the RAM the decode itself needs.  This should be the same for every image size.
+#                  The simulator's adafruit_imageload reads the whole BMP into lists, so its figure is only a host one.
+#  match:          the compressed file decodes to exactly what the uncompressed one does
+#
+# Images: the slideshow (placeholder stripes unless images/slideshow has real ones, so best case), the art in images/,
+# the long animation strip (to show the work bytes don't grow with the image) and a generated 256 colour noisy
+# gradient (close to worst case for run lengths).
+#
+# USAGE:
+#
+#   python3 tools/bench_compression.py --runs 3
+import argparse, os, random, sys, tempfile, time, tracemalloc
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(TOOLS_DIR)
+sys.path.insert(0, os.path.join(REPO_DIR, "lib"))
+sys.path.insert(0, os.path.join(TOOLS_DIR, "sim"))
+
+import simulator
+import busio, displayio
+import adafruit_imageload
+import convert_images
+from PanelImage import PanelImage
+
+ORIENTATION = 90
+
+# Images from images/ to try besides the first slide and the generated one
+IMAGES = ("temperature_1-2.bmp", "fan_1-2.bmp", "lizard.bmp", "humidity.bmp", "anim.bmp")
+
+# function noisyGradient
+# Writes a 160 x 128 BMP: a diagonal gradient over 256 colours with a little noise added to each pixel
+def noisyGradient(path):
+    random.seed(1)
+    palette = [(i << 16) | ((255 - i) << 8) | (i // 2) for i in range(256)]
+    pixels = []
+
+    for y in range(128):
+        for x in range(160):
+            pixels.append(max(0, min(255, (x + y) * 255 // 286 + random.randint(-3, 3))))
+
+    simulator.writeBmp(path, 160, 128, palette, pixels)
+
+# function countingBus
+# @return FourWire with no panel on it, it only counts what is sent
+def countingBus():
+    return displayio.FourWire(busio.SPI(None), command = None, chip_select = None)
+
+# function measure
+# @return (best ms of runs calls to work, work bytes of one more call, its result)
+def measure(runs, work):
+    times = []
+
+    for i in range(runs):
+        start = time.perf_counter()
+        work()
+        times.append((time.perf_counter() - start) * 1000)
+
+    tracemalloc.start()
+    result = work()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(times), peak - current, result
+
+# function loadBmp
+# @return displayio.Bitmap of a BMP decoded into RAM
+def loadBmp(path):
+    return adafruit_imageload.load(path, bitmap = displayio.Bitmap, palette = displayio.Palette)[0]
+
+# function drawn
+# @return bytes PanelImage.draw() sends with a bus that records them
+def drawn(path):
+    sent = bytearray()
+
+    class Recorder:
+        def send(self, command, data):
+            sent.extend(data)
+
+    PanelImage(path).draw(Recorder())
+    return bytes(sent)
+
+def main():
+    parser = argparse.ArgumentParser(description = "Compressed PanelImage size, decode speed and memory")
+    parser.add_argument("--runs", type = int, default = 3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        simulator.createDeviceRoot(root, os.path.join(REPO_DIR, "images"))
+        simulator.setRoot(root)
+        images = os.path.join(root, "images")
+        os.makedirs(os.path.join(images, "pimg"))
+        noisyGradient(os.path.join(images, "gradient.bmp"))
+
+        slide = sorted(f for f in os.listdir(os.path.join(images, "slideshow")) if f.endswith(".bmp"))[0]
+        names = ["slideshow/" + slide] + list(IMAGES) + ["gradient.bmp"]
+
+        for name in names:
+            base = os.path.join(images, "pimg", os.path.splitext(os.path.basename(name))[0])
+
+            for format in ("indexed", "rgb565"):
+                for compress in (False, True):
+                    convert_images.convert(os.path.join(images, name), base + "." + format + (".z" if compress else "") + ".pimg",
+                                           ORIENTATION, format, True, False, compress)
+
+        simulator.installFilesystem()
+
+        try:
+            print("{0:<20} {1:>9} {2:<14} {3:>8} {4:>6} {5:>8} {6:>10} {7:>6}".format(
+                "image", "size", "file", "bytes", "ratio", "px/ms", "work bytes", "match"))
+
+            for name in names:
+                path = "/images/" + name
+                base = "/images/pimg/" + os.path.splitext(os.path.basename(name))[0]
+                bmpBytes = os.path.getsize(simulator.mapPath(path))
+                ms, work, bitmap = measure(args.runs, lambda: loadBmp(path))
+                pixels = bitmap.width * bitmap.height
+                size = "{0}x{1}".format(bitmap.width, bitmap.height)
+                rows = [("bmp", path, ms, work, True)]
+
+                raw = None
+
+                for file in ("indexed", "indexed.z"):
+                    ms, work, bitmap = measure(args.runs, lambda: PanelImage(base + "." + file + ".pimg").getBitmap())
+                    values = [bitmap[i] for i in range(pixels)]
+                    raw = values if raw == None else raw
+                    rows.append(("pimg " + file, base + "." + file + ".pimg", ms, work, values == raw))
+
+                bus = countingBus()
+                raw = drawn(base + ".rgb565.pimg")
+
+                for file in ("rgb565", "rgb565.z"):
+                    ms, work, result = measure(args.runs, lambda: PanelImage(base + "." + file + ".pimg").draw(bus))
+                    rows.append(("pimg " + file, base + "." + file + ".pimg", ms, work, drawn(base + "." + file + ".pimg") == raw))
+
+                for method, file, ms, work, match in rows:
+                    fileBytes = os.path.getsize(simulator.mapPath(file))
+                    print("{0:<20} {1:>9} {2:<14} {3:>8} {4:>6.2f} {5:>8.0f} {6:>10} {7:>6}".format(
+                        os.path.basename(name), size, method, fileBytes, bmpBytes / fileBytes, pixels / ms, work, "yes" if match else "NO"))
+        finally:
+            simulator.uninstallFilesystem()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+# bench_gc.py
+# Where garbage collections land in main.py with and without lib/GcPolicy.py
+#
+# Runs main.py on the simulator with its heap model (simulator.installHeap): the stand-in displayio / label / os
+# objects are charged to a heap that only frees on a collection, collections happen by themselves when gc.threshold
+# bytes have been allocated or the heap is full, and every collection's pause moves the virtual clock on.
+#
+#  firmware: GcPolicy does nothing (no threshold, idle() never collects), the heap collects whenever it fills up
+#  policy:   main.py as it is, GC_THRESHOLD and idle() at quiet moments
+#
+#  automatic / idle: collections the heap made itself / idle() made
+#  in frames: automatic collections that landed inside the animation task, each one a late frame on the Pico
+#  pause ms: total and longest
+#  animate late: how late the animation task started (mean / max ms), missed: ticks it skipped
+#
+# The lib code's own garbage (strings, tuples, lists ...) isn't in the model, --churn charges that many bytes to the heap
+# at the start of every task run to stand in for it.
+#
+# After the policy run its collection log and the biggest allocators (lib/AllocationProfiler.py on TemperatureScreen,
+# ImageLabel and AZ_ST7735S) are printed.  The heap model only counts the stand-ins' objects, so compare the two modes
+# rather than reading the numbers as the Pico's.
+#
+# USAGE:
+#
+#   python3 tools/bench_gc.py --cycles 20 --churn 512
+import argparse, contextlib, io, os, random, runpy, sys, tempfile
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, TOOLS_DIR)
+
+import benchmark
+import simulator
+import GcPolicy
+from Scheduler import Scheduler
+from AllocationProfiler import AllocationProfiler
+from TemperatureScreen import TemperatureScreen
+from ImageLabel import ImageLabel
+from AZ_ST7735S import AZ_ST7735S
+
+# function run
+# @param policy: False to stop GcPolicy doing anything
+# @param profiler: AllocationProfiler to wrap the classes with for this run, or None
+# @return (SimulatedHeap, Scheduler stats, GcPolicy log)
+def run(policy, seconds, live, churn, seed, profiler):
+    random.seed(seed)
+    schedulers = []
+    policies = []
+    originals = (Scheduler.addTask, GcPolicy.GcPolicy.__init__, GcPolicy.GcPolicy.idle)
+
+    # Each task's callback marks the heap with its name so collections can be put down to it
+    def addTask(self, name, period, callback, startDelay = None):
+        if self not in schedulers:
+            schedulers.append(self)
+
+        def tagged():
+            heap.where = name
+            heap.allocate(churn)
+            result = callback()
+            heap.where = None
+            return result
+
+        return originals[0](self, name, period, tagged, startDelay)
+
+    def init(self, threshold = None, *args, **kwargs):
+        policies.append(self)
+        originals[1](self, threshold if policy else None, *args, **kwargs)
+
+    Scheduler.addTask = addTask
+    GcPolicy.GcPolicy.__init__ = init
+
+    if not policy:
+        GcPolicy.GcPolicy.idle = lambda self, reason, force = False: 0
+
+    if profiler != None:
+        for cls in (TemperatureScreen, ImageLabel, AZ_ST7735S):
+            profiler.wrap(cls)
+
+    with tempfile.TemporaryDirectory() as root:
+        simulator.createDeviceRoot(root, os.path.join(benchmark.REPO_DIR, "images"))
+        simulator.setRoot(root)
+        simulator.installFilesystem()
+        recorder = benchmark.FrameRecorder(seconds)
+        clock = simulator.VirtualClock(recorder.onSleep)
+        clock.install()
+        clock.installAsyncio()
+        heap = simulator.installHeap(clock, live)
+
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                runpy.run_path(os.path.join(benchmark.REPO_DIR, "main.py"), run_name = "__main__")
+        except simulator.StopSimulation:
+            pass
+        finally:
+            Scheduler.addTask, GcPolicy.GcPolicy.__init__, GcPolicy.GcPolicy.idle = originals
+            simulator.uninstallHeap()
+            clock.uninstall()
+            simulator.uninstallFilesystem()
+
+            if profiler != None:
+                profiler.unwrap()
+
+    return heap, schedulers[0].getStats(), policies[0].formatLog() if policies else ""
+
+def main():
+    parser = argparse.ArgumentParser(description = "Garbage collections in main.py with and without GcPolicy")
+    parser.add_argument("--cycles", type = int, default = 20, help = "temperature + slideshow cycles to run")
+    parser.add_argument("--live", type = int, default = 60000, help = "bytes the heap model keeps in use after a collection")
+    parser.add_argument("--churn", type = int, default = 512, help = "bytes of garbage each task run makes on top of the modelled objects")
+    parser.add_argument("--seed", type = int, default = 0)
+    args = parser.parse_args()
+    seconds = args.cycles * benchmark.CYCLE_SECONDS
+
+    print("{0:<10} {1:>10} {2:>6} {3:>10} {4:>16} {5:>16} {6:>7}".format(
+        "mode", "automatic", "idle", "in frames", "pause ms", "animate late", "missed"))
+    profiler = AllocationProfiler()
+
+    for mode, policy in (("firmware", False), ("policy", True)):
+        heap, tasks, log = run(policy, seconds, args.live, args.churn, args.seed, profiler if policy else None)
+        automatic = [c for c in heap.collections if c[3]]
+        pauses = [c[1] for c in heap.collections]
+        animate = tasks["animate"]
+        print("{0:<10} {1:>10} {2:>6} {3:>10} {4:>16} {5:>16} {6:>7}".format(mode, len(automatic),
+            len(heap.collections) - len(automatic), sum(1 for c in automatic if c[4] == "animate"),
+            "{0:.1f} / {1:.1f}".format(sum(pauses), max(pauses) if pauses else 0),
+            "{0:.1f} / {1}".format(animate["lateMean"], animate["lateMax"]), animate["missed"]))
+
+    print("")
+    print("policy's last collections:")
+    print(log)
+    print("")
+    print("biggest allocators:")
+    print(profiler.formatStats(8))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+# bench_metrics.py
+# How much of main.py's time lib/Metrics.py takes
+#
+# Runs main.py on the simulator (like tools/benchmark.py) with the Metrics methods wrapped to count how often each is
+# called, then times each method on its own over --calls calls.  calls x time per call, over the time main.py itself
+# spent (frame and refresh time from the benchmark, the simulator's checks left out), is the overhead.  report() is
+# timed where it runs as it's only called every METRICS_PERIOD.  The time stamps the hooks take (two monotonic_ns()
+# per refresh) are counted too.
+#
+# The simulator's clock is virtual so the metrics' own times all read 0 here, tools/plot_metrics.py on a capture from
+# the Pico shows the real ones.  Exit code 1 if the overhead is over --limit percent.
+#
+# USAGE:
+#
+#   python3 tools/bench_metrics.py --cycles 4 --limit 1
+import argparse, os, sys, time
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, TOOLS_DIR)
+
+import benchmark
+import Metrics
+import AZ_ST7735S
+
+# Methods counted, report() is timed as it runs instead
+COUNTED = ("observe", "increment", "setGauge", "lowerGauge", "sampleHeap")
+
+# function timeCalls
+# @return seconds one call of each counted method takes
+def timeCalls(calls):
+    metrics = Metrics.Metrics()
+    histogram = metrics.addHistogram("bench")
+    counter = metrics.addCounter("benchCount")
+    gauge = metrics.addGauge("benchGauge")
+    costs = {}
+
+    # Values spread over the buckets like real timings
+    args = {
+        "observe": [(histogram, (i * 7919) % 300000) for i in range(1000)],
+        "increment": [(counter, i) for i in range(1000)],
+        "setGauge": [(gauge, i) for i in range(1000)],
+        "lowerGauge": [(gauge, 1000 - i) for i in range(1000)],
+        "sampleHeap": [() for i in range(1000)],
+    }
+    args["stamp"] = [() for i in range(1000)]
+
+    for name in COUNTED + ("stamp",):
+        method = time.monotonic_ns if name == "stamp" else getattr(metrics, name)
+        values = args[name]
+        started = time.perf_counter()
+
+        for i in range(calls):
+            method(*values[i % 1000])
+
+        costs[name] = (time.perf_counter() - started) / calls
+
+    return costs
+
+def main():
+    parser = argparse.ArgumentParser(description = "Overhead of lib/Metrics.py in main.py")
+    parser.add_argument("--cycles", type = int, default = 4, help = "temperature + slideshow cycles to run")
+    parser.add_argument("--calls", type = int, default = 200000, help = "calls to time each method over")
+    parser.add_argument("--limit", type = float, default = 1.0, help = "overhead in percent that fails")
+    args = parser.parse_args()
+
+    counts = {name: 0 for name in COUNTED}
+    counts["stamp"] = 0
+    reportSeconds = [0, 0]
+    originals = {name: getattr(Metrics.Metrics, name) for name in COUNTED + ("report",)}
+
+    def counting(name):
+        original = originals[name]
+
+        def wrapper(self, *values):
+            counts[name] += 1
+            return original(self, *values)
+
+        return wrapper
+
+    def timedReport(self):
+        started = time.perf_counter()
+        originals["report"](self)
+        reportSeconds[0] += time.perf_counter() - started
+        reportSeconds[1] += 1
+
+    # The refresh hook stamps the time before and after each refresh that sends something
+    refresh = AZ_ST7735S.AZ_ST7735S.refresh
+
+    def countedRefresh(self):
+        sent = refresh(self)
+        counts["stamp"] += 2 if sent else 0
+        return sent
+
+    for name in COUNTED:
+        setattr(Metrics.Metrics, name, counting(name))
+
+    Metrics.Metrics.report = timedReport
+    AZ_ST7735S.AZ_ST7735S.refresh = countedRefresh
+
+    try:
+        recorder = benchmark.runMain(args.cycles * benchmark.CYCLE_SECONDS)
+    finally:
+        for name, original in originals.items():
+            setattr(Metrics.Metrics, name, original)
+
+        AZ_ST7735S.AZ_ST7735S.refresh = refresh
+
+    programSeconds = sum(f["frameMs"] + f["refreshMs"] for f in recorder.frames) / 1000
+    costs = timeCalls(args.calls)
+
+    print("{0:<12} {1:>8} {2:>10} {3:>10}".format("method", "calls", "us/call", "total ms"))
+    total = 0
+
+    for name in COUNTED + ("stamp",):
+        spent = counts[name] * costs[name]
+        total += spent
+        print("{0:<12} {1:>8} {2:>10.2f} {3:>10.2f}".format(name, counts[name], costs[name] * 1000000, spent * 1000))
+
+    total += reportSeconds[0]
+    print("{0:<12} {1:>8} {2:>10.2f} {3:>10.2f}".format("report", reportSeconds[1],
+        reportSeconds[0] / max(1, reportSeconds[1]) * 1000000, reportSeconds[0] * 1000))
+
+    overhead = 100 * total / programSeconds
+    print("metrics {0:.2f}ms of {1:.0f}ms main.py time: {2:.2f}% overhead (limit {3}%)".format(total * 1000,
+        programSeconds * 1000, overhead, args.limit))
+
+    if overhead > args.limit:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+# bench_multidisplay.py
+# Three simulated panels on one Pico: refreshing them all in a fixed order every tick against DisplayManager's round
+# robin refresh
+#
+# Panels "slides" and "graph" share SPI0 and repaint the whole screen every tick (a background change), "fan" is on
+# SPI1 and changes a 16x16 animation frame every tick.  Each loop tick sleeps --tick ms then makes the changes and
+# refreshes.  The bus is modelled as sending --rate bytes a second (displayio renders and sends on the one CPU, so
+# panels on different buses still take turns) by moving the virtual clock on by each refresh's bytes.
+#
+#  refreshes / bytes: what each panel sent (bytes as counted by the simulated bus)
+#  latency:           ms from a change being made to it being on the panel (mean / max)
+#  tick:              ms the loop's refresh step took (mean / max), how long everything else on the loop was held up
+#
+# At the end everything left is flushed and each panel is checked against its display tree (stale must be 0).
+#
+# USAGE:
+#
+#   python3 tools/bench_multidisplay.py --ticks 200 --budget 8192
+import argparse, os, sys
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(TOOLS_DIR)
+sys.path.insert(0, os.path.join(REPO_DIR, "lib"))
+sys.path.insert(0, os.path.join(TOOLS_DIR, "sim"))
+
+import simulator
+import board, displayio
+from DisplayManager import DisplayManager
+
+# name, cs, dc, res, bus, full repaint each tick
+PANELS = (
+    ("slides", board.GP17, board.GP20, board.GP16, 0, True),
+    ("graph", board.GP21, board.GP22, board.GP26, 0, True),
+    ("fan", board.GP13, board.GP14, board.GP15, 1, False),
+)
+
+class Panel:
+    # One simulated panel and the change it makes each tick
+    def __init__(self, name, tft, fullRepaint):
+        self.name = name
+        self.tft = tft
+        self.fullRepaint = fullRepaint
+        self.frame = 0
+        self.changedAt = None
+        self.latencies = []
+        self.bitmap = displayio.Bitmap(16, 16, 2)
+        palette = displayio.Palette(2)
+        palette[0] = 0x000000
+        palette[1] = 0xFFFFFF
+        tft.getScreen().append(displayio.TileGrid(self.bitmap, pixel_shader=palette, x=8, y=8))
+
+    def change(self, now):
+        self.frame += 1
+
+        if self.fullRepaint:
+            # A new colour every time so a repaint that was put off still has something to send
+            self.tft.setBackgroundColour((self.frame * 0x081008) & 0xFFFFFF)
+        else:
+            for y in range(16):
+                for x in range(16):
+                    self.bitmap[x, y] = (x + y + self.frame) % 2
+
+            self.tft.markDirty(8, 8, 16, 16)
+
+        if self.changedAt == None:
+            self.changedAt = now
+
+    def sent(self, now):
+        if self.changedAt != None:
+            self.latencies.append(now - self.changedAt)
+            self.changedAt = None
+
+# function timeBus
+# Makes each display's refresh move the virtual clock on by the time its bytes take and tell the Panel it was sent
+def timeBus(clock, panel, rate):
+    display = panel.tft.getDisplay()
+    refresh = display.refresh
+
+    def timedRefresh(**kwargs):
+        before = display.bytesPushed
+        result = refresh(**kwargs)
+        clock.advance((display.bytesPushed - before) / rate)
+        panel.sent(clock.monotonic() * 1000)
+        return result
+
+    display.refresh = timedRefresh
+
+# function run
+# @param roundRobin: refresh with DisplayManager.refresh() instead of each panel's refresh() in turn
+# @return (panels, tick times in ms, stale panels, DisplayManager.formatStats())
+def run(roundRobin, ticks, tickMs, rate, budget):
+    clock = simulator.VirtualClock()
+    clock.install()
+
+    try:
+        manager = DisplayManager(budget)
+        panels = []
+
+        for name, cs, dc, res, bus, fullRepaint in PANELS:
+            panel = Panel(name, manager.addPanel(name, cs, dc, res, bus), fullRepaint)
+            timeBus(clock, panel, rate)
+            panels.append(panel)
+
+        # Send the first full paint of each panel before timing anything
+        for panel in panels:
+            panel.tft.refresh()
+            panel.latencies = []
+
+        tickTimes = []
+
+        for tick in range(ticks):
+            clock.sleep(tickMs / 1000)
+
+            for panel in panels:
+                panel.change(clock.monotonic() * 1000)
+
+            started = clock.monotonic()
+
+            if roundRobin:
+                manager.refresh()
+            else:
+                for panel in panels:
+                    panel.tft.refresh()
+
+            tickTimes.append((clock.monotonic() - started) * 1000)
+
+        # Flush what's left and check every panel shows its display tree
+        for panel in panels:
+            panel.tft.refresh()
+
+        stale = sum(1 for panel in panels if panel.tft.getDisplay().render() != panel.tft.getDisplay().framebuffer)
+        stats = manager.formatStats()
+    finally:
+        clock.uninstall()
+
+    return panels, tickTimes, stale, stats
+
+def main():
+    parser = argparse.ArgumentParser(description = "Fixed order vs round robin refresh of several panels")
+    parser.add_argument("--ticks", type = int, default = 200)
+    parser.add_argument("--tick", type = float, default = 50, help = "ms the loop sleeps between ticks")
+    parser.add_argument("--rate", type = float, default = 500000, help = "bytes per second displayio gets through")
+    parser.add_argument("--budget", type = int, default = 8192, help = "DisplayManager bytes per refresh() call")
+    args = parser.parse_args()
+
+    print("{0:<12} {1:<8} {2:>10} {3:>10} {4:>14} {5:>14}".format("method", "panel", "refreshes", "bytes", "latency ms", "tick ms"))
+
+    for method, roundRobin in (("fixed", False), ("round robin", True)):
+        panels, tickTimes, stale, stats = run(roundRobin, args.ticks, args.tick, args.rate, args.budget)
+        tick = "{0:.1f} / {1:.1f}".format(sum(tickTimes) / len(tickTimes), max(tickTimes))
+
+        for panel in panels:
+            latency = "{0:.1f} / {1:.1f}".format(sum(panel.latencies) / max(1, len(panel.latencies)), max(panel.latencies))
+            print("{0:<12} {1:<8} {2:>10} {3:>10} {4:>14} {5:>14}".format(method, panel.name,
+                panel.tft.getUpdateCount(), panel.tft.getDisplay().bytesPushed, latency, tick))
+            tick = ""
+
+        if stale > 0:
+            print("{0}: {1} panels didn't match their display tree".format(method, stale))
+
+    print()
+    print(stats)
+
+if __name__ == "__main__":
+    main()
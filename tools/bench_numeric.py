@@ -0,0 +1,107 @@
+# bench_numeric.py
+# Micro-benchmark for reading updates: adafruit_display_text Label vs NumericLabel
+#
+# Feeds the same list of readings (15 to 32, like the dummy temperature sensor) to:
+#
+#  label:    label.Label with text = str(value) + " C" (what ImageLabel.changeText used to do)
+#  numeric:  NumericLabel(2, " C").setValue(value)
+#
+# and prints updates per second and bytes allocated per update.  Bytes are the tracemalloc peak above what was in use
+# before the update, so short lived allocations (the string, the glyph TileGrids) count even though they're freed
+# again.  It also renders both on a simulated display and checks every value looks exactly the same.
+#
+# USAGE:
+#
+#   python3 tools/bench_numeric.py --updates 20000
+import argparse, os, random, sys, time, tracemalloc
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(TOOLS_DIR)
+sys.path.insert(0, os.path.join(REPO_DIR, "lib"))
+sys.path.insert(0, os.path.join(TOOLS_DIR, "sim"))
+
+import displayio, terminalio, board, busio
+from adafruit_display_text import label
+from adafruit_st7735r import ST7735R
+from NumericLabel import NumericLabel
+
+# function makeUpdaters
+# @return {name: (object, function(value))}
+def makeUpdaters():
+    text = label.Label(terminalio.FONT, text = "99 C", color = 0xFFFFFF, x = 5, y = 10, scale = 1)
+    numeric = NumericLabel(2, " C", x = 5, y = 10)
+
+    def updateLabel(value):
+        text.text = str(value) + " C"
+
+    return {
+        "label": (text, updateLabel),
+        "numeric": (numeric.getGroup(), numeric.setValue),
+    }
+
+# function timeUpdates
+# @return updates per second
+def timeUpdates(update, values):
+    start = time.perf_counter()
+
+    for value in values:
+        update(value)
+
+    return len(values) / (time.perf_counter() - start)
+
+# function allocatedPerUpdate
+# @return mean bytes allocated per update
+def allocatedPerUpdate(update, values):
+    total = 0
+    tracemalloc.start()
+
+    for value in values:
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        update(value)
+        total += tracemalloc.get_traced_memory()[1] - before
+
+    tracemalloc.stop()
+    return total / len(values)
+
+# function samePixels
+# @return True if both groups draw the same for every value
+def samePixels(updaters, values):
+    bus = displayio.FourWire(busio.SPI(board.GP18, MOSI = board.GP19), command = board.GP20, chip_select = board.GP17)
+    display = ST7735R(bus, width = 160, height = 128, rotation = 90, bgr = True, auto_refresh = False)
+
+    for value in sorted(set(values)):
+        frames = []
+
+        for name in updaters:
+            group, update = updaters[name]
+            update(value)
+            display.root_group = group
+            frames.append(display.render())
+
+        if frames[0] != frames[1]:
+            return False
+
+    return True
+
+def main():
+    parser = argparse.ArgumentParser(description = "Label vs NumericLabel update benchmark")
+    parser.add_argument("--updates", type = int, default = 20000)
+    args = parser.parse_args()
+
+    random.seed(0)
+    values = [random.randint(15, 32) for i in range(args.updates)]
+    updaters = makeUpdaters()
+
+    print("{0:<8} {1:>14} {2:>16}".format("label", "updates/s", "bytes/update"))
+
+    for name in updaters:
+        update = updaters[name][1]
+        rate = timeUpdates(update, values)
+        allocated = allocatedPerUpdate(update, values[:min(len(values), 2000)])
+        print("{0:<8} {1:>14.0f} {2:>16.1f}".format(name, rate, allocated))
+
+    print("same pixels: " + ("yes" if samePixels(updaters, values) else "NO"))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+# bench_panelimage.py
+# Decode cost of the same images as BMPs (OnDiskBitmap / Python) and as PanelImage files from tools/convert_images.py
+#
+# Each image is converted to an rgb565 and an indexed .pimg and then put on a simulated landscape screen four ways:
+#
+#  OnDiskBitmap:   displayio.OnDiskBitmap in a TileGrid and a refresh.  On the Pico displayio parses the header, walks
+#                  the padded rows and looks up, converts and rotates every pixel in C on each redraw, here the
+#                  simulator does the same work in Python so the ms figure is only a rough guide.
+#  BMP in Python:  ScrollTransition's file reader (full screen images only), what lib code streaming a BMP itself costs
+#  pimg rgb565:    PanelImage.draw(), rows read straight into a buffer and sent, no per pixel work
+#  pimg indexed:   PanelImage.getTileGrid(), one bitmaptools.readinto into a Bitmap, displayio draws it as usual (the
+#                  simulator's readinto is Python too, on the Pico it's one call into C)
+#
+# Columns: file bytes read, pixels the Pico converts per draw, host ms (best of --runs, the bus only counts bytes)
+# and whether the panel ends up showing exactly what the OnDiskBitmap version does.
+#
+# USAGE:
+#
+#   python3 tools/bench_panelimage.py --runs 5
+import argparse, os, sys, tempfile, time
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(TOOLS_DIR)
+sys.path.insert(0, os.path.join(REPO_DIR, "lib"))
+sys.path.insert(0, os.path.join(TOOLS_DIR, "sim"))
+
+import simulator
+import busio, displayio
+import convert_images
+from AZ_ST7735S import AZ_ST7735S
+from PanelImage import PanelImage
+from ScrollTransition import ScrollTransition
+
+ORIENTATION = 90
+
+# Where the smaller images go on the screen
+ICON_X = 10
+ICON_Y = 12
+
+# Images from images/ to try besides the slideshow
+ICONS = ("temperature_1-2.bmp", "fan_1-2.bmp", "lizard.bmp", "humidity.bmp")
+
+# function best
+# @param setup [None]: called before each timed call, what it returns is passed to work
+# @return (best ms of runs calls to work, its last result)
+def best(runs, work, setup = None):
+    times = []
+    result = None
+
+    for i in range(runs):
+        if setup != None:
+            prepared = setup()
+            start = time.perf_counter()
+            result = work(prepared)
+        else:
+            start = time.perf_counter()
+            result = work()
+
+        times.append((time.perf_counter() - start) * 1000)
+
+    return min(times), result
+
+# function countingBus
+# @return FourWire with no panel on it, it only counts what is sent
+def countingBus():
+    return displayio.FourWire(busio.SPI(None), command = None, chip_select = None)
+
+# function screen
+# @return AZ_ST7735S with a black screen already on the panel
+def screen():
+    tft = AZ_ST7735S()
+    tft.initialiseScreen(ORIENTATION, autoRefresh = False)
+    tft.refresh()
+    return tft
+
+# function onDiskBitmap
+# @return TileGrid of the BMP at x, y
+def onDiskBitmap(path, x, y):
+    bitmap = displayio.OnDiskBitmap(path)
+    return displayio.TileGrid(bitmap, pixel_shader = bitmap.pixel_shader, x = x, y = y)
+
+# function reference
+# @return what the panel shows with the BMP drawn by displayio
+def reference(path, x, y):
+    tft = screen()
+    tft.getScreen().append(onDiskBitmap(path, x, y))
+    tft.markDirty(0, 0, tft.getWidth(), tft.getHeight())
+    tft.refresh()
+    return tft.getDisplay().visible()
+
+# function runOnDisk
+# @return (ms, pixels converted)
+def runOnDisk(path, x, y, runs):
+    def work(tft):
+        tft.getScreen().append(onDiskBitmap(path, x, y))
+        tft.markDirty(0, 0, tft.getWidth(), tft.getHeight())
+        tft.refresh()
+
+    ms, result = best(runs, work, screen)
+    width, height = simulator.readBmp(simulator.mapPath(path))[0:2]
+    return ms, width * height
+
+# function runPython
+# @return (ms, pixels converted, matches)
+def runPython(path, runs, expected):
+    tileGrid = onDiskBitmap(path, 0, 0)
+    transition = ScrollTransition(countingBus(), ORIENTATION)
+    ms, result = best(runs, lambda: transition.run(tileGrid, ScrollTransition.WIPE, imagePath = path))
+
+    tft = screen()
+    tft.transitionBackgroundLayer(tileGrid, ScrollTransition.WIPE, imagePath = path)
+    return ms, tileGrid.bitmap.width * tileGrid.bitmap.height, tft.getDisplay().visible() == expected
+
+# function runRgb565
+# @return (ms, pixels converted, matches)
+def runRgb565(path, x, y, runs, expected):
+    bus = countingBus()
+    ms, result = best(runs, lambda: PanelImage(path).draw(bus, x, y))
+
+    tft = screen()
+    tft.drawPanelImage(PanelImage(path), x, y)
+    return ms, 0, tft.getDisplay().visible() == expected
+
+# function runIndexed
+# @return (ms, pixels converted, matches)
+def runIndexed(path, x, y, runs, expected):
+    image = PanelImage(path)
+    ms, result = best(runs, lambda: PanelImage(path).getTileGrid(x, y))
+
+    tft = screen()
+    tft.getScreen().append(image.getTileGrid(x, y))
+    tft.markDirty(0, 0, tft.getWidth(), tft.getHeight())
+    tft.refresh()
+    return ms, image.getWidth() * image.getHeight(), tft.getDisplay().visible() == expected
+
+def main():
+    parser = argparse.ArgumentParser(description = "BMP vs PanelImage decode cost")
+    parser.add_argument("--runs", type = int, default = 5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        simulator.createDeviceRoot(root, os.path.join(REPO_DIR, "images"))
+        simulator.setRoot(root)
+        os.makedirs(os.path.join(root, "images", "pimg"))
+
+        slides = sorted(f for f in os.listdir(os.path.join(root, "images", "slideshow")) if f.endswith(".bmp"))[0:2]
+        images = [("slideshow/" + f, 0, 0) for f in slides] + [(f, ICON_X, ICON_Y) for f in ICONS]
+
+        for name, x, y in images:
+            base = os.path.splitext(os.path.basename(name))[0]
+
+            for format in ("rgb565", "indexed"):
+                convert_images.convert(os.path.join(root, "images", name), os.path.join(root, "images", "pimg", base + "." + format + ".pimg"),
+                                       ORIENTATION, format, True, False)
+
+        simulator.installFilesystem()
+
+        try:
+            print("{0:<22} {1:<14} {2:>8} {3:>10} {4:>9} {5:>6}".format("image", "method", "bytes", "converted", "host ms", "match"))
+
+            for name, x, y in images:
+                path = "/images/" + name
+                base = "/images/pimg/" + os.path.splitext(os.path.basename(name))[0]
+                expected = reference(path, x, y)
+                rows = [("OnDiskBitmap", path) + runOnDisk(path, x, y, args.runs) + (True,)]
+
+                if x == 0 and y == 0:
+                    rows.append(("BMP in Python", path) + runPython(path, args.runs, expected))
+
+                rows.append(("pimg rgb565", base + ".rgb565.pimg") + runRgb565(base + ".rgb565.pimg", x, y, args.runs, expected))
+                rows.append(("pimg indexed", base + ".indexed.pimg") + runIndexed(base + ".indexed.pimg", x, y, args.runs, expected))
+
+                for method, file, ms, converted, match in rows:
+                    print("{0:<22} {1:<14} {2:>8} {3:>10} {4:>9.2f} {5:>6}".format(
+                        os.path.basename(name), method, os.path.getsize(simulator.mapPath(file)), converted, ms, "yes" if match else "NO"))
+        finally:
+            simulator.uninstallFilesystem()
+
+if __name__ == "__main__":
+    main()
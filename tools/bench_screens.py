@@ -0,0 +1,141 @@
+# bench_screens.py
+# RAM vs switch time for ScreenManager watermarks
+#
+# Registers three temperature screens (same layout, standing in for three different screens) with a ScreenManager and
+# shows A -> slideshow -> B -> slideshow -> A -> slideshow -> C ... the way main.py swaps screens, so A is shown twice as
+# often as the others.  Each mode sets a different watermark:
+#
+#  keep:    0, screens are never torn down (fastest switches, most RAM)
+#  lru:     one screen's worth, two built screens fit but the third pushes free memory below it so the least recently
+#           shown one goes (A stays, B and C take turns)
+#  always:  above the heap size, every screen is torn down as soon as it's hidden (least RAM, every show is a build)
+#
+# gc.mem_free() comes from the simulator's gc shim with tracemalloc on.  A screen takes far more heap in CPython than
+# on the Pico, so the simulated heap is sized to hold --fit screens on top of what's already allocated, that keeps the
+# watermarks in proportion.  Every image read costs --open-ms extra, tracemalloc slows everything down so compare the
+# modes with each other rather than with the other benchmarks.
+#
+# USAGE:
+#
+#   python3 tools/bench_screens.py --switches 20 --open-ms 20 --fit 3.5
+import argparse, gc, os, sys, tempfile, time
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(TOOLS_DIR)
+sys.path.insert(0, os.path.join(REPO_DIR, "lib"))
+sys.path.insert(0, os.path.join(TOOLS_DIR, "sim"))
+
+import simulator
+from AZ_ST7735S import AZ_ST7735S
+from ScreenManager import ScreenManager
+from TemperatureScreen import TemperatureScreen
+
+# Screens in the order they are shown
+ORDER = ["A", "B", "A", "C"]
+
+# function screenBuilder
+# @return function that builds a temperature screen drawing on tft
+def screenBuilder(tft):
+    def build():
+        screen = TemperatureScreen("Demo &\nText", "temperature_1-2.bmp", "humidity_1-2.bmp", "fan_1-2.bmp", "decoration.bmp")
+        screen.addAnimationLabel("anim.bmp", portrait = False)
+        screen.setDirtyRegion(tft.getDirtyRegion())
+        screen.setTemperature(21)
+        screen.setHumidity(30)
+        return screen
+
+    return build
+
+# function screenBytes
+# @return heap bytes one built temperature screen takes
+def screenBytes(tft):
+    gc.collect()
+    before = gc.mem_alloc()
+    screen = screenBuilder(tft)()
+    used = gc.mem_alloc() - before
+    screen = None
+    gc.collect()
+    return used
+
+# function runMode
+# @param tft: initialised AZ_ST7735S
+# @param watermark: ScreenManager watermark
+# @param switches: number of screen shows
+# @return (list of show ms, lowest gc.mem_free while the slideshow was up, ScreenManager stats)
+def runMode(tft, watermark, switches):
+    screens = ScreenManager(tft.getScreen(), watermark = watermark)
+    for name in ("A", "B", "C"):
+        screens.addScreen(name, screenBuilder(tft))
+
+    showMs = []
+    lowestFree = None
+
+    for i in range(switches):
+        start = time.perf_counter()
+        screens.show(ORDER[i % len(ORDER)])
+        tft.refresh()
+        showMs.append((time.perf_counter() - start) * 1000)
+
+        screens.show(None)
+        tft.refresh()
+        gc.collect()
+        free = gc.mem_free()
+
+        if lowestFree == None or free < lowestFree:
+            lowestFree = free
+
+    for name in screens.getStats():
+        screens.release(name)
+
+    return showMs, lowestFree, screens.getStats()
+
+def main():
+    parser = argparse.ArgumentParser(description = "ScreenManager watermark benchmark")
+    parser.add_argument("--switches", type = int, default = 20)
+    parser.add_argument("--fit", type = float, default = 3.5, help = "screens that fit in the simulated heap")
+    parser.add_argument("--open-ms", type = float, default = 20, help = "simulated flash delay per image read")
+    args = parser.parse_args()
+
+    heapSize = simulator.HEAP_SIZE
+
+    with tempfile.TemporaryDirectory() as root:
+        simulator.createDeviceRoot(root, os.path.join(REPO_DIR, "images"))
+        simulator.setRoot(root)
+        simulator.installFilesystem()
+        simulator.installGc(trace = True)
+
+        try:
+            tft = AZ_ST7735S()
+            tft.initialiseScreen(90, autoRefresh = False)
+            perScreen = screenBytes(tft)
+            gc.collect()
+            simulator.HEAP_SIZE = gc.mem_alloc() + int(perScreen * args.fit)
+
+            modes = [
+                ("keep", 0),
+                ("lru", perScreen),
+                ("always", simulator.HEAP_SIZE + 1),
+            ]
+
+            simulator.setReadDelay(args.open_ms)
+            print("one screen: {0} bytes of heap".format(perScreen))
+            print("{0:<8} {1:>10} {2:>10} {3:>10} {4:>8} {5:>10} {6:>12} {7:>12}".format(
+                "mode", "watermark", "show mean", "show max", "builds", "teardowns", "teardown ms", "lowest free"))
+
+            for mode, watermark in modes:
+                showMs, lowestFree, stats = runMode(tft, watermark, args.switches)
+                builds = sum(s["builds"] for s in stats.values())
+                teardowns = sum(s["teardowns"] for s in stats.values())
+                teardownMs = max(s["teardownMsMean"] for s in stats.values())
+                print("{0:<8} {1:>10} {2:>10.2f} {3:>10.2f} {4:>8} {5:>10} {6:>12.2f} {7:>12}".format(
+                    mode, watermark, sum(showMs) / len(showMs), max(showMs), builds, teardowns, teardownMs, lowestFree))
+
+            print("(times in ms, heap {0} bytes, simulated flash delay {1} ms per image read, teardowns include the ones at the end)".format(
+                simulator.HEAP_SIZE, args.open_ms))
+        finally:
+            simulator.setReadDelay(0)
+            simulator.HEAP_SIZE = heapSize
+            simulator.uninstallFilesystem()
+
+if __name__ == "__main__":
+    main()
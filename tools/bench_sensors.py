@@ -0,0 +1,100 @@
+# bench_sensors.py
+# A slow sensor read in place (what a driver library's read() does) against
+# SensorReader's trigger now / collect later, next to an animation task on the same Scheduler
+#
+# The sensor is a SimulatedSensorDriver taking --read ms to answer and failing --fail of the time.  "blocking" reads
+# it the way a driver library does: trigger, wait out the read time (the virtual clock is moved on, like a busy wait
+# or time.sleep() inside the callback) then collect, every --period ms.  "reader" adds it to a SensorReader polled by
+# a Scheduler task that wakes when the next step is due.  The animation task runs every --frame ms.
+#
+#  frame late: how late the animation task started (mean / max ms), missed: frames it had to skip
+#  reads / failed: sensor reads and how many failed (the reader backs off after a failure)
+#  latency: ms from starting a read to having the value
+#  wakes: times the sensor task ran
+#
+# USAGE:
+#
+#   python3 tools/bench_sensors.py --read 250 --fail 0.1
+import argparse, os, random, sys
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(TOOLS_DIR)
+sys.path.insert(0, os.path.join(REPO_DIR, "lib"))
+sys.path.insert(0, os.path.join(TOOLS_DIR, "sim"))
+
+import simulator
+from Scheduler import Scheduler
+from SensorReader import SensorReader
+from SimulatedSensorDriver import SimulatedSensorDriver
+
+# function run
+# @param blocking: read the sensor in place instead of with a SensorReader
+# @return (Scheduler stats, reads, failures, latency mean, latency max)
+def run(blocking, seconds, readMs, failRate, periodMs, frameMs, seed):
+    random.seed(seed)
+    clock = simulator.VirtualClock()
+    clock.install()
+    clock.installAsyncio()
+
+    try:
+        driver = SimulatedSensorDriver(lambda: (random.uniform(15, 32), random.uniform(10, 50)), readTime = readMs, failRate = failRate)
+        reader = SensorReader(budget = 5)
+        reader.addSensor("climate", driver, periodMs)
+        scheduler = Scheduler()
+        blockingCounts = [0, 0, 0, 0]
+
+        def readInPlace():
+            started = clock.monotonic()
+            driver.trigger()
+            clock.advance(readMs / 1000)
+            values = driver.collect()
+            blockingCounts[0] += 1
+
+            if values == None:
+                blockingCounts[1] += 1
+            else:
+                latency = (clock.monotonic() - started) * 1000
+                blockingCounts[2] += latency
+                blockingCounts[3] = max(blockingCounts[3], latency)
+
+        def stop():
+            if clock.monotonic() >= seconds:
+                scheduler.stop()
+
+        scheduler.addTask("frame", frameMs, lambda: None)
+        scheduler.addTask("sensor", periodMs, readInPlace if blocking else reader.poll)
+        scheduler.addTask("stop", 1000, stop)
+        scheduler.run()
+    finally:
+        clock.uninstall()
+
+    if blocking:
+        reads, failures, latencyTotal, latencyMax = blockingCounts
+        return scheduler.getStats(), reads, failures, latencyTotal / max(1, reads - failures), latencyMax
+
+    stats = reader.getStats()["climate"]
+    return scheduler.getStats(), stats["reads"], stats["failures"], stats["latencyMean"], stats["latencyMax"]
+
+def main():
+    parser = argparse.ArgumentParser(description = "Blocking sensor reads vs SensorReader")
+    parser.add_argument("--seconds", type = float, default = 120)
+    parser.add_argument("--read", type = int, default = 250, help = "ms the sensor takes to answer")
+    parser.add_argument("--fail", type = float, default = 0.1, help = "fraction of reads that fail")
+    parser.add_argument("--period", type = int, default = 2000, help = "ms between sensor reads")
+    parser.add_argument("--frame", type = int, default = 100, help = "ms between animation frames")
+    parser.add_argument("--seed", type = int, default = 1)
+    args = parser.parse_args()
+
+    print("{0:<10} {1:>14} {2:>8} {3:>6} {4:>8} {5:>16} {6:>6}".format(
+        "method", "frame late ms", "missed", "reads", "failed", "latency ms", "wakes"))
+
+    for method, blocking in (("blocking", True), ("reader", False)):
+        tasks, reads, failures, latencyMean, latencyMax = run(blocking, args.seconds, args.read, args.fail, args.period,
+            args.frame, args.seed)
+        frame = tasks["frame"]
+        print("{0:<10} {1:>14} {2:>8} {3:>6} {4:>8} {5:>16} {6:>6}".format(method,
+            "{0:.1f} / {1}".format(frame["lateMean"], frame["lateMax"]), frame["missed"], reads, failures,
+            "{0:.1f} / {1:.1f}".format(latencyMean, latencyMax), tasks["sensor"]["runs"]))
+
+if __name__ == "__main__":
+    main()
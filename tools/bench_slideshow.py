@@ -0,0 +1,85 @@
+# bench_slideshow.py
+# Swap latency benchmark for slideshow images: loading on demand vs SlideShowLoader prefetching
+#
+# Opening a file on the Pico's flash is slow, that is modelled here by adding --open-ms of delay every time the
+# simulator reads a BMP (OnDiskBitmap or adafruit_imageload).  For each swap the time from "switch now" to layer 0
+# pointing at the new image is measured, then the refresh that sends it to the panel separately.
+#
+#  cold:    SlideShowLoader.take() with nothing prefetched (the image is opened at swap time, like the old code)
+#  warm:    prefetch() is called first (while the temperature screen would be up), only take() is timed
+#  cached:  as warm but with a RAM cache big enough to hold every slide, so after the first deck no file is opened
+#
+# USAGE:
+#
+#   python3 tools/bench_slideshow.py --swaps 20 --open-ms 30
+import argparse, os, sys, tempfile, time
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(TOOLS_DIR)
+sys.path.insert(0, os.path.join(REPO_DIR, "lib"))
+sys.path.insert(0, os.path.join(TOOLS_DIR, "sim"))
+
+import simulator
+from AZ_ST7735S import AZ_ST7735S
+from SlideShowScreen import SlideShowScreen
+from SlideShowLoader import SlideShowLoader
+
+# function runMode
+# @param mode: "cold", "warm" or "cached"
+# @param swaps: number of slideshow swaps
+# @return (list of swap ms, list of refresh ms, loader stats)
+def runMode(mode, swaps):
+    tft = AZ_ST7735S()
+    tft.initialiseScreen(90, autoRefresh = False)
+    slideshow = SlideShowScreen(width = tft.getWidth(), height = tft.getHeight())
+    budget = 1024 * 1024 if mode == "cached" else 0
+    loader = SlideShowLoader(slideshow, cacheBudget = budget)
+
+    swapMs = []
+    refreshMs = []
+
+    for i in range(swaps):
+        # The temperature screen would be showing here
+        tft.setBackgroundColour(0x000088)
+        tft.refresh()
+
+        if mode != "cold":
+            loader.prefetch()
+
+        start = time.perf_counter()
+        slide = loader.take()
+        tft.setBackgroundLayer(slide[1])
+        swapMs.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        tft.refresh()
+        refreshMs.append((time.perf_counter() - start) * 1000)
+
+    return swapMs, refreshMs, loader.getStats()
+
+def main():
+    parser = argparse.ArgumentParser(description = "Slideshow swap latency benchmark")
+    parser.add_argument("--swaps", type = int, default = 20)
+    parser.add_argument("--open-ms", type = float, default = 20, help = "simulated flash delay per image read")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        simulator.createDeviceRoot(root, os.path.join(REPO_DIR, "images"))
+        simulator.setRoot(root)
+        simulator.installFilesystem()
+        simulator.setReadDelay(args.open_ms)
+
+        print("{0:<8} {1:>10} {2:>10} {3:>10} {4:>12} {5:>10} {6:>10}".format("mode", "swap mean", "swap max", "swap last", "refresh mean", "cold takes", "cache hits"))
+
+        try:
+            for mode in ("cold", "warm", "cached"):
+                swapMs, refreshMs, stats = runMode(mode, args.swaps)
+                print("{0:<8} {1:>10.2f} {2:>10.2f} {3:>10.2f} {4:>12.2f} {5:>10} {6:>10}".format(
+                    mode, sum(swapMs) / len(swapMs), max(swapMs), swapMs[-1], sum(refreshMs) / len(refreshMs), stats["coldTakes"], stats["cacheHits"]))
+        finally:
+            simulator.uninstallFilesystem()
+
+    print("(times in ms, simulated flash delay {0} ms per image read)".format(args.open_ms))
+
+if __name__ == "__main__":
+    main()
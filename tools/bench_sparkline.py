@@ -0,0 +1,150 @@
+# bench_sparkline.py
+# Per sample cost of the Sparkline history graph
+#
+# Feeds --samples readings (a slow wave with noise) to a 60 x 12 Sparkline in scroll and sweep mode and compares with
+# redrawing the whole graph bitmap every sample (clear it, draw every line again, what a simple chart would do).
+# For each it prints per sample:
+#  - pixel writes into the bitmap
+#  - tile number writes into the TileGrid (scroll mode moves the ring buffer origin this way)
+#  - bytes the dirty windows cost on the SPI bus
+#  - heap growth over the whole run (tracemalloc, should be 0)
+#
+# Then checks the history survives a rebuild in both modes once the ring buffer has wrapped: a Sparkline's
+# getSamples() -> setSamples() on a new one, and the temperature screen's getState() -> setState() the way
+# ScreenManager does it.  Exit code 1 if any comes back different.
+#
+# USAGE:
+#
+#   python3 tools/bench_sparkline.py --samples 2000
+import argparse, math, os, random, sys, tempfile, tracemalloc
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(TOOLS_DIR)
+sys.path.insert(0, os.path.join(REPO_DIR, "lib"))
+sys.path.insert(0, os.path.join(TOOLS_DIR, "sim"))
+
+import simulator
+from DirtyRegion import DirtyRegion
+from Sparkline import Sparkline
+from TemperatureScreen import TemperatureScreen
+
+WIDTH = 60
+HEIGHT = 12
+
+# function readings
+# @return list of samples between 10 and 35
+def readings(count):
+    random.seed(0)
+    return [22 + 8 * math.sin(i / 40) + random.uniform(-1, 1) for i in range(count)]
+
+# function redrawCost
+# Pixel writes to clear and redraw a WIDTH x HEIGHT graph with the last WIDTH samples joined by lines
+def redrawCost(history):
+    writes = WIDTH * HEIGHT
+    previous = None
+
+    for value in history:
+        row = int((35 - min(35, max(10, value))) * (HEIGHT - 1) / 25 + 0.5)
+
+        if previous != None:
+            writes += abs(row - previous) + 1
+        else:
+            writes += 1
+
+        previous = row
+
+    return writes
+
+# function runSparkline
+# @return (pixel writes, tile writes, bus bytes, heap growth) totals
+def runSparkline(samples, scroll):
+    dirty = DirtyRegion(160, 128)
+    graph = Sparkline(5, 58, WIDTH, HEIGHT, 10, 35, scroll = scroll)
+    graph.setDirtyRegion(dirty)
+    busBytes = 0
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+
+    for value in samples:
+        graph.addSample(value)
+        busBytes += dirty.cost()
+        dirty.clear()
+
+    growth = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    stats = graph.getStats()
+    return stats["pixelWrites"], stats["tileWrites"], busBytes, growth
+
+# function graphRoundTrip
+# @return True if a graph's samples come back the same after getSamples() -> setSamples() on a new graph
+def graphRoundTrip(samples, scroll):
+    graph = Sparkline(0, 0, 10, HEIGHT, 10, 35, scroll = scroll)
+
+    for value in samples[:25]:
+        graph.addSample(value)
+
+    saved = graph.getSamples()
+    rebuilt = Sparkline(0, 0, 10, HEIGHT, 10, 35, scroll = scroll)
+    rebuilt.setSamples(saved)
+    return rebuilt.getSamples() == saved and len(saved) >= 9
+
+# function screenRoundTrip
+# @return True if the temperature screen's graphs come back the same after getState() -> setState() on a new screen
+def screenRoundTrip(samples, scroll):
+    def build():
+        screen = TemperatureScreen("Demo &\nText", "temperature_1-2.bmp", "humidity_1-2.bmp", "fan_1-2.bmp", "decoration.bmp")
+        screen.addGraphs(scroll)
+        return screen
+
+    screen = build()
+
+    for value in samples[:WIDTH + 15]:
+        screen.addGraphSamples(value, value * 2)
+
+    state = screen.getState()
+    rebuilt = build()
+    rebuilt.setState(state)
+    return rebuilt.getState() == state
+
+def main():
+    parser = argparse.ArgumentParser(description = "Sparkline per sample cost")
+    parser.add_argument("--samples", type = int, default = 2000)
+    args = parser.parse_args()
+
+    samples = readings(args.samples)
+    count = len(samples)
+    fullBytes = DirtyRegion(160, 128)
+    fullBytes.mark(5, 58, WIDTH, HEIGHT)
+    redrawWrites = sum(redrawCost(samples[max(0, i - WIDTH + 1):i + 1]) for i in range(count))
+
+    print("{0} x {1} graph, {2} samples".format(WIDTH, HEIGHT, count))
+    print("{0:<8} {1:>14} {2:>14} {3:>14} {4:>12}".format("mode", "pixels/sample", "tiles/sample", "bus bytes", "heap growth"))
+    print("{0:<8} {1:>14.1f} {2:>14.1f} {3:>14.1f} {4:>12}".format("redraw", redrawWrites / count, 0, fullBytes.cost(), "-"))
+
+    for name, scroll in (("scroll", True), ("sweep", False)):
+        pixels, tiles, busBytes, growth = runSparkline(samples, scroll)
+        print("{0:<8} {1:>14.1f} {2:>14.1f} {3:>14.1f} {4:>12}".format(name, pixels / count, tiles / count, busBytes / count, growth))
+
+    same = True
+
+    with tempfile.TemporaryDirectory() as root:
+        simulator.createDeviceRoot(root, os.path.join(REPO_DIR, "images"))
+        simulator.setRoot(root)
+        simulator.installFilesystem()
+
+        try:
+            for name, scroll in (("scroll", True), ("sweep", False)):
+                graph = graphRoundTrip(samples, scroll)
+                screen = screenRoundTrip(samples, scroll)
+                same = same and graph and screen
+                print("{0} round trip: graph {1}, screen {2}".format(name, "ok" if graph else "DIFFERENT", "ok" if screen else "DIFFERENT"))
+        finally:
+            simulator.uninstallFilesystem()
+
+    if not same:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+# bench_textcache.py
+# Static text drawn by adafruit_display_text's Label vs a CachedLabel from lib/TextCache.py
+#
+# For the temperature screen's title ("Demo &\nText" at scale 2) and the fan's "Off" it prints per label:
+#  - TileGrids: layers displayio goes through for every refresh that covers the label
+#  - render ms: host time to draw the label into the simulated display's framebuffer (--renders times), the part of a
+#               refresh the label costs
+#  - bytes: what building the label allocates on the Pico (the simulator's heap model, the cached bitmap included)
+#  - change ms / bytes: switching "On" <-> "Off" (--changes times), the cached text comes from the cache each time
+# and checks both draw exactly the same pixels, also for text with a character the font doesn't have (left out by both).
+#
+# Then the cache's LRU under a byte budget: --lookups lookups of a set of strings picked with a few of them far more
+# often than the rest (like a screen's title and states vs the odd message), hit rate and bytes kept per budget.
+#
+# USAGE:
+#
+#   python3 tools/bench_textcache.py --renders 200 --changes 2000
+import argparse, os, random, sys, time
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(TOOLS_DIR)
+sys.path.insert(0, os.path.join(REPO_DIR, "lib"))
+sys.path.insert(0, os.path.join(TOOLS_DIR, "sim"))
+
+import displayio, terminalio, simulator
+from adafruit_display_text import label
+from TextCache import TextCache
+from CachedLabel import CachedLabel
+
+WIDTH = 160
+HEIGHT = 128
+
+# (name, text, scale, x, y) as on the temperature screen
+LABELS = (
+    ("title", "Demo &\nText", 2, 5, 12),
+    ("fan", "Off", 1, 105, 65),
+)
+
+# Text with a character terminalio.FONT doesn't have (get_glyph returns None)
+MISSING_GLYPH = "21\u00b0C"
+
+# function countTileGrids
+# @return TileGrids in a group and its children
+def countTileGrids(group):
+    if isinstance(group, displayio.TileGrid):
+        return 1
+
+    return sum(countTileGrids(child) for child in group)
+
+# function render
+# @return framebuffer with the group drawn over a black background
+def render(group):
+    fb = [0] * (WIDTH * HEIGHT)
+    group.render(fb, WIDTH, HEIGHT)
+    return fb
+
+# function timeRenders
+# @return ms per render
+def timeRenders(group, renders):
+    start = time.perf_counter()
+
+    for i in range(renders):
+        render(group)
+
+    return (time.perf_counter() - start) * 1000 / renders
+
+# function makeLabels
+# @return {kind: (group, setText(text))} for one of LABELS, with the bytes building each allocated
+def makeLabels(heap, cache, text, scale, x, y):
+    labels = {}
+    before = heap.allocated
+    live = label.Label(terminalio.FONT, text = text, color = 0xFFFFFF, x = x, y = y, scale = scale)
+    labels["label"] = (live, lambda t: setattr(live, "text", t), heap.allocated - before)
+
+    before = heap.allocated
+    cached = CachedLabel(cache, text, x, y, 0xFFFFFF, scale)
+    labels["cached"] = (cached.getGroup(), cached.setText, heap.allocated - before)
+    return labels
+
+# function timeChanges
+# @return (ms per change, bytes per change)
+def timeChanges(heap, setText, changes):
+    texts = ("On", "Off")
+    before = heap.allocated
+    start = time.perf_counter()
+
+    for i in range(changes):
+        setText(texts[i % 2])
+
+    return (time.perf_counter() - start) * 1000 / changes, (heap.allocated - before) / changes
+
+# function lruRun
+# @return (hit rate, bytes kept) for lookups of the workload with the given budget
+def lruRun(workload, budget):
+    cache = TextCache(budget)
+
+    for text in workload:
+        cache.get(text)
+
+    stats = cache.getStats()
+    return stats["hits"] / len(workload), stats["bytes"]
+
+def main():
+    parser = argparse.ArgumentParser(description = "Label vs CachedLabel for static text")
+    parser.add_argument("--renders", type = int, default = 200, help = "renders to time each label over")
+    parser.add_argument("--changes", type = int, default = 2000, help = "On / Off changes to time")
+    parser.add_argument("--lookups", type = int, default = 5000, help = "lookups for the LRU budget sweep")
+    args = parser.parse_args()
+
+    heap = simulator.installHeap(simulator.VirtualClock(), 0)
+    cache = TextCache()
+    same = True
+
+    try:
+        print("{0:<7} {1:<7} {2:>9} {3:>10} {4:>7} {5:>10} {6:>13}".format(
+            "text", "kind", "TileGrids", "render ms", "bytes", "change ms", "change bytes"))
+
+        for name, text, scale, x, y in LABELS:
+            labels = makeLabels(heap, cache, text, scale, x, y)
+            frames = []
+
+            for kind, (group, setText, built) in labels.items():
+                frames.append(render(group))
+                renderMs = timeRenders(group, args.renders)
+                changeMs, changeBytes = ("", "")
+
+                if name == "fan":
+                    changeMs, changeBytes = timeChanges(heap, setText, args.changes)
+                    changeMs = "{0:.4f}".format(changeMs)
+                    changeBytes = "{0:.0f}".format(changeBytes)
+
+                print("{0:<7} {1:<7} {2:>9} {3:>10.3f} {4:>7} {5:>10} {6:>13}".format(
+                    name, kind, countTileGrids(group), renderMs, built, changeMs, changeBytes))
+
+            same = same and frames[0] == frames[1]
+
+        missing = [render(group) for group, setText, built in makeLabels(heap, cache, MISSING_GLYPH, 1, 5, 40).values()]
+        same = same and missing[0] == missing[1]
+
+        print("same pixels: " + ("yes" if same else "NO"))
+        print("")
+
+        # A screen's worth of strings used all the time, then messages that only come up now and then
+        random.seed(0)
+        common = ["Demo &\nText", "On", "Off", "Fan", "Temp", "Humidity"]
+        rare = ["Message {0}".format(i) for i in range(40)]
+        workload = [random.choice(common) if random.random() < 0.9 else random.choice(rare) for i in range(args.lookups)]
+        print("{0:>8} {1:>9} {2:>7}".format("budget", "hit rate", "bytes"))
+
+        for budget in (256, 512, 1024, 2048, 4096, 8192):
+            rate, kept = lruRun(workload, budget)
+            print("{0:>8} {1:>8.1f}% {2:>7}".format(budget, rate * 100, kept))
+    finally:
+        simulator.uninstallHeap()
+
+    if not same:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+# bench_timeline.py
+# Tick stepped animation (one tile per animate() call, what TemperatureScreen did) against the Timeline
+#
+# An animation is driven by a 250 ms tick for --seconds of virtual time, with some ticks held up by a random stall (as
+# if a slideshow image load or a sensor read ran long).  After each tick the frame each method shows is compared with
+# the frame the animation should be on for the time that has passed:
+#
+#  drift:   frames behind where it should be at the end (tick stepping loses a frame for every missed tick and can't go
+#           faster than the tick)
+#  max err: the furthest off it ever was
+#  changes: pictures changed (each one is a dirty tile and SPI bytes)
+#  dropped: frames the Timeline skipped to catch up
+#
+# Every other --hide seconds the screen is hidden: the Timeline pauses (no picture changes, no time counted) and the
+# expected frame doesn't move on either.
+#
+# Then checks a frame rate of 0 holds an animation on its frame (added at 0 and set to 0 while playing) and that it
+# carries on from that frame once it has a rate again, exit code 1 if not.
+#
+# USAGE:
+#
+#   python3 tools/bench_timeline.py --fps 4 --stall 0.2
+import argparse, os, random, sys
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(TOOLS_DIR)
+sys.path.insert(0, os.path.join(REPO_DIR, "lib"))
+sys.path.insert(0, os.path.join(TOOLS_DIR, "sim"))
+
+import simulator
+import displayio
+from Timeline import Timeline
+
+TICK_MS = 250
+TILES = 17
+
+class CountingLabel:
+    # Stands in for an ImageLabel, only counts picture changes
+    def __init__(self):
+        self.group = displayio.Group()
+        self.tile = 0
+        self.changes = 0
+
+    def getGroup(self):
+        return self.group
+
+    def getNumberOfTiles(self):
+        return TILES
+
+    def changePicture(self, tileNo):
+        if tileNo != self.tile:
+            self.changes += 1
+
+        self.tile = tileNo
+
+    def togglePicture(self):
+        self.changePicture((self.tile + 1) % TILES)
+
+# function run
+# @param useTimeline: drive the label with a Timeline instead of togglePicture() per tick
+# @return (drift, max error, picture changes, dropped)
+def run(useTimeline, fps, seconds, stall, stallChance, hide, seed):
+    random.seed(seed)
+    clock = simulator.VirtualClock()
+    clock.install()
+    screen = displayio.Group()
+    label = CountingLabel()
+    screen.append(label.getGroup())
+    timeline = Timeline()
+    timeline.add("animation", label, fps, group = screen)
+    visibleMs = 0
+    toggles = 0
+    worst = 0
+    error = 0
+
+    try:
+        while clock.monotonic() < seconds:
+            # Time passes: a tick, sometimes held up
+            delay = TICK_MS / 1000
+
+            if random.random() < stallChance:
+                delay += random.uniform(0, stall)
+
+            if not screen.hidden:
+                visibleMs += delay * 1000
+
+            clock.sleep(delay)
+            screen.hidden = hide > 0 and int(clock.monotonic() // hide) % 2 == 1
+
+            if useTimeline:
+                timeline.update()
+            elif not screen.hidden:
+                label.togglePicture()
+                toggles += 1
+
+            # Frames played so far (not wrapped round the tiles) against how many there should have been
+            if not screen.hidden:
+                played = timeline.get("animation").step if useTimeline else toggles
+                error = int(visibleMs * fps // 1000) - played
+                worst = max(worst, abs(error))
+    finally:
+        clock.uninstall()
+
+    return error, worst, label.changes, timeline.getStats()["animation"]["dropped"] if useTimeline else 0
+
+# function holdCheck
+# @return True if an animation at 0 fps stays on its frame and carries on from it at the next setFps()
+def holdCheck():
+    fps = 4
+    clock = simulator.VirtualClock()
+    clock.install()
+    label = CountingLabel()
+    timeline = Timeline()
+    frames = []
+
+    try:
+        timeline.add("animation", label, 0)
+
+        for rate in (0, fps, 0, fps):
+            timeline.setFps("animation", rate)
+
+            for i in range(4):
+                clock.sleep(1 / fps)
+                timeline.update()
+                frames.append(label.tile)
+    finally:
+        clock.uninstall()
+
+    # Held on the first frame, four frames, held, four more
+    return frames == [0] * 4 + [1, 2, 3, 4] + [4] * 4 + [5, 6, 7, 8]
+
+def main():
+    parser = argparse.ArgumentParser(description = "Tick stepped animation vs Timeline")
+    parser.add_argument("--fps", type = float, default = 4)
+    parser.add_argument("--seconds", type = float, default = 120)
+    parser.add_argument("--stall", type = float, default = 0.2, help = "longest a stalled tick is held up (seconds)")
+    parser.add_argument("--chance", type = float, default = 0.1, help = "fraction of ticks that stall")
+    parser.add_argument("--hide", type = float, default = 10, help = "seconds shown / hidden in turn, 0 to always show")
+    parser.add_argument("--seed", type = int, default = 1)
+    args = parser.parse_args()
+
+    print("{0:<10} {1:>6} {2:>8} {3:>8} {4:>8}".format("method", "drift", "max err", "changes", "dropped"))
+
+    for name, useTimeline in (("tick", False), ("timeline", True)):
+        drift, worst, changes, dropped = run(useTimeline, args.fps, args.seconds, args.stall, args.chance, args.hide, args.seed)
+        print("{0:<10} {1:>6} {2:>8} {3:>8} {4:>8}".format(name, drift, worst, changes, dropped))
+
+    held = holdCheck()
+    print("fps 0 hold: " + ("ok" if held else "WRONG"))
+
+    if not held:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+# bench_transition.py
+# Bytes per slideshow transition: hard cut vs a software slide vs the ST7735 scroll register transitions
+#
+# For each orientation the screen starts on one slideshow image and changes to the next:
+#
+#  cut:             setBackgroundLayer() and one refresh, the full 40 KB frame in one go (what main.py did before)
+#  software slide:  both images as TileGrids moved a strip at a time by displayio, a refresh per step
+#  slide / wipe / reveal:  AZ_ST7735S.transitionBackgroundLayer(), the panel scrolls (slide) and only strips of the
+#                   new image are sent
+#
+# The simulated panel acts on VSCRDEF / VSCSAD and the RAM writes in software, so after each transition what it shows
+# is checked against what displayio would draw ("match") and the scroll has to be back at 0.  Each transition is run
+# with the image read from the file (OnDiskBitmap) and decoded into RAM (adafruit_imageload).
+#
+# USAGE:
+#
+#   python3 tools/bench_transition.py --steps 16
+import argparse, os, sys, tempfile
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(TOOLS_DIR)
+sys.path.insert(0, os.path.join(REPO_DIR, "lib"))
+sys.path.insert(0, os.path.join(TOOLS_DIR, "sim"))
+
+import simulator
+import displayio
+import adafruit_imageload
+from AZ_ST7735S import AZ_ST7735S
+from ScrollTransition import ScrollTransition
+
+EFFECTS = (("slide", ScrollTransition.SLIDE), ("wipe", ScrollTransition.WIPE), ("reveal", ScrollTransition.REVEAL))
+
+# function loadSlide
+# @param path: device path of the image
+# @param ram: decode into a Bitmap instead of using OnDiskBitmap
+# @return TileGrid
+def loadSlide(path, ram):
+    if ram:
+        bitmap, palette = adafruit_imageload.load(path, bitmap = displayio.Bitmap, palette = displayio.Palette)
+        return displayio.TileGrid(bitmap, pixel_shader = palette)
+
+    bitmap = displayio.OnDiskBitmap(path)
+    return displayio.TileGrid(bitmap, pixel_shader = bitmap.pixel_shader)
+
+# function startScreen
+# @return AZ_ST7735S showing the first slide, auto refresh off
+def startScreen(orientation, first, ram):
+    tft = AZ_ST7735S()
+    tft.initialiseScreen(orientation, autoRefresh = False)
+    tft.setBackgroundLayer(loadSlide(first, ram))
+    tft.refresh()
+    return tft
+
+# function matches
+# @return True if the panel shows what displayio would draw and isn't left scrolled
+def matches(display):
+    return display.visible() == display.render() and display.memoryLine(0) == 0
+
+# function runCut
+# @return (bytes, steps, match)
+def runCut(orientation, first, second, ram):
+    tft = startScreen(orientation, first, ram)
+    display = tft.getDisplay()
+    before = display.bytesPushed
+    tft.setBackgroundLayer(loadSlide(second, ram))
+    tft.refresh()
+    return display.bytesPushed - before, 1, matches(display)
+
+# function runSoftwareSlide
+# Moves the old image out and the new one in along the same axis as the hardware slide, a refresh per step
+# @return (bytes, steps, match)
+def runSoftwareSlide(orientation, first, second, ram, steps):
+    tft = startScreen(orientation, first, ram)
+    display = tft.getDisplay()
+    screen = tft.getScreen()
+    old = screen[0]
+    new = loadSlide(second, ram)
+    screen.append(new)
+    landscape = orientation == 90 or orientation == 270
+    size = tft.getWidth() if landscape else tft.getHeight()
+    band = (size + steps - 1) // steps
+    before = display.bytesPushed
+    count = 0
+
+    for done in range(band, size + band, band):
+        offset = min(size, done)
+
+        if landscape:
+            old.x = -offset
+            new.x = size - offset
+        else:
+            old.y = -offset
+            new.y = size - offset
+
+        tft.markDirty(0, 0, tft.getWidth(), tft.getHeight())
+        tft.refresh()
+        count += 1
+
+    return display.bytesPushed - before, count, matches(display)
+
+# function runTransition
+# @return (bytes, steps, match, ScrollTransition stats)
+def runTransition(orientation, first, second, ram, effect, steps, imagePath):
+    tft = startScreen(orientation, first, ram)
+    display = tft.getDisplay()
+    before = display.bytesPushed
+    transitioned = tft.transitionBackgroundLayer(loadSlide(second, ram), effect, imagePath = imagePath, steps = steps)
+    stats = tft.getTransitionStats()
+
+    # Anything still waiting for a refresh would go out here and show up in the bytes
+    tft.refresh()
+    return display.bytesPushed - before, stats["lastSteps"] if transitioned else 1, matches(display), stats
+
+def main():
+    parser = argparse.ArgumentParser(description = "Slideshow transition bytes")
+    parser.add_argument("--steps", type = int, default = 16, help = "strips each transition is sent in")
+    parser.add_argument("--orientations", default = "90,0,270,180")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        simulator.createDeviceRoot(root, os.path.join(REPO_DIR, "images"))
+        simulator.setRoot(root)
+        simulator.installFilesystem()
+
+        try:
+            for orientation in [int(o) for o in args.orientations.split(",")]:
+                directory = "/images/slideshow" if orientation in (90, 270) else "/images/slideshow_portrait"
+                slides = sorted(f for f in os.listdir(directory) if f.endswith(".bmp"))
+                first = directory + "/" + slides[0]
+                second = directory + "/" + slides[1]
+                full = None
+
+                print("orientation {0}, {1} steps".format(orientation, args.steps))
+                print("{0:<16} {1:<6} {2:>8} {3:>6} {4:>10} {5:>10} {6:>7}".format(
+                    "method", "source", "bytes", "steps", "bytes/step", "vs cut", "match"))
+
+                for source, ram in (("file", False), ("ram", True)):
+                    rows = [("cut",) + runCut(orientation, first, second, ram),
+                            ("software slide",) + runSoftwareSlide(orientation, first, second, ram, args.steps)]
+
+                    for name, effect in EFFECTS:
+                        rows.append((name,) + runTransition(orientation, first, second, ram, effect, args.steps, second)[0:3])
+
+                    if full == None:
+                        full = rows[0][1]
+
+                    for name, sent, steps, match in rows:
+                        print("{0:<16} {1:<6} {2:>8} {3:>6} {4:>10.0f} {5:>9.1f}% {6:>7}".format(
+                            name, source, sent, steps, sent / steps, sent * 100 / full, "yes" if match else "NO"))
+
+                print()
+        finally:
+            simulator.uninstallFilesystem()
+
+if __name__ == "__main__":
+    main()
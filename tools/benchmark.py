@@ -0,0 +1,224 @@
+# benchmark.py
+# Runs main.py on the host against the headless displayio simulator (tools/sim) and reports
+# per frame timings, dirty area and bytes pushed over SPI.
+#
+# Every time main.py goes idle (time.sleep() or asyncio waiting for its next timer) counts as one frame:
+# the simulated display auto refreshes while the program sleeps, just like displayio does in the background
+# on the Pico.  Time is virtual so a 10 second screen takes as long as the code takes to run, not 10 seconds.
+#
+# USAGE:
+#
+#   python3 tools/benchmark.py                         (2 full cycles: temperature screen + slideshow)
+#   python3 tools/benchmark.py --cycles 5 --json out.json
+#   python3 tools/benchmark.py --compare baseline.json (exit code 1 if bytes/frame or frame time regressed)
+import argparse, contextlib, io, json, os, random, runpy, sys, tempfile, time
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(TOOLS_DIR)
+sys.path.insert(0, os.path.join(REPO_DIR, "lib"))
+sys.path.insert(0, os.path.join(TOOLS_DIR, "sim"))
+
+import simulator
+
+# Length of one temperature screen + slideshow cycle in main.py (virtual seconds)
+CYCLE_SECONDS = 20
+
+# function percentile
+# @param values: list of numbers
+# @param fraction: 0.0 - 1.0
+# @return value at the given percentile (0 for an empty list)
+def percentile(values, fraction):
+    if not values:
+        return 0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+class FrameRecorder:
+    # function __init__
+    # @param seconds: virtual seconds to run before stopping main.py
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.frames = []
+        self.lastWake = time.perf_counter()
+        self.lastTotals = (0, 0, 0)
+        self.stopped = False
+
+    # function onSleep
+    # Called by the virtual clock after the display has refreshed
+    # Figures come from the display's running totals as a frame may have had no refresh (or more than one)
+    def onSleep(self, clock, seconds):
+        now = time.perf_counter()
+        displays = simulator.getDisplays()
+
+        if displays:
+            display = displays[0]
+            totals = (display.pixelsPushed, display.bytesPushed, display.bus.transactions)
+
+            # The first frame carries all of boot (imports, asset loads, first full paint)
+            # After that it's the slideshow if nothing but the background (layer 0) is visible
+            if not self.frames:
+                phase = "boot"
+            elif all(layer.hidden for layer in list(display.root_group)[1:]):
+                phase = "slideshow"
+            else:
+                phase = "temperature"
+
+            self.frames.append({
+                "phase": phase,
+                "at": clock.monotonic(),
+                "frameMs": (now - self.lastWake - clock.lastRefreshSeconds) * 1000,
+                "refreshMs": clock.lastRefreshSeconds * 1000,
+                "dirtyPixels": totals[0] - self.lastTotals[0],
+                "bytes": totals[1] - self.lastTotals[1],
+                "transactions": totals[2] - self.lastTotals[2],
+                # With auto refresh off a change nobody marked dirty never reaches the panel, catch that here
+                "stale": display.render() != display.framebuffer,
+            })
+            self.lastTotals = totals
+
+        if clock.monotonic() >= self.seconds and not self.stopped:
+            self.stopped = True
+            raise simulator.StopSimulation()
+
+        self.lastWake = time.perf_counter()
+
+# function summarise
+# @param frames: list of frame dicts from FrameRecorder
+# @return dict of summary figures
+def summarise(frames):
+    frameMs = [f["frameMs"] for f in frames]
+    bytesPushed = [f["bytes"] for f in frames]
+
+    return {
+        "frames": len(frames),
+        "frameMsMean": sum(frameMs) / len(frames) if frames else 0,
+        "frameMsP95": percentile(frameMs, 0.95),
+        "frameMsMax": max(frameMs) if frames else 0,
+        "refreshMsMean": sum(f["refreshMs"] for f in frames) / len(frames) if frames else 0,
+        "dirtyPixelsMean": sum(f["dirtyPixels"] for f in frames) / len(frames) if frames else 0,
+        "bytesPerFrameMean": sum(bytesPushed) / len(frames) if frames else 0,
+        "bytesPerFrameMax": max(bytesPushed) if frames else 0,
+        "bytesTotal": sum(bytesPushed),
+        "transactionsTotal": sum(f["transactions"] for f in frames),
+        "staleFrames": sum(1 for f in frames if f["stale"]),
+    }
+
+# function runMain
+# Runs main.py under the simulator for the given number of virtual seconds
+# @param seconds: virtual seconds to run
+# @param root [None]: simulator root directory, a temporary one is created if not given
+# @param verbose [False]: show main.py's console output
+# @param seed [0]: seed for the random module so the dummy sensor readings and slideshow picks repeat between runs
+# @return FrameRecorder holding the frames
+def runMain(seconds, root = None, verbose = False, seed = 0):
+    tmp = None
+    random.seed(seed)
+
+    if root is None:
+        tmp = tempfile.TemporaryDirectory()
+        root = tmp.name
+
+    simulator.createDeviceRoot(root, os.path.join(REPO_DIR, "images"))
+    simulator.setRoot(root)
+    simulator.installFilesystem()
+    simulator.installGc()
+
+    recorder = FrameRecorder(seconds)
+    clock = simulator.VirtualClock(recorder.onSleep)
+    clock.install()
+    clock.installAsyncio()
+
+    output = None if verbose else io.StringIO()
+    recorder.lastWake = time.perf_counter()
+
+    try:
+        with contextlib.redirect_stdout(output) if output else contextlib.nullcontext():
+            runpy.run_path(os.path.join(REPO_DIR, "main.py"), run_name = "__main__")
+    except simulator.StopSimulation:
+        pass
+    finally:
+        clock.uninstall()
+        simulator.uninstallFilesystem()
+
+        if tmp is not None:
+            tmp.cleanup()
+
+    return recorder
+
+# function compare
+# Checks a result against a saved baseline
+# @param result: dict from this run
+# @param baseline: dict loaded from a previous --json file
+# @param tolerance: allowed percentage increase
+# @return list of failure messages (empty if OK)
+def compare(result, baseline, tolerance):
+    failures = []
+
+    for phase, summary in result["phases"].items():
+        if phase not in baseline["phases"]:
+            continue
+
+        # Boot time depends on disk caches more than on the code, only its bytes are checked
+        keys = ("bytesPerFrameMean", "bytesPerFrameMax") if phase == "boot" else ("bytesPerFrameMean", "bytesPerFrameMax", "frameMsMean")
+
+        for key in keys:
+            old = baseline["phases"][phase][key]
+            new = summary[key]
+            # Timings are noisy on shared CI machines, allow an extra millisecond before failing
+            slack = 1.0 if key.startswith("frameMs") else 0
+
+            if new > old * (1 + tolerance / 100) + slack:
+                failures.append("{0} {1}: {2:.2f} > baseline {3:.2f}".format(phase, key, new, old))
+
+        if summary["staleFrames"] > 0:
+            failures.append("{0}: {1} frames where the panel didn't match the display tree".format(phase, summary["staleFrames"]))
+
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description = "Benchmark main.py against the headless ST7735S simulator")
+    parser.add_argument("--cycles", type = int, default = 2, help = "temperature + slideshow cycles to run")
+    parser.add_argument("--json", help = "write results to this file")
+    parser.add_argument("--compare", help = "baseline JSON file to compare against")
+    parser.add_argument("--tolerance", type = float, default = 10, help = "allowed regression in percent")
+    parser.add_argument("--seed", type = int, default = 0, help = "random seed for sensor values / slideshow order")
+    parser.add_argument("--verbose", action = "store_true", help = "show main.py output")
+    args = parser.parse_args()
+
+    recorder = runMain(args.cycles * CYCLE_SECONDS, verbose = args.verbose, seed = args.seed)
+    frames = recorder.frames
+
+    phases = {}
+    for frame in frames:
+        phases.setdefault(frame["phase"], []).append(frame)
+
+    result = {
+        "cycles": args.cycles,
+        "all": summarise(frames),
+        "phases": {phase: summarise(items) for phase, items in phases.items()},
+    }
+
+    print("{0:<12} {1:>6} {2:>9} {3:>9} {4:>9} {5:>10} {6:>10} {7:>10} {8:>10} {9:>6}".format(
+        "phase", "frames", "ms mean", "ms p95", "ms max", "dirty px", "bytes/f", "bytes max", "bytes", "stale"))
+
+    for phase, summary in list(result["phases"].items()) + [("all", result["all"])]:
+        print("{0:<12} {1:>6} {2:>9.2f} {3:>9.2f} {4:>9.2f} {5:>10.0f} {6:>10.0f} {7:>10} {8:>10} {9:>6}".format(
+            phase, summary["frames"], summary["frameMsMean"], summary["frameMsP95"], summary["frameMsMax"],
+            summary["dirtyPixelsMean"], summary["bytesPerFrameMean"], summary["bytesPerFrameMax"], summary["bytesTotal"], summary["staleFrames"]))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent = 2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            failures = compare(result, json.load(f), args.tolerance)
+
+        for failure in failures:
+            print("REGRESSION: " + failure)
+
+        if failures:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
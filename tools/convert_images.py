@@ -0,0 +1,431 @@
+# convert_images.py
+# Converts PNG / BMP images into PanelImage files (lib/PanelImage.py) so the Pico doesn't have to decode them
+#
+# Formats:
+#  - rgb565:  pixels turned into RGB565, BGR swapped (the AZ panel is bgr = True) and rotated into the panel's own order
+#             for --orientation, so PanelImage.draw() can send the file's rows straight to the panel.  2 bytes a pixel.
+#  - indexed: the palette is cut down to the colours the image actually uses (duplicates merged, unused entries
+#             dropped) and the pixels packed at the fewest bits that hold them (1, 2, 4 or 8), rows in screen order for
+#             PanelImage.getBitmap() to read in one go.
+#  - auto (default): indexed if the image has 256 colours or fewer, otherwise rgb565
+#
+# With --compress the pixels are compressed (see lib/PanelDecoder.py): indexed images run length encoded one index a
+# byte, rgb565 QOI style.  The Pico decodes them a small chunk at a time so they take no more RAM than uncompressed ones.
+# An image that doesn't get any smaller is written uncompressed.
+#
+# With --transparent index 0 of an indexed BMP (the convention ImageLabel sheets use) or PNG pixels with alpha under
+# 128 become palette index 0 and are made transparent.
+#
+# Files are written to --out with the .pimg extension, copy them to the Pico with the rest of /images.
+#
+# USAGE:
+#
+#   python3 tools/convert_images.py --orientation 90 --out build/slideshow slides/*.png
+#   python3 tools/convert_images.py --format indexed --transparent --out build images/temperature_1-2.bmp
+#   python3 tools/convert_images.py --format indexed --compress --out build/slideshow images/slideshow/*.bmp
+import argparse, os, struct, sys, zlib
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(TOOLS_DIR, "sim"))
+
+import simulator
+
+EXTENSION = ".pimg"
+FLAG_BGR = 1
+FLAG_TRANSPARENT = 2
+FLAG_COMPRESSED = 4
+
+# function readPng
+# Reads a non interlaced PNG (greyscale, RGB, palette, with or without alpha, 1 to 16 bit)
+# @return (width, height, list of 0xRRGGBB, list of alpha 0 - 255)
+def readPng(path):
+    with open(path, "rb") as f:
+        data = f.read()
+
+    if data[0:8] != b"\x89PNG\r\n\x1a\n":
+        raise ValueError("Not a PNG file: " + path)
+
+    offset = 8
+    compressed = bytearray()
+    palette = []
+    alphas = []
+
+    while offset < len(data):
+        length, kind = struct.unpack_from(">I4s", data, offset)
+        chunk = data[offset + 8:offset + 8 + length]
+        offset += 12 + length
+
+        if kind == b"IHDR":
+            width, height, depth, colourType, compression, filtering, interlace = struct.unpack(">IIBBBBB", chunk)
+        elif kind == b"PLTE":
+            palette = [(chunk[i] << 16) | (chunk[i + 1] << 8) | chunk[i + 2] for i in range(0, len(chunk), 3)]
+        elif kind == b"tRNS":
+            alphas = list(chunk)
+        elif kind == b"IDAT":
+            compressed += chunk
+        elif kind == b"IEND":
+            break
+
+    if interlace != 0:
+        raise ValueError("Interlaced PNGs are not supported: " + path)
+
+    channels = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}[colourType]
+    rowBytes = (width * channels * depth + 7) // 8
+    pixelBytes = max(1, channels * depth // 8)
+    raw = zlib.decompress(bytes(compressed))
+    rows = []
+    previous = bytearray(rowBytes)
+
+    for y in range(height):
+        start = y * (rowBytes + 1)
+        kind = raw[start]
+        row = bytearray(raw[start + 1:start + 1 + rowBytes])
+
+        for i in range(rowBytes):
+            left = row[i - pixelBytes] if i >= pixelBytes else 0
+            up = previous[i]
+            upLeft = previous[i - pixelBytes] if i >= pixelBytes else 0
+
+            if kind == 1:
+                row[i] = (row[i] + left) & 0xFF
+            elif kind == 2:
+                row[i] = (row[i] + up) & 0xFF
+            elif kind == 3:
+                row[i] = (row[i] + (left + up) // 2) & 0xFF
+            elif kind == 4:
+                estimate = left + up - upLeft
+                distances = (abs(estimate - left), abs(estimate - up), abs(estimate - upLeft))
+
+                if distances[0] <= distances[1] and distances[0] <= distances[2]:
+                    row[i] = (row[i] + left) & 0xFF
+                elif distances[1] <= distances[2]:
+                    row[i] = (row[i] + up) & 0xFF
+                else:
+                    row[i] = (row[i] + upLeft) & 0xFF
+
+        rows.append(row)
+        previous = row
+
+    pixels = []
+    alpha = []
+    maximum = (1 << depth) - 1
+
+    for row in rows:
+        for x in range(width):
+            samples = []
+
+            for channel in range(channels):
+                bit = (x * channels + channel) * depth
+
+                # 16 bit samples are big endian, only the high byte is kept
+                if depth >= 8:
+                    samples.append(row[bit // 8])
+                else:
+                    samples.append((row[bit // 8] >> (8 - depth - bit % 8)) & maximum)
+
+            if colourType == 3:
+                pixels.append(palette[samples[0]])
+                alpha.append(alphas[samples[0]] if samples[0] < len(alphas) else 255)
+                continue
+
+            if depth < 8:
+                samples = [value * 255 // maximum for value in samples]
+
+            if colourType in (0, 4):
+                pixels.append(samples[0] * 0x010101)
+            else:
+                pixels.append((samples[0] << 16) | (samples[1] << 8) | samples[2])
+
+            alpha.append(samples[-1] if colourType in (4, 6) else 255)
+
+    return width, height, pixels, alpha
+
+# function readImage
+# @param path: host path to a .png or .bmp
+# @param transparent: BMP palette index 0 / PNG alpha under 128 is transparent
+# @return (width, height, list of 0xRRGGBB, list of True for transparent pixels)
+def readImage(path, transparent):
+    if path.lower().endswith(".png"):
+        width, height, pixels, alpha = readPng(path)
+        return width, height, pixels, [transparent and a < 128 for a in alpha]
+
+    width, height, bits, palette, values = simulator.readBmp(path)
+
+    if palette is not None:
+        return width, height, [palette[v] for v in values], [transparent and v == 0 for v in values]
+
+    if bits == 16:
+        return width, height, [simulator.rgb565To888(v) for v in values], [False] * len(values)
+
+    return width, height, values, [False] * len(values)
+
+# function compactPalette
+# Only the colours used, in order of first use (transparent pixels share index 0)
+# @return (list of 0xRRGGBB, list of indexes) or None if there are more than 256 colours
+def compactPalette(pixels, clear):
+    palette = [0] if any(clear) else []
+    lookup = {}
+    indexes = []
+
+    for colour, isClear in zip(pixels, clear):
+        if isClear:
+            indexes.append(0)
+            continue
+
+        if colour not in lookup:
+            if len(palette) == 256:
+                return None
+
+            lookup[colour] = len(palette)
+            palette.append(colour)
+
+        indexes.append(lookup[colour])
+
+    return palette, indexes
+
+# function bitsFor
+# @return fewest of 1, 2, 4 or 8 bits that hold count colours
+def bitsFor(count):
+    bits = 1
+
+    while (1 << bits) < count:
+        bits *= 2
+
+    return bits
+
+# function packRows
+# Packs indexes most significant bits first, each row padded to a whole byte
+# @return (bytes, bytes per row)
+def packRows(indexes, width, height, bits):
+    rowBytes = (width * bits + 7) // 8
+    out = bytearray(rowBytes * height)
+
+    for y in range(height):
+        for x in range(width):
+            bit = x * bits
+            out[y * rowBytes + bit // 8] |= indexes[y * width + x] << (8 - bits - bit % 8)
+
+    return bytes(out), rowBytes
+
+# function panelOrder
+# Where each panel window pixel comes from in the image (rotation is clockwise, as displayio does it)
+# @return (panel window width, height, function (column, row) -> (x, y) in the image)
+def panelOrder(width, height, orientation):
+    if orientation == 90:
+        return height, width, lambda c, r: (r, height - 1 - c)
+
+    if orientation == 180:
+        return width, height, lambda c, r: (width - 1 - c, height - 1 - r)
+
+    if orientation == 270:
+        return height, width, lambda c, r: (width - 1 - r, c)
+
+    return width, height, lambda c, r: (c, r)
+
+# function rgb565Rows
+# @return (big endian RGB565 in panel order, bytes per panel row)
+def rgb565Rows(pixels, width, height, orientation, bgr):
+    columns, rows, source = panelOrder(width, height, orientation)
+    out = bytearray(columns * rows * 2)
+    i = 0
+
+    for r in range(rows):
+        for c in range(columns):
+            x, y = source(c, r)
+            colour = simulator.rgb888To565(pixels[y * width + x])
+
+            if bgr:
+                colour = ((colour & 0x1F) << 11) | (colour & 0x07E0) | (colour >> 11)
+
+            out[i] = colour >> 8
+            out[i + 1] = colour & 0xFF
+            i += 2
+
+    return bytes(out), columns * 2
+
+# function encodeRle
+# Run length encodes indexes, one per byte (runs carry on across rows)
+# @return bytes for PanelDecoder.readIndexes()
+def encodeRle(indexes):
+    out = bytearray()
+    literal = []
+    i = 0
+
+    def flush():
+        if literal:
+            out.append(len(literal) - 1)
+            out.extend(literal)
+            del literal[:]
+
+    while i < len(indexes):
+        run = 1
+
+        while i + run < len(indexes) and run < 129 and indexes[i + run] == indexes[i]:
+            run += 1
+
+        if run >= 2:
+            flush()
+            out.append(0x80 | (run - 2))
+            out.append(indexes[i])
+            i += run
+            continue
+
+        literal.append(indexes[i])
+        i += 1
+
+        if len(literal) == 128:
+            flush()
+
+    flush()
+    return bytes(out)
+
+# function qoiSlot
+# @return slot in the 64 entry table PanelDecoder.readRGB565() keeps for value
+def qoiSlot(value):
+    return ((value >> 11) * 3 + ((value >> 5) & 63) * 5 + (value & 31) * 7) & 63
+
+# function encodeQoi565
+# QOI style encoding of big endian RGB565 values
+# @return bytes for PanelDecoder.readRGB565()
+def encodeQoi565(data):
+    out = bytearray()
+    table = [0] * 64
+    previous = 0
+    run = 0
+
+    for i in range(0, len(data), 2):
+        value = (data[i] << 8) | data[i + 1]
+
+        if value == previous:
+            run += 1
+
+            if run == 62:
+                out.append(0xC0 | (run - 1))
+                run = 0
+
+            continue
+
+        if run > 0:
+            out.append(0xC0 | (run - 1))
+            run = 0
+
+        slot = qoiSlot(value)
+
+        if table[slot] == value:
+            out.append(slot)
+            previous = value
+            continue
+
+        table[slot] = value
+        high = (((value >> 11) - (previous >> 11) + 16) & 31) - 16
+        middle = ((((value >> 5) & 63) - ((previous >> 5) & 63) + 32) & 63) - 32
+        low = (((value & 31) - (previous & 31) + 16) & 31) - 16
+        half = middle >> 1
+
+        if -2 <= high <= 1 and -2 <= middle <= 1 and -2 <= low <= 1:
+            out.append(0x40 | ((high + 2) << 4) | ((middle + 2) << 2) | (low + 2))
+        elif -8 <= high - half <= 7 and -8 <= low - half <= 7:
+            out.append(0x80 | (middle + 32))
+            out.append(((high - half + 8) << 4) | (low - half + 8))
+        else:
+            out.append(0xFE)
+            out.append(value >> 8)
+            out.append(value & 0xFF)
+
+        previous = value
+
+    if run > 0:
+        out.append(0xC0 | (run - 1))
+
+    return bytes(out)
+
+# function convert
+# @param path: source image
+# @param outPath: .pimg to write
+# @param orientation: screen orientation for rgb565
+# @param format: "rgb565", "indexed" or "auto"
+# @param bgr: swap red and blue for rgb565
+# @param transparent: see readImage
+# @param compress [False]: RLE / QOI style compressed pixels
+# @return dict describing what was written
+def convert(path, outPath, orientation, format, bgr, transparent, compress = False):
+    width, height, pixels, clear = readImage(path, transparent)
+    compact = compactPalette(pixels, clear) if format != "rgb565" else None
+
+    if format == "indexed" and compact is None:
+        raise ValueError(path + " has more than 256 colours, use --format rgb565")
+
+    flags = 0
+
+    if compact is not None:
+        palette, indexes = compact
+        bits = bitsFor(len(palette))
+        data, rowBytes = packRows(indexes, width, height, bits)
+        storedOrientation = 0
+
+        if any(clear):
+            flags |= FLAG_TRANSPARENT
+
+        if compress:
+            encoded = encodeRle(indexes)
+    else:
+        palette = []
+        bits = 16
+        data, rowBytes = rgb565Rows(pixels, width, height, orientation, bgr)
+        storedOrientation = orientation
+
+        if bgr:
+            flags |= FLAG_BGR
+
+        if compress:
+            encoded = encodeQoi565(data)
+
+    # RLE stores a byte a pixel, small 1 / 2 bit images can come out bigger than packed rows
+    if compress and len(encoded) < len(data):
+        data = encoded
+        flags |= FLAG_COMPRESSED
+
+    out = bytearray(b"AZPI")
+    out += struct.pack("<BBBBHHHH", 1, bits, storedOrientation // 90, flags, width, height, len(palette), rowBytes)
+
+    for colour in palette:
+        out += bytes(((colour >> 16) & 0xFF, (colour >> 8) & 0xFF, colour & 0xFF))
+
+    out += data
+
+    with open(outPath, "wb") as f:
+        f.write(out)
+
+    return {
+        "width": width,
+        "height": height,
+        "bits": bits,
+        "compressed": (flags & FLAG_COMPRESSED) != 0,
+        "colours": len(palette),
+        "sourceBytes": os.path.getsize(path),
+        "bytes": len(out),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description = "Convert PNG / BMP images to PanelImage files")
+    parser.add_argument("images", nargs = "+")
+    parser.add_argument("--out", default = ".", help = "directory to write the .pimg files to")
+    parser.add_argument("--orientation", type = int, default = 90, choices = (0, 90, 180, 270), help = "screen orientation rgb565 images are rotated for")
+    parser.add_argument("--format", default = "auto", choices = ("auto", "rgb565", "indexed"))
+    parser.add_argument("--rgb", action = "store_true", help = "panel takes RGB order (default is BGR like the AZ panel)")
+    parser.add_argument("--transparent", action = "store_true", help = "BMP index 0 / PNG alpha < 128 is transparent")
+    parser.add_argument("--compress", action = "store_true", help = "run length (indexed) / QOI style (rgb565) compress the pixels")
+    args = parser.parse_args()
+
+    os.makedirs(args.out, exist_ok = True)
+    print("{0:<28} {1:>9} {2:>8} {3:>8} {4:>10} {5:>10}".format("image", "size", "format", "colours", "source", "pimg"))
+
+    for path in args.images:
+        name = os.path.splitext(os.path.basename(path))[0] + EXTENSION
+        result = convert(path, os.path.join(args.out, name), args.orientation, args.format, not args.rgb, args.transparent, args.compress)
+        kind = ("qoi565" if result["compressed"] else "rgb565") if result["bits"] == 16 else str(result["bits"]) + (" rle" if result["compressed"] else " bit")
+        print("{0:<28} {1:>9} {2:>8} {3:>8} {4:>10} {5:>10}".format(
+            name, "{0}x{1}".format(result["width"], result["height"]), kind, result["colours"], result["sourceBytes"], result["bytes"]))
+
+if __name__ == "__main__":
+    main()
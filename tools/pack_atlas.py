@@ -0,0 +1,247 @@
+# pack_atlas.py
+# Packs ImageLabel sprite sheets into atlas bmps + a manifest for lib/Atlas.py
+#
+# Each input is an indexed bmp sprite sheet with its tile size, frames are read left to right, top to bottom.
+# Index 0 of every input is its transparent colour, in the atlas index 0 is the one shared transparent colour and
+# the other colours the sheets actually use are merged into one palette (max 256).  More than 16 colours makes the
+# atlas 8 bits per pixel, so a long strip with only a few colours (like anim.bmp) is better left as its own bmp -
+# ImageLabel still loads anything that isn't in the atlas on its own.
+#
+# A TileGrid's tile size has to divide its bitmap's width and height exactly (Circuit Python raises ValueError
+# otherwise), so sprites are grouped by tile size and each group gets its own atlas bmp, NAME_WxH.bmp.  They all share
+# the one merged palette.  Frames of a sprite have to be consecutive tiles when its bmp is cut into tiles (that's how
+# TileGrid numbers tiles), so each sprite is placed at the first tile number where all its frames land on free space.
+# Every width that's a whole number of tiles up to MAX_WIDTH is tried and the smallest result is kept.
+#
+# USAGE:
+#
+#   python3 tools/pack_atlas.py --dir images --out atlas \
+#       temperature_1-2.bmp:20x20 humidity_1-2.bmp:20x20 fan_1-2.bmp:20x20 decoration.bmp:49x40
+#
+# writes images/atlas_20x20.bmp, images/atlas_49x40.bmp and images/atlas.txt, copy them all to /images on the Pico.
+import argparse, os, sys
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(TOOLS_DIR, "sim"))
+
+import simulator
+
+# Widest atlas to try (pixels)
+MAX_WIDTH = 2048
+
+class Sprite:
+    # function __init__
+    # @param name: sprite name (the file name)
+    # @param path: host path to the bmp
+    # @param tileWidth: frame width
+    # @param tileHeight: frame height
+    # @param frames [None]: number of frames, defaults to every whole tile in the sheet
+    def __init__(self, name, path, tileWidth, tileHeight, frames = None):
+        self.name = name
+        self.tileWidth = tileWidth
+        self.tileHeight = tileHeight
+        self.width, self.height, bits, self.palette, self.pixels = simulator.readBmp(path)
+
+        if self.palette is None:
+            raise ValueError(name + " is not an indexed bmp")
+
+        across = self.width // tileWidth
+        self.frames = frames if frames is not None else across * (self.height // tileHeight)
+        self.across = across
+        self.firstTile = 0
+
+    # function frameOrigin
+    # @param frame: frame number
+    # @return (x, y) of the frame in the source sheet
+    def frameOrigin(self, frame):
+        return ((frame % self.across) * self.tileWidth, (frame // self.across) * self.tileHeight)
+
+# function parseInput
+# @param spec: "file.bmp:WxH" or "file.bmp:WxH:frames"
+# @param directory: directory the files are in
+# @return Sprite
+def parseInput(spec, directory):
+    parts = spec.split(":")
+
+    if len(parts) < 2:
+        raise ValueError("Expected file.bmp:WIDTHxHEIGHT[:frames], got " + spec)
+
+    width, height = [int(v) for v in parts[1].lower().split("x")]
+    frames = int(parts[2]) if len(parts) > 2 else None
+    return Sprite(os.path.basename(parts[0]), os.path.join(directory, parts[0]), width, height, frames)
+
+# function tileRects
+# @param sprite: Sprite
+# @param atlasWidth: atlas width in pixels
+# @param firstTile: tile number of the first frame
+# @return list of (x1, y1, x2, y2) for each frame in the atlas
+def tileRects(sprite, atlasWidth, firstTile):
+    across = atlasWidth // sprite.tileWidth
+    rects = []
+
+    for i in range(firstTile, firstTile + sprite.frames):
+        x = (i % across) * sprite.tileWidth
+        y = (i // across) * sprite.tileHeight
+        rects.append((x, y, x + sprite.tileWidth, y + sprite.tileHeight))
+
+    return rects
+
+def overlaps(a, b):
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+# function place
+# Places every sprite at the lowest free tile number for the given atlas width
+# @return (height, {name: firstTile}) or None if a sprite doesn't fit the width
+def place(sprites, atlasWidth):
+    used = []
+    placement = {}
+    height = 0
+
+    for sprite in sprites:
+        if atlasWidth // sprite.tileWidth == 0:
+            return None
+
+        firstTile = 0
+
+        while True:
+            rects = tileRects(sprite, atlasWidth, firstTile)
+
+            if not any(overlaps(r, u) for r in rects for u in used):
+                break
+
+            firstTile += 1
+
+        used.extend(rects)
+        placement[sprite.name] = firstTile
+        height = max(height, max(r[3] for r in rects))
+
+    return height, placement
+
+# function mergePalettes
+# Builds the shared palette and a per sprite index remap
+# @return (palette, {name: [atlas index for each source index]})
+def mergePalettes(sprites):
+    palette = [sprites[0].palette[0]]
+    lookup = {}
+    remaps = {}
+
+    for sprite in sprites:
+        remap = [0]
+
+        used = set(sprite.pixels)
+
+        for index, colour in enumerate(sprite.palette[1:], 1):
+            if index not in used:
+                remap.append(0)
+                continue
+
+            if colour not in lookup:
+                lookup[colour] = len(palette)
+                palette.append(colour)
+
+            remap.append(lookup[colour])
+
+        remaps[sprite.name] = remap
+
+    if len(palette) > 256:
+        raise ValueError("Merged palette has {0} colours, the atlas can only have 256".format(len(palette)))
+
+    return palette, remaps
+
+# function groupByTile
+# @param sprites: list of Sprite
+# @return list of lists of Sprite with the same tile size, in the order the sizes first appear
+def groupByTile(sprites):
+    groups = {}
+
+    for sprite in sprites:
+        groups.setdefault((sprite.tileWidth, sprite.tileHeight), []).append(sprite)
+
+    return list(groups.values())
+
+# function pack
+# @param sprites: list of Sprite all with the same tile size
+# @param remaps: {name: [atlas index for each source index]} from mergePalettes
+# @return (width, height, pixels) and sets firstTile on each sprite
+def pack(sprites, remaps):
+    # Big sprites first, they are the hardest to fit
+    ordered = sorted(sprites, key = lambda s: s.frames, reverse = True)
+    tileWidth = sprites[0].tileWidth
+    best = None
+
+    # Whole tiles across, so the tile size divides the bmp exactly (the height always is whole tiles)
+    for width in range(tileWidth, MAX_WIDTH + 1, tileWidth):
+        result = place(ordered, width)
+
+        if result is not None and (best is None or width * result[0] < best[0] * best[1]):
+            best = (width, result[0], result[1])
+
+    if best is None:
+        raise ValueError("Sprites don't fit in any atlas width")
+
+    width, height, placement = best
+    pixels = [0] * (width * height)
+
+    for sprite in sprites:
+        sprite.firstTile = placement[sprite.name]
+        remap = remaps[sprite.name]
+
+        for frame, rect in enumerate(tileRects(sprite, width, sprite.firstTile)):
+            sx, sy = sprite.frameOrigin(frame)
+
+            for row in range(sprite.tileHeight):
+                source = (sy + row) * sprite.width + sx
+                target = (rect[1] + row) * width + rect[0]
+
+                for column in range(sprite.tileWidth):
+                    pixels[target + column] = remap[sprite.pixels[source + column]]
+
+    return width, height, pixels
+
+# function writeAtlas
+# Packs the sprites and writes a NAME_WxH.bmp per tile size and NAME.txt
+# @param sprites: list of Sprite
+# @param directory: where to write
+# @param name: atlas name
+# @return (list of (file name, width, height), number of colours)
+def writeAtlas(sprites, directory, name):
+    palette, remaps = mergePalettes(sprites)
+    images = []
+    imageOf = {}
+
+    for group in groupByTile(sprites):
+        width, height, pixels = pack(group, remaps)
+        fileName = "{0}_{1}x{2}.bmp".format(name, group[0].tileWidth, group[0].tileHeight)
+        simulator.writeBmp(os.path.join(directory, fileName), width, height, palette, pixels)
+
+        for sprite in group:
+            imageOf[sprite.name] = len(images)
+
+        images.append((fileName, width, height))
+
+    with open(os.path.join(directory, name + ".txt"), "w") as f:
+        f.write(",".join(image[0] for image in images) + "\n")
+        f.write("# name,firstTile,tileWidth,tileHeight,frames,image\n")
+
+        for sprite in sprites:
+            f.write("{0},{1},{2},{3},{4},{5}\n".format(sprite.name, sprite.firstTile, sprite.tileWidth, sprite.tileHeight, sprite.frames, imageOf[sprite.name]))
+
+    return images, len(palette)
+
+def main():
+    parser = argparse.ArgumentParser(description = "Pack sprite sheets into an atlas for lib/Atlas.py")
+    parser.add_argument("inputs", nargs = "+", help = "file.bmp:WIDTHxHEIGHT[:frames]")
+    parser.add_argument("--dir", default = ".", help = "directory holding the input bmps (and where the atlas is written)")
+    parser.add_argument("--out", default = "atlas", help = "output name, writes NAME.bmp and NAME.txt")
+    args = parser.parse_args()
+
+    sprites = [parseInput(spec, args.dir) for spec in args.inputs]
+    images, colours = writeAtlas(sprites, args.dir, args.out)
+
+    separate = sum(s.width * s.height for s in sprites)
+    packed = sum(width * height for fileName, width, height in images)
+    sizes = ", ".join("{0} {1} x {2}".format(fileName, width, height) for fileName, width, height in images)
+    print("atlas {0}, {1} colours, {2} sprites ({3} pixels vs {4} separately)".format(sizes, colours, len(sprites), packed, separate))
+
+if __name__ == "__main__":
+    main()
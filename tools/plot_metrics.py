@@ -0,0 +1,244 @@
+# plot_metrics.py
+# Reads the metrics lines lib/Metrics.py prints over the serial console and plots them in the terminal
+#
+# Give it a capture of the console (e.g. from tio / screen logging, or tools/benchmark.py --verbose), "-" for stdin or
+# the Pico's serial device to read it live until Ctrl+C.  Everything that isn't a #MH / #M line is skipped.
+#
+#  summary: per histogram the number of values, mean, ~p50 / ~p95 (upper bound of the bucket they fall in) and max,
+#           per counter the total and rate, per gauge the last / lowest / highest value
+#  share:   the fraction of the time covered that went on loop / refresh / sensor / gc / the report itself
+#  charts:  one row per metric over time, the mean (histograms), value (gauges) or total (counters) of each line
+#
+# USAGE:
+#
+#   python3 tools/plot_metrics.py console.log
+#   python3 tools/plot_metrics.py /dev/ttyACM0 --csv metrics.csv
+#
+# If the metrics change part way through (the Pico restarted with other settings) only the lines after that are used.
+import argparse, sys
+
+BLOCKS = " ▁▂▃▄▅▆▇█"
+
+# function parseHeader
+# @param parts: the #MH line split on spaces
+# @return list of (name, kind, bounds) kind is "c", "g" or "h", bounds a list of ints for histograms
+def parseHeader(parts):
+    header = []
+
+    for part in parts[1:]:
+        fields = part.split(":")
+        header.append((fields[0], fields[1], [int(b) for b in fields[2:]]))
+
+    return header
+
+# function parseLine
+# @param parts: the #M line split on spaces
+# @param header: from parseHeader
+# @return dict with "t" (ms) and a value per metric: int for counters / gauges,
+#         dict of count, sum, max, buckets for histograms.  None if the line doesn't fit the header.
+def parseLine(parts, header):
+    if len(parts) != len(header) + 2:
+        return None
+
+    record = {"t": int(parts[1])}
+
+    for (name, kind, bounds), value in zip(header, parts[2:]):
+        if kind != "h":
+            record[name] = int(value)
+            continue
+
+        count, total, largest, buckets = value.split(",")
+        record[name] = {"count": int(count), "sum": int(total), "max": int(largest),
+                        "buckets": [int(b) for b in buckets.split(":")]}
+
+    return record
+
+# function parseStream
+# @param lines: iterable of console lines
+# @return (header of the last #MH line, list of records)
+def parseStream(lines):
+    header = None
+    records = []
+
+    try:
+        for line in lines:
+            parts = line.strip().split(" ")
+
+            if parts[0] == "#MH":
+                # Different metrics means the Pico restarted with other settings, only the latest run is kept
+                if parseHeader(parts) != header:
+                    header = parseHeader(parts)
+                    records = []
+            elif parts[0] == "#M" and header != None:
+                record = parseLine(parts, header)
+
+                if record != None:
+                    records.append(record)
+    except KeyboardInterrupt:
+        pass
+
+    return header, records
+
+# function percentile
+# @param bounds: histogram bucket bounds
+# @param buckets: counts per bucket (one more than bounds)
+# @param fraction: 0.0 - 1.0
+# @return upper bound of the bucket the value at that fraction falls in (None for the overflow bucket)
+def percentile(bounds, buckets, fraction):
+    total = sum(buckets)
+    seen = 0
+
+    for i in range(len(buckets)):
+        seen += buckets[i]
+
+        if total > 0 and seen >= total * fraction:
+            return bounds[i] if i < len(bounds) else None
+
+    return 0
+
+# function series
+# @return one value per record for a metric (histograms give their mean)
+def series(records, name, kind):
+    values = []
+
+    for record in records:
+        value = record.get(name)
+
+        if value == None:
+            values.append(0)
+        elif kind == "h":
+            values.append(value["sum"] / value["count"] if value["count"] else 0)
+        else:
+            values.append(value)
+
+    return values
+
+# function chart
+# @param values: list of numbers
+# @param width: characters, values are averaged down to fit
+# @return one line of block characters scaled from the lowest to the highest value
+def chart(values, width):
+    if not values:
+        return ""
+
+    columns = []
+    per = max(1, -(-len(values) // width))
+
+    for i in range(0, len(values), per):
+        group = values[i:i + per]
+        columns.append(sum(group) / len(group))
+
+    low = min(columns)
+    high = max(columns)
+    span = high - low
+
+    return "".join(BLOCKS[1 + int((v - low) / span * (len(BLOCKS) - 2))] if span else BLOCKS[1] for v in columns)
+
+# function formatUs
+def formatUs(value):
+    if value == None:
+        return "over"
+
+    return "{0:.2f}ms".format(value / 1000)
+
+# function summarise
+# @return list of report lines
+def summarise(header, records, width):
+    seconds = max(0.001, (records[-1]["t"] - records[0]["t"]) / 1000) if len(records) > 1 else 0
+    lines = ["{0} lines over {1:.1f}s".format(len(records), seconds), ""]
+    lines.append("{0:<16} {1:>8} {2:>10} {3:>10} {4:>10} {5:>10}".format("histogram", "count", "mean", "~p50", "~p95", "max"))
+
+    for name, kind, bounds in header:
+        if kind != "h":
+            continue
+
+        count = sum(r[name]["count"] for r in records)
+        total = sum(r[name]["sum"] for r in records)
+        largest = max(r[name]["max"] for r in records)
+        buckets = [sum(r[name]["buckets"][i] for r in records) for i in range(len(bounds) + 1)]
+        lines.append("{0:<16} {1:>8} {2:>10} {3:>10} {4:>10} {5:>10}".format(name, count, formatUs(total / count if count else 0),
+            formatUs(percentile(bounds, buckets, 0.5)), formatUs(percentile(bounds, buckets, 0.95)), formatUs(largest)))
+
+    lines.append("")
+    lines.append("{0:<16} {1:>12} {2:>12} {3:>12}".format("counter / gauge", "total / last", "per s / low", "high"))
+
+    for name, kind, bounds in header:
+        values = series(records, name, kind)
+
+        if kind == "c":
+            lines.append("{0:<16} {1:>12} {2:>12.1f}".format(name, sum(values), sum(values) / seconds if seconds else 0))
+        elif kind == "g":
+            lines.append("{0:<16} {1:>12} {2:>12} {3:>12}".format(name, values[-1], min(values), max(values)))
+
+    # Share of the time covered by the lines (the first line's values are from before it, so it's left out)
+    if seconds:
+        lines.append("")
+        lines.append("time share (of {0:.1f}s)".format(seconds))
+        covered = records[1:]
+
+        for name, kind, bounds in header:
+            if kind == "h" and name != "late":
+                used = sum(r[name]["sum"] for r in covered)
+                lines.append("  {0:<14} {1:>7.2f}%".format(name, used / 10 / seconds / 1000))
+
+        if any(name == "reportUs" for name, kind, bounds in header):
+            used = sum(r["reportUs"] for r in covered)
+            lines.append("  {0:<14} {1:>7.2f}%".format("report", used / 10 / seconds / 1000))
+
+    lines.append("")
+
+    for name, kind, bounds in header:
+        values = series(records, name, kind)
+        label = name + (" mean" if kind == "h" else "")
+        lines.append("{0:<18} {1} {2:.0f}..{3:.0f}".format(label, chart(values, width), min(values), max(values)))
+
+    return lines
+
+# function writeCsv
+# One row per line: time then each counter / gauge, and count, mean, max of each histogram
+def writeCsv(path, header, records):
+    columns = ["t"]
+
+    for name, kind, bounds in header:
+        columns += [name + "_count", name + "_mean", name + "_max"] if kind == "h" else [name]
+
+    with open(path, "w") as f:
+        f.write(",".join(columns) + "\n")
+
+        for record in records:
+            row = [record["t"]]
+
+            for name, kind, bounds in header:
+                value = record[name]
+
+                if kind == "h":
+                    row += [value["count"], round(value["sum"] / value["count"]) if value["count"] else 0, value["max"]]
+                else:
+                    row.append(value)
+
+            f.write(",".join(str(v) for v in row) + "\n")
+
+def main():
+    parser = argparse.ArgumentParser(description = "Summarise and plot lib/Metrics.py lines from the serial console")
+    parser.add_argument("source", help = "console capture, serial device (e.g. /dev/ttyACM0) or - for stdin")
+    parser.add_argument("--csv", help = "also write the values to this CSV file")
+    parser.add_argument("--width", type = int, default = 60, help = "characters per chart")
+    args = parser.parse_args()
+
+    if args.source == "-":
+        header, records = parseStream(sys.stdin)
+    else:
+        with open(args.source, errors = "replace") as f:
+            header, records = parseStream(f)
+
+    if header == None or not records:
+        print("No metrics lines found (set METRICS_PERIOD in main.py)")
+        sys.exit(1)
+
+    print("\n".join(summarise(header, records, args.width)))
+
+    if args.csv:
+        writeCsv(args.csv, header, records)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+# replay_sensors.py
+# Replays a recorded sensor trace through SensorChannel and TemperatureScreen and counts the screen updates
+#
+# A trace is a CSV file with a header line and one row per sample: seconds,temperature,humidity (one sample every
+# SENSOR_DELAY like main.py).  Each configuration feeds every sample to a TemperatureScreen (on the simulator) and counts:
+#
+#  pushes:      setTemperature / setHumidity calls made (raw sends every sample)
+#  text:        times a reading's digits actually changed
+#  icons:       temperature / humidity icon swaps (cold/ok/hot, dry/ok/wet)
+#  suppressed:  samples that never reached the screen
+#
+# traces/room.csv is an hour of a room warming up with sensor noise and the odd glitch, made with --generate.
+#
+# USAGE:
+#
+#   python3 tools/replay_sensors.py
+#   python3 tools/replay_sensors.py --trace my_trace.csv --history 8 --deadband 0.6
+#   python3 tools/replay_sensors.py --generate tools/traces/room.csv
+import argparse, math, os, random, sys, tempfile
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(TOOLS_DIR)
+sys.path.insert(0, os.path.join(REPO_DIR, "lib"))
+sys.path.insert(0, os.path.join(TOOLS_DIR, "sim"))
+
+import simulator
+from SensorChannel import SensorChannel
+from TemperatureScreen import TemperatureScreen
+
+DEFAULT_TRACE = os.path.join(TOOLS_DIR, "traces", "room.csv")
+
+# function loadTrace
+# @param path: CSV file
+# @return list of (temperature, humidity)
+def loadTrace(path):
+    samples = []
+
+    with open(path) as f:
+        for line in f.read().split("\n")[1:]:
+            if line.strip() == "":
+                continue
+
+            fields = line.split(",")
+            samples.append((float(fields[1]), float(fields[2])))
+
+    return samples
+
+# function generateTrace
+# Writes an hour of 2 second samples: temperature drifting from 17 to 29 and back with +/-1 noise, humidity wandering
+# around 15 to 45, and a glitch reading every few minutes
+def generateTrace(path):
+    random.seed(1)
+
+    with open(path, "w") as f:
+        f.write("seconds,temperature,humidity\n")
+
+        for i in range(1800):
+            seconds = i * 2
+            phase = seconds / 3600
+            temperature = 23 - 6 * math.cos(2 * math.pi * phase) + random.gauss(0, 0.6)
+            humidity = 30 + 15 * math.sin(4 * math.pi * phase) + random.gauss(0, 1.2)
+
+            if random.random() < 0.01:
+                temperature += random.choice((-8, 8))
+
+            f.write("{0},{1:.1f},{2:.1f}\n".format(seconds, temperature, humidity))
+
+# function replay
+# @param samples: list of (temperature, humidity)
+# @param channels: (temperature SensorChannel, humidity SensorChannel) or None to send every raw sample
+# @param hysteresis: (temperature, humidity) hysteresis for the screen
+# @return dict of counts
+def replay(samples, channels, hysteresis):
+    screen = TemperatureScreen("Demo &\nText", "temperature_1-2.bmp", "humidity_1-2.bmp", "fan_1-2.bmp", "decoration.bmp")
+    screen.setHysteresis(*hysteresis)
+    counts = {"pushes": 0, "text": 0, "icons": 0}
+
+    # Count icon swaps by wrapping the methods setTemperature / setHumidity call
+    def counting(method):
+        def wrapper():
+            counts["icons"] += 1
+            method()
+
+        return wrapper
+
+    for name in ("setTemperatureHot", "setTemperatureCold", "setTemperatureOK", "setHumidityHigh", "setHumidityLow", "setHumidityOK"):
+        setattr(screen, name, counting(getattr(screen, name)))
+
+    shown = [None, None]
+
+    for temperature, humidity in samples:
+        if channels == None:
+            values = (round(temperature), round(humidity))
+            changed = (True, True)
+        else:
+            changed = (channels[0].add(temperature), channels[1].add(humidity))
+            values = (channels[0].getValue(), channels[1].getValue())
+
+        for i in range(2):
+            if not changed[i]:
+                continue
+
+            counts["pushes"] += 1
+
+            if values[i] != shown[i]:
+                counts["text"] += 1
+                shown[i] = values[i]
+
+            if i == 0:
+                screen.setTemperature(values[i])
+            else:
+                screen.setHumidity(values[i])
+
+    counts["suppressed"] = len(samples) * 2 - counts["pushes"]
+
+    # The first reading of each isn't a swap
+    counts["icons"] -= 2
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(description = "Replay a sensor trace through SensorChannel and TemperatureScreen")
+    parser.add_argument("--trace", default = DEFAULT_TRACE)
+    parser.add_argument("--history", type = int, default = 8, help = "SensorChannel size")
+    parser.add_argument("--deadband", type = float, default = 0.6)
+    parser.add_argument("--generate", metavar = "PATH", help = "write the synthetic trace to PATH and stop")
+    args = parser.parse_args()
+
+    if args.generate:
+        generateTrace(args.generate)
+        return
+
+    samples = loadTrace(args.trace)
+    configs = [
+        ("raw", None, (0, 0)),
+        ("raw + hysteresis", None, (1, 2)),
+        ("average", SensorChannel.AVERAGE, (1, 2)),
+        ("median", SensorChannel.MEDIAN, (1, 2)),
+        ("ema", SensorChannel.EMA, (1, 2)),
+        ("median no hyst.", SensorChannel.MEDIAN, (0, 0)),
+    ]
+
+    with tempfile.TemporaryDirectory() as root:
+        simulator.createDeviceRoot(root, os.path.join(REPO_DIR, "images"))
+        simulator.setRoot(root)
+        simulator.installFilesystem()
+
+        try:
+            print("{0} samples from {1}".format(len(samples), os.path.basename(args.trace)))
+            print("{0:<18} {1:>8} {2:>8} {3:>8} {4:>12}".format("config", "pushes", "text", "icons", "suppressed"))
+
+            for name, filter, hysteresis in configs:
+                channels = None
+
+                if filter != None:
+                    channels = (SensorChannel(args.history, filter, args.deadband), SensorChannel(args.history, filter, args.deadband))
+
+                counts = replay(samples, channels, hysteresis)
+                print("{0:<18} {1:>8} {2:>8} {3:>8} {4:>11.1f}%".format(
+                    name, counts["pushes"], counts["text"], counts["icons"], counts["suppressed"] * 100 / (len(samples) * 2)))
+        finally:
+            simulator.uninstallFilesystem()
+
+if __name__ == "__main__":
+    main()
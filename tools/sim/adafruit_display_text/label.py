@@ -0,0 +1,66 @@
+# label.py
+# Host side stand-in for adafruit_display_text.label
+# Like the real Label, every glyph is its own TileGrid into the font bitmap and changing text rebuilds them all
+import displayio
+
+class Label(displayio.Group):
+    def __init__(self, font, *, text = "", color = 0xFFFFFF, background_color = None, x = 0, y = 0, scale = 1, line_spacing = 1.25, **kwargs):
+        displayio.Group.__init__(self, x = x, y = y, scale = scale)
+        self.font = font
+        self.line_spacing = line_spacing
+        self._palette = displayio.Palette(2)
+        self._palette.make_transparent(0)
+        self._palette[1] = color
+        self._text = None
+        self.text = text
+
+    @property
+    def text(self):
+        return self._text
+
+    @text.setter
+    def text(self, text):
+        if text == self._text:
+            return
+
+        self._text = text
+        self._children = []
+
+        width, height = self.font.get_bounding_box()
+        lineHeight = int(height * self.line_spacing)
+        line = 0
+        column = 0
+
+        for character in text:
+            if character == "\n":
+                line += 1
+                column = 0
+                continue
+
+            glyph = self.font.get_glyph(ord(character))
+
+            # The real Label leaves out characters the font doesn't have
+            if glyph == None:
+                continue
+
+            tile = displayio.TileGrid(glyph.bitmap, pixel_shader = self._palette, tile_width = glyph.width, tile_height = glyph.height,
+                                      default_tile = glyph.tile_index, x = column * width, y = line * lineHeight - height // 2)
+            self._children.append(tile)
+            column += 1
+
+    @property
+    def color(self):
+        return self._palette[1]
+
+    @color.setter
+    def color(self, colour):
+        self._palette[1] = colour
+
+    # function bounding_box
+    # @return (x, y, width, height) in unscaled label co-ordinates
+    @property
+    def bounding_box(self):
+        width, height = self.font.get_bounding_box()
+        lines = self._text.split("\n")
+        columns = max(len([c for c in l if self.font.get_glyph(ord(c)) != None]) for l in lines)
+        return (0, -(height // 2), columns * width, int(height * self.line_spacing) * (len(lines) - 1) + height)
@@ -0,0 +1,26 @@
+# adafruit_imageload.py
+# Host side stand-in for adafruit_imageload, BMP only (which is all the lib code loads)
+import simulator
+
+# function load
+# @param file: device path to the image
+# @param bitmap: Bitmap class to construct
+# @param palette: Palette class to construct
+# @return (bitmap, palette)
+def load(file, *, bitmap = None, palette = None):
+    width, height, bpp, colours, pixels = simulator.readBmp(simulator.mapPath(file))
+
+    if colours is None:
+        raise ValueError("Only indexed BMPs are supported by the simulator: " + file)
+
+    image = bitmap(width, height, len(colours))
+    for i, value in enumerate(pixels):
+        image[i] = value
+
+    shader = None
+    if palette is not None:
+        shader = palette(len(colours))
+        for i, colour in enumerate(colours):
+            shader[i] = colour
+
+    return image, shader
@@ -0,0 +1,30 @@
+# adafruit_st7735r.py
+# Host side stand-in for the Adafruit ST7735R driver
+# Sends the same init sequence as the real driver so it shows up in the bus counters
+from displayio import BusDisplay
+
+_INIT_SEQUENCE = bytearray(
+    b"\x01\x80\x96"  # SWRESET and Delay 150ms
+    b"\x11\x80\xff"  # SLPOUT and Delay
+    b"\xb1\x03\x01\x2c\x2d"  # FRMCTR1
+    b"\xb2\x03\x01\x2c\x2d"  # FRMCTR2
+    b"\xb3\x06\x01\x2c\x2d\x01\x2c\x2d"  # FRMCTR3
+    b"\xb4\x01\x07"  # INVCTR line inversion
+    b"\xc0\x03\xa2\x02\x84"  # PWCTR1
+    b"\xc1\x01\xc5"  # PWCTR2
+    b"\xc2\x02\x0a\x00"  # PWCTR3
+    b"\xc3\x02\x8a\x2a"  # PWCTR4
+    b"\xc4\x02\x8a\xee"  # PWCTR5
+    b"\xc5\x01\x0e"  # VMCTR1
+    b"\x20\x00"  # INVOFF
+    b"\x36\x01\x18"  # MADCTL
+    b"\x3a\x01\x05"  # COLMOD 16 bit colour
+    b"\xe0\x10\x02\x1c\x07\x12\x37\x32\x29\x2d\x29\x25\x2b\x39\x00\x01\x03\x10"  # GMCTRP1
+    b"\xe1\x10\x03\x1d\x07\x06\x2e\x2c\x29\x2d\x2e\x2e\x37\x3f\x00\x00\x02\x10"  # GMCTRN1
+    b"\x13\x80\x0a"  # NORON
+    b"\x29\x80\x64"  # DISPON
+)
+
+class ST7735R(BusDisplay):
+    def __init__(self, bus, *, bgr = False, invert = False, **kwargs):
+        BusDisplay.__init__(self, bus, _INIT_SEQUENCE, bgr = bgr, **kwargs)
@@ -0,0 +1,59 @@
+# bitmaptools.py
+# Host side stand-in for Circuit Python's bitmaptools, readinto and arrayblit (which is all the lib code uses)
+
+# function readinto
+# Reads bitmap.height rows of packed pixels from a file into a bitmap, each row is the smallest whole number of
+# element_size byte elements that holds bitmap.width pixels
+# @param bitmap: displayio.Bitmap to fill
+# @param file: file open in binary mode, positioned at the first row
+# @param bits_per_pixel: 1, 2, 4, 8, 16, 24 or 32
+# @param element_size [1]: bytes per element (1, 2 or 4)
+# @param reverse_pixels_in_element [False]: first pixel is in the most significant bits of an element
+# @param swap_bytes_in_element [False]: elements are big endian
+# @param reverse_rows [False]: the first row in the file is the bottom one
+def readinto(bitmap, file, bits_per_pixel, element_size = 1, reverse_pixels_in_element = False, swap_bytes_in_element = False, reverse_rows = False):
+    elementBits = element_size * 8
+    rowBytes = ((bitmap.width * bits_per_pixel + elementBits - 1) // elementBits) * element_size
+    mask = (1 << bits_per_pixel) - 1
+
+    for row in range(bitmap.height):
+        data = file.read(rowBytes)
+        y = bitmap.height - 1 - row if reverse_rows else row
+
+        if bits_per_pixel >= 8:
+            step = bits_per_pixel // 8
+
+            for x in range(bitmap.width):
+                value = int.from_bytes(data[x * step:(x + 1) * step], "big" if swap_bytes_in_element else "little")
+                bitmap[x, y] = value
+
+            continue
+
+        perElement = elementBits // bits_per_pixel
+
+        for x in range(bitmap.width):
+            start = (x // perElement) * element_size
+            element = int.from_bytes(data[start:start + element_size], "big" if swap_bytes_in_element else "little")
+            slot = x % perElement
+
+            if reverse_pixels_in_element:
+                slot = perElement - 1 - slot
+
+            bitmap[x, y] = (element >> (slot * bits_per_pixel)) & mask
+
+# function arrayblit
+# Copies one value per element of data into the rectangle x1, y1 to x2, y2 (exclusive) row by row
+# @param bitmap: displayio.Bitmap to fill
+# @param data: buffer of at least (x2 - x1) * (y2 - y1) elements
+# @param skip_index [None]: value that is left out (the bitmap keeps what it had)
+def arrayblit(bitmap, data, x1 = 0, y1 = 0, x2 = None, y2 = None, skip_index = None):
+    x2 = bitmap.width if x2 is None else x2
+    y2 = bitmap.height if y2 is None else y2
+    i = 0
+
+    for y in range(y1, y2):
+        for x in range(x1, x2):
+            if data[i] != skip_index:
+                bitmap[x, y] = data[i]
+
+            i += 1
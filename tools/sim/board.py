@@ -0,0 +1,20 @@
+# board.py
+# Host side stand-in for Circuit Python's board module on a Raspberry Pi Pico
+# Pins are just named objects so drivers can record which ones they were given
+
+class Pin:
+    def __init__(self, name):
+        self.name = name
+
+    def __repr__(self):
+        return "board." + self.name
+
+for _number in range(29):
+    globals()["GP" + str(_number)] = Pin("GP" + str(_number))
+
+LED = GP25
+A0 = GP26
+A1 = GP27
+A2 = GP28
+SMPS_MODE = GP23
+VBUS_SENSE = GP24
@@ -0,0 +1,29 @@
+# busio.py
+# Host side stand-in for Circuit Python's busio module
+# SPI only records its pins and configuration, byte counting happens in displayio.FourWire
+
+class SPI:
+    def __init__(self, clock, MOSI = None, MISO = None, half_duplex = False):
+        self.clock = clock
+        self.MOSI = MOSI
+        self.MISO = MISO
+        self.frequency = 250000
+        self.__locked = False
+
+    def try_lock(self):
+        if self.__locked:
+            return False
+        self.__locked = True
+        return True
+
+    def unlock(self):
+        self.__locked = False
+
+    def configure(self, *, baudrate = 100000, polarity = 0, phase = 0, bits = 8):
+        self.frequency = baudrate
+
+    def write(self, buffer, *, start = 0, end = None):
+        pass
+
+    def deinit(self):
+        pass
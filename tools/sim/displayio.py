@@ -0,0 +1,647 @@
+# displayio.py
+# Host side stand-in for Circuit Python's displayio
+#
+# Only the parts of the API the lib code uses are here: Group, Bitmap, Palette, ColorConverter,
+# TileGrid, OnDiskBitmap, FourWire, BusDisplay and release_displays.
+# Everything renders in software into an RGB565 framebuffer owned by BusDisplay.
+import array
+import simulator
+
+# ****************************
+# *      DISPLAY BUSES       *
+# ****************************
+def release_displays():
+    simulator.releaseDisplays()
+
+class FourWire:
+    # function __init__
+    # Same arguments as displayio.FourWire, pins are only recorded
+    def __init__(self, spi_bus, *, command = None, chip_select = None, reset = None, baudrate = 24000000, polarity = 0, phase = 0):
+        self.spi = spi_bus
+        self.command = command
+        self.chip_select = chip_select
+        self.reset_pin = reset
+        self.baudrate = baudrate
+
+        # Counters a harness can read, every send() is one transaction (CS low -> command + data -> CS high)
+        self.bytesSent = 0
+        self.transactions = 0
+        self.commands = {}
+
+        # Display on this bus, commands lib code sends itself are passed on to it so the simulated panel acts on them
+        self.panel = None
+
+    def reset(self):
+        pass
+
+    # function send
+    # Sends a command byte followed by its data bytes
+    # @param command: command byte (e.g. 0x2A CASET)
+    # @param data: bytes of parameters / pixel data
+    def send(self, command, data, *, toggle_every_byte = False):
+        self.count(command, data)
+
+        if self.panel is not None:
+            self.panel.command(command, bytes(data))
+
+    # function count
+    # Simulator only: counts a transaction without the panel acting on it (BusDisplay's own refresh uses this)
+    def count(self, command, data):
+        self.bytesSent += 1 + len(data)
+        self.transactions += 1
+        self.commands[command] = self.commands.get(command, 0) + 1
+
+# ****************************
+# *         BITMAPS          *
+# ****************************
+# function _bitsFor
+# Bits per value displayio uses for a bitmap with the given number of values (it packs to 1, 2, 4, 8, 16 or 32)
+def _bitsFor(value_count):
+    bits = 1
+
+    while (1 << bits) < value_count:
+        bits *= 2
+
+    return bits
+
+# function _storage
+# Host storage for bitmap values: one byte per pixel up to 256 values, otherwise 16/32 bit words
+def _storage(size, value_count, value = 0):
+    if value_count <= 256:
+        return bytearray([value]) * size
+
+    return array.array("H" if value_count <= 65536 else "I", [value]) * size
+
+class Bitmap:
+    def __init__(self, width, height, value_count):
+        self.width = width
+        self.height = height
+        self.value_count = value_count
+        self.bits_per_value = _bitsFor(value_count)
+        self._data = _storage(width * height, value_count)
+
+        if type(self) is Bitmap:
+            simulator.allocate(32 + self.deviceBytes())
+
+    # function deviceBytes
+    # Simulator only: how much RAM this bitmap takes on the Pico (rows are packed into 32 bit words)
+    def deviceBytes(self):
+        return ((self.width * self.bits_per_value + 31) // 32) * 4 * self.height
+
+    def __getitem__(self, index):
+        if isinstance(index, tuple):
+            index = index[1] * self.width + index[0]
+        return self._data[index]
+
+    def __setitem__(self, index, value):
+        if isinstance(index, tuple):
+            index = index[1] * self.width + index[0]
+        self._data[index] = value
+
+    def __len__(self):
+        return len(self._data)
+
+    def fill(self, value):
+        self._data = _storage(self.width * self.height, self.value_count, value)
+
+    # function row
+    # Simulator only: gets a slice of one row of raw values
+    def row(self, y, x, width):
+        start = y * self.width + x
+        return self._data[start:start + width]
+
+    def dirty(self, x1 = 0, y1 = 0, x2 = -1, y2 = -1):
+        pass
+
+class Palette:
+    def __init__(self, color_count, *, dither = False):
+        self._colours = [0] * color_count
+        self._transparent = [False] * color_count
+        simulator.allocate(16 + color_count * 8)
+
+    def __len__(self):
+        return len(self._colours)
+
+    def __getitem__(self, index):
+        return self._colours[index]
+
+    def __setitem__(self, index, value):
+        self._colours[index] = value
+
+    def make_transparent(self, index):
+        self._transparent[index] = True
+
+    def make_opaque(self, index):
+        self._transparent[index] = False
+
+    def is_transparent(self, index):
+        return self._transparent[index]
+
+    # function lookup
+    # Simulator only: list of RGB565 colours per index, None for transparent entries
+    def lookup(self):
+        return [None if self._transparent[i] else simulator.rgb888To565(c) for i, c in enumerate(self._colours)]
+
+class Colorspace:
+    RGB888 = "RGB888"
+    RGB565 = "RGB565"
+
+class ColorConverter:
+    def __init__(self, *, input_colorspace = Colorspace.RGB888, dither = False):
+        self.input_colorspace = input_colorspace
+        self._transparent = None
+
+    def make_transparent(self, color):
+        self._transparent = color
+
+    def make_opaque(self, color):
+        self._transparent = None
+
+    # function convert
+    # Simulator only: raw bitmap value to RGB565 (None if transparent)
+    def convert(self, value):
+        if value == self._transparent:
+            return None
+        if self.input_colorspace == Colorspace.RGB565:
+            return value
+        return simulator.rgb888To565(value)
+
+class OnDiskBitmap(Bitmap):
+    # function __init__
+    # Unlike the real thing this reads the whole file up front, the pixels are the same either way
+    # @param file: device path (e.g. /images/slideshow/x.bmp) or open file
+    def __init__(self, file):
+        path = file if isinstance(file, str) else file.name
+        width, height, bpp, palette, pixels = simulator.readBmp(simulator.mapPath(path))
+
+        Bitmap.__init__(self, width, height, len(palette) if palette else (65536 if bpp == 16 else 1 << 24))
+        self._data = bytearray(pixels) if self.value_count <= 256 else array.array(self._data.typecode, pixels)
+
+        # The real OnDiskBitmap reads pixels from the file as it draws, it only holds the header in RAM
+        self.deviceBytes = lambda: 0
+        simulator.allocate(64)
+
+        if palette is not None:
+            self.pixel_shader = Palette(len(palette))
+
+            for i, colour in enumerate(palette):
+                self.pixel_shader[i] = colour
+        elif bpp == 16:
+            self.pixel_shader = ColorConverter(input_colorspace = Colorspace.RGB565)
+        else:
+            self.pixel_shader = ColorConverter()
+
+# ****************************
+# *         GROUPS           *
+# ****************************
+class TileGrid:
+    def __init__(self, bitmap, *, pixel_shader, width = 1, height = 1, tile_width = None, tile_height = None, default_tile = 0, x = 0, y = 0):
+        self.bitmap = bitmap
+        self.pixel_shader = pixel_shader
+        self.width = width
+        self.height = height
+        self.tile_width = tile_width if tile_width is not None else bitmap.width
+        self.tile_height = tile_height if tile_height is not None else bitmap.height
+
+        # Circuit Python won't make a TileGrid whose tiles don't cut the bitmap up exactly
+        if bitmap.width % self.tile_width != 0:
+            raise ValueError("Tile width must exactly divide bitmap width")
+
+        if bitmap.height % self.tile_height != 0:
+            raise ValueError("Tile height must exactly divide bitmap height")
+
+        self.x = x
+        self.y = y
+        self.hidden = False
+        self._tiles = [default_tile] * (width * height)
+        simulator.allocate(64 + width * height * 2)
+
+    def __getitem__(self, index):
+        if isinstance(index, tuple):
+            index = index[1] * self.width + index[0]
+        return self._tiles[index]
+
+    def __setitem__(self, index, value):
+        if isinstance(index, tuple):
+            index = index[1] * self.width + index[0]
+        self._tiles[index] = value
+
+    # function render
+    # Simulator only: draws into a framebuffer
+    # @param fb: flat list of RGB565 values
+    # @param fbWidth: framebuffer width
+    # @param fbHeight: framebuffer height
+    # @param ox: absolute x of the parent
+    # @param oy: absolute y of the parent
+    # @param scale: accumulated scale of the parents
+    def render(self, fb, fbWidth, fbHeight, ox, oy, scale):
+        if self.hidden:
+            return
+
+        shader = self.pixel_shader
+
+        if isinstance(shader, Palette):
+            lookup = shader.lookup()
+            opaque = None not in lookup
+            lookup += [None] * (256 - len(lookup))
+            convert = None
+        else:
+            convert = shader.convert
+            lookup = None
+            opaque = shader._transparent is None
+
+        bitmap = self.bitmap
+        tw = self.tile_width
+        th = self.tile_height
+        tilesPerRow = max(1, bitmap.width // tw)
+        baseX = ox + self.x * scale
+        baseY = oy + self.y * scale
+
+        for ty in range(self.height):
+            for tx in range(self.width):
+                tile = self._tiles[ty * self.width + tx]
+                sx = (tile % tilesPerRow) * tw
+                sy = (tile // tilesPerRow) * th
+                x0 = baseX + tx * tw * scale
+                y0 = baseY + ty * th * scale
+
+                for row in range(min(th, bitmap.height - sy)):
+                    values = bitmap.row(sy + row, sx, tw)
+
+                    if lookup is not None:
+                        colours = [lookup[v] for v in values]
+                    else:
+                        colours = [convert(v) for v in values]
+
+                    for sub in range(scale):
+                        y = y0 + row * scale + sub
+
+                        if y < 0 or y >= fbHeight:
+                            continue
+
+                        line = y * fbWidth
+
+                        if scale == 1 and opaque and x0 >= 0 and x0 + tw <= fbWidth and len(colours) == tw:
+                            fb[line + x0:line + x0 + tw] = colours
+                            continue
+
+                        for i, colour in enumerate(colours):
+                            if colour is None:
+                                continue
+
+                            for dx in range(scale):
+                                x = x0 + i * scale + dx
+
+                                if 0 <= x < fbWidth:
+                                    fb[line + x] = colour
+
+class Group:
+    def __init__(self, *, scale = 1, x = 0, y = 0):
+        self.scale = scale
+        self.x = x
+        self.y = y
+        self.hidden = False
+        self._children = []
+        simulator.allocate(48)
+
+    def append(self, layer):
+        self._children.append(layer)
+
+    def insert(self, index, layer):
+        self._children.insert(index, layer)
+
+    def pop(self, index = -1):
+        return self._children.pop(index)
+
+    def remove(self, layer):
+        self._children.remove(layer)
+
+    def index(self, layer):
+        return self._children.index(layer)
+
+    def __len__(self):
+        return len(self._children)
+
+    def __getitem__(self, index):
+        return self._children[index]
+
+    def __setitem__(self, index, layer):
+        self._children[index] = layer
+
+    def __contains__(self, layer):
+        return layer in self._children
+
+    def __iter__(self):
+        return iter(self._children)
+
+    # function render
+    # Simulator only: draws this group and its children into a framebuffer (see TileGrid.render)
+    def render(self, fb, fbWidth, fbHeight, ox = 0, oy = 0, scale = 1):
+        if self.hidden:
+            return
+
+        childX = ox + self.x * scale
+        childY = oy + self.y * scale
+        childScale = scale * self.scale
+
+        for child in self._children:
+            child.render(fb, fbWidth, fbHeight, childX, childY, childScale)
+
+# ****************************
+# *         DISPLAY          *
+# ****************************
+class BusDisplay:
+    # ST77xx command bytes used to push a window of pixels
+    CASET = 0x2A
+    RASET = 0x2B
+    RAMWR = 0x2C
+    VSCRDEF = 0x33
+    VSCSAD = 0x37
+    SLPIN = 0x10
+    SLPOUT = 0x11
+    DISPOFF = 0x28
+    DISPON = 0x29
+
+    # function __init__
+    # Subset of the displayio.BusDisplay arguments, init_sequence is sent to the bus so it gets counted
+    def __init__(self, display_bus, init_sequence = b"", *, width, height, rotation = 0, colstart = 0, rowstart = 0,
+                 color_depth = 16, auto_refresh = True, backlight_pin = None, brightness = 1.0, bgr = False, **kwargs):
+        self.bus = display_bus
+        self.width = width
+        self.height = height
+        self.rotation = rotation
+        self.bgr = bgr
+        self.auto_refresh = auto_refresh
+        self.brightness = brightness
+        self.root_group = None
+
+        # Framebuffer of what the panel is currently showing (RGB565, row major, display co-ordinates)
+        self.framebuffer = [0] * (width * height)
+
+        # Counters, lastRefresh* describe the most recent refresh() only
+        self.refreshes = 0
+        self.bytesPushed = 0
+        self.pixelsPushed = 0
+        self.lastRefreshBytes = 0
+        self.lastRefreshTransactions = 0
+        self.lastRefreshAreas = []
+        self.lastRefreshPixels = 0
+
+        # Panel in its own (unrotated) co-ordinates, used for commands sent straight to the bus: the RAM window and the
+        # vertical scroll area (top fixed, scrolling, bottom fixed lines) and the memory line at the top of it
+        self.panelWidth = height if rotation in (90, 270) else width
+        self.panelHeight = width if rotation in (90, 270) else height
+        self.colstart = colstart
+        self.rowstart = rowstart
+        self.window = [0, 0, self.panelWidth - 1, self.panelHeight - 1]
+        self.scrollArea = (0, self.panelHeight, 0)
+        self.scrollStart = 0
+
+        # Panel power: sleeping after SLPIN until SLPOUT, showing nothing after DISPOFF until DISPON (memory is kept)
+        self.sleeping = False
+        self.displayOn = True
+
+        self._sendInitSequence(init_sequence)
+        display_bus.panel = self
+        simulator.registerDisplay(self)
+
+        # The panel starts as noise on real hardware, treat the first refresh as a full paint
+        self._first = True
+
+    def _sendInitSequence(self, sequence):
+        i = 0
+
+        while i < len(sequence):
+            command = sequence[i]
+            count = sequence[i + 1] & 0x7F
+            delay = sequence[i + 1] & 0x80
+            self.bus.send(command, sequence[i + 2:i + 2 + count])
+            i += 2 + count + (1 if delay else 0)
+
+    # function render
+    # Simulator only: renders root_group into a new framebuffer without touching the panel
+    # @return flat list of RGB565 values
+    def render(self):
+        fb = [0] * (self.width * self.height)
+
+        if self.root_group is not None:
+            self.root_group.render(fb, self.width, self.height)
+
+        return fb
+
+    # function dirtyAreas
+    # Simulator only: works out which areas differ between two framebuffers
+    # Consecutive changed rows are merged into one rectangle spanning their changed columns
+    # @return list of (x, y, width, height)
+    def dirtyAreas(self, old, new):
+        width = self.width
+        areas = []
+        current = None
+
+        for y in range(self.height):
+            start = y * width
+            oldRow = old[start:start + width]
+            newRow = new[start:start + width]
+
+            if oldRow == newRow:
+                if current is not None:
+                    areas.append(current)
+                    current = None
+                continue
+
+            x1 = 0
+            while oldRow[x1] == newRow[x1]:
+                x1 += 1
+
+            x2 = width - 1
+            while oldRow[x2] == newRow[x2]:
+                x2 -= 1
+
+            if current is None:
+                current = [x1, y, x2, y]
+            else:
+                current = [min(current[0], x1), current[1], max(current[2], x2), y]
+
+        if current is not None:
+            areas.append(current)
+
+        return [(a[0], a[1], a[2] - a[0] + 1, a[3] - a[1] + 1) for a in areas]
+
+    # function pushArea
+    # Simulator only: sends one window of pixels over the bus (CASET, RASET, RAMWR)
+    def pushArea(self, fb, x, y, width, height):
+        self.bus.count(self.CASET, bytes((0, x, 0, x + width - 1)))
+        self.bus.count(self.RASET, bytes((0, y, 0, y + height - 1)))
+
+        pixels = bytearray(width * height * 2)
+        i = 0
+
+        for row in range(y, y + height):
+            start = row * self.width + x
+
+            for colour in fb[start:start + width]:
+                if self.bgr:
+                    colour = ((colour & 0x1F) << 11) | (colour & 0x07E0) | (colour >> 11)
+                pixels[i] = colour >> 8
+                pixels[i + 1] = colour & 0xFF
+                i += 2
+
+        self.bus.count(self.RAMWR, pixels)
+
+    # function refresh
+    # Renders the root group and pushes only the areas that changed since the last refresh
+    # @return True (the real one returns False if it was too soon to refresh)
+    def refresh(self, *, target_frames_per_second = None, minimum_frames_per_second = 0):
+        new = self.render()
+
+        if self._first:
+            areas = [(0, 0, self.width, self.height)]
+            self._first = False
+        else:
+            areas = self.dirtyAreas(self.framebuffer, new)
+
+        bytesBefore = self.bus.bytesSent
+        transactionsBefore = self.bus.transactions
+
+        for area in areas:
+            self.pushArea(new, *area)
+
+        # Too fast for the wiring, the panel gets some pixels wrong
+        limit = simulator.getSpiLimit()
+
+        if limit is not None and self.bus.baudrate > limit:
+            new = list(new)
+
+            for x, y, width, height in areas:
+                for i in range(0, width * height, 61):
+                    index = (y + i // width) * self.width + x + i % width
+                    new[index] ^= 0x0841
+
+        clock = simulator.getBusClock()
+
+        if clock is not None:
+            clock.advance((self.bus.bytesSent - bytesBefore) * 8 / self.bus.baudrate)
+
+        self.framebuffer = new
+        self.refreshes += 1
+        self.lastRefreshAreas = areas
+        self.lastRefreshPixels = sum(a[2] * a[3] for a in areas)
+        self.lastRefreshBytes = self.bus.bytesSent - bytesBefore
+        self.lastRefreshTransactions = self.bus.transactions - transactionsBefore
+        self.bytesPushed += self.lastRefreshBytes
+        self.pixelsPushed += self.lastRefreshPixels
+
+        return True
+
+    # function toScreen
+    # Simulator only: display (rotated) co-ordinates of a panel pixel, rotation is clockwise like displayio's
+    def toScreen(self, panelX, panelY):
+        if self.rotation == 90:
+            return panelY, self.panelWidth - 1 - panelX
+
+        if self.rotation == 180:
+            return self.panelWidth - 1 - panelX, self.panelHeight - 1 - panelY
+
+        if self.rotation == 270:
+            return self.panelHeight - 1 - panelY, panelX
+
+        return panelX, panelY
+
+    # function command
+    # Simulator only: acts on a command lib code sent straight to the bus (the software stand-in for the panel)
+    # CASET / RASET / RAMWR write pixels into the framebuffer, which is the panel's memory, VSCRDEF / VSCSAD scroll it
+    def command(self, command, data):
+        if command in (self.CASET, self.RASET, self.RAMWR, self.VSCRDEF, self.VSCSAD):
+            self.bytesPushed += 1 + len(data)
+
+        if command == self.CASET:
+            self.window[0] = ((data[0] << 8) | data[1]) - self.colstart
+            self.window[2] = ((data[2] << 8) | data[3]) - self.colstart
+        elif command == self.RASET:
+            self.window[1] = ((data[0] << 8) | data[1]) - self.rowstart
+            self.window[3] = ((data[2] << 8) | data[3]) - self.rowstart
+        elif command == self.RAMWR:
+            x1, y1, x2, y2 = self.window
+            i = 0
+
+            for panelY in range(y1, y2 + 1):
+                for panelX in range(x1, x2 + 1):
+                    if i + 1 >= len(data):
+                        return
+
+                    colour = (data[i] << 8) | data[i + 1]
+                    i += 2
+
+                    if self.bgr:
+                        colour = ((colour & 0x1F) << 11) | (colour & 0x07E0) | (colour >> 11)
+
+                    if 0 <= panelX < self.panelWidth and 0 <= panelY < self.panelHeight:
+                        x, y = self.toScreen(panelX, panelY)
+                        self.framebuffer[y * self.width + x] = colour
+                        self.pixelsPushed += 1
+        elif command == self.VSCRDEF:
+            self.scrollArea = ((data[0] << 8) | data[1], (data[2] << 8) | data[3], (data[4] << 8) | data[5])
+        elif command == self.VSCSAD:
+            self.scrollStart = (data[0] << 8) | data[1]
+        elif command == self.SLPIN:
+            self.sleeping = True
+        elif command == self.SLPOUT:
+            self.sleeping = False
+        elif command == self.DISPOFF:
+            self.displayOn = False
+        elif command == self.DISPON:
+            self.displayOn = True
+
+    # function memoryLine
+    # Simulator only: which memory line the panel shows on a line with the current scroll setting
+    def memoryLine(self, panelY):
+        top, lines, bottom = self.scrollArea
+
+        if panelY < top or panelY >= top + lines or lines == 0:
+            return panelY
+
+        return top + (panelY - top + self.scrollStart - top) % lines
+
+    # function visible
+    # Simulator only: what the panel actually shows, the framebuffer seen through the vertical scroll
+    # @return flat list of RGB565 values (the framebuffer itself when it isn't scrolled)
+    def visible(self):
+        if all(self.memoryLine(y) == y for y in range(self.panelHeight)):
+            return self.framebuffer
+
+        fb = [0] * (self.width * self.height)
+
+        for panelY in range(self.panelHeight):
+            line = self.memoryLine(panelY)
+
+            for panelX in range(self.panelWidth):
+                x, y = self.toScreen(panelX, panelY)
+
+                if line < self.panelHeight:
+                    sx, sy = self.toScreen(panelX, line)
+                    fb[y * self.width + x] = self.framebuffer[sy * self.width + sx]
+
+        return fb
+
+    # function panelPixels
+    # Simulator only: what the panel shows in its own memory order (row by row from panel pixel 0, 0, rotation applied),
+    # so the same picture at 0 and 180 degrees (or 90 and 270) comes out turned round as it is on the glass
+    # @return flat list of RGB565 values, panelWidth x panelHeight
+    def panelPixels(self):
+        shown = self.visible()
+        pixels = []
+
+        for panelY in range(self.panelHeight):
+            for panelX in range(self.panelWidth):
+                x, y = self.toScreen(panelX, panelY)
+                pixels.append(shown[y * self.width + x])
+
+        return pixels
+
+    # function pixel
+    # Simulator only: gets the RGB565 value currently shown at x, y
+    def pixel(self, x, y):
+        return self.visible()[y * self.width + x]
+
+# Older name for BusDisplay, still used by some drivers
+Display = BusDisplay
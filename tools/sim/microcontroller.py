@@ -0,0 +1,9 @@
+# microcontroller.py
+# Host side stand-in for Circuit Python's microcontroller module
+
+class Processor:
+    frequency = 125000000
+    temperature = 25.0
+    voltage = 3.3
+
+cpu = Processor()
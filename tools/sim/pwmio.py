@@ -0,0 +1,26 @@
+# pwmio.py
+# Host side stand-in for Circuit Python's pwmio module
+# PWMOut only records its pin, frequency and duty cycle (and how many times the duty cycle was written)
+
+class PWMOut:
+    def __init__(self, pin, *, duty_cycle = 0, frequency = 500, variable_frequency = False):
+        self.pin = pin
+        self.frequency = frequency
+        self.variable_frequency = variable_frequency
+        self.writes = 0
+        self._duty_cycle = duty_cycle
+
+    @property
+    def duty_cycle(self):
+        return self._duty_cycle
+
+    @duty_cycle.setter
+    def duty_cycle(self, value):
+        if not 0 <= value <= 65535:
+            raise ValueError("duty_cycle must be 0 to 65535")
+
+        self._duty_cycle = value
+        self.writes += 1
+
+    def deinit(self):
+        pass
@@ -0,0 +1,622 @@
+# simulator.py
+# Host side helpers for the headless displayio simulator
+#
+# The other files in this directory stand in for the Circuit Python modules the lib code imports
+# (board, busio, displayio, terminalio, adafruit_st7735r, adafruit_display_text, adafruit_imageload
+# and microcontroller).  Put this directory on sys.path ahead of ../../lib and the library code runs
+# unchanged under CPython on Linux, rendering into an in-memory RGB565 framebuffer instead of a panel.
+#
+# This file holds the bits that don't belong to any one stand-in module:
+#  - mapping of device paths (e.g. /images/...) onto a directory on the host
+#  - a virtual clock that replaces time.sleep / time.monotonic_ns so main.py can be driven quickly
+#  - a gc.mem_free / gc.mem_alloc shim (CPython's gc doesn't have them) and a model of the Pico's collected heap
+#  - a small BMP reader used by OnDiskBitmap and adafruit_imageload
+#  - PNG read / write of framebuffers for the snapshot suite
+#  - a registry of displays so a harness can get at their framebuffers and SPI counters
+import os, struct, time, gc, math, tracemalloc, zlib
+
+# ****************************
+# *    SETTINGS VARIABLES    *
+# ****************************
+# Directories on the device (CIRCUITPY drive root) that get mapped onto the simulator root
+DEVICE_DIRS = ["/images"]
+
+# Heap size reported by the gc shim, roughly what a Pico running Circuit Python 9 has free at boot
+HEAP_SIZE = 192 * 1024
+
+# ****************************
+# *    INTERNAL VARIABLES    *
+# ****************************
+_root = None
+_displays = []
+_realOs = {}
+_realTime = {}
+_readDelay = 0
+_spiLimit = None
+_busClock = None
+_heap = None
+_realGc = {}
+
+# Raised from the virtual time.sleep when the harness wants the program under test to stop
+class StopSimulation(Exception):
+    pass
+
+# ****************************
+# *       FILE SYSTEM        *
+# ****************************
+# function setRoot
+# Sets the host directory that stands in for the root of the CIRCUITPY drive
+# @param path: host directory containing images/ etc.
+def setRoot(path):
+    global _root
+    _root = path
+
+def getRoot():
+    return _root
+
+# function mapPath
+# Converts a device path (/images/x.bmp) to the matching host path under the simulator root
+# Paths outside DEVICE_DIRS (or when no root is set) are returned unchanged
+# @param path: path as the code on the Pico would use it
+# @return host path
+def mapPath(path):
+    if _root is None or not isinstance(path, str) or not path.startswith("/"):
+        return path
+
+    for prefix in DEVICE_DIRS:
+        if path == prefix or path.startswith(prefix + "/"):
+            return os.path.join(_root, path[1:])
+
+    return path
+
+# function installFilesystem
+# Wraps os.listdir / os.stat and open so lib code using device paths reads from the simulator root
+def installFilesystem():
+    import builtins
+
+    if _realOs:
+        return
+
+    _realOs["listdir"] = os.listdir
+    _realOs["stat"] = os.stat
+    _realOs["open"] = builtins.open
+
+    os.listdir = _listdir
+    os.stat = lambda path, *args, **kwargs: _realOs["stat"](mapPath(path), *args, **kwargs)
+    builtins.open = lambda path, *args, **kwargs: _realOs["open"](mapPath(path), *args, **kwargs)
+
+# function _listdir
+# os.listdir on the simulator root, charging the list of names to the heap model
+def _listdir(path = "."):
+    names = _realOs["listdir"](mapPath(path))
+    allocate(16 + sum(16 + len(name) for name in names))
+    return names
+
+# function uninstallFilesystem
+# Puts back the real os / open functions
+def uninstallFilesystem():
+    import builtins
+
+    if not _realOs:
+        return
+
+    os.listdir = _realOs.pop("listdir")
+    os.stat = _realOs.pop("stat")
+    builtins.open = _realOs.pop("open")
+
+# ****************************
+# *      VIRTUAL CLOCK       *
+# ****************************
+class VirtualClock:
+    # function __init__
+    # @param onSleep [None]: callback(clock, seconds) run every time the program sleeps (after time has advanced)
+    #                        raise StopSimulation from it to end the run
+    def __init__(self, onSleep = None):
+        self.nowNs = 0
+        self.onSleep = onSleep
+        self.sleeps = 0
+        self.lastRefreshSeconds = 0
+
+    def monotonic_ns(self):
+        return self.nowNs
+
+    def monotonic(self):
+        return self.nowNs / 1000000000
+
+    def sleep(self, seconds):
+        # Rounded up so a tiny sleep (asyncio waiting for a timer a float rounding error away) still moves time on
+        self.nowNs += math.ceil(seconds * 1000000000)
+        self.sleeps += 1
+
+        # Displays with auto refresh on would have refreshed in the background while we slept
+        start = time.perf_counter()
+
+        for display in _displays:
+            if display.auto_refresh:
+                display.refresh()
+
+        self.lastRefreshSeconds = time.perf_counter() - start
+
+        if self.onSleep is not None:
+            self.onSleep(self, seconds)
+
+    # function advance
+    # Moves time forward without counting as a sleep (e.g. to model time spent doing work)
+    def advance(self, seconds):
+        self.nowNs += int(seconds * 1000000000)
+
+    def install(self):
+        if _realTime:
+            return
+
+        for name in ("sleep", "monotonic", "monotonic_ns"):
+            _realTime[name] = getattr(time, name)
+            setattr(time, name, getattr(self, name))
+
+    def uninstall(self):
+        for name in list(_realTime):
+            setattr(time, name, _realTime.pop(name))
+
+        import asyncio
+        asyncio.set_event_loop_policy(None)
+
+    # function installAsyncio
+    # Makes asyncio event loops wait on this clock: whenever the loop would block waiting for its next timer
+    # it calls sleep() instead, so asyncio code runs in virtual time just like time.sleep() code
+    def installAsyncio(self):
+        import asyncio, selectors
+
+        clock = self
+
+        class VirtualSelector(selectors.DefaultSelector):
+            def select(self, timeout = None):
+                if timeout is None or timeout > 0:
+                    clock.sleep(timeout or 0)
+
+                return selectors.DefaultSelector.select(self, 0)
+
+        class VirtualPolicy(asyncio.DefaultEventLoopPolicy):
+            def new_event_loop(self):
+                return asyncio.SelectorEventLoop(VirtualSelector())
+
+        asyncio.set_event_loop_policy(VirtualPolicy())
+
+# ****************************
+# *         GC SHIM          *
+# ****************************
+# function installGc
+# Adds mem_free / mem_alloc to CPython's gc module
+# @param trace [False]: use tracemalloc so mem_alloc reflects real Python allocations (slow)
+def installGc(trace = False):
+    if trace and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+    def mem_alloc():
+        if tracemalloc.is_tracing():
+            return tracemalloc.get_traced_memory()[0]
+        return 0
+
+    gc.mem_alloc = mem_alloc
+    gc.mem_free = lambda: max(0, HEAP_SIZE - mem_alloc())
+
+# Model of Circuit Python's heap, where nothing is freed until a collection: the stand-in modules charge what their
+# objects would take on the Pico (allocate()), a collection happens when gc.threshold bytes have been allocated since
+# the last one or the heap is full, and each collection moves the virtual clock on by a pause that grows with the heap
+# in use.  Only the stand-ins' objects are counted (not strings, lists ... made by the lib code) and everything
+# allocated is taken to be garbage by the next collection, so it's for comparing when collections happen rather than
+# predicting the Pico's figures.
+class SimulatedHeap:
+    # Pause of one collection: a fixed part plus a part per KB in use (~7ms with 150KB in use)
+    PAUSE_MS = 0.5
+    PAUSE_MS_PER_KB = 0.04
+
+    # function __init__
+    # @param clock: VirtualClock collections move on
+    # @param live [60000]: bytes still in use after a collection
+    def __init__(self, clock, live = 60000):
+        self.clock = clock
+        self.live = live
+        self.sinceCollect = 0
+        self.threshold = -1
+        self.enabled = True
+        self.allocated = 0
+        self.where = None
+
+        # (virtual seconds, pause ms, bytes freed, automatic, where) per collection
+        self.collections = []
+
+    def used(self):
+        return self.live + self.sinceCollect
+
+    # function allocate
+    # Charges an allocation, collecting first if it's due (the way the Pico collects inside whatever allocates)
+    def allocate(self, size):
+        full = self.used() + size > HEAP_SIZE
+        overThreshold = self.enabled and self.threshold >= 0 and self.sinceCollect + size > self.threshold
+
+        if full or overThreshold:
+            self.collect(True)
+
+        self.sinceCollect += size
+        self.allocated += size
+
+    # function collect
+    # @param automatic: True for a collection the heap did itself, False for gc.collect()
+    def collect(self, automatic = False):
+        pause = self.PAUSE_MS + self.PAUSE_MS_PER_KB * self.used() / 1024
+        self.collections.append((self.clock.monotonic(), pause, self.sinceCollect, automatic, self.where))
+        self.sinceCollect = 0
+        self.clock.advance(pause / 1000)
+
+    def thresholdFunction(self, amount = None):
+        if amount is None:
+            return self.threshold
+
+        self.threshold = amount
+
+# function installHeap
+# Replaces gc.collect / mem_free / mem_alloc / threshold / enable / disable with a SimulatedHeap
+# @param clock: VirtualClock
+# @param live [60000]: bytes in use after a collection
+# @return the SimulatedHeap
+def installHeap(clock, live = 60000):
+    global _heap
+
+    if _realGc:
+        uninstallHeap()
+
+    _heap = SimulatedHeap(clock, live)
+
+    for name in ("collect", "mem_free", "mem_alloc", "threshold", "enable", "disable"):
+        _realGc[name] = getattr(gc, name, None)
+
+    gc.collect = lambda generation = 2: _heap.collect()
+    gc.mem_alloc = _heap.used
+    gc.mem_free = lambda: max(0, HEAP_SIZE - _heap.used())
+    gc.threshold = _heap.thresholdFunction
+    gc.enable = lambda: setattr(_heap, "enabled", True)
+    gc.disable = lambda: setattr(_heap, "enabled", False)
+    return _heap
+
+# function uninstallHeap
+# Puts gc back as it was
+def uninstallHeap():
+    global _heap
+
+    for name, function in _realGc.items():
+        if function is None:
+            delattr(gc, name)
+        else:
+            setattr(gc, name, function)
+
+    _realGc.clear()
+    _heap = None
+
+# function allocate
+# Called by the stand-in modules with the bytes an object they make would take on the Pico
+def allocate(size):
+    if _heap is not None:
+        _heap.allocate(size)
+
+# ****************************
+# *        DISPLAYS          *
+# ****************************
+def registerDisplay(display):
+    _displays.append(display)
+
+def releaseDisplays():
+    _displays.clear()
+
+# function getDisplays
+# @return list of simulated displays that have been created since the last release_displays()
+def getDisplays():
+    return list(_displays)
+
+# function setSpiLimit
+# Models the wiring: refreshes sent faster than this corrupt some of the pixels the panel gets (the display tree is
+# still right, so the panel's framebuffer no longer matches render())
+# @param hz: fastest clean SPI clock, None for no limit
+def setSpiLimit(hz):
+    global _spiLimit
+    _spiLimit = hz
+
+def getSpiLimit():
+    return _spiLimit
+
+# function setBusClock
+# Makes every refresh move a VirtualClock on by the time its bytes take at the bus baud rate, so code timing
+# refreshes with time.monotonic_ns() sees SPI time
+# @param clock: VirtualClock, None to stop
+def setBusClock(clock):
+    global _busClock
+    _busClock = clock
+
+def getBusClock():
+    return _busClock
+
+# ****************************
+# *        BMP READER        *
+# ****************************
+# function setReadDelay
+# Makes every BMP read take longer, to model opening files on the Pico's flash in the benchmarks
+# @param delayMs: milliseconds (real time) added to each readBmp, 0 for none
+def setReadDelay(delayMs):
+    global _readDelay
+    _readDelay = delayMs
+
+# function readBmp
+# Reads an uncompressed (or BI_BITFIELDS 16 bit) BMP file
+# @param path: host path to the file
+# @return (width, height, bitsPerPixel, palette, pixels)
+#         palette is a list of 0xRRGGBB ints for indexed images otherwise None
+#         pixels is a flat top-down list of palette indexes, RGB565 values (16 bit) or 0xRRGGBB values (24/32 bit)
+def readBmp(path):
+    if _readDelay > 0:
+        _realTime.get("sleep", time.sleep)(_readDelay / 1000)
+
+    with _realOs.get("open", open)(path, "rb") as f:
+        data = f.read()
+
+    if data[0:2] != b"BM":
+        raise ValueError("Not a BMP file: " + path)
+
+    dataOffset, = struct.unpack_from("<I", data, 10)
+    headerSize, width, height, planes, bpp, compression = struct.unpack_from("<IiiHHI", data, 14)
+
+    if compression not in (0, 3):
+        raise ValueError("Compressed BMPs are not supported: " + path)
+
+    topDown = height < 0
+    height = abs(height)
+
+    palette = None
+
+    if bpp <= 8:
+        colours, = struct.unpack_from("<I", data, 46)
+
+        if colours == 0:
+            colours = 1 << bpp
+
+        start = 14 + headerSize
+        palette = []
+
+        for i in range(colours):
+            b, g, r = data[start + i * 4], data[start + i * 4 + 1], data[start + i * 4 + 2]
+            palette.append((r << 16) | (g << 8) | b)
+
+    stride = ((width * bpp + 31) // 32) * 4
+    pixels = []
+
+    for y in range(height):
+        row = y if topDown else height - 1 - y
+        offset = dataOffset + row * stride
+
+        if bpp == 8:
+            pixels.extend(data[offset:offset + width])
+        elif bpp < 8:
+            perByte = 8 // bpp
+            mask = (1 << bpp) - 1
+
+            for x in range(width):
+                byte = data[offset + x // perByte]
+                shift = 8 - bpp * (x % perByte + 1)
+                pixels.append((byte >> shift) & mask)
+        elif bpp == 16:
+            for x in range(width):
+                pixels.append(struct.unpack_from("<H", data, offset + x * 2)[0])
+        elif bpp in (24, 32):
+            step = bpp // 8
+
+            for x in range(width):
+                p = offset + x * step
+                pixels.append((data[p + 2] << 16) | (data[p + 1] << 8) | data[p])
+        else:
+            raise ValueError("Unsupported bit depth " + str(bpp) + ": " + path)
+
+    return width, height, bpp, palette, pixels
+
+# function writeBmp
+# Writes an 8 bit indexed BMP (used by harnesses to generate placeholder assets)
+# @param path: host path to write
+# @param width: width in pixels
+# @param height: height in pixels
+# @param palette: list of 0xRRGGBB ints (max 256)
+# @param pixels: flat top-down list of palette indexes
+def writeBmp(path, width, height, palette, pixels):
+    stride = ((width * 8 + 31) // 32) * 4
+    dataOffset = 14 + 40 + len(palette) * 4
+    size = dataOffset + stride * height
+
+    out = bytearray()
+    out += struct.pack("<2sIHHI", b"BM", size, 0, 0, dataOffset)
+    out += struct.pack("<IiiHHIIiiII", 40, width, height, 1, 8, 0, stride * height, 2835, 2835, len(palette), 0)
+
+    for colour in palette:
+        out += bytes(((colour) & 0xFF, (colour >> 8) & 0xFF, (colour >> 16) & 0xFF, 0))
+
+    for y in range(height - 1, -1, -1):
+        row = bytes(pixels[y * width:(y + 1) * width])
+        out += row + bytes(stride - width)
+
+    with _realOs.get("open", open)(path, "wb") as f:
+        f.write(out)
+
+# function writePng
+# Writes a framebuffer as an 8 bit RGB PNG (so snapshots open in any image viewer)
+# @param path: host path to write
+# @param width: width in pixels
+# @param height: height in pixels
+# @param pixels: flat top-down list of RGB565 values
+def writePng(path, width, height, pixels):
+    raw = bytearray()
+
+    for y in range(height):
+        raw.append(0)
+
+        for colour in pixels[y * width:(y + 1) * width]:
+            rgb = rgb565To888(colour)
+            raw += bytes(((rgb >> 16) & 0xFF, (rgb >> 8) & 0xFF, rgb & 0xFF))
+
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+    out = b"\x89PNG\r\n\x1a\n"
+    out += chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+    out += chunk(b"IDAT", zlib.compress(bytes(raw), 9))
+    out += chunk(b"IEND", b"")
+
+    with _realOs.get("open", open)(path, "wb") as f:
+        f.write(out)
+
+# function readPng
+# Reads an 8 bit RGB or RGBA PNG (not interlaced), e.g. one written by writePng and touched up in an image editor
+# @param path: host path to the file
+# @return (width, height, pixels) pixels is a flat top-down list of RGB565 values (alpha is ignored)
+def readPng(path):
+    with _realOs.get("open", open)(path, "rb") as f:
+        data = f.read()
+
+    if data[0:8] != b"\x89PNG\r\n\x1a\n":
+        raise ValueError("Not a PNG file: " + path)
+
+    offset = 8
+    compressed = bytearray()
+
+    while offset < len(data):
+        length, kind = struct.unpack_from(">I4s", data, offset)
+        body = data[offset + 8:offset + 8 + length]
+        offset += 12 + length
+
+        if kind == b"IHDR":
+            width, height, depth, colourType, _, _, interlace = struct.unpack(">IIBBBBB", body)
+
+            if depth != 8 or colourType not in (2, 6) or interlace != 0:
+                raise ValueError("Only 8 bit RGB / RGBA PNGs are supported: " + path)
+        elif kind == b"IDAT":
+            compressed += body
+        elif kind == b"IEND":
+            break
+
+    raw = zlib.decompress(bytes(compressed))
+    step = 3 if colourType == 2 else 4
+    stride = width * step
+    previous = bytearray(stride)
+    pixels = []
+
+    for y in range(height):
+        start = y * (stride + 1)
+        kind = raw[start]
+        row = bytearray(raw[start + 1:start + 1 + stride])
+
+        # Undo the row filter (None, Sub, Up, Average, Paeth)
+        for i in range(stride):
+            left = row[i - step] if i >= step else 0
+            up = previous[i]
+
+            if kind == 1:
+                row[i] = (row[i] + left) & 0xFF
+            elif kind == 2:
+                row[i] = (row[i] + up) & 0xFF
+            elif kind == 3:
+                row[i] = (row[i] + (left + up) // 2) & 0xFF
+            elif kind == 4:
+                upLeft = previous[i - step] if i >= step else 0
+                p = left + up - upLeft
+                pa, pb, pc = abs(p - left), abs(p - up), abs(p - upLeft)
+                row[i] = (row[i] + (left if pa <= pb and pa <= pc else up if pb <= pc else upLeft)) & 0xFF
+
+        for x in range(width):
+            p = x * step
+            pixels.append(rgb888To565((row[p] << 16) | (row[p + 1] << 8) | row[p + 2]))
+
+        previous = row
+
+    return width, height, pixels
+
+# ****************************
+# *         COLOURS          *
+# ****************************
+# function rgb888To565
+# @param colour: 0xRRGGBB
+# @return RGB565 value
+def rgb888To565(colour):
+    return ((colour >> 8) & 0xF800) | ((colour >> 5) & 0x07E0) | ((colour >> 3) & 0x001F)
+
+# function rgb565To888
+# @param colour: RGB565 value
+# @return 0xRRGGBB (low bits filled by replicating the high bits)
+def rgb565To888(colour):
+    r = (colour >> 11) & 0x1F
+    g = (colour >> 5) & 0x3F
+    b = colour & 0x1F
+    return (((r << 3) | (r >> 2)) << 16) | (((g << 2) | (g >> 4)) << 8) | ((b << 3) | (b >> 2))
+
+# ****************************
+# *       DEVICE ROOT        *
+# ****************************
+# Assets main.py expects on the Pico that aren't in the repo, generated as simple patterned placeholders
+# name: (width, height, number of colours)
+PLACEHOLDER_IMAGES = {
+    "decoration.bmp": (98, 40, 4),
+    "anim.bmp": (1700, 44, 4),
+}
+
+# Number of placeholder slideshow images to generate when the slideshow directories are empty
+PLACEHOLDER_SLIDES = 4
+
+# function placeholderImage
+# Builds a striped indexed image, index 0 is left as the (transparent) background colour
+# @param width: width in pixels
+# @param height: height in pixels
+# @param colours: number of palette entries
+# @param seed: varies the pattern / palette so generated images differ from each other
+# @return (palette, pixels)
+def placeholderImage(width, height, colours, seed = 0):
+    palette = [0x000000]
+
+    for i in range(1, colours):
+        palette.append(((i * 97 + seed * 53) % 256) << 16 | ((i * 31 + seed * 101) % 256) << 8 | ((i * 151 + seed * 17) % 256))
+
+    pixels = []
+
+    for y in range(height):
+        for x in range(width):
+            pixels.append(((x + seed * 7) // 8 + (y // 8)) % colours)
+
+    return palette, pixels
+
+# function createDeviceRoot
+# Fills a host directory with what the CIRCUITPY drive would hold for main.py: the repo's images
+# plus placeholders for anything main.py uses that isn't checked in
+# @param target: host directory to use as the simulator root (created if needed)
+# @param imagesDir: the repo's images directory
+# @return target
+def createDeviceRoot(target, imagesDir):
+    import shutil
+
+    images = os.path.join(target, "images")
+
+    if not os.path.isdir(images):
+        shutil.copytree(imagesDir, images)
+
+    for name, (width, height, colours) in PLACEHOLDER_IMAGES.items():
+        path = os.path.join(images, name)
+
+        if not os.path.exists(path):
+            palette, pixels = placeholderImage(width, height, colours)
+            writeBmp(path, width, height, palette, pixels)
+
+    for directory, width, height in (("slideshow", 160, 128), ("slideshow_portrait", 128, 160)):
+        path = os.path.join(images, directory)
+        os.makedirs(path, exist_ok = True)
+
+        # The readme is only there for git, the Pico wouldn't have it
+        if os.path.exists(os.path.join(path, "readme.md")):
+            os.remove(os.path.join(path, "readme.md"))
+
+        if not any(f.endswith(".bmp") for f in os.listdir(path)):
+            for i in range(PLACEHOLDER_SLIDES):
+                palette, pixels = placeholderImage(width, height, 16, seed = i + 1)
+                writeBmp(os.path.join(path, "slide" + str(i) + ".bmp"), width, height, palette, pixels)
+
+    return target
@@ -0,0 +1,278 @@
+# snapshot_screens.py
+# Golden image and repaint budget checks for every screen in all four orientations
+#
+# Each scenario builds a screen the way main.py does on the simulated panel and goes through a few steps (first paint,
+# new readings, the fan, graph points, an animation frame ...).  After each step what the panel shows, in the panel's
+# own memory order with the rotation applied (so each orientation has its own image, a rotation mistake shows), is
+# compared with tools/snapshots/<scenario>_<orientation>_<step>.png and the bytes the step sent over SPI with its budget in
+# tools/snapshots/budgets.json.  A pixel that differs or a step sending more than its budget (plus --tolerance percent)
+# fails the suite, the exit code is 1 and the actual / diff images are written to --out so they can be looked at.
+#
+# After a change that's meant to alter the screens (or to bring the bytes down) run it with --update and check the new
+# PNGs in with the change.
+#
+# USAGE:
+#
+#   python3 tools/snapshot_screens.py                   (check, exit code 1 on a regression)
+#   python3 tools/snapshot_screens.py --update          (write new goldens and budgets)
+#   python3 tools/snapshot_screens.py --only temperature_90
+import argparse, json, os, random, sys, tempfile
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(TOOLS_DIR)
+sys.path.insert(0, os.path.join(REPO_DIR, "lib"))
+sys.path.insert(0, os.path.join(TOOLS_DIR, "sim"))
+
+import simulator
+from AZ_ST7735S import AZ_ST7735S
+from SplashScreen import SplashScreen
+from TemperatureScreen import TemperatureScreen
+from SlideShowScreen import SlideShowScreen
+from SlideShowLoader import SlideShowLoader
+from ScreenManager import ScreenManager
+from ScrollTransition import ScrollTransition
+
+SNAPSHOT_DIR = os.path.join(TOOLS_DIR, "snapshots")
+BUDGETS_PATH = os.path.join(SNAPSHOT_DIR, "budgets.json")
+ORIENTATIONS = (0, 90, 180, 270)
+
+# Colour changed pixels are painted in the diff images
+DIFF_COLOUR = 0xF800
+
+# function isPortrait
+def isPortrait(orientation):
+    return orientation in (0, 180)
+
+# function splashScenario
+# The boot splash screen filling up then going
+def splashScenario(tft, clock):
+    splash = SplashScreen(tft)
+    tft.refresh()
+    yield "paint"
+
+    splash.setProgress(0.5)
+    tft.refresh()
+    yield "progress"
+
+    splash.hide()
+    tft.refresh()
+    yield "hide"
+
+# function temperatureScenario
+# The temperature screen built and updated the way main.py does it
+def temperatureScenario(tft, clock):
+    def build():
+        screen = TemperatureScreen("Demo &\nText", "temperature_1-2.bmp", "humidity_1-2.bmp", "fan_1-2.bmp", "decoration.bmp")
+
+        if isPortrait(tft.getOrientation()):
+            screen.addAnimationLabel("anim.bmp")
+            screen.setPortrait()
+        else:
+            screen.addAnimationLabel("anim.bmp", portrait = False)
+
+        screen.addGraphs()
+        screen.setDisplay(tft)
+        screen.setTemperature(21)
+        screen.setHumidity(40)
+        return screen
+
+    screens = ScreenManager(tft.getScreen(), watermark = 0)
+    screens.addScreen("temperature", build)
+
+    with tft:
+        screen = screens.show("temperature")
+        tft.setBackgroundColour(screen.getBackgroundColour())
+
+    yield "paint"
+
+    with screen:
+        screen.setTemperature(30)
+        screen.setHumidity(70)
+
+    yield "reading"
+
+    with tft:
+        screen.toggleFan()
+
+    yield "fan"
+
+    with screen:
+        for i in range(8):
+            screen.addGraphSamples(18 + i, 35 + i * 3)
+
+    yield "graph"
+
+    clock.advance(1)
+
+    if screen.animate() > 0:
+        tft.refresh()
+
+    yield "animate"
+
+    with tft:
+        screen.cycleBackgroundColour()
+        tft.setBackgroundColour(screen.getBackgroundColour())
+
+    yield "background"
+
+# function slideshowScenario
+# A slideshow image put up then the next one scrolled in
+def slideshowScenario(tft, clock):
+    slideshowDir = "slideshow_portrait" if isPortrait(tft.getOrientation()) else "slideshow"
+    slideshow = SlideShowScreen(slideshowDir = slideshowDir, width = tft.getWidth(), height = tft.getHeight())
+    loader = SlideShowLoader(slideshow)
+
+    slide = loader.take()
+    tft.setBackgroundLayer(slide[1])
+    tft.refresh()
+    yield "slide"
+
+    slide = loader.take()
+    tft.transitionBackgroundLayer(slide[1], ScrollTransition.SLIDE, imagePath = loader.getImagePath(slide[0]))
+    yield "transition"
+
+SCENARIOS = (
+    ("splash", splashScenario),
+    ("temperature", temperatureScenario),
+    ("slideshow", slideshowScenario),
+)
+
+# function runScenario
+# @param scenario: generator function(tft, clock) yielding a step name after each change has been refreshed
+# @param orientation: 0, 90, 180 or 270
+# @return list of (step, panel width, panel height, pixels shown in panel memory order, bytes sent)
+def runScenario(scenario, orientation):
+    random.seed(0)
+    clock = simulator.VirtualClock()
+    clock.install()
+
+    try:
+        tft = AZ_ST7735S()
+        tft.initialiseScreen(orientation, autoRefresh = False)
+        display = tft.getDisplay()
+        steps = []
+        sent = display.bus.bytesSent
+
+        for step in scenario(tft, clock):
+            steps.append((step, display.panelWidth, display.panelHeight, display.panelPixels(), display.bus.bytesSent - sent))
+            sent = display.bus.bytesSent
+    finally:
+        clock.uninstall()
+
+    return steps
+
+# function diffPixels
+# @return (number of pixels that differ, diff image: the expected image dimmed with changed pixels in DIFF_COLOUR)
+def diffPixels(expected, actual):
+    changed = 0
+    diff = []
+
+    for old, new in zip(expected, actual):
+        if old != new:
+            changed += 1
+            diff.append(DIFF_COLOUR)
+        else:
+            diff.append((old >> 1) & 0x7BEF)
+
+    return changed, diff
+
+# function checkStep
+# @return list of failure messages for one step (empty if it matches)
+def checkStep(name, width, height, pixels, sent, budget, tolerance, out):
+    failures = []
+    path = os.path.join(SNAPSHOT_DIR, name + ".png")
+
+    if not os.path.exists(path):
+        failures.append("{0}: no golden image, run with --update".format(name))
+    else:
+        goldenWidth, goldenHeight, golden = simulator.readPng(path)
+
+        if (goldenWidth, goldenHeight) != (width, height):
+            failures.append("{0}: {1}x{2} but the golden image is {3}x{4}".format(name, width, height, goldenWidth, goldenHeight))
+        else:
+            changed, diff = diffPixels(golden, pixels)
+
+            if changed > 0:
+                failures.append("{0}: {1} pixels differ".format(name, changed))
+                os.makedirs(out, exist_ok = True)
+                simulator.writePng(os.path.join(out, name + "_diff.png"), width, height, diff)
+
+    if budget == None:
+        failures.append("{0}: no bytes budget, run with --update".format(name))
+    elif sent > budget * (1 + tolerance / 100):
+        failures.append("{0}: sent {1} bytes, budget {2}".format(name, sent, budget))
+
+    if failures:
+        os.makedirs(out, exist_ok = True)
+        simulator.writePng(os.path.join(out, name + ".png"), width, height, pixels)
+
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description = "Golden image and repaint budget checks for every screen and orientation")
+    parser.add_argument("--update", action = "store_true", help = "write the current images and bytes as the new goldens")
+    parser.add_argument("--only", help = "only run scenarios whose <scenario>_<orientation> name contains this")
+    parser.add_argument("--tolerance", type = float, default = 0, help = "percent a step can go over its bytes budget")
+    parser.add_argument("--out", default = "snapshot_failures", help = "directory for the actual / diff images of failures")
+    args = parser.parse_args()
+
+    budgets = {}
+
+    if os.path.exists(BUDGETS_PATH):
+        with open(BUDGETS_PATH) as f:
+            budgets = json.load(f)
+
+    failures = []
+    checked = 0
+
+    with tempfile.TemporaryDirectory() as root:
+        simulator.createDeviceRoot(root, os.path.join(REPO_DIR, "images"))
+        simulator.setRoot(root)
+        simulator.installFilesystem()
+        simulator.installGc()
+
+        try:
+            for scenarioName, scenario in SCENARIOS:
+                for orientation in ORIENTATIONS:
+                    run = "{0}_{1}".format(scenarioName, orientation)
+
+                    if args.only and args.only not in run:
+                        continue
+
+                    for step, width, height, pixels, sent in runScenario(scenario, orientation):
+                        name = run + "_" + step
+                        checked += 1
+
+                        if args.update:
+                            os.makedirs(SNAPSHOT_DIR, exist_ok = True)
+                            simulator.writePng(os.path.join(SNAPSHOT_DIR, name + ".png"), width, height, pixels)
+                            budgets.setdefault(run, {})[step] = sent
+                            print("{0:<36} {1:>7} bytes  updated".format(name, sent))
+                            continue
+
+                        budget = budgets.get(run, {}).get(step)
+                        stepFailures = checkStep(name, width, height, pixels, sent, budget, args.tolerance, args.out)
+                        failures += stepFailures
+                        print("{0:<36} {1:>7} bytes  {2}".format(name, sent, "FAIL" if stepFailures else "ok"))
+        finally:
+            simulator.uninstallFilesystem()
+
+    if args.update:
+        with open(BUDGETS_PATH, "w") as f:
+            json.dump(budgets, f, indent = 2, sort_keys = True)
+            f.write("\n")
+
+        print("{0} snapshots written to {1}".format(checked, SNAPSHOT_DIR))
+        return
+
+    for failure in failures:
+        print("REGRESSION: " + failure)
+
+    print("{0} steps checked, {1} failures (actual / diff images in {2})".format(checked, len(failures), args.out) if failures
+          else "{0} steps checked, all match".format(checked))
+
+    if failures:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
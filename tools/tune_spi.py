@@ -0,0 +1,63 @@
+# tune_spi.py
+# Runs lib/BaudTuner.py's sweep against the simulated panel
+#
+# The simulated wiring corrupts pixels sent faster than --limit Hz (simulator.setSpiLimit) and every refresh moves the
+# virtual clock on by its bytes at the bus baud rate (simulator.setBusClock), so the report's ms/frame is SPI time
+# only (on the Pico displayio's rendering adds to it).  Instead of asking over serial each rate is checked by comparing
+# the panel's memory with the display tree, the way a panel that could be read back would be checked.
+#
+# The fastest good rate is saved to a temporary CIRCUITPY root and read back with loadBaudrate() the way main.py does.
+#
+# USAGE:
+#
+#   python3 tools/tune_spi.py --limit 40000000
+import argparse, os, sys, tempfile
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(TOOLS_DIR)
+sys.path.insert(0, os.path.join(REPO_DIR, "lib"))
+sys.path.insert(0, os.path.join(TOOLS_DIR, "sim"))
+
+import simulator
+from AZ_ST7735S import AZ_ST7735S
+import BaudTuner
+
+# function readBack
+# verify() for the simulator: the panel shows exactly what the display tree says it should
+def readBack(tft):
+    display = tft.getDisplay()
+    return display.render() == display.framebuffer
+
+def main():
+    parser = argparse.ArgumentParser(description = "SPI baud rate sweep on the simulated panel")
+    parser.add_argument("--limit", type = float, default = 40000000, help = "fastest SPI clock the simulated wiring carries cleanly (Hz)")
+    parser.add_argument("--frames", type = int, default = 10, help = "full screen repaints timed at each rate")
+    args = parser.parse_args()
+
+    clock = simulator.VirtualClock()
+    clock.install()
+    simulator.setSpiLimit(args.limit)
+    simulator.setBusClock(clock)
+
+    with tempfile.TemporaryDirectory() as root:
+        simulator.setRoot(root)
+        simulator.DEVICE_DIRS.append(BaudTuner.CONFIG_PATH)
+        simulator.installFilesystem()
+
+        try:
+            tft = AZ_ST7735S()
+            tft.initialiseScreen(90, autoRefresh = False)
+            tuner = BaudTuner.BaudTuner(tft, verify = readBack, frames = args.frames)
+            tuner.sweep()
+            print(tuner.formatReport())
+            print("saved: {0}, read back: {1}, screen now at: {2}".format(tuner.save(), BaudTuner.loadBaudrate(),
+                tft.getDisplay().bus.baudrate))
+        finally:
+            simulator.uninstallFilesystem()
+            simulator.DEVICE_DIRS.remove(BaudTuner.CONFIG_PATH)
+            simulator.setBusClock(None)
+            simulator.setSpiLimit(None)
+            clock.uninstall()
+
+if __name__ == "__main__":
+    main()